@@ -0,0 +1,117 @@
+"""
+案卷 mmap 基准：进程池 worker 的内存占用（RSS / PSS / 私有匿名页）
+
+对比两种把同一份 etf_daily 交给 N 个 worker 的方式（spawn 启动，与真实进程池一致）：
+- pickle：常规 Dossier，每个 worker 反序列化出一份私有 DataFrame
+- mmap：快照 mmap 案卷，序列化只传路径，worker 映射同一文件（物理页共享）
+
+用法（Linux，读 /proc/self/smaps_rollup）：
+    python benchmarks/dossier_mmap_rss.py --rows 3000000 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from debate_mas.loader.dossier import Dossier
+from debate_mas.loader.dual_mode_loader import DualModeLoader
+from debate_mas.loader.snapshot import resolve_version_dir
+
+_BARRIER: Optional[Any] = None
+
+
+def _mem_mb() -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    with open("/proc/self/smaps_rollup", "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].rstrip(":") in ("Rss", "Pss", "Anonymous"):
+                out[parts[0].rstrip(":").lower()] = int(parts[1]) / 1024.0
+    return out
+
+
+def _init(barrier: Any) -> None:
+    global _BARRIER
+    _BARRIER = barrier
+
+
+def _worker(dossier: Optional[Dossier]) -> Dict[str, float]:
+    if dossier is not None:
+        df = dossier.get_table("etf_daily")
+        # 触达所有列（模拟技能读表），让页面真正进入进程
+        float(df["close"].sum() + df["amount"].sum() + df["volume"].sum())
+        int(df["date"].max().value)
+        int(df["code"].nunique())
+    _BARRIER.wait()  # 所有 worker 同时持有数据时再测，PSS 才能反映共享
+    mem = _mem_mb()
+    _BARRIER.wait()
+    return mem
+
+
+def _make_daily(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    n_codes = 2000
+    codes = np.array([f"{510000 + i:06d}" for i in range(n_codes)])
+    days = max(1, rows // n_codes)
+    return pd.DataFrame({
+        "code": np.tile(codes, days)[:rows],
+        "date": np.repeat(pd.date_range("2010-01-01", periods=days, freq="B").to_numpy(), n_codes)[:rows],
+        "open": rng.random(rows),
+        "high": rng.random(rows),
+        "low": rng.random(rows),
+        "close": rng.random(rows),
+        "volume": rng.integers(0, 10**8, rows),
+        "amount": rng.random(rows) * 1e8,
+    })
+
+
+def _run(mode: str, dossier: Optional[Dossier], workers: int) -> List[Dict[str, float]]:
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init, initargs=(barrier,)) as pool:
+        return list(pool.map(_worker, [dossier] * workers))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dossier mmap vs pickle: worker memory")
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snap = os.path.join(tmp, "snap")
+        d = Dossier.create_empty(mission="bench")
+        d.add_table("etf_daily", _make_daily(args.rows))
+        d.save_snapshot(snap)
+        del d
+
+        loader = DualModeLoader()
+        cases = [
+            ("baseline", None),
+            ("pickle", loader.load_snapshot(snap)),
+            ("mmap", loader.load_snapshot(snap, mmap=True)),
+        ]
+        table_mb = os.path.getsize(os.path.join(resolve_version_dir(snap), "tables", "0000.feather")) / 1024 / 1024
+        print(f"\netf_daily: {args.rows:,} rows, feather {table_mb:.0f} MB, workers={args.workers}")
+        print(f"{'mode':<10}{'rss/worker':>12}{'pss/worker':>12}{'anon/worker':>13}{'sum pss':>10}{'time':>8}")
+        for mode, dossier in cases:
+            t0 = time.time()
+            mems = _run(mode, dossier, args.workers)
+            avg = {k: sum(m[k] for m in mems) / len(mems) for k in ("rss", "pss", "anonymous")}
+            print(
+                f"{mode:<10}{avg['rss']:>10.0f}MB{avg['pss']:>10.0f}MB{avg['anonymous']:>11.0f}MB"
+                f"{sum(m['pss'] for m in mems):>8.0f}MB{time.time() - t0:>7.1f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# core/backtest.py
+"""
+Walk-forward 回测：不经过 LLM，直接按图里强制的两阶段流程调用技能
+
+每个 ref_date：
+1) recall：quantitative_sniper × HUNTER_RECALL_STRATEGIES（每个 top_k=HUNTER_RECALL_TOPK_PER_STRATEGY）
+2) audit：market_sentry + forensic_detective 审计召回池 -> risk_reports
+3) survivors：剔除 illiquid / risk_score >= RISK_SCORE_THRESHOLD（与 graph._compute_survivor_universe 同口径）
+4) rerank：quantitative_sniper(strategy=HUNTER_RERANK_STRATEGY, universe=survivors)
+5) allocate：portfolio_allocator(rerank 候选, risk_reports) -> BUY 权重
+
+参数统一走 tools._apply_tool_policy（与图中工具调用同一套 defaults/profile/enforce）。
+数据准备跨日期共享：案卷只加载一次；标准化日线 / 价格面板 / 舆情倒排索引按案卷缓存，
+各 ref_date 只取日期前缀切片（见 BaseFinanceSkill.get_prepared_daily / sniper._get_price_panel）。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+import pandas as pd
+
+from debate_mas.protocol import SkillResult
+from debate_mas.skills.registry import SkillRegistry
+
+from .blend_rank import dedup_by_symbol_keep_best
+from .config import CONFIG
+from .engine import load_dossier
+from .graph import _compute_survivor_universe, _merge_risk_reports
+from .tools import _apply_tool_policy, _schema_keys_from_tool, build_ctx
+
+
+@dataclass
+class BacktestResult:
+    """weights：index=ref_date, columns=symbol（未持有为 0）；turnover：0.5 * Σ|Δw|（首期相对空仓）"""
+    weights: pd.DataFrame
+    turnover: pd.Series
+    log: List[Dict[str, Any]] = field(default_factory=list)
+
+    def save(self, output_dir: str) -> Dict[str, str]:
+        os.makedirs(output_dir, exist_ok=True)
+        paths = {
+            "weights": os.path.join(output_dir, "backtest_weights.csv"),
+            "turnover": os.path.join(output_dir, "backtest_turnover.csv"),
+            "log": os.path.join(output_dir, "backtest_log.jsonl"),
+        }
+        self.weights.to_csv(paths["weights"], encoding="utf-8-sig")
+        self.turnover.to_frame().to_csv(paths["turnover"], encoding="utf-8-sig")
+        with open(paths["log"], "w", encoding="utf-8") as f:
+            for row in self.log:
+                f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+        return paths
+
+
+class _SkillCaller:
+    """按 (技能, role, ref_date) 调技能；参数走与图相同的 policy，schema 字段按技能缓存"""
+
+    def __init__(self, dossier: Any):
+        self.dossier = dossier
+        self._schema_keys: Dict[str, Optional[Set[str]]] = {}
+
+    def __call__(self, name: str, role: str, ref_date: str, args: Dict[str, Any]) -> SkillResult:
+        skill = SkillRegistry.get_skill(name)
+        ctx = build_ctx(self.dossier, role=role, ref_date=ref_date)
+        if name not in self._schema_keys:
+            self._schema_keys[name] = _schema_keys_from_tool(skill.to_langchain_tool(ctx))
+        return skill.safe_run(ctx, **_apply_tool_policy(name, dict(args), self._schema_keys[name]))
+
+
+def _items(res: SkillResult) -> List[Dict[str, Any]]:
+    data = res.data if res.success else None
+    items = data.get("items") if isinstance(data, dict) else None
+    return [x for x in items if isinstance(x, dict)] if isinstance(items, list) else []
+
+
+def run_pipeline(call: _SkillCaller, ref_date: str) -> Dict[str, Any]:
+    """单个 ref_date 的 recall -> audit -> rerank -> allocate；返回权重与过程统计"""
+    t0 = time.time()
+    row: Dict[str, Any] = {"ref_date": ref_date, "ok": False, "weights": {}}
+
+    # 1) recall
+    topk = int(getattr(CONFIG, "HUNTER_RECALL_TOPK_PER_STRATEGY", 10) or 10)
+    recalled: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    for strat in getattr(CONFIG, "HUNTER_RECALL_STRATEGIES", []) or []:
+        res = call("quantitative_sniper", "hunter", ref_date, {"strategy": strat, "top_k": topk})
+        if not res.success:
+            errors.append(f"recall[{strat}]: {res.error_msg}")
+        recalled.extend(_items(res))
+    candidates = dedup_by_symbol_keep_best(recalled)
+    row["n_recall"] = len(candidates)
+    if not candidates:
+        row["error"] = "; ".join(errors) or "召回为空"
+        row["elapsed_s"] = round(time.time() - t0, 3)
+        return row
+
+    # 2) audit
+    symbols = [c["symbol"] for c in candidates]
+    risk = _merge_risk_reports(
+        _items(call("market_sentry", "auditor", ref_date, {"symbols": symbols})),
+        _items(call("forensic_detective", "auditor", ref_date, {"symbols": symbols})),
+    )
+
+    # 3) survivors
+    survivors = _compute_survivor_universe({"candidates_cur": candidates, "objections_cur": [], "risk_reports": risk})
+    row["n_survivors"] = len(survivors)
+
+    # 4) rerank（存活池为空 -> 空仓）
+    reranked: List[Dict[str, Any]] = []
+    if survivors:
+        strat = str(getattr(CONFIG, "HUNTER_RERANK_STRATEGY", "composite"))
+        res = call("quantitative_sniper", "hunter", ref_date, {"strategy": strat, "universe": survivors, "top_k": len(survivors)})
+        if not res.success:
+            row["error"] = f"rerank: {res.error_msg}"
+            row["elapsed_s"] = round(time.time() - t0, 3)
+            return row
+        reranked = _items(res)
+
+    # 5) allocate
+    weights: Dict[str, float] = {}
+    if reranked:
+        res = call("portfolio_allocator", "pm", ref_date, {"candidates": reranked, "risk_reports": risk})
+        if not res.success:
+            row["error"] = f"allocate: {res.error_msg}"
+            row["elapsed_s"] = round(time.time() - t0, 3)
+            return row
+        for d in _items(res):
+            action = d.get("action", "")
+            if str(getattr(action, "value", action)).upper() == "BUY" and float(d.get("weight", 0.0) or 0.0) > 0:
+                weights[str(d["symbol"])] = float(d["weight"])
+
+    row.update(ok=True, weights=weights, n_rerank=len(reranked), n_buy=len(weights), elapsed_s=round(time.time() - t0, 3))
+    return row
+
+
+def compute_turnover(weights: pd.DataFrame) -> pd.Series:
+    """turnover_t = 0.5 * Σ|w_t - w_{t-1}|；首期相对空仓"""
+    if len(weights.index) == 0:
+        return pd.Series(dtype=float, name="turnover")
+    prev = weights.shift(1).fillna(0.0)
+    return (weights - prev).abs().sum(axis=1).mul(0.5).rename("turnover")
+
+
+def run_backtest(
+    ref_dates: Sequence[str],
+    *,
+    folder_path: Optional[str] = None,
+    dossier: Optional[Any] = None,
+    workers: int = 1,
+    output_dir: Optional[str] = None,
+) -> BacktestResult:
+    """
+    按 ref_dates 逐期回放两阶段流程（不调 LLM）
+    - 某期失败（数据缺失等）时沿用上期权重（不交易），原因记入 log
+    - workers>1：首期串行跑完（构建共享缓存），其余日期线程池并发
+    - output_dir：落盘 weights / turnover / log
+    """
+    dates = sorted({str(pd.Timestamp(d).date()) for d in ref_dates})
+
+    SkillRegistry.load_all_skills(force_reload=False)
+    if dossier is None:
+        dossier = load_dossier("backtest", folder_path)
+    call = _SkillCaller(dossier)
+
+    t0 = time.time()
+    rows: List[Dict[str, Any]] = []
+    if dates:
+        rows.append(run_pipeline(call, dates[0]))
+        rest = dates[1:]
+        if int(workers or 1) > 1 and rest:
+            with ThreadPoolExecutor(max_workers=int(workers), thread_name_prefix="backtest") as pool:
+                rows.extend(pool.map(lambda d: run_pipeline(call, d), rest))
+        else:
+            rows.extend(run_pipeline(call, d) for d in rest)
+
+    # 失败期沿用上期权重
+    held: Dict[str, float] = {}
+    series: Dict[str, Dict[str, float]] = {}
+    for r in rows:
+        if r["ok"]:
+            held = r["weights"]
+        else:
+            r["held_previous"] = True
+        series[r["ref_date"]] = held
+
+    weights = pd.DataFrame.from_dict(series, orient="index").reindex(dates).fillna(0.0)
+    weights = weights.reindex(columns=sorted(weights.columns))
+    weights.index.name = "ref_date"
+    turnover = compute_turnover(weights)
+
+    ok_n = sum(1 for r in rows if r["ok"])
+    print(f"📈 [Backtest] {len(dates)} 期完成 {ok_n} 期，用时 {time.time() - t0:.1f}s，平均换手 {float(turnover.mean() if len(turnover) else 0.0):.3f}")
+
+    result = BacktestResult(weights=weights, turnover=turnover, log=rows)
+    if output_dir:
+        result.save(output_dir)
+    return result
@@ -0,0 +1,204 @@
+# core/batch.py
+"""
+批量运行：多个 (mission, ref_date) 任务共享一份案卷
+
+- 案卷只加载一次，各任务只读共享（派生缓存 get_derived 也随之共享）
+- 技能只注册一次；每个任务独立构建 state / tools / LLM（ref_date 各不相同）
+- 线程池并发（LLM 请求是网络 I/O，技能中的 pandas 计算大多释放 GIL）
+- 产物：<output_dir>/<job_id>/ 下为单任务四件套；<output_dir>/batch_summary.jsonl|csv 为汇总索引
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from debate_mas.skills.registry import SkillRegistry
+
+from .config import CONFIG
+from .llm_backends import run_stats_scope
+from . import engine
+
+SUMMARY_FIELDS = [
+    "job_id",
+    "mission",
+    "ref_date",
+    "ok",
+    "stop_reason",
+    "rounds",
+    "elapsed_s",
+    "n_decisions",
+    "n_buy",
+    "decisions",
+    "output_dir",
+    "error",
+]
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    mission: str
+    ref_date: Optional[str] = None
+    seed_user_message: Optional[str] = None
+    job_id: Optional[str] = None
+
+
+def _coerce_job(job: Union[BatchJob, Dict[str, Any]]) -> BatchJob:
+    if isinstance(job, BatchJob):
+        return job
+    if isinstance(job, dict) and job.get("mission"):
+        return BatchJob(
+            mission=str(job["mission"]),
+            ref_date=job.get("ref_date"),
+            seed_user_message=job.get("seed_user_message"),
+            job_id=job.get("job_id"),
+        )
+    raise ValueError(f"无效的批量任务（缺少 mission）: {job!r}")
+
+
+def _decisions_digest(decisions: List[Dict[str, Any]]) -> str:
+    """决策摘要：symbol:action:weight；分号分隔（CSV 一格可读）"""
+    parts = []
+    for d in decisions or []:
+        if not isinstance(d, dict):
+            continue
+        try:
+            w = float(d.get("weight", 0.0) or 0.0)
+        except (TypeError, ValueError):
+            w = 0.0
+        parts.append(f"{d.get('symbol', '')}:{d.get('action', '')}:{w:.4f}")
+    return ";".join(parts)
+
+
+def run_job(job: BatchJob, *, dossier: Any, output_dir: str) -> Dict[str, Any]:
+    """在已加载的案卷上跑单个任务（不重新加载案卷/技能），返回汇总行"""
+    t0 = time.time()
+    row: Dict[str, Any] = {
+        "job_id": job.job_id,
+        "mission": job.mission,
+        "ref_date": job.ref_date,
+        "ok": False,
+        "output_dir": output_dir,
+    }
+    # 并发任务各自计数：留痕里的 LLM 缓存 / cassette 命中数只含本任务
+    with run_stats_scope():
+        try:
+            _, st = engine._setup_dossier_and_state(
+                mission=job.mission,
+                ref_date=job.ref_date,
+                folder_path=None,
+                seed_user_message=job.seed_user_message,
+                dossier=dossier,
+            )
+            _prompts, hunter_block, auditor_block, pm_block = engine._setup_prompts_tools_llms(
+                mission=job.mission,
+                dossier=dossier,
+                ref_date=job.ref_date,
+                st=st,
+            )
+            final_state = engine._run_graph(
+                st=st,
+                hunter_block=hunter_block,
+                auditor_block=auditor_block,
+                pm_block=pm_block,
+                verbose_summary=False,
+            )
+            artifacts = engine._finalize_and_render(
+                mission=job.mission,
+                ref_date=job.ref_date,
+                output_dir=output_dir,
+                final_state=final_state,
+                verbose_summary=False,
+            )
+            decisions = [d for d in (final_state.get("decisions", []) or []) if isinstance(d, dict)]
+            row.update(
+                ok=True,
+                stop_reason=final_state.get("stop_reason"),
+                rounds=int(final_state.get("round_idx", 0) or 0) + 1,
+                n_decisions=len(decisions),
+                n_buy=sum(1 for d in decisions if str(d.get("action", "")).upper() == "BUY"),
+                decisions=_decisions_digest(decisions),
+                artifacts=artifacts,
+            )
+        except Exception as e:
+            row["error"] = f"{type(e).__name__}: {e}"
+    row["elapsed_s"] = round(time.time() - t0, 3)
+    return row
+
+
+def write_summary(rows: List[Dict[str, Any]], output_dir: str) -> Dict[str, str]:
+    """汇总索引落盘：JSONL（完整，含 artifacts）+ CSV（SUMMARY_FIELDS）"""
+    os.makedirs(output_dir, exist_ok=True)
+    jsonl_path = os.path.join(output_dir, "batch_summary.jsonl")
+    csv_path = os.path.join(output_dir, "batch_summary.csv")
+
+    with open(jsonl_path, "w", encoding="utf-8") as f:
+        for r in rows:
+            f.write(json.dumps(r, ensure_ascii=False, default=str) + "\n")
+
+    with open(csv_path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for r in rows:
+            writer.writerow({k: r.get(k, "") for k in SUMMARY_FIELDS})
+
+    return {"summary_jsonl": jsonl_path, "summary_csv": csv_path}
+
+
+def run_batch(
+    jobs: Sequence[Union[BatchJob, Dict[str, Any]]],
+    *,
+    folder_path: Optional[str] = None,
+    output_dir: str = "./output_reports/batch",
+    workers: Optional[int] = None,
+    dossier: Optional[Any] = None,
+) -> List[Dict[str, Any]]:
+    """
+    批量入口：
+    - jobs：BatchJob 或 dict（mission 必填；ref_date / seed_user_message / job_id 可选）
+    - folder_path / dossier：二选一；传入 dossier 时不再读盘
+    - workers：并发任务数，缺省 CONFIG.BATCH_MAX_WORKERS
+    - 返回与 jobs 同序的汇总行；单任务失败记 ok=False + error，不影响其它任务
+    """
+    job_list = [_coerce_job(j) for j in jobs]
+    job_list = [
+        j if j.job_id else BatchJob(j.mission, j.ref_date, j.seed_user_message, f"job_{i:03d}")
+        for i, j in enumerate(job_list)
+    ]
+    ids = [j.job_id for j in job_list]
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"批量任务 job_id 重复: {ids}")
+
+    # 1) 技能 + 案卷只加载一次
+    SkillRegistry.load_all_skills(force_reload=False)
+    if dossier is None:
+        dossier = engine.load_dossier(f"batch({len(job_list)} jobs)", folder_path)
+
+    # 2) 并发跑任务
+    n_workers = max(1, min(int(workers or getattr(CONFIG, "BATCH_MAX_WORKERS", 4) or 1), len(job_list) or 1))
+    print(f"📦 [Batch] {len(job_list)} jobs, workers={n_workers}, output={output_dir}")
+
+    def _one(job: BatchJob) -> Dict[str, Any]:
+        row = run_job(job, dossier=dossier, output_dir=os.path.join(output_dir, str(job.job_id)))
+        flag = "✅" if row["ok"] else "❌"
+        print(f"{flag} [Batch] {job.job_id} ref_date={job.ref_date} {row['elapsed_s']}s {row.get('stop_reason') or row.get('error', '')}")
+        return row
+
+    t0 = time.time()
+    with ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="batch") as pool:
+        rows = list(pool.map(_one, job_list))
+
+    # 3) 汇总索引
+    paths = write_summary(rows, output_dir)
+    ok_n = sum(1 for r in rows if r["ok"])
+    print(
+        f"📦 [Batch] done {ok_n}/{len(rows)} ok in {time.time() - t0:.1f}s "
+        f"({datetime.now().isoformat(timespec='seconds')}) -> {paths['summary_csv']}"
+    )
+    return rows
@@ -45,6 +45,16 @@ class SystemConfig:
         "pm": 3000,
     })
 
+    # --- 上下文裁剪（通用：控制每次发言的 prompt 大小，见 context.py） ---
+    CONTEXT_PRUNE: bool = True
+    CONTEXT_TOKEN_BUDGET_DEFAULT: int = 24000  # 估算 token；超出后早期 ToolMessage 换成摘要
+    ROLE_CONTEXT_TOKEN_BUDGET: Dict[str, int] = field(default_factory=lambda: {
+        "hunter": 24000,
+        "auditor": 24000,
+        "pm": 24000,
+    })
+    CONTEXT_PRUNE_TOP_N: int = 10  # 摘要中保留的 symbol 个数
+
     # --- 运行与证据策略（通用） ---
     VERBOSE: bool = True  # 是否打印“增量摘要”
     ENFORCE_TOOL_ON_NEED_EVIDENCE: bool = True  # 若出现 NEED_EVIDENCE，下一轮强制补证据（通用机制）
@@ -60,6 +70,13 @@ class SystemConfig:
         "pm": 1,
     })
     FORBID_SAME_TOOL_SAME_ARGS_IN_SAME_ROUND: bool = True  # 同轮同参去重/防刷
+    TOOL_RESULT_MEMO: bool = True  # 跨轮同参结果复用（按 ref_date + dossier 版本失效；命中仍计入调用次数）
+    TOOL_OUTPUT_LLM_VIEW: bool = True  # ToolMessage 用列式 LLM 视图（protocol/llm_view.py）；完整结果仍在 tool_cache
+    TOOL_OUTPUT_LLM_VIEW_DIGITS: int = 4  # LLM 视图数值保留的有效数字
+    TOOL_PARALLEL_MODE: str = "thread"  # 同一步多个 tool_call：thread=并发执行（guard 仍按顺序）；serial=逐个执行
+    TOOL_PARALLEL_MAX_WORKERS: int = 4
+    ASYNC_MAX_CONCURRENCY: int = 8  # engine.arun_many：同一事件循环内同时在跑的辩论数
+    BATCH_MAX_WORKERS: int = 4  # batch.run_batch：共享案卷并发跑的任务数
 
     # --- 候选数量硬约束（机制通用，但在本项目用于“候选池”） ---
     ENFORCE_MIN_CANDIDATES: bool = True
@@ -69,8 +86,36 @@ class SystemConfig:
     BASE_DIR: str = field(default_factory=_default_base_dir)
     DATA_DIR: str = field(init=False)
 
+    # --- 案卷快照（通用：源文件未变时跳过 CSV 解析，见 loader/snapshot.py；CLI --dossier_snapshot 可开启） ---
+    DOSSIER_SNAPSHOT: bool = False
+    DOSSIER_SNAPSHOT_DIR: str = field(init=False)  # 每个数据目录一个子目录
+    DOSSIER_SNAPSHOT_MMAP: bool = False  # 表由内存映射的快照文件支撑（进程池 worker 共享物理内存；需 pyarrow）
+    LOADER_PARALLEL: bool = True  # 逐文件加载时并行读取（CSV/XLSX 线程池，PDF/DOCX 进程池；按文件名顺序合并）
+    LOADER_MAX_WORKERS: int = 0  # 每个池的 worker 上限；0 = min(8, 文件数)
+    LOADER_LAZY: bool = True  # 表按需读取：CSV / 快照表只探测表头与行数，首次 get_table 时才解析
+
+    # --- 技能结果磁盘缓存（通用：跨运行复用；CLI --skill_cache 可覆盖） ---
+    SKILL_CACHE_MODE: str = "off"  # off / on / bypass（bypass=不读旧结果但刷新写入）
+    SKILL_CACHE_DIR: str = field(init=False)
+    SKILL_CACHE_MAX_MB: float = 512.0  # 超出后按最近使用时间淘汰
+
+    # --- LLM 后端（通用：live / record / replay；CLI --llm_backend 可覆盖） ---
+    LLM_BACKEND: str = "live"
+    LLM_CASSETTE_PATH: str = field(init=False)
+
+    # --- LLM 响应缓存（通用：SQLite；CLI --llm_cache 可覆盖） ---
+    LLM_CACHE_MODE: str = "off"  # off / on / bypass
+    LLM_CACHE_PATH: str = field(init=False)
+    LLM_CACHE_TTL_HOURS: float = 168.0  # 超时条目视为未命中
+    LLM_CACHE_MAX_MB: float = 256.0  # 超出后按最近访问时间淘汰
+    LLM_CACHE_ALLOW_SAMPLED: bool = False  # temperature > 0 的角色默认绕过缓存
+
     def __post_init__(self):
         object.__setattr__(self, "DATA_DIR", os.path.join(self.BASE_DIR, "data_test"))
+        object.__setattr__(self, "SKILL_CACHE_DIR", os.path.join(self.BASE_DIR, ".skill_cache"))
+        object.__setattr__(self, "DOSSIER_SNAPSHOT_DIR", os.path.join(self.BASE_DIR, ".dossier_snapshots"))
+        object.__setattr__(self, "LLM_CASSETTE_PATH", os.path.join(self.BASE_DIR, ".llm_cassettes", "cassette.jsonl"))
+        object.__setattr__(self, "LLM_CACHE_PATH", os.path.join(self.BASE_DIR, ".llm_cache", "responses.sqlite"))
 
     # ============================================================
     # B) ETF 业务参数（ETF Domain-Level）
@@ -223,6 +268,20 @@ class SystemConfig:
             "Tool_Allowlist": self.ROLE_TOOL_ALLOWLIST,
             "Tool_MaxCalls": self.ROLE_TOOL_MAX_CALLS,
             "Dedup_SameToolSameArgs": self.FORBID_SAME_TOOL_SAME_ARGS_IN_SAME_ROUND,
+            "Tool_Result_Memo": self.TOOL_RESULT_MEMO,
+            "Context_Prune": {
+                "enabled": self.CONTEXT_PRUNE,
+                "budget_by_role": self.ROLE_CONTEXT_TOKEN_BUDGET,
+                "top_n": self.CONTEXT_PRUNE_TOP_N,
+            },
+            "Tool_Parallel": {"mode": self.TOOL_PARALLEL_MODE, "max_workers": self.TOOL_PARALLEL_MAX_WORKERS},
+            "Async_Max_Concurrency": self.ASYNC_MAX_CONCURRENCY,
+            "Batch_Max_Workers": self.BATCH_MAX_WORKERS,
+            "Skill_Cache": {
+                "mode": self.SKILL_CACHE_MODE,
+                "dir": self.SKILL_CACHE_DIR,
+                "max_mb": self.SKILL_CACHE_MAX_MB,
+            },
             "Risk_Threshold": self.RISK_SCORE_THRESHOLD,
             "Hunter_Pipeline": {
                 "enabled": self.HUNTER_DETERMINISTIC_PIPELINE,
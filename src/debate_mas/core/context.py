@@ -0,0 +1,135 @@
+# core/context.py
+"""
+上下文裁剪：控制每次发言的 prompt 大小
+
+_agent 每次都把 system prompt + 全量 messages 发给模型；早期 ToolMessage（比如 200 个候选的 sniper 结果）
+会在后续每一轮里重复出现，prompt 随轮数近似平方增长。
+
+策略（确定性，同一输入裁剪结果相同，不影响 LLM 响应缓存命中）：
+1) 本轮（state["_round_msg_start"] 之后）的消息原样保留
+2) prompt 估算 token 超出角色预算时，从最早的 ToolMessage 开始替换为摘要（insight + 前 N 个 symbol），
+   直到低于预算；tool_call_id 保留，AI tool_calls 与 ToolMessage 的配对不被破坏
+3) 全部早期 ToolMessage 都压缩后仍超预算：不再裁剪（本轮证据优先），由 trace 留痕
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, ToolMessage
+
+from debate_mas.protocol.llm_view import view_rows
+
+from .config import CONFIG
+
+# 每条消息的固定开销（role / 分隔符）
+_MSG_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """粗估 token：非 ASCII（中文）按 1 字 1 token，ASCII 按 4 字符 1 token"""
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + (len(text) - non_ascii + 3) // 4
+
+
+def _content_text(m: BaseMessage) -> str:
+    content = getattr(m, "content", "")
+    return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False, default=str)
+
+
+def message_tokens(m: BaseMessage) -> int:
+    n = _MSG_OVERHEAD + estimate_tokens(_content_text(m))
+    tool_calls = getattr(m, "tool_calls", None)
+    if tool_calls:
+        n += estimate_tokens(json.dumps(tool_calls, ensure_ascii=False, default=str))
+    return n
+
+
+def count_tokens(messages: Sequence[BaseMessage]) -> int:
+    return sum(message_tokens(m) for m in messages or [])
+
+
+def digest_tool_content(content: str, *, top_n: int = 10) -> str:
+    """ToolMessage（SkillResult JSON 或 LLM 视图）-> 摘要 JSON：success / insight / 条目数 / 前 N 个 symbol"""
+    try:
+        obj = json.loads(content)
+    except (TypeError, ValueError):
+        obj = None
+    if not isinstance(obj, dict):
+        text = str(content or "")
+        return json.dumps({"pruned": True, "preview": text[:200]}, ensure_ascii=False)
+
+    data = obj.get("data")
+    items = view_rows(obj)
+    if items is None:
+        items = data.get("items") if isinstance(data, dict) else data
+    digest: Dict[str, Any] = {"pruned": True, "success": obj.get("success"), "insight": obj.get("insight", "")}
+    if obj.get("error_msg"):
+        digest["error_msg"] = obj.get("error_msg")
+    if isinstance(items, list):
+        symbols = [str(x["symbol"]) for x in items if isinstance(x, dict) and x.get("symbol")]
+        digest["n_items"] = len(items)
+        if symbols:
+            digest["top_symbols"] = symbols[: max(0, int(top_n))]
+    return json.dumps(digest, ensure_ascii=False)
+
+
+def prune_messages(
+    messages: List[BaseMessage],
+    *,
+    keep_from: int,
+    budget_tokens: int,
+    reserved_tokens: int = 0,
+    top_n: int = 10,
+) -> Tuple[List[BaseMessage], Dict[str, int]]:
+    """
+    返回 (裁剪后的 messages, 统计)；不修改入参
+    - keep_from：该下标及之后的消息原样保留（本轮）
+    - reserved_tokens：同一 prompt 中 system 消息等不可裁剪部分的 token
+    """
+    msgs = list(messages or [])
+    before = reserved_tokens + count_tokens(msgs)
+    stats = {"tokens_before": before, "tokens_after": before, "pruned_n": 0, "budget": int(budget_tokens)}
+    if budget_tokens <= 0 or before <= budget_tokens:
+        return msgs, stats
+
+    total = before
+    keep_from = max(0, min(int(keep_from), len(msgs)))
+    for i in range(keep_from):
+        if total <= budget_tokens:
+            break
+        m = msgs[i]
+        if not isinstance(m, ToolMessage):
+            continue
+        digest = digest_tool_content(_content_text(m), top_n=top_n)
+        pruned = m.model_copy(update={"content": digest})
+        delta = message_tokens(m) - message_tokens(pruned)
+        if delta <= 0:
+            continue
+        msgs[i] = pruned
+        total -= delta
+        stats["pruned_n"] += 1
+
+    stats["tokens_after"] = total
+    return msgs, stats
+
+
+def prune_for_role(state: Dict[str, Any], role: str, *, reserved_tokens: int = 0) -> Tuple[List[BaseMessage], Dict[str, int]]:
+    """按 CONFIG.ROLE_CONTEXT_TOKEN_BUDGET 裁剪 state["messages"]（CONTEXT_PRUNE=False 时原样返回）"""
+    msgs = state.get("messages", []) or []
+    if not bool(getattr(CONFIG, "CONTEXT_PRUNE", True)):
+        n = reserved_tokens + count_tokens(msgs)
+        return list(msgs), {"tokens_before": n, "tokens_after": n, "pruned_n": 0, "budget": 0}
+
+    budgets = getattr(CONFIG, "ROLE_CONTEXT_TOKEN_BUDGET", {}) or {}
+    budget = int(budgets.get(role, getattr(CONFIG, "CONTEXT_TOKEN_BUDGET_DEFAULT", 0)) or 0)
+    return prune_messages(
+        msgs,
+        keep_from=int(state.get("_round_msg_start", 0) or 0),
+        budget_tokens=budget,
+        reserved_tokens=reserved_tokens,
+        top_n=int(getattr(CONFIG, "CONTEXT_PRUNE_TOP_N", 10) or 10),
+    )
@@ -3,14 +3,16 @@ from __future__ import annotations
 
 import os
 import json
+import asyncio
 from datetime import datetime
-from typing import Any, Dict, Optional, List, Tuple
+from typing import Any, Dict, Optional, List, Tuple, Union
 
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, BaseMessage
 
 from debate_mas.loader.dual_mode_loader import DualModeLoader
+from debate_mas.loader.snapshot import default_snapshot_path
 from debate_mas.skills.registry import SkillRegistry
 from debate_mas.protocol.renderer import DebateRenderer
 from debate_mas.protocol.schema import EtfDecision
@@ -31,6 +33,8 @@ from .graph import (
 
 from .blend_rank import merge_candidates, explain_merge
 from .tools import build_role_tools_and_node
+from .llm_backends import get_llm_backend, run_stats, run_stats_scope, wrap_llm
+from .llm_cache import cached_llm, get_llm_cache
 
 load_dotenv()
 
@@ -61,6 +65,23 @@ def _build_llm(
     )
 
 
+def _llm_backend_meta() -> Dict[str, Any]:
+    """LLM 后端留痕：live / record / replay + 本次运行的 cassette 命中统计"""
+    backend = get_llm_backend()
+    cassette = backend.get("cassette")
+    if cassette is None:
+        return {"mode": backend.get("mode", "live")}
+    return {"mode": backend.get("mode"), "cassette": str(cassette.path), "stats": run_stats("cassette", cassette.stats)}
+
+
+def _llm_cache_meta() -> Dict[str, Any]:
+    """LLM 响应缓存留痕：模式 + 本次运行的命中统计（并发多场互不混计，见 run_stats_scope）"""
+    cache = get_llm_cache()
+    if cache is None:
+        return {"mode": "off"}
+    return {"mode": cache.mode, "path": str(cache.db_path), "allow_sampled": cache.allow_sampled, "stats": run_stats("llm_cache", cache.stats)}
+
+
 def _coerce_decisions(decisions: List[Dict[str, Any]]) -> List[EtfDecision]:
     """把 PM 输出的 dict 统一转成 EtfDecision"""
     out: List[EtfDecision] = []
@@ -88,6 +109,7 @@ def _coerce_tool_trace(trace: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         x.setdefault("visuals", [])
         x.setdefault("produced_n", 0)
         x.setdefault("elapsed_ms", 0)
+        x.setdefault("cache_hit", False)
         x.setdefault("round_idx", 0)
         x.setdefault("role", "unknown")
         out.append(x)
@@ -135,16 +157,37 @@ def _serialize_messages(msgs: List[BaseMessage]) -> List[Dict[str, Any]]:
 # ============================================================
 # 2) run() 的 3 个“纯组装函数”
 # ============================================================
+def load_dossier(mission: str, folder_path: Optional[str] = None, *, snapshot: Optional[bool] = None) -> Any:
+    """
+    从文件夹加载案卷（run / batch / backtest 共用）
+    - snapshot：是否读写案卷快照（源文件未变则直接读快照）；None 时取 CONFIG.DOSSIER_SNAPSHOT
+    """
+    folder = folder_path or CONFIG.DATA_DIR
+    kwargs: Dict[str, Any] = {}
+    if snapshot is None:
+        snapshot = bool(getattr(CONFIG, "DOSSIER_SNAPSHOT", False))
+    if snapshot:
+        kwargs["snapshot_dir"] = default_snapshot_path(CONFIG.DOSSIER_SNAPSHOT_DIR, folder)
+        kwargs["snapshot_mmap"] = bool(getattr(CONFIG, "DOSSIER_SNAPSHOT_MMAP", False))
+    if bool(getattr(CONFIG, "LOADER_PARALLEL", False)):
+        kwargs["parallel"] = True
+        kwargs["max_workers"] = int(getattr(CONFIG, "LOADER_MAX_WORKERS", 0) or 0) or None
+    if bool(getattr(CONFIG, "LOADER_LAZY", False)):
+        kwargs["lazy"] = True
+    return DualModeLoader().load_from_folder(mission=mission, folder_path=folder, **kwargs)
+
+
 def _setup_dossier_and_state(
     *,
     mission: str,
     ref_date: Optional[str],
     folder_path: Optional[str],
     seed_user_message: Optional[str],
+    dossier: Optional[Any] = None,
 ) -> Tuple[Any, DebateState]:
-    # 1) 加载案卷（dossier）
-    loader = DualModeLoader()
-    dossier = loader.load_from_folder(mission=mission, folder_path=folder_path or CONFIG.DATA_DIR)
+    # 1) 加载案卷（dossier）；外部传入时直接复用
+    if dossier is None:
+        dossier = load_dossier(mission, folder_path)
 
     # 2) 初始化 state
     msgs: List[BaseMessage] = []
@@ -179,16 +222,28 @@ def _setup_prompts_tools_llms(
     role_max_tokens = getattr(CONFIG, "ROLE_MAX_TOKENS", {}) or {}
     max_tokens_default = int(getattr(CONFIG, "MAX_TOKENS_DEFAULT", 3000) or 3000)
 
-    # 3) 构建 LLM
-    hunter_llm = _build_llm(CONFIG.HUNTER_MODEL, temperature=float(temps.get("hunter", 0.9)), max_tokens=role_max_tokens.get("hunter", max_tokens_default)).bind_tools(hunter_tools)
-    auditor_llm = _build_llm(CONFIG.AUDITOR_MODEL, temperature=float(temps.get("auditor", 0.3)), max_tokens=role_max_tokens.get("auditor", max_tokens_default)).bind_tools(auditor_tools)
-    pm_llm = _build_llm(CONFIG.PM_MODEL, temperature=float(temps.get("pm", 0.1)), max_tokens=role_max_tokens.get("pm", max_tokens_default)).bind_tools(pm_tools)
+    # 3) 构建 LLM（record/replay 后端见 llm_backends.py；replay 时不连网；live 时可叠加响应缓存 llm_cache.py）
+    def _role_llm(role: str, model: str, default_temp: float) -> Any:
+        temperature = float(temps.get(role, default_temp))
+        llm = wrap_llm(
+            lambda: _build_llm(model, temperature=temperature, max_tokens=role_max_tokens.get(role, max_tokens_default)),
+            role=role,
+            model=model,
+        )
+        if get_llm_backend().get("mode") != "live":
+            return llm
+        return cached_llm(llm, model=model, temperature=temperature)
+
+    hunter_llm = _role_llm("hunter", CONFIG.HUNTER_MODEL, 0.9).bind_tools(hunter_tools)
+    auditor_llm = _role_llm("auditor", CONFIG.AUDITOR_MODEL, 0.3).bind_tools(auditor_tools)
+    pm_llm = _role_llm("pm", CONFIG.PM_MODEL, 0.1).bind_tools(pm_tools)
 
     # 4) 组装 RoleBlock
     hunter_block = RoleBlock(
         role="hunter",
         system_prompt=prompts["hunter"],
         llm_invoke=lambda ms: hunter_llm.invoke(ms),
+        allm_invoke=(lambda ms: hunter_llm.ainvoke(ms)) if hasattr(hunter_llm, "ainvoke") else None,
         tool_node=hunter_tool_node,
         postprocess=postprocess_hunter,
     )
@@ -196,6 +251,7 @@ def _setup_prompts_tools_llms(
         role="auditor",
         system_prompt=prompts["auditor"],
         llm_invoke=lambda ms: auditor_llm.invoke(ms),
+        allm_invoke=(lambda ms: auditor_llm.ainvoke(ms)) if hasattr(auditor_llm, "ainvoke") else None,
         tool_node=auditor_tool_node,
         postprocess=postprocess_auditor,
     )
@@ -203,6 +259,7 @@ def _setup_prompts_tools_llms(
         role="pm",
         system_prompt=prompts["pm"],
         llm_invoke=lambda ms: pm_llm.invoke(ms),
+        allm_invoke=(lambda ms: pm_llm.ainvoke(ms)) if hasattr(pm_llm, "ainvoke") else None,
         tool_node=pm_tool_node,
         postprocess=postprocess_pm,
     )
@@ -210,6 +267,37 @@ def _setup_prompts_tools_llms(
     return prompts, hunter_block, auditor_block, pm_block
 
 
+def _run_graph(
+    *,
+    st: DebateState,
+    hunter_block: RoleBlock,
+    auditor_block: RoleBlock,
+    pm_block: RoleBlock,
+    verbose_summary: bool,
+) -> DebateState:
+    """构建并运行图，返回最终 state（verbose 时按步打印增量摘要）"""
+    app = build_etf_attack_patch_graph(hunter=hunter_block, auditor=auditor_block, pm=pm_block)
+
+    if not verbose_summary:
+        return app.invoke(st)
+
+    final_state: DebateState = st
+    last_tool_trace_len = len(st.get("tool_trace", []) or [])
+    last_msg_len = len(st.get("messages", []) or [])
+
+    for step_state in app.stream(st, stream_mode="values"):
+        final_state = step_state
+
+        # 1) tool_trace 增量摘要
+        tool_trace_now = final_state.get("tool_trace", []) or []
+        last_tool_trace_len = _print_tool_trace_increment(tool_trace_now, last_tool_trace_len)
+
+        # 2) messages 增量：打印 Debate + payload 一行摘要
+        msgs_now = final_state.get("messages", []) or []
+        last_msg_len = _print_assistant_messages_increment(msgs_now, last_msg_len, max_chars=900, state=final_state)
+    return final_state
+
+
 def _run_graph_and_render(
     *,
     mission: str,
@@ -222,31 +310,73 @@ def _run_graph_and_render(
     verbose_summary: bool,
 ) -> Dict[str, str]:
     # 1) 构建并运行图
-    app = build_etf_attack_patch_graph(hunter=hunter_block, auditor=auditor_block, pm=pm_block)
+    print("\n🟦 VERBOSE_MODE=summary：辩论级摘要（按轮/角色工具摘要 + 自然语言）\n")
+    final_state = _run_graph(
+        st=st,
+        hunter_block=hunter_block,
+        auditor_block=auditor_block,
+        pm_block=pm_block,
+        verbose_summary=verbose_summary,
+    )
+    print("\n🟦 VERBOSE END\n")
+
+    return _finalize_and_render(
+        mission=mission,
+        ref_date=ref_date,
+        output_dir=output_dir,
+        final_state=final_state,
+        verbose_summary=verbose_summary,
+    )
+
+
+async def _arun_graph_and_render(
+    *,
+    mission: str,
+    ref_date: Optional[str],
+    output_dir: str,
+    st: DebateState,
+    hunter_block: RoleBlock,
+    auditor_block: RoleBlock,
+    pm_block: RoleBlock,
+    verbose_summary: bool,
+) -> Dict[str, str]:
+    """_run_graph_and_render 的异步版：图用 astream/ainvoke 驱动，渲染落盘放线程池"""
+    app = build_etf_attack_patch_graph(hunter=hunter_block, auditor=auditor_block, pm=pm_block, use_async=True)
 
     final_state: DebateState = st
-    print("\n🟦 VERBOSE_MODE=summary：辩论级摘要（按轮/角色工具摘要 + 自然语言）\n")
-    
     if verbose_summary:
         last_tool_trace_len = len(st.get("tool_trace", []) or [])
         last_msg_len = len(st.get("messages", []) or [])
 
-        for step_state in app.stream(st, stream_mode="values"):
+        async for step_state in app.astream(st, stream_mode="values"):
             final_state = step_state
-
-            # 1) tool_trace 增量摘要
             tool_trace_now = final_state.get("tool_trace", []) or []
             last_tool_trace_len = _print_tool_trace_increment(tool_trace_now, last_tool_trace_len)
-
-            # 2) messages 增量：打印 Debate + payload 一行摘要
             msgs_now = final_state.get("messages", []) or []
             last_msg_len = _print_assistant_messages_increment(msgs_now, last_msg_len, max_chars=900, state=final_state)
     else:
-        final_state = app.invoke(st)
+        final_state = await app.ainvoke(st)
+
+    return await asyncio.to_thread(
+        _finalize_and_render,
+        mission=mission,
+        ref_date=ref_date,
+        output_dir=output_dir,
+        final_state=final_state,
+        verbose_summary=verbose_summary,
+    )
 
-    print("\n🟦 VERBOSE END\n")
 
-    # 2) 候选融合留痕
+def _finalize_and_render(
+    *,
+    mission: str,
+    ref_date: Optional[str],
+    output_dir: str,
+    final_state: DebateState,
+    verbose_summary: bool,
+) -> Dict[str, str]:
+    """图跑完之后：候选融合 + 渲染 + transcript 落盘（同步/异步入口共用）"""
+    # 1) 候选融合留痕
     cand = final_state.get("candidates_cur", None)
     if cand is None:
         cand = final_state.get("candidates", []) or []
@@ -260,7 +390,7 @@ def _run_graph_and_render(
     transcript_msgs: List[BaseMessage] = final_state.get("messages", []) or []
     transcript = _serialize_messages(transcript_msgs)
 
-    # 3) 渲染输出
+    # 2) 渲染输出
     round_idx = int(final_state.get("round_idx", 0) or 0)
     rounds_done = round_idx + 1
 
@@ -276,6 +406,8 @@ def _run_graph_and_render(
         "extras": {
             "merge_notes": merge_notes,
             "config_snapshot": CONFIG.get_model_config(),
+            "llm_backend": _llm_backend_meta(),
+            "llm_cache": _llm_cache_meta(),
             "transcript": transcript,
             "candidates_cur": final_state.get("candidates_cur", []),
             "objections_cur": final_state.get("objections_cur", []),
@@ -289,7 +421,7 @@ def _run_graph_and_render(
     artifacts = renderer.render(mission=mission, decisions=decisions, extra_meta=extra_meta)
     final_state["artifacts"] = artifacts
 
-    # 4) transcript 落盘
+    # 3) transcript 落盘
     try:
         os.makedirs(output_dir, exist_ok=True)
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -335,10 +467,12 @@ def run(
     folder_path: Optional[str] = None,
     output_dir: str = "./output_reports",
     seed_user_message: Optional[str] = None,
+    dossier: Optional[Any] = None,
 ) -> Dict[str, str]:
     """
     一键运行入口：
     - folder_path：本地文件夹模式（最适合教学与业务人员）
+    - dossier：已加载的案卷（复用时不再读 folder_path；多任务复用见 core/batch.py）
     - 输出：log.json + memo.md + rebalance.csv（由 renderer 负责）
     """
     verbose_summary = CONFIG.VERBOSE
@@ -346,33 +480,112 @@ def run(
     # 1) 加载 skills
     SkillRegistry.load_all_skills(force_reload=False)
 
-    # 2) 准备 dossier + state
-    dossier, st = _setup_dossier_and_state(
-        mission=mission,
-        ref_date=ref_date,
-        folder_path=folder_path,
-        seed_user_message=seed_user_message,
-    )
+    # 2)~4) 在单次运行的统计作用域内执行（LLM 缓存 / cassette 命中数按本次运行计）
+    with run_stats_scope():
+        # 2) 准备 dossier + state
+        dossier, st = _setup_dossier_and_state(
+            mission=mission,
+            ref_date=ref_date,
+            folder_path=folder_path,
+            seed_user_message=seed_user_message,
+            dossier=dossier,
+        )
 
-    # 3) 准备 prompts/tools/llms
-    _prompts, hunter_block, auditor_block, pm_block = _setup_prompts_tools_llms(
-        mission=mission,
-        dossier=dossier,
-        ref_date=ref_date,
-        st=st,
-    )
+        # 3) 准备 prompts/tools/llms
+        _prompts, hunter_block, auditor_block, pm_block = _setup_prompts_tools_llms(
+            mission=mission,
+            dossier=dossier,
+            ref_date=ref_date,
+            st=st,
+        )
 
-    # 4) 运行图 + 渲染输出
-    return _run_graph_and_render(
-        mission=mission,
-        ref_date=ref_date,
-        output_dir=output_dir,
-        st=st,
-        hunter_block=hunter_block,
-        auditor_block=auditor_block,
-        pm_block=pm_block,
-        verbose_summary=verbose_summary,
-    )
+        # 4) 运行图 + 渲染输出
+        return _run_graph_and_render(
+            mission=mission,
+            ref_date=ref_date,
+            output_dir=output_dir,
+            st=st,
+            hunter_block=hunter_block,
+            auditor_block=auditor_block,
+            pm_block=pm_block,
+            verbose_summary=verbose_summary,
+        )
+
+async def arun(
+    mission: str,
+    *,
+    ref_date: Optional[str] = None,
+    folder_path: Optional[str] = None,
+    output_dir: str = "./output_reports",
+    seed_user_message: Optional[str] = None,
+    verbose: Optional[bool] = None,
+    load_skills: bool = True,
+) -> Dict[str, str]:
+    """
+    异步运行入口（与 run 参数一致）：
+    - LLM 走 ainvoke，技能/加载/渲染放线程池，事件循环可同时驱动多场辩论
+    - verbose 缺省取 CONFIG.VERBOSE；并发多场时建议关闭（增量打印会交错）
+    - load_skills=False：调用方已加载过技能（arun_many 只加载一次，避免并发重复 exec handler）
+    """
+    verbose_summary = CONFIG.VERBOSE if verbose is None else bool(verbose)
+
+    if load_skills:
+        await asyncio.to_thread(SkillRegistry.load_all_skills, force_reload=False)
+
+    with run_stats_scope():
+        dossier, st = await asyncio.to_thread(
+            _setup_dossier_and_state,
+            mission=mission,
+            ref_date=ref_date,
+            folder_path=folder_path,
+            seed_user_message=seed_user_message,
+        )
+
+        _prompts, hunter_block, auditor_block, pm_block = _setup_prompts_tools_llms(
+            mission=mission,
+            dossier=dossier,
+            ref_date=ref_date,
+            st=st,
+        )
+
+        return await _arun_graph_and_render(
+            mission=mission,
+            ref_date=ref_date,
+            output_dir=output_dir,
+            st=st,
+            hunter_block=hunter_block,
+            auditor_block=auditor_block,
+            pm_block=pm_block,
+            verbose_summary=verbose_summary,
+        )
+
+
+async def arun_many(
+    jobs: List[Dict[str, Any]],
+    *,
+    max_concurrency: Optional[int] = None,
+) -> List[Union[Dict[str, str], BaseException]]:
+    """
+    单事件循环并发跑多场辩论：
+    - jobs：每项为 arun 的关键字参数（必须含 mission）
+    - max_concurrency：同时在跑的辩论数上限，缺省 CONFIG.ASYNC_MAX_CONCURRENCY
+    - 返回与 jobs 同序；单场失败返回异常对象，不影响其它场次
+    - 报告文件名按秒级时间戳命名，未指定 output_dir 的 job 自动落到 ./output_reports/job_XXX
+    """
+    limit = int(max_concurrency or getattr(CONFIG, "ASYNC_MAX_CONCURRENCY", 8) or 1)
+    sem = asyncio.Semaphore(max(1, limit))
+
+    async def _one(i: int, job: Dict[str, Any]) -> Dict[str, str]:
+        kwargs = dict(job)
+        kwargs.setdefault("output_dir", os.path.join("./output_reports", f"job_{i:03d}"))
+        kwargs.setdefault("verbose", False)
+        kwargs["load_skills"] = False
+        async with sem:
+            return await arun(**kwargs)
+
+    await asyncio.to_thread(SkillRegistry.load_all_skills, force_reload=False)
+
+    return await asyncio.gather(*(_one(i, job) for i, job in enumerate(jobs)), return_exceptions=True)
 
 # ============================================================
 # VERBOSE SECTION
@@ -435,6 +648,7 @@ def _tool_trace_entry_digest(t: Dict[str, Any]) -> Dict[str, Any]:
         "ok": ok,
         "denied": denied,
         "elapsed_ms": elapsed_ms,
+        "cache_hit": bool(t.get("cache_hit", False)),
         "produced_n": produced_n,
         "insight": insight,
         "error": err,
@@ -469,6 +683,8 @@ def _print_tool_trace_increment(tool_trace: List[Dict[str, Any]], start_idx: int
                 status = "OK" if it["ok"] else "FAIL"
                 if it["denied"]:
                     status += "/DENIED"
+                if it["cache_hit"]:
+                    status += "/CACHED"
 
                 produced = f" | produced={it['produced_n']}" if it["produced_n"] is not None else ""
                 cost = f" | {it['elapsed_ms']}ms" if it["elapsed_ms"] else ""
@@ -1,14 +1,17 @@
 # core/graph.py
 from __future__ import annotations
 
+import asyncio
+from contextvars import copy_context
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 
 from langchain_core.messages import SystemMessage, AIMessage, BaseMessage
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
 
 from .config import CONFIG
+from .context import count_tokens, prune_for_role
 from .state import (
     DebateState,
     bump_round,
@@ -258,6 +261,8 @@ class RoleBlock:
     llm_invoke: Callable[[List[BaseMessage]], AIMessage]
     tool_node: Optional[ToolRunner]
     postprocess: Callable[[DebateState], None]
+    # 异步图使用；缺省时把 llm_invoke 丢进线程池执行
+    allm_invoke: Optional[Callable[[List[BaseMessage]], Awaitable[AIMessage]]] = None
 
 
 def _make_tool_wrapper(tool_node: ToolRunner) -> ToolRunner:
@@ -265,6 +270,14 @@ def _make_tool_wrapper(tool_node: ToolRunner) -> ToolRunner:
         return tool_node(state)
     return _tools
 
+
+def _make_async_tool_wrapper(tool_node: ToolRunner) -> Callable[[DebateState], Awaitable[DebateState]]:
+    """异步图的工具节点：技能多为 pandas 计算（CPU/阻塞），放到默认线程池，不阻塞事件循环"""
+    async def _tools(state: DebateState) -> DebateState:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, copy_context().run, tool_node, state)
+    return _tools
+
 # ============================================================
 # 8) Two-stage pipeline sys prompt helper
 # ============================================================
@@ -600,12 +613,52 @@ def _should_end_debate(state: DebateState) -> str:
 # 11) 构建图：Hunter ↔ Auditor（attack/patch）→ PM
 # ============================================================
 
+def _build_agent_prompt(rb: RoleBlock, state: DebateState) -> List[BaseMessage]:
+    """角色发言前的 prompt 组装（同步/异步图共用）；同时写入 phase/_last_speaker_role"""
+    role = rb.role
+    sys_msgs = _append_system_prompt([], rb.system_prompt)
+
+    # auditor：强制工具调用提示
+    if role == "auditor":
+        sys_msgs = [SystemMessage(content="【强制】本轮至少调用 1 次工具（优先 market_sentry），并在 Final JSON 的 evidence 中引用【本轮】ToolMessage 输出。")] + sys_msgs
+
+    # hunter：Two-stage pipeline 提示
+    if role == "hunter":
+        sys_prompt = _build_hunter_pipeline_sys_prompt(state)  # 【MOD】
+        if sys_prompt:
+            sys_msgs = [SystemMessage(content=sys_prompt)] + sys_msgs  # 【MOD】
+
+    # 上下文裁剪：本轮原样保留；超出角色预算时早期 ToolMessage 换成摘要（只影响 prompt，不改 state["messages"]）
+    msgs, prune_stats = prune_for_role(state, role, reserved_tokens=count_tokens(sys_msgs))
+    if prune_stats["pruned_n"] > 0:
+        _append_soft_trace(
+            state,
+            role=role,
+            tool="__context_prune__",
+            args=prune_stats,
+            insight=(
+                f"prompt 超出预算 {prune_stats['budget']} tokens：早期 ToolMessage 压缩 {prune_stats['pruned_n']} 条，"
+                f"{prune_stats['tokens_before']} -> {prune_stats['tokens_after']} tokens（估算）。"
+            ),
+        )
+
+    state["_last_speaker_role"] = role
+    state["phase"] = role
+    return sys_msgs + msgs
+
+
 def build_etf_attack_patch_graph(
     *,
     hunter: RoleBlock,
     auditor: RoleBlock,
     pm: RoleBlock,
+    use_async: bool = False,
 ) -> StateGraph:
+    """
+    use_async=True：agent/tools 节点为协程，需用 ainvoke/astream 驱动
+    - agent：优先 rb.allm_invoke，否则线程池执行 rb.llm_invoke
+    - tools：线程池执行（见 _make_async_tool_wrapper）
+    """
     g = StateGraph(DebateState)
 
     def add_role(rb: RoleBlock) -> Tuple[str, str]:
@@ -616,22 +669,20 @@ def build_etf_attack_patch_graph(
 
         def _agent(state: DebateState) -> DebateState:
             msgs = state.get("messages", []) or []
-            prompt_msgs = _append_system_prompt(msgs, rb.system_prompt)
+            prompt_msgs = _build_agent_prompt(rb, state)
 
-            # auditor：强制工具调用提示
-            if role == "auditor":
-                prompt_msgs = [SystemMessage(content="【强制】本轮至少调用 1 次工具（优先 market_sentry），并在 Final JSON 的 evidence 中引用【本轮】ToolMessage 输出。")] + prompt_msgs
-
-            # hunter：Two-stage pipeline 提示
-            if role == "hunter":
-                sys_prompt = _build_hunter_pipeline_sys_prompt(state)  # 【MOD】
-                if sys_prompt:
-                    prompt_msgs = [SystemMessage(content=sys_prompt)] + prompt_msgs  # 【MOD】
+            ai = rb.llm_invoke(prompt_msgs)
+            state["messages"] = (msgs or []) + [ai]
+            return state
 
-            state["_last_speaker_role"] = role
-            state["phase"] = role
+        async def _aagent(state: DebateState) -> DebateState:
+            msgs = state.get("messages", []) or []
+            prompt_msgs = _build_agent_prompt(rb, state)
 
-            ai = rb.llm_invoke(prompt_msgs)
+            if rb.allm_invoke is not None:
+                ai = await rb.allm_invoke(prompt_msgs)
+            else:
+                ai = await asyncio.get_running_loop().run_in_executor(None, rb.llm_invoke, prompt_msgs)
             state["messages"] = (msgs or []) + [ai]
             return state
 
@@ -639,11 +690,12 @@ def build_etf_attack_patch_graph(
             rb.postprocess(state)
             return state
 
-        g.add_node(agent_n, _agent)
+        g.add_node(agent_n, _aagent if use_async else _agent)
         g.add_node(post_n, _post)
 
         if rb.tool_node is not None:
-            g.add_node(tools_n, _make_tool_wrapper(rb.tool_node)) 
+            tool_wrapper = _make_async_tool_wrapper if use_async else _make_tool_wrapper
+            g.add_node(tools_n, tool_wrapper(rb.tool_node))
 
             def _route(_state: DebateState) -> str:
                 return "tools" if _last_ai_has_tool_calls(_state) else "post"
@@ -0,0 +1,352 @@
+# core/llm_backends.py
+"""
+LLM 后端替身：录制 / 回放（离线基准测试用）
+
+- record：包住真实 LLM，每次 invoke 把 (请求, 响应含 tool_calls) 追加写入 cassette（JSONL）
+- replay：不连网，按 prompt 哈希返回录制的响应；哈希未命中时按角色顺序回放（可用 transcript 生成的 cassette）
+- live：原样使用 ChatOpenAI
+
+prompt 哈希 = model + 绑定的工具名 + 归一化消息（只保留 type/content/name/tool_calls/tool_call_id，
+去掉 id / response_metadata / usage 等每次调用都会变的字段）。
+用法：main --llm_backend record|replay --cassette path；或代码里 configure_llm_backend(...)。
+
+统计：cassette / 响应缓存的 stats 是进程级累计；run_stats_scope() 内另按单次运行计数（count_stat / run_stats），
+batch / arun_many 并发多场时每场留痕只含自己的命中数。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, messages_from_dict, messages_to_dict
+
+LLM_BACKENDS = ("live", "record", "replay")
+
+# cassette 格式版本：entry 结构变化时 +1
+_FORMAT = 1
+
+# 单次运行的计数：{scope: {stat: n}}；run / arun 入口开启，线程池 / 异步任务随 context 继承同一个 dict
+_RUN_STATS: ContextVar[Optional[Dict[str, Dict[str, int]]]] = ContextVar("_LLM_RUN_STATS", default=None)
+
+
+@contextmanager
+def run_stats_scope() -> Iterator[Dict[str, Dict[str, int]]]:
+    """开启一次运行的计数作用域（可嵌套，内层覆盖外层）"""
+    token = _RUN_STATS.set({})
+    try:
+        yield _RUN_STATS.get()
+    finally:
+        _RUN_STATS.reset(token)
+
+
+def count_stat(stats: Dict[str, int], scope: str, name: str, n: int = 1) -> None:
+    """进程级累计 + 当前运行计数（调用方持有 stats 所属对象的锁）"""
+    stats[name] += n
+    run = _RUN_STATS.get()
+    if run is not None:
+        bucket = run.setdefault(scope, dict.fromkeys(stats, 0))
+        bucket[name] = bucket.get(name, 0) + n
+
+
+def run_stats(scope: str, stats: Dict[str, int]) -> Dict[str, int]:
+    """当前运行的计数；不在 run_stats_scope 内时退回进程级累计"""
+    run = _RUN_STATS.get()
+    if run is None:
+        return dict(stats)
+    return {**dict.fromkeys(stats, 0), **run.get(scope, {})}
+
+
+# ============================================================
+# 1) prompt 归一化 / 哈希
+# ============================================================
+def _stable_json(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _norm_tool_calls(tool_calls: Any) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for tc in tool_calls or []:
+        if isinstance(tc, dict):
+            out.append({"name": tc.get("name"), "args": tc.get("args") or {}, "id": tc.get("id")})
+    return out
+
+
+def normalize_messages(messages: Sequence[BaseMessage]) -> List[Dict[str, Any]]:
+    """只保留决定模型输出的字段（跨运行稳定）"""
+    out: List[Dict[str, Any]] = []
+    for m in messages or []:
+        d: Dict[str, Any] = {"type": getattr(m, "type", type(m).__name__), "content": getattr(m, "content", "")}
+        name = getattr(m, "name", None)
+        if name:
+            d["name"] = name
+        tool_calls = _norm_tool_calls(getattr(m, "tool_calls", None))
+        if tool_calls:
+            d["tool_calls"] = tool_calls
+        tool_call_id = getattr(m, "tool_call_id", None)
+        if tool_call_id:
+            d["tool_call_id"] = tool_call_id
+        out.append(d)
+    return out
+
+
+def tool_names(tools: Optional[Iterable[Any]]) -> List[str]:
+    """bind_tools 入参（StructuredTool / OpenAI dict / 函数）-> 排序后的工具名"""
+    names: List[str] = []
+    for t in tools or []:
+        if isinstance(t, dict):
+            name = (t.get("function") or {}).get("name") or t.get("name")
+        else:
+            name = getattr(t, "name", None) or getattr(t, "__name__", None)
+        if name:
+            names.append(str(name))
+    return sorted(names)
+
+
+def prompt_key(model: str, messages: Sequence[BaseMessage], tools: Optional[Sequence[str]] = None) -> str:
+    raw = _stable_json({"model": model, "tools": list(tools or []), "messages": normalize_messages(messages)})
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ============================================================
+# 2) Cassette（JSONL，一行一个 entry）
+# ============================================================
+class Cassette:
+    """
+    entry = {format, key, role, model, tools, request, response}
+    - key 为 None 的 entry（transcript 生成）只参与按角色顺序回放
+    - 同一 key 多条响应按录制顺序依次返回，用尽后重复最后一条
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.entries: List[Dict[str, Any]] = []
+        self._by_key: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_role: Dict[str, List[Dict[str, Any]]] = {}
+        self._key_cursor: Dict[str, int] = {}
+        self._role_cursor: Dict[str, int] = {}
+        self.stats: Dict[str, int] = {"recorded": 0, "hits": 0, "sequential": 0, "misses": 0}
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._index(json.loads(line))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _index(self, entry: Dict[str, Any]) -> None:
+        self.entries.append(entry)
+        if entry.get("key"):
+            self._by_key.setdefault(entry["key"], []).append(entry)
+        self._by_role.setdefault(str(entry.get("role") or ""), []).append(entry)
+
+    def record(self, *, key: Optional[str], role: str, model: str, tools: Sequence[str], request: Sequence[BaseMessage], response: BaseMessage) -> None:
+        entry = {
+            "format": _FORMAT,
+            "key": key,
+            "role": role,
+            "model": model,
+            "tools": list(tools),
+            "request": normalize_messages(request) if request else [],
+            "response": messages_to_dict([response])[0],
+        }
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._index(entry)
+            count_stat(self.stats, "cassette", "recorded")
+
+    def replay(self, key: str, role: str, *, strict: bool = False) -> BaseMessage:
+        with self._lock:
+            hits = self._by_key.get(key)
+            if hits:
+                i = self._key_cursor.get(key, 0)
+                self._key_cursor[key] = i + 1
+                count_stat(self.stats, "cassette", "hits")
+                return messages_from_dict([hits[min(i, len(hits) - 1)]["response"]])[0]
+
+            seq = self._by_role.get(role) or []
+            i = self._role_cursor.get(role, 0)
+            if strict or i >= len(seq):
+                count_stat(self.stats, "cassette", "misses")
+                raise LookupError(
+                    f"cassette 未命中：role={role} key={key[:12]}（{'strict 模式' if strict else f'该角色 {len(seq)} 条已用尽'}）| {self.path}"
+                )
+            self._role_cursor[role] = i + 1
+            count_stat(self.stats, "cassette", "sequential")
+            return messages_from_dict([seq[i]["response"]])[0]
+
+
+# ============================================================
+# 3) LLM 包装（与 ChatOpenAI 的 bind_tools / invoke / ainvoke 对齐）
+# ============================================================
+class RecordingLLM:
+    """包住真实 LLM：透传调用并把请求/响应写入 cassette"""
+
+    def __init__(self, inner: Any, cassette: Cassette, *, role: str, model: str, tools: Sequence[str] = ()):
+        self.inner = inner
+        self.cassette = cassette
+        self.role = role
+        self.model = model
+        self.tools = list(tools)
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "RecordingLLM":
+        return RecordingLLM(self.inner.bind_tools(tools, **kwargs), self.cassette, role=self.role, model=self.model, tools=tool_names(tools))
+
+    def _record(self, messages: Sequence[BaseMessage], out: BaseMessage) -> BaseMessage:
+        self.cassette.record(
+            key=prompt_key(self.model, messages, self.tools),
+            role=self.role,
+            model=self.model,
+            tools=self.tools,
+            request=messages,
+            response=out,
+        )
+        return out
+
+    def invoke(self, messages: Sequence[BaseMessage], *args: Any, **kwargs: Any) -> BaseMessage:
+        return self._record(messages, self.inner.invoke(messages, *args, **kwargs))
+
+    async def ainvoke(self, messages: Sequence[BaseMessage], *args: Any, **kwargs: Any) -> BaseMessage:
+        return self._record(messages, await self.inner.ainvoke(messages, *args, **kwargs))
+
+
+class ReplayLLM:
+    """离线回放：按 prompt 哈希取录制响应；未命中且非 strict 时按角色顺序回放"""
+
+    def __init__(self, cassette: Cassette, *, role: str, model: str, tools: Sequence[str] = (), strict: bool = False):
+        self.cassette = cassette
+        self.role = role
+        self.model = model
+        self.tools = list(tools)
+        self.strict = strict
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "ReplayLLM":
+        return ReplayLLM(self.cassette, role=self.role, model=self.model, tools=tool_names(tools), strict=self.strict)
+
+    def invoke(self, messages: Sequence[BaseMessage], *args: Any, **kwargs: Any) -> BaseMessage:
+        return self.cassette.replay(prompt_key(self.model, messages, self.tools), self.role, strict=self.strict)
+
+    async def ainvoke(self, messages: Sequence[BaseMessage], *args: Any, **kwargs: Any) -> BaseMessage:
+        return self.invoke(messages, *args, **kwargs)
+
+
+# ============================================================
+# 4) transcript -> cassette（只含响应，按角色顺序回放）
+# ============================================================
+_PAYLOAD_ROLE = {"CANDIDATES": "hunter", "OBJECTIONS": "auditor", "DECISIONS": "pm"}
+
+
+def _transcript_ai_message(m: Dict[str, Any]) -> AIMessage:
+    tool_calls = []
+    for tc in m.get("tool_calls") or []:
+        if not isinstance(tc, dict):
+            continue
+        if "function" in tc:  # OpenAI 原始格式
+            fn = tc.get("function") or {}
+            try:
+                args = json.loads(fn.get("arguments") or "{}")
+            except ValueError:
+                args = {}
+            tool_calls.append({"name": fn.get("name"), "args": args, "id": tc.get("id"), "type": "tool_call"})
+        else:
+            tool_calls.append({"name": tc.get("name"), "args": tc.get("args") or {}, "id": tc.get("id"), "type": "tool_call"})
+    return AIMessage(content=m.get("content") or "", tool_calls=tool_calls)
+
+
+def cassette_from_transcript(
+    transcript_path: str,
+    cassette_path: str,
+    *,
+    allowlist_by_role: Dict[str, List[str]],
+    model_by_role: Optional[Dict[str, str]] = None,
+) -> int:
+    """
+    从 output_reports/*_transcript.json 生成 cassette（追加写入），返回写入条数
+    - 角色推断：带 tool_calls 看工具归属（allowlist）；工具回合后的发言沿用调工具的角色；否则看 payload type
+    """
+    from debate_mas.protocol.etf_debate import try_parse_payload_with_span
+
+    with open(transcript_path, "r", encoding="utf-8") as f:
+        transcript = json.load(f).get("transcript") or []
+
+    tool_owner = {t: r for r, ts in (allowlist_by_role or {}).items() for t in ts or []}
+    cassette = Cassette(cassette_path)
+    written = 0
+    last_tool_role: Optional[str] = None
+    prev_role_type = ""
+
+    for m in transcript:
+        role_type = str(m.get("role") or "")
+        if role_type != "assistant":
+            prev_role_type = role_type
+            continue
+
+        ai = _transcript_ai_message(m)
+        role: Optional[str] = None
+        if ai.tool_calls:
+            role = next((tool_owner.get(tc["name"]) for tc in ai.tool_calls if tool_owner.get(tc["name"])), None)
+            last_tool_role = role
+        elif prev_role_type == "tool" and last_tool_role:
+            role = last_tool_role
+        else:
+            payload, _ = try_parse_payload_with_span(ai.content if isinstance(ai.content, str) else "")
+            role = _PAYLOAD_ROLE.get(str((payload or {}).get("type", "")).upper())
+        prev_role_type = role_type
+
+        if not role:
+            print(f"⚠️ [Cassette] 无法判断 transcript 发言角色，已跳过: {str(ai.content)[:40]!r}")
+            continue
+        cassette.record(
+            key=None,
+            role=role,
+            model=(model_by_role or {}).get(role, ""),
+            tools=[],
+            request=[],
+            response=ai,
+        )
+        written += 1
+    return written
+
+
+# ============================================================
+# 5) 进程级配置（默认 live；由 main 按 CLI 配置）
+# ============================================================
+_BACKEND: Dict[str, Any] = {"mode": "live", "cassette": None, "strict": False}
+
+
+def configure_llm_backend(mode: str, cassette_path: Optional[str] = None, *, strict: bool = False) -> Optional[Cassette]:
+    if mode not in LLM_BACKENDS:
+        raise ValueError(f"未知 LLM 后端 '{mode}'，可选: {LLM_BACKENDS}")
+    cassette = Cassette(cassette_path) if mode != "live" and cassette_path else None
+    if mode != "live" and cassette is None:
+        raise ValueError(f"LLM 后端 {mode} 需要 cassette 路径")
+    if mode == "replay" and not os.path.exists(str(cassette_path)):
+        raise FileNotFoundError(f"cassette 不存在: {cassette_path}")
+    _BACKEND.update(mode=mode, cassette=cassette, strict=bool(strict))
+    return cassette
+
+
+def get_llm_backend() -> Dict[str, Any]:
+    return dict(_BACKEND)
+
+
+def wrap_llm(build: Callable[[], Any], *, role: str, model: str) -> Any:
+    """按当前后端返回 LLM：live=build()；record=录制包装；replay=不调用 build（无需网络/密钥）"""
+    mode, cassette = _BACKEND["mode"], _BACKEND["cassette"]
+    if mode == "replay":
+        return ReplayLLM(cassette, role=role, model=model, strict=_BACKEND["strict"])
+    llm = build()
+    if mode == "record":
+        return RecordingLLM(llm, cassette, role=role, model=model)
+    return llm
@@ -0,0 +1,267 @@
+# core/llm_cache.py
+"""
+LLM 响应缓存（SQLite 单文件）
+
+同一案卷 / mission / config 反复运行时，首轮 prompt 往往完全相同，没必要重复付费：
+- key = model + temperature + 绑定工具的 schema + 归一化消息（见 llm_backends.normalize_messages）
+- value = AIMessage（messages_to_dict，含 tool_calls）
+- TTL：写入超过 ttl_s 的条目视为未命中并删除
+- 容量：总字节数超过 max_bytes 时按最近访问时间淘汰
+- temperature > 0 时默认绕过（采样输出本就不该复用），allow_sampled=True 才缓存
+
+模式与技能结果缓存一致：off / on / bypass（bypass=不读旧响应但写入刷新）
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+
+from .llm_backends import _stable_json, count_stat, normalize_messages, tool_names
+
+LLM_CACHE_MODES = ("off", "on", "bypass")
+
+# 缓存格式版本：key/value 结构变化时 +1
+_FORMAT = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    response TEXT NOT NULL
+)
+"""
+
+
+def tool_schemas(tools: Optional[Sequence[Any]]) -> List[Any]:
+    """bind_tools 入参 -> OpenAI tool schema 列表（按名字排序）；转换失败退化为工具名"""
+    try:
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+
+        schemas = [convert_to_openai_tool(t) for t in tools or []]
+        return sorted(schemas, key=lambda s: str((s.get("function") or {}).get("name", "")))
+    except Exception:
+        return tool_names(tools)
+
+
+def response_key(model: str, temperature: Optional[float], messages: Sequence[BaseMessage], tools: Optional[Sequence[Any]] = None) -> str:
+    raw = _stable_json({
+        "format": _FORMAT,
+        "model": model,
+        "temperature": temperature,
+        "tools": list(tools or []),
+        "messages": normalize_messages(messages),
+    })
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """SQLite 响应缓存（单连接 + 锁；跨线程共享）"""
+
+    def __init__(
+        self,
+        db_path: str,
+        *,
+        mode: str = "on",
+        ttl_s: float = 7 * 24 * 3600,
+        max_bytes: int = 256 * 1024 * 1024,
+        allow_sampled: bool = False,
+    ):
+        if mode not in LLM_CACHE_MODES:
+            raise ValueError(f"未知 LLM 缓存模式 '{mode}'，可选: {LLM_CACHE_MODES}")
+        self.db_path = Path(db_path)
+        self.mode = mode
+        self.ttl_s = float(ttl_s)
+        self.max_bytes = int(max_bytes)
+        self.allow_sampled = bool(allow_sampled)
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "writes": 0, "bypassed": 0, "expired": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    # ---------------- 开关 ----------------
+    @property
+    def readable(self) -> bool:
+        return self.mode == "on"
+
+    @property
+    def writable(self) -> bool:
+        return self.mode in ("on", "bypass")
+
+    def accepts(self, temperature: Optional[float]) -> bool:
+        """temperature > 0 的调用默认不缓存"""
+        return self.allow_sampled or not temperature or float(temperature) <= 0.0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+            self._conn.execute(_SCHEMA)
+        return self._conn
+
+    # ---------------- 读写 ----------------
+    def get(self, key: str) -> Optional[BaseMessage]:
+        if not self.readable:
+            return None
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._db().execute("SELECT created_at, response FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and self.ttl_s > 0 and now - row[0] > self.ttl_s:
+                    self._db().execute("DELETE FROM responses WHERE key = ?", (key,))
+                    count_stat(self.stats, "llm_cache", "expired")
+                    row = None
+                if row is None:
+                    count_stat(self.stats, "llm_cache", "misses")
+                    return None
+                self._db().execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                msg = messages_from_dict([json.loads(row[1])])[0]
+            except (sqlite3.Error, ValueError, KeyError) as e:
+                print(f"⚠️ [LLMCache] 读取失败，按未命中处理: {e}")
+                count_stat(self.stats, "llm_cache", "misses")
+                return None
+            count_stat(self.stats, "llm_cache", "hits")
+            return msg
+
+    def put(self, key: str, response: BaseMessage, *, model: str = "") -> None:
+        """写入失败静默跳过（缓存不影响主流程）"""
+        if not self.writable:
+            return
+        try:
+            text = json.dumps(messages_to_dict([response])[0], ensure_ascii=False, default=str)
+        except Exception as e:
+            print(f"⚠️ [LLMCache] 响应序列化失败: {e}")
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                self._db().execute(
+                    "INSERT OR REPLACE INTO responses (key, model, created_at, accessed_at, size, response) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, now, now, len(text.encode("utf-8")), text),
+                )
+            except sqlite3.Error as e:
+                print(f"⚠️ [LLMCache] 写入失败: {e}")
+                return
+            count_stat(self.stats, "llm_cache", "writes")
+        self.evict()
+
+    def evict(self) -> int:
+        """总大小超过 max_bytes 时按 accessed_at 从旧到新删除；返回删除个数"""
+        with self._lock:
+            db = self._db()
+            total = int(db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0])
+            if total <= self.max_bytes:
+                return 0
+            removed = 0
+            for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall():
+                if total <= self.max_bytes:
+                    break
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                total -= int(size)
+                removed += 1
+            count_stat(self.stats, "llm_cache", "evictions", removed)
+            return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._db().execute("SELECT COUNT(*) FROM responses").fetchone()[0])
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            for suffix in ("", "-wal", "-shm", "-journal"):
+                try:
+                    os.remove(f"{self.db_path}{suffix}")
+                except OSError:
+                    pass
+        print(f"🧹 [LLMCache] 已清空: {self.db_path}")
+
+
+class CachedLLM:
+    """包住 LLM：命中直接返回缓存响应；未命中调用后写入（与 ChatOpenAI 的 bind_tools / invoke / ainvoke 对齐）"""
+
+    def __init__(self, inner: Any, cache: LLMResponseCache, *, model: str, temperature: Optional[float], tools: Sequence[Any] = ()):
+        self.inner = inner
+        self.cache = cache
+        self.model = model
+        self.temperature = temperature
+        self.tools = list(tools)
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "CachedLLM":
+        return CachedLLM(self.inner.bind_tools(tools, **kwargs), self.cache, model=self.model, temperature=self.temperature, tools=tool_schemas(tools))
+
+    def _key(self, messages: Sequence[BaseMessage]) -> Optional[str]:
+        if not self.cache.accepts(self.temperature):
+            with self.cache._lock:
+                count_stat(self.cache.stats, "llm_cache", "bypassed")
+            return None
+        return response_key(self.model, self.temperature, messages, self.tools)
+
+    def invoke(self, messages: Sequence[BaseMessage], *args: Any, **kwargs: Any) -> BaseMessage:
+        key = self._key(messages)
+        hit = self.cache.get(key) if key else None
+        if hit is not None:
+            return hit
+        out = self.inner.invoke(messages, *args, **kwargs)
+        if key:
+            self.cache.put(key, out, model=self.model)
+        return out
+
+    async def ainvoke(self, messages: Sequence[BaseMessage], *args: Any, **kwargs: Any) -> BaseMessage:
+        key = self._key(messages)
+        hit = self.cache.get(key) if key else None
+        if hit is not None:
+            return hit
+        out = await self.inner.ainvoke(messages, *args, **kwargs)
+        if key:
+            self.cache.put(key, out, model=self.model)
+        return out
+
+
+# ============================================================
+# 进程级单例（默认关闭；由 main 按 CONFIG + CLI 配置）
+# ============================================================
+_LLM_CACHE: Optional[LLMResponseCache] = None
+
+
+def configure_llm_cache(
+    mode: str,
+    db_path: str,
+    *,
+    ttl_hours: float = 168,
+    max_mb: float = 256,
+    allow_sampled: bool = False,
+) -> LLMResponseCache:
+    global _LLM_CACHE
+    _LLM_CACHE = LLMResponseCache(
+        db_path,
+        mode=mode,
+        ttl_s=float(ttl_hours) * 3600,
+        max_bytes=int(float(max_mb) * 1024 * 1024),
+        allow_sampled=allow_sampled,
+    )
+    return _LLM_CACHE
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """未配置或 mode=off 时返回 None"""
+    cache = _LLM_CACHE
+    return cache if cache is not None and cache.mode != "off" else None
+
+
+def cached_llm(llm: Any, *, model: str, temperature: Optional[float]) -> Any:
+    """已配置缓存时包一层 CachedLLM；否则原样返回"""
+    cache = get_llm_cache()
+    return llm if cache is None else CachedLLM(llm, cache, model=model, temperature=temperature)
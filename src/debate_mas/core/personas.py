@@ -17,6 +17,7 @@ _ENFORCED_TOOL_POLICY: List[str] = [
     "【绝对禁止】禁止虚构工具调用结果。你必须先发出 Tool Call，等待下一轮看到 ToolMessage 后，再基于真实结果撰写 evidence。",
     "如果本轮没有看到 ToolMessage 返回的 [PASS]/[REJECT] 等结果，严禁在文字中声称‘结果显示...’。",
     "引用工具证据时必须指向【本轮】ToolMessage 的实际输出（不口头编造数值）。",
+    "列表类 ToolMessage 为列式表格：columns 为列名，rows 每行一条（与 columns 顺序对齐），const 为所有行相同的字段；引用时按列名取值，数值已取整，照抄即可。",
 ]
 
 @dataclass(frozen=True)
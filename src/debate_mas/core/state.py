@@ -63,12 +63,14 @@ class DebateState(TypedDict, total=False):
     stop_reason: Optional[str]
     artifacts: Optional[Dict[str, str]]
     tool_cache: Dict[str, Any]
+    tool_memo: Dict[str, str]            # 跨轮结果复用：memo_key -> 成功结果 JSON（整场辩论有效）
 
     # --- Tool Guard（每轮重置）---
     _round_tool_calls: Dict[str, int]
     _round_tool_calls_ok: Dict[str, int]
     _round_fingerprints: Set[str]
     _round_guard_denied: bool
+    _round_msg_start: int                # 本轮第一条消息的下标（上下文裁剪：此后原样保留）
 
     # --- NEED_EVIDENCE 协议驱动（跨轮控制）---
     _need_evidence: bool                       
@@ -141,6 +143,7 @@ def init_state(
         "dossier_view": dossier.frozen_view() if hasattr(dossier, "frozen_view") else {},
         "messages": messages or [],
         "round_idx": 0,
+        "_round_msg_start": 0,
         "candidates_cur": [],
         "objections_cur": [],
         "diff_cur": {},
@@ -155,6 +158,7 @@ def init_state(
         "stop_reason": None,
         "artifacts": None,
         "tool_cache": {},
+        "tool_memo": {},
         "_need_evidence": False,
         "_need_evidence_symbols": [],
         "_need_evidence_actions": [],
@@ -192,6 +196,7 @@ def mark_guard_denied(st: DebateState) -> None:
 
 def bump_round(st: DebateState) -> None:
     st["round_idx"] = int(st.get("round_idx", 0) or 0) + 1
+    st["_round_msg_start"] = len(st.get("messages", []) or [])
     reset_round_runtime(st)
 
 # MIN_CANDIDATES helpers
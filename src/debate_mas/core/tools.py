@@ -7,15 +7,19 @@ import time
 import hashlib
 from typing import Any, Dict, List, Optional, Tuple, Callable, Set
 
-from contextvars import ContextVar
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass
 
 from langchain_core.tools import StructuredTool
-from langchain_core.messages import AIMessage
+from langchain_core.messages import AIMessage, ToolMessage
 from langgraph.prebuilt import ToolNode
 
 from debate_mas.skills.registry import SkillRegistry
 from debate_mas.skills.base import SkillContext
 from debate_mas.protocol import SkillResult
+from debate_mas.protocol.llm_view import dumps_llm_view
 
 from .config import CONFIG
 from .state import DebateState, mark_guard_denied
@@ -26,11 +30,21 @@ from .state import DebateState, mark_guard_denied
 _CURRENT_STATE: ContextVar[Optional[DebateState]] = ContextVar("_CURRENT_STATE", default=None)
 ToolRunner = Callable[[DebateState], DebateState]
 
+# guard 硬状态（_round_tool_calls / _round_fingerprints / tool_cache / tool_trace / tool_memo）的写锁
+# ToolNode 本身会用线程池并发执行同一条 AIMessage 里的多个 tool_call；
+# 锁按 tool node 各一把，与运行时 state 同样经 ContextVar 注入，不同辩论 / 角色之间互不阻塞
+_CURRENT_LOCK: ContextVar[Optional[Any]] = ContextVar("_CURRENT_LOCK", default=None)
+
 def _get_runtime_state(fallback: DebateState) -> DebateState:
     """优先取 ToolNode 注入的“运行时 state”，避免闭包捕获旧 state。"""
     st = _CURRENT_STATE.get()
     return st if isinstance(st, dict) else fallback
 
+def _get_state_lock(fallback: Any) -> Any:
+    """优先取 ToolNode 注入的锁；脱离 node 直接调用时用 wrapper 自己的锁"""
+    lock = _CURRENT_LOCK.get()
+    return lock if lock is not None else fallback
+
 # ============================================================
 # SECTION 1) 指纹 / 稳定序列化
 # ============================================================
@@ -44,6 +58,18 @@ def fingerprint(tool_name: str, tool_args: Dict[str, Any]) -> str:
     raw = tool_name + "|" + _json_dumps_stable(tool_args or {})
     return hashlib.sha1(raw.encode("utf-8")).hexdigest()
 
+def memo_key(role: str, tool_name: str, tool_args: Dict[str, Any], ctx: Optional[SkillContext]) -> Optional[str]:
+    """
+    跨轮结果复用 key = (fingerprint, role, ref_date, dossier.version)
+    - dossier 无 version（无法判断数据是否变化）时返回 None，不复用
+    """
+    dossier = getattr(ctx, "dossier", None)
+    version = getattr(dossier, "version", None)
+    if ctx is None or not isinstance(version, int):
+        return None
+    raw = "|".join([fingerprint(tool_name, tool_args), str(role), str(getattr(ctx, "ref_date", None)), str(version)])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
 # ============================================================
 # SECTION 2) ctx 构建（注入 role/ref_date/dossier）
 # ============================================================
@@ -75,6 +101,14 @@ def _schema_keys_from_tool(base_tool: StructuredTool) -> Optional[Set[str]]:
             return None
     return None
 
+def _validate_tool_args(tool: Any, args: Dict[str, Any]) -> Dict[str, Any]:
+    """按 tool.args_schema（pydantic 模型）校验参数；只返回调用方给出的字段（与 ToolNode 入参一致）"""
+    schema = getattr(tool, "args_schema", None)
+    if schema is None or not hasattr(schema, "model_validate"):
+        return dict(args)
+    model = schema.model_validate(args)
+    return {k: getattr(model, k) for k in args if k in type(model).model_fields}
+
 def _filter_to_schema(args: Dict[str, Any], schema_keys: Optional[Set[str]]) -> Dict[str, Any]:
     if schema_keys is None:
         return args
@@ -225,6 +259,16 @@ def _try_parse_tool_json(text: str) -> Optional[Dict[str, Any]]:
     except Exception:
         return None
 
+def _llm_content(out_obj: Dict[str, Any], out_json: str) -> str:
+    """ToolMessage 内容：默认给模型看列式 LLM 视图（完整对象留在 tool_cache / tool_memo）"""
+    if not bool(getattr(CONFIG, "TOOL_OUTPUT_LLM_VIEW", True)):
+        return out_json
+    try:
+        return dumps_llm_view(out_obj, digits=int(getattr(CONFIG, "TOOL_OUTPUT_LLM_VIEW_DIGITS", 4) or 4))
+    except Exception as e:
+        print(f"⚠️ [Tools] LLM 视图编码失败，回退完整输出: {e}")
+        return out_json
+
 def _count_produced(obj: Optional[Dict[str, Any]]) -> int:
     """从 SkillResult 结构里统计产出条数（items/candidates/results）。"""
     if not isinstance(obj, dict):
@@ -255,6 +299,7 @@ def _append_tool_trace(
     elapsed_ms: Optional[int] = None,
     denied: bool = False,
     produced_n: Optional[int] = None,
+    cache_hit: bool = False,
 ) -> None:
     """trace 增强：写 produced_n，summary 才能“真实统计”而不是猜。"""
     state.setdefault("tool_trace", [])
@@ -270,6 +315,7 @@ def _append_tool_trace(
         "visuals": visuals or [],
         "elapsed_ms": int(elapsed_ms or 0),
         "produced_n": int(produced_n or 0),
+        "cache_hit": bool(cache_hit),
         "round_idx": int(state.get("round_idx", 0) or 0),
         "ts": time.time(),
     })
@@ -290,114 +336,166 @@ def build_tools_for_role(
     for tool_name in allowlist:
         skill = SkillRegistry.get_skill(tool_name)
         base_tool = skill.to_langchain_tool(ctx)
-        tools.append(_wrap_tool_with_guard(role=role, tool_name=tool_name, base_tool=base_tool, state=state))
+        tools.append(_wrap_tool_with_guard(role=role, tool_name=tool_name, base_tool=base_tool, state=state, ctx=ctx))
 
     return tools
 
+@dataclass
+class PreparedCall:
+    """prepare 阶段产物：payload 非空表示已有结果（guard 拒绝 / 跨轮缓存命中），无需执行"""
+    tool_args: Dict[str, Any]
+    state: DebateState
+    payload: Optional[str] = None
+    memo_key: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class GuardedCall:
+    """
+    guard 三段式（供并发 ToolNode 使用，挂在 StructuredTool.metadata["guarded_call"]）：
+    - prepare(kwargs): policy + guard + 计数/指纹/缓存查找（持锁，按 tool_call 顺序串行）
+    - execute(prep): 真正执行技能（不持锁，可并发）-> (out_json, error, elapsed_ms)
+    - finish(prep, out_json, error, elapsed_ms): trace / tool_cache / ok 计数（持锁）
+    """
+    prepare: Callable[[Dict[str, Any]], PreparedCall]
+    execute: Callable[[PreparedCall], Tuple[Optional[str], Optional[Exception], int]]
+    finish: Callable[[PreparedCall, Optional[str], Optional[Exception], int], str]
+
+
 def _wrap_tool_with_guard(
     *,
     role: str,
     tool_name: str,
     base_tool: StructuredTool,
     state: DebateState,
+    ctx: Optional[SkillContext] = None,
 ) -> StructuredTool:
-    def _func(**kwargs):
+    own_lock = threading.RLock()
+
+    def _record(st: DebateState, tool_args: Dict[str, Any], out_json: str, elapsed_ms: int, cache_hit: bool) -> Tuple[bool, str]:
+        """成功返回后的统一记账：tool_cache / trace / ok 计数 / 策略使用记录；返回 (ok, ToolMessage 内容)"""
+        out_obj = _try_parse_tool_json(out_json) or {
+            "success": True,
+            "data": out_json,
+            "insight": "",
+            "error_msg": None,
+        }
+        st.setdefault("tool_cache", {})
+        st["tool_cache"][tool_name] = out_obj
+        ok = bool(out_obj.get("success", True))
+        produced_n = _count_produced(out_obj)
+
+        _append_tool_trace(
+            st,
+            role=role,
+            tool=tool_name,
+            args=tool_args,
+            ok=ok,
+            insight=str(out_obj.get("insight", "")),
+            error_msg=out_obj.get("error_msg"),
+            elapsed_ms=elapsed_ms,
+            denied=False,
+            produced_n=produced_n,
+            cache_hit=cache_hit,
+        )
+
+        st.setdefault("_round_tool_calls_ok", {"hunter": 0, "auditor": 0, "pm": 0})
+        if ok:
+            st["_round_tool_calls_ok"][role] = int(st["_round_tool_calls_ok"].get(role, 0)) + 1
+
+        # “策略使用记录”写入硬状态
+        if ok and role == "hunter" and tool_name == "quantitative_sniper":
+            strat = str((tool_args or {}).get("strategy", "") or "").strip()
+            if strat:
+                st.setdefault("_hunter_round_sniper_strategies", [])
+                used = st["_hunter_round_sniper_strategies"]
+                if strat not in used:
+                    used.append(strat)
+        return ok, _llm_content(out_obj, out_json)
+
+    def _prepare(kwargs: Dict[str, Any]) -> PreparedCall:
         st = _get_runtime_state(state)
-         # 1) 先按 args_schema 过滤 + 应用 policy（少而硬强控）
-        schema_keys = _schema_keys_from_tool(base_tool)
-        tool_args = _apply_tool_policy(tool_name, dict(kwargs or {}), schema_keys)
-
-        # 2) PM allocator 需要吃“硬状态”字段（仍然先判断 schema 是否支持）
-        if tool_name == "portfolio_allocator":
-            if schema_keys is None or "candidates" in schema_keys:
-                tool_args["candidates"] = st.get("candidates_cur") or st.get("candidates") or []
-            if schema_keys is None or "risk_reports" in schema_keys:
-                tool_args["risk_reports"] = st.get("risk_reports") or []
-
-        # 3) Guard & Dedup
-        allowed, reason = tool_guard_check(role, tool_name, tool_args, st)
-        if not allowed:
-            mark_guard_denied(st)
-            payload_json = _guard_deny_payload(reason)
-            payload_obj = _try_parse_tool_json(payload_json) or {}
-            _append_tool_trace(
-                st,
-                role=role,
-                tool=tool_name,
-                args=tool_args,
-                ok=False,
-                insight=str(payload_obj.get("insight", "")),
-                error_msg=str(payload_obj.get("error_msg", reason)),
-                elapsed_ms=0,
-                denied=True,
-                produced_n=0,
-            )
-            return payload_json
-        
-        # 4) call count
-        st.setdefault("_round_tool_calls", {"hunter": 0, "auditor": 0, "pm": 0})
-        st["_round_tool_calls"][role] = int(st["_round_tool_calls"].get(role, 0)) + 1
-
-        # 5) dedup fingerprints
-        if CONFIG.FORBID_SAME_TOOL_SAME_ARGS_IN_SAME_ROUND:
-            fp = fingerprint(tool_name, tool_args)
-            st.setdefault("_round_fingerprints", set())
-            st["_round_fingerprints"].add(fp)
-
-
-        # 6) invoke & trace
+        with _get_state_lock(own_lock):
+            # 1) 先按 args_schema 过滤 + 应用 policy（少而硬强控）
+            schema_keys = _schema_keys_from_tool(base_tool)
+            tool_args = _apply_tool_policy(tool_name, dict(kwargs or {}), schema_keys)
+
+            # 2) PM allocator 需要吃“硬状态”字段（仍然先判断 schema 是否支持）
+            if tool_name == "portfolio_allocator":
+                if schema_keys is None or "candidates" in schema_keys:
+                    tool_args["candidates"] = st.get("candidates_cur") or st.get("candidates") or []
+                if schema_keys is None or "risk_reports" in schema_keys:
+                    tool_args["risk_reports"] = st.get("risk_reports") or []
+
+            # 3) Guard & Dedup
+            allowed, reason = tool_guard_check(role, tool_name, tool_args, st)
+            if not allowed:
+                mark_guard_denied(st)
+                payload_json = _guard_deny_payload(reason)
+                payload_obj = _try_parse_tool_json(payload_json) or {}
+                _append_tool_trace(
+                    st,
+                    role=role,
+                    tool=tool_name,
+                    args=tool_args,
+                    ok=False,
+                    insight=str(payload_obj.get("insight", "")),
+                    error_msg=str(payload_obj.get("error_msg", reason)),
+                    elapsed_ms=0,
+                    denied=True,
+                    produced_n=0,
+                )
+                return PreparedCall(tool_args=tool_args, state=st, payload=payload_json)
+
+            # 4) call count
+            st.setdefault("_round_tool_calls", {"hunter": 0, "auditor": 0, "pm": 0})
+            st["_round_tool_calls"][role] = int(st["_round_tool_calls"].get(role, 0)) + 1
+
+            # 5) dedup fingerprints
+            if CONFIG.FORBID_SAME_TOOL_SAME_ARGS_IN_SAME_ROUND:
+                fp = fingerprint(tool_name, tool_args)
+                st.setdefault("_round_fingerprints", set())
+                st["_round_fingerprints"].add(fp)
+
+            # 6) 跨轮复用：同 (fingerprint, role, ref_date, dossier 版本) 直接返回上次成功结果
+            #    命中同样计入调用次数/去重指纹（已在 4/5 记账），只跳过执行
+            key = memo_key(role, tool_name, tool_args, ctx) if getattr(CONFIG, "TOOL_RESULT_MEMO", True) else None
+            memo = st.setdefault("tool_memo", {}) if key else {}
+            if key and key in memo:
+                _, content = _record(st, tool_args, memo[key], 0, cache_hit=True)
+                return PreparedCall(tool_args=tool_args, state=st, payload=content)
+
+            return PreparedCall(tool_args=tool_args, state=st, memo_key=key)
+
+    def _execute(prep: PreparedCall) -> Tuple[Optional[str], Optional[Exception], int]:
+        # 7) invoke（不持锁）
         t0 = time.time()
         try:
-            out = base_tool.invoke(tool_args)
+            out = base_tool.invoke(prep.tool_args)
             if isinstance(out, str):
                 out_json = out
             elif isinstance(out, dict):
                 out_json = json.dumps(out, ensure_ascii=False)
             else:
                 out_json = str(out)
-
-            out_obj = _try_parse_tool_json(out_json) or {
-                "success": True,
-                "data": out_json,
-                "insight": "",
-                "error_msg": None,
-            }
-            st.setdefault("tool_cache", {})
-            st["tool_cache"][tool_name] = out_obj
-            ok = bool(out_obj.get("success", True))
-            produced_n = _count_produced(out_obj)
-
-            _append_tool_trace(
-                st,
-                role=role,
-                tool=tool_name,
-                args=tool_args,
-                ok=ok,
-                insight=str(out_obj.get("insight", "")),
-                error_msg=out_obj.get("error_msg"),
-                elapsed_ms=int((time.time() - t0) * 1000),
-                denied=False,
-                produced_n=produced_n,
-            )
-
-            st.setdefault("_round_tool_calls_ok", {"hunter": 0, "auditor": 0, "pm": 0})
-            if ok:
-                st["_round_tool_calls_ok"][role] = int(st["_round_tool_calls_ok"].get(role, 0)) + 1
-
-            # 7) “策略使用记录”写入硬状态
-            if ok and role == "hunter" and tool_name == "quantitative_sniper":
-                strat = str((tool_args or {}).get("strategy", "") or "").strip()
-                if strat:
-                    st.setdefault("_hunter_round_sniper_strategies", [])
-                    used = st["_hunter_round_sniper_strategies"]
-                    if strat not in used:
-                        used.append(strat)
-
-            return out_json
-
+            return out_json, None, int((time.time() - t0) * 1000)
         except Exception as e:
-            elapsed = int((time.time() - t0) * 1000)
-            fail_obj = SkillResult.fail(error_msg=f"tool '{tool_name}' 执行异常: {e}").model_dump()
+            return None, e, int((time.time() - t0) * 1000)
+
+    def _finish(prep: PreparedCall, out_json: Optional[str], error: Optional[Exception], elapsed: int) -> str:
+        st, tool_args = prep.state, prep.tool_args
+        with _get_state_lock(own_lock):
+            if error is None and out_json is not None:
+                try:
+                    ok, content = _record(st, tool_args, out_json, elapsed, cache_hit=False)
+                    # 只缓存成功结果（存完整 JSON 串，命中时重新解析，避免下游原地修改污染缓存）
+                    if ok and prep.memo_key:
+                        st.setdefault("tool_memo", {})[prep.memo_key] = out_json
+                    return content
+                except Exception as e:
+                    error = e
+
+            fail_obj = SkillResult.fail(error_msg=f"tool '{tool_name}' 执行异常: {error}").model_dump()
             _append_tool_trace(
                 st,
                 role=role,
@@ -405,23 +503,75 @@ def _wrap_tool_with_guard(
                 args=tool_args,
                 ok=False,
                 insight=str(fail_obj.get("insight", "")),
-                error_msg=str(fail_obj.get("error_msg", str(e))),
+                error_msg=str(fail_obj.get("error_msg", str(error))),
                 elapsed_ms=elapsed,
                 denied=False,
                 produced_n=0,
             )
             return json.dumps(fail_obj, ensure_ascii=False)
 
+    def _func(**kwargs):
+        prep = _prepare(kwargs)
+        if prep.payload is not None:
+            return prep.payload
+        return _finish(prep, *_execute(prep))
+
     return StructuredTool(
         name=base_tool.name,
         description=base_tool.description,
         args_schema=getattr(base_tool, "args_schema", None),
         func=_func,
+        metadata={"guarded_call": GuardedCall(prepare=_prepare, execute=_execute, finish=_finish)},
     )
 
 # ============================================================
 # SECTION 8) ToolNode 构建（给 graph.py 用）
 # ============================================================
+def _run_tool_calls_parallel(msgs: List[Any], tools_by_name: Dict[str, Any]) -> Optional[List[ToolMessage]]:
+    """
+    同一条 AIMessage 内多个 tool_call 的并发执行：
+    - prepare（guard/计数/指纹/缓存）按 tool_call 原顺序串行 -> 拒绝结果与串行执行完全一致
+    - execute 丢进线程池并发（墙钟 ≈ 最慢的单个调用）
+    - finish 按原顺序记账，ToolMessage 顺序与 tool_calls 一致
+    返回 None 表示不适用（单个调用 / 非 guard 工具 / 参数校验失败），交回 ToolNode 处理
+    """
+    if not msgs or not isinstance(msgs[-1], AIMessage):
+        return None
+    calls = list(getattr(msgs[-1], "tool_calls", None) or [])
+    if len(calls) < 2:
+        return None
+
+    jobs: List[Tuple[Dict[str, Any], GuardedCall, Dict[str, Any]]] = []
+    for tc in calls:
+        tool = tools_by_name.get(tc.get("name"))
+        guarded = (getattr(tool, "metadata", None) or {}).get("guarded_call") if tool is not None else None
+        if not isinstance(guarded, GuardedCall):
+            return None
+        try:
+            kwargs = _validate_tool_args(tool, dict(tc.get("args") or {}))
+        except Exception:
+            return None  # 让 ToolNode 生成标准的参数错误消息
+        if not isinstance(kwargs, dict):
+            return None
+        jobs.append((tc, guarded, kwargs))
+
+    preps = [guarded.prepare(kwargs) for _, guarded, kwargs in jobs]
+    pending = [i for i, prep in enumerate(preps) if prep.payload is None]
+
+    results: Dict[int, Tuple[Optional[str], Optional[Exception], int]] = {}
+    if pending:
+        workers = max(1, min(int(getattr(CONFIG, "TOOL_PARALLEL_MAX_WORKERS", 4) or 1), len(pending)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tool") as pool:
+            futures = {i: pool.submit(copy_context().run, jobs[i][1].execute, preps[i]) for i in pending}
+            results = {i: f.result() for i, f in futures.items()}
+
+    tool_msgs: List[ToolMessage] = []
+    for i, ((tc, guarded, _), prep) in enumerate(zip(jobs, preps)):
+        content = prep.payload if i not in results else guarded.finish(prep, *results[i])
+        tool_msgs.append(ToolMessage(content=content, name=tc.get("name"), tool_call_id=tc.get("id")))
+    return tool_msgs
+
+
 def build_tool_node_for_role(
     role: str,
     tools: List[StructuredTool],
@@ -432,9 +582,15 @@ def build_tool_node_for_role(
         return None
 
     raw_node = ToolNode(tools=tools)
+    tools_by_name = {t.name: t for t in tools}
+    lock = threading.RLock()  # 本 node 的 guard 记账锁（见 _CURRENT_LOCK）
+    # serial：ToolNode 逐个执行；thread：guard 阶段串行、技能执行并发（见 _run_tool_calls_parallel）
+    parallel = str(getattr(CONFIG, "TOOL_PARALLEL_MODE", "thread")).lower() == "thread"
+    node_config = None if parallel else {"max_concurrency": 1}
 
     def _node(state_in: DebateState) -> DebateState:
         ctx_token = _CURRENT_STATE.set(state_in)
+        lock_token = _CURRENT_LOCK.set(lock)
         try:
             msgs = state_in.get("messages", [])
             if msgs and isinstance(msgs[-1], AIMessage):
@@ -464,11 +620,14 @@ def build_tool_node_for_role(
                         fixed_calls.append(tc)
                     
                     last_msg.tool_calls = fixed_calls
-            out = raw_node.invoke({"messages": msgs})
-            tool_msgs: List[Any] = out.get("messages", []) if isinstance(out, dict) else []
+            tool_msgs = _run_tool_calls_parallel(msgs, tools_by_name)
+            if tool_msgs is None:
+                out = raw_node.invoke({"messages": msgs}, config=node_config)
+                tool_msgs = out.get("messages", []) if isinstance(out, dict) else []
             state_in["messages"] = msgs + tool_msgs
             return state_in
         finally:
+            _CURRENT_LOCK.reset(lock_token)
             _CURRENT_STATE.reset(ctx_token)
 
     return _node
@@ -0,0 +1,186 @@
+"""
+【ClickHouse 流式读取】(Streaming Query Reader)
+
+替代 db.fetch(sql) -> pd.DataFrame(rows)（整份结果先变成 Python 元组列表，再整体建表）：
+- 按服务端数据块流式取回，每块（≤ block_rows 行）就地建 DataFrame 并按表 schema 转类型（csv_reader.apply_schema），最后合并；
+  峰值内存 ≈ 最终列式表 + 一个块的原始行，不随结果行数线性堆积 Python 对象
+- 兼容两类客户端：
+  - clickhouse_driver.Client（quantchdb 的底层连接）：execute_iter(chunk_size=block_rows)
+  - clickhouse_connect 客户端：query_df_stream，每块直接是列式 DataFrame
+- describe_columns：DESCRIBE TABLE 取列名，供 sql_templates.project_columns 做列投影
+- ClickHouseSession：连接池 + 表结构缓存；同一会话里多张表可并发查询（每个查询独占一条连接）
+"""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from .csv_reader import apply_schema
+
+# 每块行数（同时作为服务端 max_block_size）
+DEFAULT_BLOCK_ROWS = 100_000
+
+
+def iter_query_frames(client: Any, sql: str, *, block_rows: int = DEFAULT_BLOCK_ROWS) -> Iterator[pd.DataFrame]:
+    """逐块产出 DataFrame（未做类型转换）；空结果至少产出一个只有表头的空块"""
+    block_rows = max(1, int(block_rows))
+    settings = {"max_block_size": block_rows}
+
+    if hasattr(client, "query_df_stream"):
+        with client.query_df_stream(sql, settings=settings) as stream:
+            for df in stream:
+                yield df
+        return
+
+    names: Optional[List[str]] = None
+    for chunk in client.execute_iter(sql, with_column_types=True, settings=settings, chunk_size=block_rows):
+        # chunk_size=1 时 execute_iter 不分块，逐条产出裸行（首条是列类型列表）
+        rows = list(chunk) if block_rows > 1 else [chunk]
+        if names is None:
+            # with_column_types=True 时首个元素是 [(列名, 类型), ...]
+            names = [str(c[0]) for c in rows[0]] if rows else []
+            rows = rows[1:]
+        yield pd.DataFrame.from_records(rows, columns=names)
+    if names is None:
+        yield pd.DataFrame()
+
+
+def read_query_typed(
+    client: Any,
+    sql: str,
+    *,
+    table_name: Optional[str] = None,
+    block_rows: int = DEFAULT_BLOCK_ROWS,
+) -> Tuple[pd.DataFrame, int]:
+    """流式执行查询 -> (按 table_name 的 schema 转好类型的 df, 块数)"""
+    parts = [apply_schema(df, table_name) for df in iter_query_frames(client, sql, block_rows=block_rows)]
+    if not parts:
+        return pd.DataFrame(), 0
+    non_empty = [p for p in parts if len(p)] or parts[:1]
+    df = non_empty[0] if len(non_empty) == 1 else pd.concat(non_empty, ignore_index=True)
+    return df, len(parts)
+
+
+def describe_columns(client: Any, table_name: str) -> List[str]:
+    """DESCRIBE TABLE -> 列名列表（按库表定义顺序）"""
+    cols: List[str] = []
+    for df in iter_query_frames(client, f"DESCRIBE TABLE {table_name}"):
+        if len(df.columns):
+            cols.extend(str(v) for v in df.iloc[:, 0].tolist())
+    return cols
+
+
+# ================= 连接池会话 =================
+class ClickHouseSession:
+    """
+    ClickHouse 连接池会话
+    - factory() 产出 quantchdb.ClickHouseDatabase（或任何有 cursor() / close() 的对象），首次用到时才连接
+    - 最多 pool_size 条连接；用满时等待归还。clickhouse_driver 的一条连接同一时刻只能跑一个查询
+    - 查询出错的连接直接关闭丢弃（流读到一半的连接状态不可信），下次按需重建
+    - columns(table)：DESCRIBE 结果按表名缓存，refresh=True 时重查
+    """
+
+    def __init__(self, factory: Callable[[], Any], pool_size: int = 4):
+        self._factory = factory
+        self.pool_size = max(1, int(pool_size))
+        self._idle: List[Any] = []
+        self._all: List[Any] = []
+        # 连接借还 / 表结构缓存共用一把锁；池满时在条件变量上等归还或丢弃
+        self._cond = threading.Condition()
+        self._schema: Dict[str, List[str]] = {}
+        self._closed = False
+
+    def __enter__(self) -> "ClickHouseSession":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @property
+    def connections(self) -> int:
+        """已建立（含借出）的连接数"""
+        return len(self._all)
+
+    def _acquire(self) -> Any:
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("ClickHouseSession 已关闭")
+                if self._idle:
+                    return self._idle.pop()
+                if len(self._all) < self.pool_size:
+                    break
+                self._cond.wait()
+            # factory 只构造对象（首次 cursor() 才连接），锁内调用不会阻塞其它借还
+            db = self._factory()
+            self._all.append(db)
+            return db
+
+    def _release(self, db: Any) -> None:
+        with self._cond:
+            if self._closed:
+                self._all.remove(db)
+            else:
+                self._idle.append(db)
+                db = None
+            self._cond.notify()
+        if db is not None:
+            db.close()
+
+    def _discard(self, db: Any) -> None:
+        with self._cond:
+            if db in self._all:
+                self._all.remove(db)
+            self._cond.notify()
+        try:
+            db.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def client(self) -> Iterator[Any]:
+        """借一条连接，产出底层客户端；正常退出时归还连接池"""
+        db = self._acquire()
+        try:
+            with db.cursor() as c:
+                yield c
+        except BaseException:
+            self._discard(db)
+            raise
+        self._release(db)
+
+    def query(self, sql: str, *, table_name: Optional[str] = None, block_rows: int = DEFAULT_BLOCK_ROWS) -> Tuple[pd.DataFrame, int]:
+        """流式执行查询 -> (typed df, 块数)；见 read_query_typed"""
+        with self.client() as c:
+            return read_query_typed(c, sql, table_name=table_name, block_rows=block_rows)
+
+    def columns(self, table_name: str, *, refresh: bool = False) -> List[str]:
+        """表的列名（DESCRIBE TABLE，按表名缓存）"""
+        if not refresh:
+            with self._cond:
+                cached = self._schema.get(table_name)
+            if cached is not None:
+                return list(cached)
+        with self.client() as c:
+            cols = describe_columns(c, table_name)
+        with self._cond:
+            self._schema[table_name] = cols
+        return list(cols)
+
+    def close(self) -> None:
+        """关闭池内所有连接（借出中的连接在归还时关闭）；等待中的借用方随即报错"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            for db in idle:
+                self._all.remove(db)
+            self._cond.notify_all()
+        for db in idle:
+            try:
+                db.close()
+            except Exception:
+                pass
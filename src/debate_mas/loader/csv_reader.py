@@ -0,0 +1,164 @@
+"""
+【CSV 读取】(Typed CSV Reader)
+
+按表 schema 读 CSV，替代"逐个编码整表重读 + 全部列默认推断"：
+- 编码：只读文件开头一段字节判定（BOM -> utf-8-sig；能解 utf-8 -> utf-8；能解 gb18030 -> gb18030；否则 latin1），
+  判错（后文出现非法字节）时才按编码列表重读
+- code 类列读为 pandas "string" 类型（保留前导 0，技能不必再 astype(str)；显式用 "string"，pandas 2.x 下 "str" 仍是 object）
+- 日期列读入时解析一次为 datetime64（无法解析的值为 NaT，与技能里 to_datetime(errors="coerce") 同口径）
+- 允许降精度的浮点列转 float32；参与收益 / 流动性计算的列（close / amount）保持 float64
+- 大文件按块流式读取，每块先做类型转换再合并，峰值内存不随原始字符串列膨胀
+
+schema 按规范表名登记在 TABLE_SCHEMAS（与 sql_templates.TEMPLATE_REGISTRY 同风格），列名按 strip + 小写匹配；
+数据库分块结果走 apply_schema，与 CSV 读入同口径。
+"""
+
+from __future__ import annotations
+
+import codecs
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from pandas.api.types import is_float_dtype
+
+CSV_ENCODINGS = ["utf-8-sig", "utf-8", "gb18030", "latin1"]
+
+# 超过该大小的文件按块读取
+CHUNK_THRESHOLD_BYTES = 64 * 1024 * 1024
+CHUNK_ROWS = 500_000
+
+
+@dataclass(frozen=True)
+class TableSchema:
+    """
+    单表读入 schema（列名按 strip + 小写匹配；文件里没有的列忽略）
+    - codes：读为字符串
+    - dates：读入后解析为 datetime64
+    - float32：降为 float32 的列；float32_rest=True 时除 float64 外的所有浮点列都降
+    - float64：保持 float64（优先级高于 float32_rest）
+    """
+    codes: Tuple[str, ...] = ("code",)
+    dates: Tuple[str, ...] = ()
+    float32: Tuple[str, ...] = ()
+    float64: Tuple[str, ...] = ()
+    float32_rest: bool = False
+
+
+TABLE_SCHEMAS: Dict[str, TableSchema] = {
+    "etf_daily": TableSchema(
+        codes=("code",),
+        dates=("date", "tradingdate", "data"),
+        float64=("close", "amount"),
+        float32_rest=True,
+    ),
+    # list_date / setup_date 等在技能里按字符串取用，不在此解析
+    "etf_basic": TableSchema(codes=("code", "index_code")),
+    "govcn": TableSchema(codes=(), dates=("date", "pub_date")),
+    "csrc": TableSchema(codes=(), dates=("date", "pub_date")),
+}
+
+# 未登记的表：只保护 code 列
+DEFAULT_SCHEMA = TableSchema()
+
+
+def schema_for(table_name: Optional[str]) -> TableSchema:
+    return TABLE_SCHEMAS.get(str(table_name or ""), DEFAULT_SCHEMA)
+
+
+# ================= 编码探测 =================
+def sniff_encoding(path: str, sample_bytes: int = 1 << 16) -> str:
+    """读文件开头 sample_bytes 判定编码（表头常是纯 ASCII，默认看 64KB 覆盖若干数据行）"""
+    with open(path, "rb") as f:
+        sample = f.read(sample_bytes)
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    for enc in ("utf-8", "gb18030"):
+        try:
+            codecs.getincrementaldecoder(enc)().decode(sample, final=False)  # 末尾截断的多字节字符不算错
+            return enc
+        except UnicodeDecodeError:
+            continue
+    return "latin1"
+
+
+# ================= schema -> read_csv 参数 / 块内转换 =================
+def _match(columns: List[str], names: Tuple[str, ...]) -> List[str]:
+    wanted = {n.lower() for n in names}
+    return [c for c in columns if str(c).strip().lower() in wanted]
+
+
+def read_dtypes(columns: List[str], schema: TableSchema) -> Dict[str, Any]:
+    """read_csv 的 dtype 参数（只含 code 类列；原始列名）"""
+    return {c: "string" for c in _match(columns, schema.codes)}
+
+
+def _convert(df: pd.DataFrame, schema: TableSchema) -> pd.DataFrame:
+    """块内类型转换：日期解析 + 浮点降精度（列名已 strip）"""
+    for c in _match(list(df.columns), schema.dates):
+        df[c] = pd.to_datetime(df[c], errors="coerce")
+    keep64 = set(_match(list(df.columns), schema.float64))
+    targets = list(df.columns) if schema.float32_rest else _match(list(df.columns), schema.float32)
+    for c in targets:
+        if c not in keep64 and is_float_dtype(df[c]) and df[c].dtype != "float32":
+            df[c] = df[c].astype("float32")
+    return df
+
+
+def apply_schema(df: pd.DataFrame, table_name: Optional[str] = None) -> pd.DataFrame:
+    """非 CSV 来源（如数据库分块结果）复用同一 schema：code 类列转字符串 + 日期解析 + 浮点降精度"""
+    schema = schema_for(table_name)
+    df.columns = [str(c).strip() for c in df.columns]
+    for c in _match(list(df.columns), schema.codes):
+        if not isinstance(df[c].dtype, pd.StringDtype):
+            df[c] = df[c].astype("string")
+    return _convert(df, schema)
+
+
+def _read(path: str, *, encoding: str, schema: TableSchema, dtype: Optional[Dict[str, Any]], chunk_rows: Optional[int]) -> pd.DataFrame:
+    header = pd.read_csv(path, encoding=encoding, nrows=0)
+    dtypes = read_dtypes([str(c) for c in header.columns], schema)
+    dtypes.update(dtype or {})
+
+    if not chunk_rows:
+        df = pd.read_csv(path, encoding=encoding, dtype=dtypes or None)
+        df.columns = [str(c).strip() for c in df.columns]
+        return _convert(df, schema)
+
+    parts: List[pd.DataFrame] = []
+    with pd.read_csv(path, encoding=encoding, dtype=dtypes or None, chunksize=int(chunk_rows)) as reader:
+        for chunk in reader:
+            chunk.columns = [str(c).strip() for c in chunk.columns]
+            parts.append(_convert(chunk, schema))
+    if not parts:
+        return pd.DataFrame(columns=[str(c).strip() for c in header.columns])
+    return pd.concat(parts, ignore_index=True)
+
+
+def read_csv_typed(
+    path: str,
+    *,
+    table_name: Optional[str] = None,
+    encoding: Optional[str] = None,
+    dtype: Optional[Dict[str, Any]] = None,
+    chunk_rows: Optional[int] = None,
+) -> Tuple[pd.DataFrame, str]:
+    """
+    按 table_name 对应的 schema 读 CSV -> (df, 实际编码)
+    - encoding 缺省时探测；读取因编码失败时按 CSV_ENCODINGS 依次重试
+    - dtype：额外的列类型提示（原始列名），覆盖 schema
+    - chunk_rows 缺省时：文件超过 CHUNK_THRESHOLD_BYTES 按 CHUNK_ROWS 分块
+    """
+    schema = schema_for(table_name)
+    if chunk_rows is None and os.path.getsize(path) > CHUNK_THRESHOLD_BYTES:
+        chunk_rows = CHUNK_ROWS
+
+    first = encoding or sniff_encoding(path)
+    last_err: Optional[Exception] = None
+    for enc in [first] + [e for e in CSV_ENCODINGS if e != first]:
+        try:
+            return _read(path, encoding=enc, schema=schema, dtype=dtype, chunk_rows=chunk_rows), enc
+        except UnicodeDecodeError as e:
+            last_err = e
+    raise last_err or ValueError(f"无法读取 CSV: {path}")
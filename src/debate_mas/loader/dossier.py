@@ -1,10 +1,253 @@
 from __future__ import annotations
 
+import threading
+import time
 from dataclasses import dataclass, field
-from typing import Dict, List, Any, Optional
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterator, List, Any, Optional, Tuple
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_datetime64_dtype
+
+# 派生缓存条目上限（LRU）：批量 / 回测跨数百个 ref_date 时，按 ref_date 的切片不无限累积
+DERIVED_CACHE_MAX_ENTRIES = 64
+
+
+@dataclass(frozen=True)
+class DateIndex:
+    """
+    单表日期索引（随表版本缓存）：
+    - frame: 日期列已解析为 datetime、NaT 行已剔除的表（保持原行序，其余列与原表共享内存）
+    - dates: frame 日期列的 datetime64[ns] 数组
+    - order: 原行序下日期是否单调 ("asc" / "desc" / "none")
+    - sorter: order == "none" 时按日期的稳定 argsort
+    """
+    date_col: str
+    frame: pd.DataFrame
+    dates: np.ndarray
+    order: str
+    sorter: Optional[np.ndarray] = None
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, date_col: str) -> "DateIndex":
+        col = df[date_col]
+        parsed = col if is_datetime64_dtype(col) else pd.to_datetime(col, errors="coerce")
+        if getattr(parsed.dtype, "tz", None) is not None:
+            raise ValueError("带时区的日期列不走索引")
+        frame = df if parsed is col else df.assign(**{date_col: parsed})
+        valid = parsed.notna().to_numpy()
+        if not valid.all():
+            frame = frame[valid]
+
+        dates = frame[date_col].to_numpy(dtype="datetime64[ns]")
+        if len(dates) < 2 or bool(np.all(dates[1:] >= dates[:-1])):
+            return cls(date_col=date_col, frame=frame, dates=dates, order="asc")
+        if bool(np.all(dates[1:] <= dates[:-1])):
+            return cls(date_col=date_col, frame=frame, dates=dates, order="desc")
+        return cls(date_col=date_col, frame=frame, dates=dates, order="none", sorter=np.argsort(dates, kind="stable"))
+
+    def before(self, target: Any) -> pd.DataFrame:
+        """date < target 的行（保持原行序）；单调表为 iloc 区间（零拷贝视图）"""
+        t = np.datetime64(pd.Timestamp(target).to_datetime64(), "ns")
+        if self.order == "asc":
+            return self.frame.iloc[: int(np.searchsorted(self.dates, t, side="left"))]
+        if self.order == "desc":
+            k = int(np.searchsorted(self.dates[::-1], t, side="left"))
+            return self.frame.iloc[len(self.dates) - k:]
+        k = int(np.searchsorted(self.dates[self.sorter], t, side="left"))
+        return self.frame.take(np.sort(self.sorter[:k]))
+
+    def append(self, info: "TableAppend") -> Optional["DateIndex"]:
+        """
+        追加行后的增量索引（只解析新增行的日期）：
+        仅处理升序表、没有覆盖旧行、新日期不早于原末尾的情形（每日收盘追加）；其余返回 None，按需重建
+        """
+        if self.order != "asc" or len(info.removed) or self.date_col not in info.delta.columns:
+            return None
+        col = info.delta[self.date_col]
+        parsed = col if is_datetime64_dtype(col) else pd.to_datetime(col, errors="coerce")
+        if getattr(parsed.dtype, "tz", None) is not None:
+            return None
+        valid = parsed.notna().to_numpy()
+        new = parsed[valid].to_numpy(dtype="datetime64[ns]")
+        if len(new) and (bool(np.any(new[1:] < new[:-1])) or (len(self.dates) and new[0] < self.dates[-1])):
+            return None
+
+        if parsed is col and valid.all() and self.frame is info.previous:
+            frame = info.table  # 原表即索引 frame（日期列已是 datetime 且无 NaT）：继续零拷贝
+        else:
+            delta = info.delta if parsed is col else info.delta.assign(**{self.date_col: parsed})
+            frame = pd.concat([self.frame, delta[valid]])
+        return DateIndex(date_col=self.date_col, frame=frame, dates=np.concatenate([self.dates, new]), order="asc")
+
+
+@dataclass(frozen=True)
+class TableAppend:
+    """
+    一次 append_rows 的结果（传给派生缓存的 updater 做增量更新）：
+    - previous / table：追加前 / 后的整表
+    - delta：实际追加的行（已去重、列类型已对齐；索引为其在新表中的标签）
+    - removed：被 delta 按主键覆盖而删除的旧行
+    - old_positions：旧表为 RangeIndex 时，旧行 -> 新表位置（被删为 -1）；否则 None
+    """
+    name: str
+    previous: pd.DataFrame
+    table: pd.DataFrame
+    delta: pd.DataFrame
+    removed: pd.DataFrame
+    keys: Tuple[str, ...]
+    old_positions: Optional[np.ndarray] = None
+
+
+def _append_date_index(idx: Optional[DateIndex], info: TableAppend) -> Optional[DateIndex]:
+    """date_index 的 updater（模块级，可 pickle）"""
+    return idx.append(info) if idx is not None else None
+
+
+# 主键列别名（append_rows 按列名不区分大小写匹配）
+_KEY_ALIASES: Dict[str, Tuple[str, ...]] = {"date": ("date", "tradingdate", "data")}
+
+
+def _key_columns(df: pd.DataFrame, keys: Tuple[str, ...]) -> List[str]:
+    """keys -> df 中的实际列名；任一主键缺失时返回 []"""
+    lower = {str(c).strip().lower(): c for c in df.columns}
+    out: List[str] = []
+    for k in keys:
+        col = next((lower[a] for a in _KEY_ALIASES.get(k, (k,)) if a in lower), None)
+        if col is None:
+            return []
+        out.append(col)
+    return out
+
+
+def _normalized_key(s: pd.Series, key: str) -> pd.Series:
+    """主键比较口径：date 类 -> datetime；其余 -> 字符串（已是目标类型时不转换）"""
+    if key == "date":
+        return s if is_datetime64_dtype(s) else pd.to_datetime(s, errors="coerce")
+    return s if isinstance(s.dtype, pd.StringDtype) else s.astype(str)
+
+
+def _align_dtypes(delta: pd.DataFrame, like: pd.DataFrame) -> pd.DataFrame:
+    """delta 中与 like 同名的列转成 like 的类型（失败则保持原样）"""
+    out = delta.copy()
+    for c in out.columns:
+        if c not in like.columns or out[c].dtype == like[c].dtype:
+            continue
+        try:
+            if is_datetime64_dtype(like[c]):
+                out[c] = pd.to_datetime(out[c], errors="coerce").astype(like[c].dtype)
+            else:
+                out[c] = out[c].astype(like[c].dtype)
+        except (TypeError, ValueError):
+            pass
+    return out
+
+
+@dataclass
+class LazyTable:
+    """
+    惰性表句柄：首次取表时才 reader(path, dtype=..., **kwargs) 读入。
+    - dtype：列类型提示（None 时不传给 reader）
+    - kwargs：其余读入参数（编码 / mmap 等，由探测阶段确定）
+    """
+    path: str
+    reader: Callable[..., pd.DataFrame]
+    dtype: Optional[Dict[str, Any]] = None
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+    def load(self) -> pd.DataFrame:
+        kwargs = dict(self.kwargs)
+        if self.dtype is not None:
+            kwargs["dtype"] = self.dtype
+        return self.reader(self.path, **kwargs)
+
+
+class TableStore(dict):
+    """
+    表名 -> DataFrame；值可以是 LazyTable，按 key 取值（[] / get / items / values / pop）时就地物化。
+    in / len / keys / 迭代表名不触发读取。物化后用真实行列刷新 meta_sink（即 Dossier.tables_meta）。
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.meta_sink: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    def is_loaded(self, key: str) -> bool:
+        return key in self and not isinstance(dict.__getitem__(self, key), LazyTable)
+
+    def lazy_names(self) -> List[str]:
+        return [k for k, v in dict.items(self) if isinstance(v, LazyTable)]
+
+    def _materialize(self, key: str) -> Optional[pd.DataFrame]:
+        value = dict.get(self, key)
+        if not isinstance(value, LazyTable):
+            return value
+        with self._lock:
+            value = dict.get(self, key)  # 双检：其它线程可能刚读完
+            if not isinstance(value, LazyTable):
+                return value
+            t0 = time.perf_counter()
+            try:
+                df = value.load()
+            except Exception as e:
+                print(f"⚠️ [Dossier] 惰性表读取失败，移除: table={key}, path={value.path}, err={e}")
+                dict.__delitem__(self, key)
+                if self.meta_sink is not None:
+                    self.meta_sink.pop(key, None)
+                return None
+            dict.__setitem__(self, key, df)
+
+        m = self.meta_sink.get(key) if self.meta_sink is not None else None
+        if m is not None:
+            m.update({
+                "rows": int(df.shape[0]),
+                "cols": int(df.shape[1]),
+                "columns": [str(c) for c in df.columns],
+                "load_ms": round((time.perf_counter() - t0) * 1000, 1),
+            })
+            m.pop("rows_estimated", None)
+        return df
+
+    def __getitem__(self, key: str) -> pd.DataFrame:
+        if key not in self:
+            raise KeyError(key)
+        df = self._materialize(key)
+        if df is None:
+            raise KeyError(key)
+        return df
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in self:
+            return default
+        df = self._materialize(key)
+        return default if df is None else df
+
+    def items(self) -> Iterator[Tuple[str, pd.DataFrame]]:  # type: ignore[override]
+        for key in list(self.keys()):
+            df = self._materialize(key)
+            if df is not None:
+                yield key, df
+
+    def values(self) -> Iterator[pd.DataFrame]:  # type: ignore[override]
+        for _, df in self.items():
+            yield df
+
+    def pop(self, key: str, *default: Any) -> Any:
+        if key in self:
+            self._materialize(key)
+        return super().pop(key, *default)
+
+    def __reduce_ex__(self, protocol: Any) -> Any:
+        # 序列化不触发物化（LazyTable 原样传给子进程）；锁不可 pickle，反序列化时重建
+        return self.__class__, (), {"meta_sink": self.meta_sink}, None, iter(dict.items(self))
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.meta_sink = state.get("meta_sink")
+        self._lock = threading.Lock()
+
 
 @dataclass
 class Dossier:
@@ -17,8 +260,8 @@ class Dossier:
     # 1. 任务指令 (Mission)
     mission: str
 
-    # 2. 结构化证据 (Structured Evidence)
-    structured_data: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    # 2. 结构化证据 (Structured Evidence)；值可为 LazyTable，首次取表时读入（见 TableStore）
+    structured_data: Dict[str, pd.DataFrame] = field(default_factory=TableStore)
 
     # 3. 文本证据 (Textual Evidence)
     unstructured_text: List[str] = field(default_factory=list)
@@ -33,8 +276,25 @@ class Dossier:
     texts_meta: List[Dict[str, Any]] = field(default_factory=list)
     table_aliases: Dict[str, List[str]] = field(default_factory=dict)
     _alias_to_canonical: Dict[str, str] = field(default_factory=dict, init=False, repr=False)
-    
-    
+
+    # 派生数据缓存：(表名, key) -> (表对象 id, 表版本, 派生值, updater)；add_table 替换表时失效，append_rows 时走 updater 增量更新
+    # LRU，最多 DERIVED_CACHE_MAX_ENTRIES 条；updater 须是模块级函数（案卷序列化时缓存整体丢弃，见 __getstate__）
+    _table_versions: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    _derived: "OrderedDict[Tuple[str, Hashable], Tuple[int, int, Any, Optional[Callable[[Any, TableAppend], Any]]]]" = field(default_factory=OrderedDict, init=False, repr=False)
+    _version: int = field(default=0, init=False, repr=False)
+
+    # 多线程共享同一案卷（batch runner）：版本号 / 派生缓存的读写都在 _lock 下；同一派生 key 只构建一次
+    _lock: Any = field(default_factory=threading.RLock, init=False, repr=False, compare=False)
+    _build_locks: Dict[Tuple[str, Hashable], Any] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    # mmap 快照来源：(快照路径, 加载时版本)；表未改动时序列化只传路径（多进程共享物理内存）
+    _mmap_snapshot: Optional[Tuple[str, int]] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if not isinstance(self.structured_data, TableStore):
+            self.structured_data = TableStore(self.structured_data or {})
+        self.structured_data.meta_sink = self.tables_meta
+
     def register_table_aliases(self, mapping: Dict[str, Any]) -> None:
         """
         注册别名映射（两种格式都支持）：
@@ -121,6 +381,7 @@ class Dossier:
         [工具方法] 添加表格证据。
         """
         self.structured_data[name] = df
+        self._bump_table_version(name)
 
         try:
             shape = (int(df.shape[0]), int(df.shape[1]))
@@ -144,6 +405,51 @@ class Dossier:
         if aliases:
             self.register_table_aliases({name: aliases})
 
+    def add_lazy_table(
+        self,
+        name: str,
+        handle: LazyTable,
+        *,
+        columns: Optional[List[str]] = None,
+        rows: Optional[int] = None,
+        rows_estimated: bool = False,
+        description: str = "",
+        source: str = "unknown",
+        extra: Optional[Dict[str, Any]] = None,
+        aliases: Optional[List[str]] = None,
+    ) -> None:
+        """
+        [工具方法] 添加惰性表：先登记句柄与探测到的表头/行数（frozen_view 可用），首次 get_table 时才读入。
+        rows_estimated=True 表示行数为粗估（如按换行计数），读入后以真实值覆盖。
+        """
+        self.structured_data[name] = handle  # type: ignore[assignment]
+        self._bump_table_version(name)
+
+        cols = [str(c) for c in (columns or [])]
+        m: Dict[str, Any] = {
+            "name": name,
+            "source": source,
+            "description": description,
+            "rows": rows,
+            "cols": len(cols) if columns is not None else None,
+            "columns": cols,
+            "added_at": datetime.now().isoformat(timespec="seconds"),
+            "lazy": True,
+        }
+        if rows_estimated:
+            m["rows_estimated"] = True
+        if extra and isinstance(extra, dict):
+            m.update(extra)
+
+        self.tables_meta[name] = m
+        if aliases:
+            self.register_table_aliases({name: aliases})
+
+    def is_table_loaded(self, name: str) -> bool:
+        """表是否已读入内存（惰性表未被取用前为 False）"""
+        canonical = self.resolve_table_name(name)
+        return bool(canonical) and self.structured_data.is_loaded(canonical)
+
     def add_text(
         self,
         content: str,
@@ -254,6 +560,252 @@ class Dossier:
         """返回当前案卷里所有表名，方便调试。"""
         return list(self.structured_data.keys())
 
+    # -------------------------------------------------------
+    # 派生数据缓存（标准化副本 / 面板 / 索引等，按表版本自动失效）
+    # -------------------------------------------------------
+    @property
+    def version(self) -> int:
+        """案卷版本号：任意表被添加/替换时 +1"""
+        return self._version
+
+    def table_version(self, name: str) -> int:
+        canonical = self.resolve_table_name(name)
+        return self._table_versions.get(canonical, 0) if canonical else 0
+
+    def _bump_table_version(self, name: str) -> None:
+        with self._lock:
+            self._table_versions[name] = self._table_versions.get(name, 0) + 1
+            self._version += 1
+            for k in [k for k in self._derived if k[0] == name]:
+                del self._derived[k]
+
+    def _store_derived(self, k: Tuple[str, Hashable], entry: Tuple[int, int, Any, Any]) -> None:
+        """写入派生缓存并按 LRU 淘汰（调用方持有 _lock）"""
+        self._derived[k] = entry
+        self._derived.move_to_end(k)
+        while len(self._derived) > DERIVED_CACHE_MAX_ENTRIES:
+            old_key, _ = self._derived.popitem(last=False)
+            self._build_locks.pop(old_key, None)
+
+    def get_derived(
+        self,
+        name: str,
+        key: Hashable,
+        builder: Callable[[pd.DataFrame], Any],
+        updater: Optional[Callable[[Any, TableAppend], Any]] = None,
+    ) -> Any:
+        """
+        [缓存] 取表 name 的派生数据；未命中则 builder(df) 构建并缓存。
+        - 以 (表对象 id, 表版本) 校验，add_table 替换表后自动重建
+        - updater(旧值, TableAppend) -> 新值：append_rows 时增量更新；返回 None / 未提供时下次按需重建
+        - 派生值在技能间共享，调用方只读，不得原地修改
+        - 线程安全：同一 (表, key) 并发未命中时只构建一次；构建期间表被替换则结果不入缓存
+        - 表不存在时返回 None
+        """
+        canonical = self.resolve_table_name(name)
+        if not canonical:
+            return None
+        df = self.structured_data.get(canonical)
+        if df is None:
+            return None
+
+        k = (canonical, key)
+        with self._lock:
+            stamp = (id(df), self._table_versions.get(canonical, 0))
+            hit = self._derived.get(k)
+            if hit is not None and (hit[0], hit[1]) == stamp:
+                self._derived.move_to_end(k)
+                return hit[2]
+            build_lock = self._build_locks.setdefault(k, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                hit = self._derived.get(k)
+                if hit is not None and (hit[0], hit[1]) == stamp:
+                    self._derived.move_to_end(k)
+                    return hit[2]
+            value = builder(df)
+            with self._lock:
+                if self.structured_data.get(canonical) is df and self._table_versions.get(canonical, 0) == stamp[1]:
+                    self._store_derived(k, (stamp[0], stamp[1], value, updater))
+        return value
+
+    def date_index(self, name: str, date_col: str) -> Optional[DateIndex]:
+        """[索引] 表 name 在 date_col 上的日期索引（按表版本缓存；列不存在/无法解析时返回 None）"""
+        def _build(df: pd.DataFrame) -> Optional[DateIndex]:
+            if date_col not in df.columns:
+                return None
+            try:
+                return DateIndex.build(df, date_col)
+            except Exception as e:
+                print(f"⚠️ [Dossier] 日期索引构建失败: table={name}, col={date_col}, err={e}")
+                return None
+
+        return self.get_derived(name, ("date_index", date_col), _build, _append_date_index)
+
+    def slice_before(self, name: str, ref_date: Any, date_col: str) -> Optional[pd.DataFrame]:
+        """
+        [切片] 取表 name 中 date_col < ref_date 的行（与 apply_date_filter 同口径）。
+        结果 attrs["date_filter"] 记录 fast_path/date_col/order；索引不可用时返回 None。
+        """
+        target = pd.to_datetime(ref_date, errors="coerce")
+        if pd.isna(target):
+            return None
+        idx = self.date_index(name, date_col)
+        if idx is None:
+            return None
+        out = idx.before(target)
+        out.attrs["date_filter"] = {"fast_path": True, "date_col": date_col, "order": idx.order, "rows": int(len(out))}
+        return out
+
+
+    # -------------------------------------------------------
+    # 增量追加（每日收盘只追加新一天的行情，不重载全量历史）
+    # -------------------------------------------------------
+    def append_rows(
+        self,
+        name: str,
+        delta: pd.DataFrame,
+        *,
+        keys: Tuple[str, ...] = ("code", "date"),
+        source: str = "append",
+    ) -> Dict[str, int]:
+        """
+        [增量] 向表 name 追加行：
+        - 按主键 keys 去重（列名不区分大小写，date 兼容 tradingdate/data）：delta 内保留最后一条，与旧表重复的旧行被覆盖
+        - delta 列名 strip，同名列类型对齐旧表（code 字符串 / date datetime / float32 等）
+        - 表版本与案卷版本 +1（依赖版本的缓存随之失效）；带 updater 的派生缓存（日期索引 / 标准化日线 / 价格面板）增量更新
+        - 表不存在时等同 add_table
+        返回 {"appended": 追加行数, "replaced": 被覆盖的旧行数, "rows": 追加后总行数}
+        """
+        with self._lock:
+            return self._append_rows(name, delta, keys=keys, source=source)
+
+    def _append_rows(self, name: str, delta: pd.DataFrame, *, keys: Tuple[str, ...], source: str) -> Dict[str, int]:
+        canonical = self.resolve_table_name(name) or str(name)
+        delta = delta.rename(columns=lambda c: str(c).strip())
+        old = self.structured_data.get(canonical)
+        if old is None:
+            table = delta.reset_index(drop=True)
+            self.add_table(canonical, table, description="Appended rows", source=source)
+            return {"appended": int(len(table)), "replaced": 0, "rows": int(len(table))}
+
+        delta = _align_dtypes(delta, old)
+        removed_mask = np.zeros(len(old), dtype=bool)
+        key_cols = _key_columns(old, tuple(keys))
+        if key_cols and all(c in delta.columns for c in key_cols):
+            dkeys = pd.DataFrame({c: _normalized_key(delta[c], k) for c, k in zip(key_cols, keys)})
+            keep = ~dkeys.duplicated(keep="last").to_numpy()
+            delta, dkeys = delta[keep], dkeys[keep]
+
+            # 只在 delta 的日期范围内找重复（每日追加时候选行只有几天）
+            cand = np.ones(len(old), dtype=bool)
+            if "date" in keys and len(dkeys):
+                dcol = key_cols[list(keys).index("date")]
+                odates = _normalized_key(old[dcol], "date")
+                dd = dkeys[dcol]
+                cand = ((odates >= dd.min()) & (odates <= dd.max())).to_numpy()
+            if cand.any() and len(dkeys):
+                okeys = pd.DataFrame({c: _normalized_key(old[c][cand], k) for c, k in zip(key_cols, keys)})
+                hit = pd.MultiIndex.from_frame(okeys).isin(pd.MultiIndex.from_frame(dkeys))
+                removed_mask[np.flatnonzero(cand)[hit]] = True
+        else:
+            print(f"⚠️ [Dossier] append_rows 未找到主键列 {list(keys)}，按纯追加处理: table={canonical}")
+
+        kept = ~removed_mask
+        old_positions = None
+        if isinstance(old.index, pd.RangeIndex) and old.index.start == 0 and old.index.step == 1:
+            n_kept = int(kept.sum())
+            old_positions = np.where(kept, np.cumsum(kept) - 1, -1)
+            delta = delta.set_axis(pd.RangeIndex(n_kept, n_kept + len(delta)), axis=0)
+            table = pd.concat([old[kept].reset_index(drop=True) if removed_mask.any() else old, delta])
+        else:
+            table = pd.concat([old[kept] if removed_mask.any() else old, delta])
+
+        info = TableAppend(
+            name=canonical,
+            previous=old,
+            table=table,
+            delta=delta,
+            removed=old[removed_mask],
+            keys=tuple(keys),
+            old_positions=old_positions,
+        )
+
+        # 先用旧版本的派生值算出增量结果，再换表 / 升版本
+        stamp = (id(old), self._table_versions.get(canonical, 0))
+        carried: List[Tuple[Hashable, Any, Callable[[Any, TableAppend], Any]]] = []
+        for (tname, key), (oid, ver, value, updater) in list(self._derived.items()):
+            if tname != canonical or updater is None or (oid, ver) != stamp:
+                continue
+            try:
+                new_value = updater(value, info)
+            except Exception as e:
+                print(f"⚠️ [Dossier] 派生缓存增量更新失败，改为按需重建: table={canonical}, key={key}, err={e}")
+                new_value = None
+            if new_value is not None:
+                carried.append((key, new_value, updater))
+
+        self.structured_data[canonical] = table
+        self._bump_table_version(canonical)
+        ver = self._table_versions[canonical]
+        for key, value, updater in carried:
+            self._store_derived((canonical, key), (id(table), ver, value, updater))
+
+        stats = {"appended": int(len(delta)), "replaced": int(removed_mask.sum()), "rows": int(len(table))}
+        m = self.tables_meta.setdefault(canonical, {"name": canonical, "source": source, "description": ""})
+        m.update({
+            "rows": int(table.shape[0]),
+            "cols": int(table.shape[1]),
+            "columns": [str(c) for c in table.columns],
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "last_append": stats,
+        })
+        m.pop("rows_estimated", None)
+        return stats
+
+
+    # -------------------------------------------------------
+    # 快照（列式落盘，跳过 CSV 解析；见 snapshot.py）
+    # -------------------------------------------------------
+    def save_snapshot(self, path: str, *, sources: Optional[Dict[str, Any]] = None) -> str:
+        """[持久化] 把案卷写成快照目录（表为 feather/pickle，文本与元信息进 manifest.json）"""
+        from .snapshot import save_snapshot
+
+        return save_snapshot(self, path, sources=sources)
+
+    @property
+    def is_mmap_backed(self) -> bool:
+        """表是否仍全部来自 mmap 快照（加载后未 add_table）"""
+        return self._mmap_snapshot is not None and self._mmap_snapshot[1] == self._version
+
+    def __reduce_ex__(self, protocol: Any) -> Any:
+        # 进程池传参：mmap 案卷只序列化快照路径，子进程重新映射同一文件，不复制 DataFrame
+        # 文本 / 别名 / 表元信息不影响 _version（加载后仍可改），随路径一并传过去
+        if self.is_mmap_backed:
+            from .snapshot import _restore_mmap_dossier
+
+            extras = {
+                "texts": list(self.unstructured_text),
+                "texts_meta": [dict(m) for m in self.texts_meta],
+                "table_aliases": {k: list(v) for k, v in self.table_aliases.items()},
+                "tables_meta": {k: dict(v) for k, v in self.tables_meta.items()},
+            }
+            return _restore_mmap_dossier, (self._mmap_snapshot[0], self.mission, dict(self.meta), extras)
+        return super().__reduce_ex__(protocol)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # 派生缓存（面板 / 索引等，可能很大）与锁不随案卷序列化；子进程按需重建
+        state = dict(self.__dict__)
+        state["_derived"] = OrderedDict()
+        state.pop("_lock", None)
+        state.pop("_build_locks", None)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+        self._build_locks = {}
 
     @classmethod
     def create_empty(cls, mission: str) -> "Dossier":
@@ -1,14 +1,22 @@
 from __future__ import annotations
 
 import json
+import multiprocessing
 import os
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 import pandas as pd
 from dotenv import load_dotenv
 
-from .dossier import Dossier
-from .sql_templates import TEMPLATE_REGISTRY
+from .clickhouse_reader import DEFAULT_BLOCK_ROWS, ClickHouseSession
+from .csv_reader import read_csv_typed, read_dtypes, schema_for, sniff_encoding
+from .dossier import Dossier, LazyTable
+from .snapshot import is_fresh, load_snapshot, source_fingerprint
+from .sql_templates import DB_BATCH_TABLES, TABLE_COLUMNS, TABLE_DATE_CANDIDATES, TABLE_DATE_MAP, TEMPLATE_REGISTRY, project_columns
 
 load_dotenv()
 
@@ -28,6 +36,100 @@ try:
 except ImportError:
     ClickHouseDatabase = None
 
+# 每个数据库会话的连接数上限（批量加载时的并发上限）
+DB_POOL_SIZE = 4
+
+
+# ================= 单文件读取（纯函数：不碰 Dossier，可放进线程池 / 进程池） =================
+# PDF / DOCX 文本抽取是纯 Python 的 CPU 活（持 GIL），并行时走进程池；其余走线程池
+_PROCESS_KINDS = ("docx", "pdf")
+
+
+def _file_kind(filename: str) -> Optional[str]:
+    fname_lower = filename.lower()
+    if fname_lower.endswith(".csv"):
+        return "csv"
+    if fname_lower.endswith(".xlsx"):
+        return "excel"
+    if fname_lower.endswith((".txt", ".md")):
+        return "txt"
+    if fname_lower.endswith(".docx"):
+        return "docx"
+    if fname_lower.endswith(".pdf"):
+        return "pdf"
+    return None
+
+
+def _read_csv(path: str, table_name: Optional[str] = None) -> Tuple[pd.DataFrame, str]:
+    """按表 schema 读 CSV（编码探测 / code 字符串 / 日期解析 / float32 / 大文件分块，见 csv_reader）；返回 (df, 编码)"""
+    return read_csv_typed(path, table_name=table_name)
+
+
+def _read_csv_table(path: str, *, encoding: str, table_name: Optional[str] = None, dtype: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """惰性表的 reader：编码已由探测确定（判错时 read_csv_typed 自行按编码列表重试）"""
+    return read_csv_typed(path, table_name=table_name, encoding=encoding, dtype=dtype)[0]
+
+
+def _count_lines(path: str, block_size: int = 1 << 20) -> int:
+    """按块数换行符（不解析字段）；末行无换行时补 1"""
+    n, last = 0, b""
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            n += block.count(b"\n")
+            last = block[-1:]
+    return n + (1 if last and last != b"\n" else 0)
+
+
+def _probe_csv(path: str, table_name: Optional[str] = None) -> Dict[str, Any]:
+    """只读表头 + 数行数：返回 {columns, rows, encoding, dtype}；rows 为粗估（引号内换行 / 空行会有偏差）"""
+    enc = sniff_encoding(path)
+    head = pd.read_csv(path, encoding=enc, nrows=0)
+    raw_cols = [str(c) for c in head.columns]
+    return {
+        "columns": [c.strip() for c in raw_cols],
+        "rows": max(0, _count_lines(path) - 1),
+        "encoding": enc,
+        "dtype": read_dtypes(raw_cols, schema_for(table_name)),
+    }
+
+
+def _read_excel(path: str) -> Dict[str, pd.DataFrame]:
+    return pd.read_excel(path, sheet_name=None)
+
+
+def _read_txt(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _read_docx(path: str) -> str:
+    doc = Document(path)
+    return "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
+
+
+def _read_pdf(path: str) -> str:
+    reader = PdfReader(path)
+    return "\n".join([p.extract_text() for p in reader.pages if p.extract_text()])
+
+
+_READERS = {"csv": _read_csv, "csv_probe": _probe_csv, "excel": _read_excel, "txt": _read_txt, "docx": _read_docx, "pdf": _read_pdf}
+
+
+def _timed_read(kind: str, path: str, table_name: Optional[str] = None) -> Tuple[Any, Optional[str], float]:
+    """读取单个文件 -> (payload, 错误信息, 耗时 ms)；异常转成字符串（进程池回传不依赖异常可 pickle）"""
+    t0 = time.perf_counter()
+    try:
+        reader = _READERS[kind]
+        payload = reader(path, table_name) if kind in ("csv", "csv_probe") else reader(path)
+        err = None
+    except Exception as e:
+        payload, err = None, str(e) or type(e).__name__
+    return payload, err, round((time.perf_counter() - t0) * 1000, 1)
+
+
 class DualModeLoader:
     """
     【双模加载器】(Dual Mode Loader)  
@@ -44,7 +146,19 @@ class DualModeLoader:
     }
 
     def __init__(self):
-        pass
+        # 数据库连接池会话：按连接参数复用（见 clickhouse_session / _db_session）
+        self._sessions: Dict[Tuple[Any, ...], ClickHouseSession] = {}
+        self._sessions_lock = threading.Lock()
+        # with 块内：数据库调用建立的会话保留到退出时统一关闭
+        self._keep_sessions = False
+
+    def __enter__(self) -> "DualModeLoader":
+        self._keep_sessions = True
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._keep_sessions = False
+        self.close()
 
     # ================= 模式 A: 本地文件 (保持不变) =================
     def load_from_folder(self, 
@@ -54,6 +168,11 @@ class DualModeLoader:
                          table_name_map: Optional[Dict[str, str]] = None,          
                          table_name_map_path: Optional[str] = None,               
                          auto_load_table_map_json: bool = True, 
+                         snapshot_dir: Optional[str] = None,
+                         snapshot_mmap: bool = False,
+                         parallel: bool = False,
+                         max_workers: Optional[int] = None,
+                         lazy: bool = False,
                          ) -> Dossier:
         """
         扫描指定文件夹，自动识别并加载所有支持的文件。
@@ -62,6 +181,15 @@ class DualModeLoader:
         - .csv  -> Table
         - .xlsx -> 多 Sheet -> 多 Table
         - .txt/.md/.docx/.pdf -> Text
+
+        snapshot_dir：案卷快照目录。源文件（大小/mtime）与加载参数都没变时直接读快照；
+        否则正常加载并刷新快照。
+        snapshot_mmap：表由内存映射的快照文件支撑（进程池 worker 共享一份物理内存）。
+        parallel：并行读取（CSV/XLSX/TXT 走线程池，PDF/DOCX 文本抽取走进程池）；
+        无论串行/并行，都按文件名顺序装入 Dossier，每个文件的读取耗时记入 tables_meta / texts_meta 的 load_ms。
+        max_workers：每个池的 worker 上限（None/0 = min(8, 文件数)）。
+        lazy：CSV 只探测表头和行数，首次 get_table 时才解析（快照命中时表也按需读取）；
+        需要写快照（snapshot_dir 未命中）时仍全量解析。
         """
         dossier = Dossier.create_empty(mission=mission)
         dossier.meta["source_path"] = folder_path
@@ -80,6 +208,22 @@ class DualModeLoader:
             if os.path.exists(candidate):
                 table_name_map_path = candidate
 
+        # 快照命中：跳过逐文件解析
+        sources = None
+        if snapshot_dir:
+            sources = source_fingerprint(
+                folder_path,
+                options={"file_map": file_map, "table_name_map": table_name_map, "table_name_map_path": table_name_map_path},
+                extra_files=[table_name_map_path] if table_name_map_path else None,
+            )
+            if is_fresh(snapshot_dir, sources):
+                try:
+                    cached = self.load_snapshot(snapshot_dir, mission=mission, mmap=snapshot_mmap, lazy=lazy)
+                    cached.meta["source_path"] = folder_path
+                    return cached
+                except Exception as e:
+                    print(f"   ⚠️ [Loader] 快照读取失败，回退逐文件加载 {snapshot_dir}: {e}")
+
         if table_name_map_path and os.path.exists(table_name_map_path):
             try:
                 with open(table_name_map_path, "r", encoding="utf-8") as f:
@@ -105,37 +249,73 @@ class DualModeLoader:
         if merged_map:
             print(f"   (启用表名映射 table_name_map: {merged_map})")
 
-        for filename in os.listdir(folder_path):
+        # 1) 规划：文件名排序，确定类型与目标表名
+        jobs: List[Dict[str, Any]] = []
+        for filename in sorted(os.listdir(folder_path)):
             if filename.startswith("."):
                 continue
+            kind = _file_kind(filename)
+            if kind is None:
+                continue
+            if kind == "csv" and lazy and not snapshot_dir:
+                kind = "csv_probe"
+            if kind == "docx" and Document is None:
+                print(f"  ⚠️ 缺少 docx 库，跳过: {filename}")
+                continue
+            if kind == "pdf" and PdfReader is None:
+                print(f"  ⚠️ 缺少 pypdf 库，跳过: {filename}")
+                continue
 
-            file_path = os.path.join(folder_path, filename)
-            fname_lower = filename.lower()
             base_name = os.path.splitext(filename)[0]
-
             # 先 file_map（精确文件名），否则用 base_name
             target_name = file_map.get(filename, base_name)
-
             # 再 base_name -> canonical（两步兜底）
             target_name = merged_map.get(target_name, target_name)
             target_name = merged_map.get(base_name, target_name)
+            jobs.append({
+                "filename": filename,
+                "path": os.path.join(folder_path, filename),
+                "kind": kind,
+                "base_name": base_name,
+                "target_name": target_name,
+            })
+
+        # 2) 读取（可并行）；3) 按文件名顺序装入 dossier，结果与串行一致
+        t0 = time.perf_counter()
+        results = self._read_files(jobs, parallel=parallel, max_workers=max_workers)
+        for job, (payload, err, load_ms) in zip(jobs, results):
+            self._add_loaded(dossier, job, payload, err, load_ms)
+
+        mode = "parallel" if parallel and len(jobs) > 1 else "serial"
+        print(f"✅ [Loader] 加载完成。({len(jobs)} files, {mode}, {time.perf_counter() - t0:.2f}s)")
+        if snapshot_dir:
+            try:
+                dossier.save_snapshot(snapshot_dir, sources=sources)
+                if snapshot_mmap:
+                    # 换成 mmap 版本，释放刚解析出来的私有内存副本
+                    mapped = self.load_snapshot(snapshot_dir, mission=mission, mmap=True, lazy=lazy)
+                    mapped.meta["source_path"] = folder_path
+                    return mapped
+            except Exception as e:
+                print(f"   ⚠️ [Loader] 快照写入失败（不影响本次运行）{snapshot_dir}: {e}")
+        return dossier
 
-            # --- 结构化数据 ---
-            if fname_lower.endswith(".csv"):
-                self._load_csv(dossier, file_path, target_name, aliases=[base_name])  # ✅【修改点 L10】登记 alias
-            elif fname_lower.endswith(".xlsx"):
-                self._load_excel(dossier, file_path, target_name)
-            # --- 非结构化文本 ---
-            elif fname_lower.endswith((".txt", ".md")):
-                self._load_txt(dossier, file_path, filename)
-            elif fname_lower.endswith(".docx"):
-                self._load_docx(dossier, file_path, filename)
-            elif fname_lower.endswith(".pdf"):
-                self._load_pdf(dossier, file_path, filename)
-
-        print(f"✅ [Loader] 加载完成。")
+    def load_snapshot(self, path: str, mission: Optional[str] = None, mmap: bool = False, lazy: bool = False) -> Dossier:
+        """[快照模式] 读 Dossier.save_snapshot 写出的快照目录；mission 缺省沿用快照里的；mmap=True 时表为内存映射；lazy=True 时表按需读取"""
+        dossier = load_snapshot(path, mission=mission, mmap=mmap, lazy=lazy)
+        tag = (", mmap" if mmap else "") + (", lazy" if lazy else "")
+        print(f"⚡ [Loader] 已从快照加载案卷: {path} ({len(dossier.structured_data)} tables, {len(dossier.unstructured_text)} texts{tag})")
         return dossier
     
+    # ================= 增量追加 (Incremental Ingest) =================
+    def append_from_csv(self, dossier: Dossier, table_name: str, path: str, keys: Tuple[str, ...] = ("code", "date")) -> Dict[str, int]:
+        """[增量模式] 读一份增量 CSV（如当日收盘行情）按表 schema 解析后追加到已有案卷；见 Dossier.append_rows"""
+        canonical = dossier.resolve_table_name(table_name) or table_name
+        delta, enc = read_csv_typed(path, table_name=canonical)
+        stats = dossier.append_rows(canonical, delta, keys=keys, source=path)
+        print(f"➕ [Loader] 增量追加 {canonical}: +{stats['appended']} rows (覆盖 {stats['replaced']}，共 {stats['rows']}; encoding={enc})")
+        return stats
+
     # ================= 模式 B: 数据库集成 (ClickHouse) =================
     def load_from_clickhouse(self, 
                              mission: str, 
@@ -152,6 +332,9 @@ class DualModeLoader:
                              user: Optional[str] = None, 
                              password: Optional[str] = None,
                              database: Optional[str] = None,
+
+                             # --- 流式读取：每块行数 ---
+                             block_rows: int = DEFAULT_BLOCK_ROWS,
                              
                              # --- 模版动态参数 (关键) ---
                              **kwargs) -> Dossier:
@@ -161,83 +344,252 @@ class DualModeLoader:
         用法 1：直接 SQL
         用法 2：template_name + kwargs
         用法 3：kwargs 里传 table_name -> 自动 universal 模版
+        - 模版模式下未指定 columns 时，按 sql_templates.TABLE_COLUMNS 与库表实际列做投影
+        - 结果按块流式读取并按表 schema 转类型（clickhouse_reader.read_query_typed）
         """
         dossier = Dossier.create_empty(mission=mission)
         dossier.meta["source_type"] = "clickhouse_tcp"
 
-        # --- 1. 逻辑分流：决定到底执行哪句 SQL ---
-        final_sql = ""
+        # --- 1. 逻辑分流：决定到底用哪句 SQL / 哪个模版 ---
+        builder = None
         # 情况 A: 用户直接给了 SQL -> 听用户的
         if sql:
-            final_sql = sql 
+            pass
         # 情况 B: 用户给了模版名 -> 查字典生成
         elif template_name:
             if template_name not in TEMPLATE_REGISTRY:
                 print(f"❌ [Loader] 找不到模版: {template_name}")
                 return dossier
-            try:
-                final_sql = TEMPLATE_REGISTRY[template_name](**kwargs)
-            except Exception as e:
-                print(f"❌ [Loader] 模版生成出错: {e}")
-                return dossier
+            builder = TEMPLATE_REGISTRY[template_name]
         # 情况 C: 用户啥都没给，但 kwargs 里有 'table_name' -> 自动启用万能模版
         elif "table_name" in kwargs:
             print(f"ℹ️ [Loader] 检测到 table_name，自动启用万能模版...")
-            final_sql = TEMPLATE_REGISTRY["universal"](**kwargs)  
+            builder = TEMPLATE_REGISTRY["universal"]
         else:
             print("❌ [Loader] 必须提供 sql, template_name 或 table_name 其中之一")
             return dossier
 
-        dossier.meta["sql"] = final_sql
-        print(f"🔧 [Loader] 准备执行 SQL: {final_sql[:100]}...")
+        # 连接池会话：复用已打开的；否则本次临时建立，用完关闭（quantchdb 未安装时为 None）
+        with self._db_session(host, port, user, password, database) as session:
+            final_sql = sql or ""
+            if builder is not None:
+                params = dict(kwargs)
+                # 未指定 columns 时按技能需要的列投影（不 SELECT *）
+                if session is not None and params.get("table_name") and not params.get("columns"):
+                    params["columns"] = self._projection(session, str(params["table_name"]))
+                try:
+                    final_sql = builder(**params)
+                except Exception as e:
+                    print(f"❌ [Loader] 模版生成出错: {e}")
+                    return dossier
+
+            dossier.meta["sql"] = final_sql
+            print(f"🔧 [Loader] 准备执行 SQL: {final_sql[:100]}...")
+
+            # --- 2. 流式执行 ---
+            if session is None:
+                print("❌ [Loader] 缺少 quantchdb 库，请确保已安装。")
+                return dossier
+
+            final_table_name = kwargs.get("table_name", table_name_in_dossier)
+            try:
+                t0 = time.perf_counter()
+                df, n_blocks = session.query(final_sql, table_name=final_table_name, block_rows=block_rows)
+                load_ms = (time.perf_counter() - t0) * 1000.0
+
+                # --- 3. 智能表头优化 (Smart Columns) ---
+                req_cols = kwargs.get("columns")
+                if req_cols and isinstance(req_cols, list) and len(df.columns) == len(req_cols) and req_cols != ["*"]:
+                    df.columns = req_cols
+                    print(f"   -> 已自动匹配列名: {req_cols}")
+
+                dossier.add_table(
+                    name=final_table_name,
+                    df=df,
+                    description=f"Source: DB ({len(df)} rows)",
+                    source="clickhouse",
+                    extra={"load_ms": round(load_ms, 1), "blocks": n_blocks},
+                )
+                print(f"✅ [Loader] 成功获取 {len(df)} 行数据 ({n_blocks} 块, {load_ms:.0f}ms) -> 表名: {final_table_name}")
+
+            except Exception as e:
+                print(f"⚠️ [Loader] 数据库查询失败: {e}")
 
-        # --- 2. 建立连接与执行 (标准流程) ---
-        if ClickHouseDatabase is None:
-            print("❌ [Loader] 缺少 quantchdb 库，请确保已安装。")
             return dossier
 
-        _host = host or os.getenv("CLICKHOUSE_HOST", "localhost")
-        _port = port or int(os.getenv("CLICKHOUSE_PORT", "8123"))
-        _user = user or os.getenv("CLICKHOUSE_USER", "default")
-        _password = password or os.getenv("CLICKHOUSE_PASSWORD", "")
-        _database = database or os.getenv("CLICKHOUSE_DB", "default")
+    def load_tables_from_clickhouse(self,
+                                    mission: str,
+                                    tables: Optional[Union[List[str], Dict[str, Dict[str, Any]]]] = None,
+                                    ref_date: Optional[str] = None,
+                                    lookback_days: Optional[int] = None,
+                                    max_workers: Optional[int] = None,
+                                    block_rows: int = DEFAULT_BLOCK_ROWS,
+                                    host: Optional[str] = None,
+                                    port: Optional[int] = None,
+                                    user: Optional[str] = None,
+                                    password: Optional[str] = None,
+                                    database: Optional[str] = None) -> Dossier:
+        """
+        [数据库模式·批量] 一次把多张表并发读进同一个案卷
+        - tables：表名列表，或 {案卷表名: 模版参数}（参数可含 template / table_name / columns / codes 等）；
+          缺省为 DB_BATCH_TABLES（etf_daily / etf_basic / govcn / csrc）
+        - ref_date / lookback_days 为各表共享的时间窗口参数：只作用于有时间列的表
+          （TABLE_DATE_MAP 或 TABLE_DATE_CANDIDATES 在库表里找到的列；etf_basic 这类静态表不加窗口）
+        - 共用一个连接池会话：每张表独占一条连接并发查询，表结构（投影用）按会话缓存；
+          会话未事先打开时本次调用结束即关闭（多次调用想复用连接 / 表结构缓存：with DualModeLoader() as loader）
+        - 结果按 tables 的顺序装入案卷；单表失败只跳过该表
+        """
+        dossier = Dossier.create_empty(mission=mission)
+        dossier.meta["source_type"] = "clickhouse_tcp"
 
-        try:
-            print(f"🔌 [Loader] 连接数据库 ({_host})...")
-            db = ClickHouseDatabase(
-                config={
-                    "host": _host,
-                    "port": _port,
-                    "user": _user,
-                    "password": _password,
-                    "database": _database,
-                },
-                terminal_log=False,
-                file_log=False,
-            )
-            raw_data = db.fetch(final_sql)
-            df = pd.DataFrame(raw_data)
-
-            # --- 4. 智能表头优化 (Smart Columns) ---
-            req_cols= kwargs.get('columns')
-            if req_cols and isinstance(req_cols, list) and len(df.columns) == len(req_cols):
-                df.columns = req_cols
-                print(f"   -> 已自动匹配列名: {req_cols}")
-                    
-            final_table_name = kwargs.get("table_name", table_name_in_dossier)
-            dossier.add_table(
-                name=final_table_name,
-                df=df,
-                description=f"Source: DB ({len(df)} rows)",
-                source="clickhouse",
-            )
-            print(f"✅ [Loader] 成功获取 {len(df)} 行数据 -> 表名: {final_table_name}")
+        with self._db_session(host, port, user, password, database) as session:
+            if session is None:
+                print("❌ [Loader] 缺少 quantchdb 库，请确保已安装。")
+                return dossier
 
+            if tables is None:
+                tables = list(DB_BATCH_TABLES)
+            specs: Dict[str, Dict[str, Any]] = {name: {} for name in tables} if isinstance(tables, list) else {k: dict(v or {}) for k, v in tables.items()}
+
+            def _one(name: str, spec: Dict[str, Any]) -> Tuple[pd.DataFrame, int, str, float]:
+                params = dict(spec)
+                template = str(params.pop("template", "universal"))
+                if template not in TEMPLATE_REGISTRY:
+                    raise ValueError(f"找不到模版: {template}")
+                params.setdefault("table_name", name)
+                db_table = str(params["table_name"])
+                if not params.get("columns"):
+                    params["columns"] = self._projection(session, db_table)
+                if ref_date is not None:
+                    params.setdefault("ref_date", ref_date)
+                if lookback_days is not None:
+                    params.setdefault("lookback_days", lookback_days)
+                if not params.get("date_col") and db_table not in TABLE_DATE_MAP:
+                    params["date_col"] = self._date_col(session, db_table)
+                final_sql = TEMPLATE_REGISTRY[template](**params)
+                t0 = time.perf_counter()
+                df, n_blocks = session.query(final_sql, table_name=name, block_rows=block_rows)
+                return df, n_blocks, final_sql, (time.perf_counter() - t0) * 1000.0
+
+            names = list(specs)
+            workers = max(1, min(len(names), int(max_workers or session.pool_size)))
+            print(f"🔌 [Loader] 批量读取 {len(names)} 张表 (并发 {workers})...")
+            results: Dict[str, Any] = {}
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {name: pool.submit(_one, name, specs[name]) for name in names}
+                for name, fut in futures.items():
+                    try:
+                        results[name] = fut.result()
+                    except Exception as e:
+                        print(f"⚠️ [Loader] 表 {name} 读取失败: {e}")
+
+            for name in names:
+                if name not in results:
+                    continue
+                df, n_blocks, final_sql, load_ms = results[name]
+                dossier.add_table(
+                    name=name,
+                    df=df,
+                    description=f"Source: DB ({len(df)} rows)",
+                    source="clickhouse",
+                    extra={"load_ms": round(load_ms, 1), "blocks": n_blocks, "sql": final_sql},
+                )
+                print(f"✅ [Loader] {name}: {len(df)} rows ({n_blocks} 块, {load_ms:.0f}ms)")
+            return dossier
 
+    def clickhouse_session(self,
+                           host: Optional[str] = None,
+                           port: Optional[int] = None,
+                           user: Optional[str] = None,
+                           password: Optional[str] = None,
+                           database: Optional[str] = None,
+                           pool_size: Optional[int] = None) -> Optional[ClickHouseSession]:
+        """
+        按连接参数（含 .env 默认值）打开或复用连接池会话；quantchdb 未安装时返回 None
+        - 显式打开的会话由 loader 持有，之后的数据库调用共用其连接与表结构缓存，需 loader.close()（或 with DualModeLoader()）释放
+        """
+        if ClickHouseDatabase is None:
+            return None
+        key, config = self._session_config(host, port, user, password, database)
+        with self._sessions_lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._new_session(config, pool_size)
+                self._sessions[key] = session
+        return session
+
+    @contextmanager
+    def _db_session(self,
+                    host: Optional[str] = None,
+                    port: Optional[int] = None,
+                    user: Optional[str] = None,
+                    password: Optional[str] = None,
+                    database: Optional[str] = None) -> Iterator[Optional[ClickHouseSession]]:
+        """数据库调用取会话：已打开（或在 with 块内）则复用；否则本次临时建立、用完关闭，一次性调用不留连接"""
+        if ClickHouseDatabase is None:
+            yield None
+            return
+        key, config = self._session_config(host, port, user, password, database)
+        with self._sessions_lock:
+            session = self._sessions.get(key)
+        if session is not None or self._keep_sessions:
+            yield session or self.clickhouse_session(host, port, user, password, database)
+            return
+        session = self._new_session(config)
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def _session_config(self, host: Optional[str], port: Optional[int], user: Optional[str], password: Optional[str], database: Optional[str]) -> Tuple[Tuple[Any, ...], Dict[str, Any]]:
+        config = {
+            "host": host or os.getenv("CLICKHOUSE_HOST", "localhost"),
+            "port": port or int(os.getenv("CLICKHOUSE_PORT", "8123")),
+            "user": user or os.getenv("CLICKHOUSE_USER", "default"),
+            "password": password or os.getenv("CLICKHOUSE_PASSWORD", ""),
+            "database": database or os.getenv("CLICKHOUSE_DB", "default"),
+        }
+        return tuple(config[k] for k in ("host", "port", "user", "password", "database")), config
+
+    def _new_session(self, config: Dict[str, Any], pool_size: Optional[int] = None) -> ClickHouseSession:
+        print(f"🔌 [Loader] 建立数据库连接池 ({config['host']})...")
+        return ClickHouseSession(
+            lambda: ClickHouseDatabase(config=dict(config), terminal_log=False, file_log=False),
+            pool_size=pool_size or DB_POOL_SIZE,
+        )
+
+    def close(self) -> None:
+        """关闭所有数据库连接池会话"""
+        with self._sessions_lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def _projection(self, session: ClickHouseSession, table_name: str) -> Optional[List[str]]:
+        """按 TABLE_COLUMNS 与库表实际列求投影；表未登记 / 取不到 schema 时返回 None（SELECT *）"""
+        if table_name not in TABLE_COLUMNS:
+            return None
+        try:
+            available = session.columns(table_name)
         except Exception as e:
-            print(f"⚠️ [Loader] 数据库查询失败: {e}")
-
-        return dossier
+            print(f"⚠️ [Loader] 读取表结构失败 ({table_name})，退回 SELECT *: {e}")
+            return None
+        cols = project_columns(table_name, available)
+        if cols is None:
+            print(f"⚠️ [Loader] {table_name} 的列与 TABLE_COLUMNS 对不上，退回 SELECT *")
+        return cols
+
+    def _date_col(self, session: ClickHouseSession, table_name: str) -> Optional[str]:
+        """TABLE_DATE_CANDIDATES 里第一个在库表中存在的列（保留库里的大小写）；没有则不加时间窗口"""
+        candidates = TABLE_DATE_CANDIDATES.get(table_name)
+        if not candidates:
+            return None
+        try:
+            by_lower = {c.lower(): c for c in session.columns(table_name)}
+        except Exception:
+            return None
+        return next((by_lower[c.lower()] for c in candidates if c.lower() in by_lower), None)
 
 
     # ================== 模式 C: API 生态扩展 ==================
@@ -250,80 +602,122 @@ class DualModeLoader:
     
 
     # ================= 辅助功能: 查看表结构 =================
-    def inspect_table(self, table_name: str) -> List[str]:
-        """[探路功能] 返回表的列名列表"""
-        check_sql = f"SELECT * FROM {table_name} LIMIT 1"
-        temp = self.load_from_clickhouse(mission="inspect", sql=check_sql)
-        if temp.structured_data:
-            df = list(temp.structured_data.values())[0]
-            cols = list(df.columns)
+    def inspect_table(self, table_name: str, refresh: bool = False, **conn: Any) -> List[str]:
+        """[探路功能] 返回表的列名列表（DESCRIBE TABLE；在已打开的会话上按表缓存，refresh=True 时重查）"""
+        with self._db_session(**conn) as session:
+            if session is None:
+                print("❌ [Loader] 缺少 quantchdb 库，请确保已安装。")
+                return []
+            try:
+                cols = session.columns(table_name, refresh=refresh)
+            except Exception as e:
+                print(f"⚠️ [Inspector] 读取表结构失败 ({table_name}): {e}")
+                return []
             print(f"👀 [Inspector] 表 '{table_name}' 包含: {cols}")
             return cols
-        return []
     
     # ================= 内部处理逻辑 (Private Methods) =================
-    def _load_csv(self, dossier: Dossier, path: str, table_name: str, aliases: Optional[List[str]] = None) -> None:
-        encodings_to_try = ["utf-8-sig", "utf-8", "gb18030", "latin1"]
-        last_err = None
-
-        for enc in encodings_to_try:
-            try:
-                df = pd.read_csv(path, encoding=enc)
-                df.columns = [str(c).strip() for c in df.columns]
-                dossier.add_table(
-                    name=table_name,
-                    df=df,
-                    description=f"CSV Source (encoding={enc})",
-                    source=path,
-                    aliases=aliases,
-                )
-                print(f"  -> 已加载表: {table_name} ({len(df)} rows, encoding={enc})")
-                return
-            except Exception as e:
-                last_err = e
-
-        print(f"  ⚠️ CSV读取失败 {path}: {last_err}")
-
-    def _load_excel(self, dossier: Dossier, path: str, base_name: str):
-        try:
-            dfs = pd.read_excel(path, sheet_name=None)
-            for sheet_name, df in dfs.items():
-                full_key = base_name if len(dfs) == 1 else f"{base_name}_{sheet_name}"
-                dossier.add_table(name=full_key, df=df, description=f"Excel Source")
-        except Exception as e:
-            print(f"  ⚠️ Excel读取失败 {path}: {e}")
-
-    def _load_txt(self, dossier: Dossier, path: str, filename: str):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                dossier.add_text(content=f.read(), source=filename)
-        except Exception as e:
-            print(f"  ⚠️ 文本读取失败 {filename}: {e}")
-
-    def _load_docx(self, dossier: Dossier, path: str, filename: str):
-        if Document is None:
-            print(f"  ⚠️ 缺少 docx 库，跳过: {filename}")
-            return
-        
-        try:
-            doc = Document(path)
-            full_text = "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
-            if full_text:
-                dossier.add_text(content=full_text, source=filename)
-                print(f"  [Loader] 已提取 Word: {filename}")
-        except Exception as e:
-            print(f"  ⚠️ Word读取失败 {filename}: {e}")
-
-    def _load_pdf(self, dossier: Dossier, path: str, filename: str):
-        if PdfReader is None:
-            print(f"  ⚠️ 缺少 pypdf 库，跳过: {filename}")
-            return
-
+    def _read_files(self, jobs: List[Dict[str, Any]], *, parallel: bool = False, max_workers: Optional[int] = None) -> List[Tuple[Any, Optional[str], float]]:
+        """按 jobs 顺序返回 _timed_read 结果；并行失败（如进程池起不来）时对未完成的文件串行兜底"""
+        if not parallel or len(jobs) <= 1:
+            return [_timed_read(j["kind"], j["path"], j["target_name"]) for j in jobs]
+
+        limit = int(max_workers or 0) or min(8, len(jobs))
+        proc_jobs = [i for i, j in enumerate(jobs) if j["kind"] in _PROCESS_KINDS]
+        thread_jobs = [i for i, j in enumerate(jobs) if j["kind"] not in _PROCESS_KINDS]
+        futures: Dict[int, Future] = {}
+        pools: List[Executor] = []
         try:
-            reader = PdfReader(path)
-            full_text = "\n".join([p.extract_text() for p in reader.pages if p.extract_text()])
-            if full_text:
-                dossier.add_text(content=full_text, source=filename)
-                print(f"  [Loader] 已提取 PDF: {filename}")
-        except Exception as e:
-            print(f"  ⚠️ PDF读取失败 {filename}: {e}")
+            if proc_jobs:
+                try:
+                    # 不用 fork：调用方进程里可能已有线程（LangGraph / 线程池），fork 有死锁风险
+                    methods = multiprocessing.get_all_start_methods()
+                    ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                    pool: Executor = ProcessPoolExecutor(max_workers=min(limit, len(proc_jobs), os.cpu_count() or 1), mp_context=ctx)
+                    pools.append(pool)
+                    for i in proc_jobs:
+                        futures[i] = pool.submit(_timed_read, jobs[i]["kind"], jobs[i]["path"], jobs[i]["target_name"])
+                except Exception as e:
+                    print(f"   ⚠️ [Loader] 进程池不可用，PDF/DOCX 改用线程池: {e}")
+                    thread_jobs = sorted(thread_jobs + [i for i in proc_jobs if i not in futures])
+            if thread_jobs:
+                pool = ThreadPoolExecutor(max_workers=min(limit, len(thread_jobs)), thread_name_prefix="loader")
+                pools.append(pool)
+                for i in thread_jobs:
+                    futures[i] = pool.submit(_timed_read, jobs[i]["kind"], jobs[i]["path"], jobs[i]["target_name"])
+
+            results: List[Tuple[Any, Optional[str], float]] = []
+            for i, j in enumerate(jobs):
+                try:
+                    results.append(futures[i].result())
+                except Exception as e:
+                    print(f"   ⚠️ [Loader] 并行读取失败，串行重试 {j['filename']}: {e}")
+                    results.append(_timed_read(j["kind"], j["path"], j["target_name"]))
+            return results
+        finally:
+            for pool in pools:
+                pool.shutdown(wait=True)
+
+    def _add_loaded(self, dossier: Dossier, job: Dict[str, Any], payload: Any, err: Optional[str], load_ms: float) -> None:
+        """把单个文件的读取结果装入 dossier（主线程、文件名顺序调用）"""
+        kind, path, filename = job["kind"], job["path"], job["filename"]
+        timing = {"load_ms": load_ms}
+
+        if kind == "csv":
+            if err is not None:
+                print(f"  ⚠️ CSV读取失败 {path}: {err}")
+                return
+            df, enc = payload
+            table_name = job["target_name"]
+            dossier.add_table(
+                name=table_name,
+                df=df,
+                description=f"CSV Source (encoding={enc})",
+                source=path,
+                extra=timing,
+                aliases=[job["base_name"]],  # ✅【修改点 L10】登记 alias
+            )
+            print(f"  -> 已加载表: {table_name} ({len(df)} rows, encoding={enc})")
+        elif kind == "csv_probe":
+            if err is not None:
+                print(f"  ⚠️ CSV读取失败 {path}: {err}")
+                return
+            table_name, enc = job["target_name"], payload["encoding"]
+            dossier.add_lazy_table(
+                table_name,
+                LazyTable(
+                    path=path,
+                    reader=_read_csv_table,
+                    dtype=payload["dtype"] or None,
+                    kwargs={"encoding": enc, "table_name": table_name},
+                ),
+                columns=payload["columns"],
+                rows=payload["rows"],
+                rows_estimated=True,
+                description=f"CSV Source (encoding={enc})",
+                source=path,
+                extra={"probe_ms": load_ms},
+                aliases=[job["base_name"]],
+            )
+            print(f"  -> 已登记表(惰性): {table_name} (~{payload['rows']} rows, encoding={enc})")
+        elif kind == "excel":
+            if err is not None:
+                print(f"  ⚠️ Excel读取失败 {path}: {err}")
+                return
+            base_name = job["target_name"]
+            for sheet_name, df in payload.items():
+                full_key = base_name if len(payload) == 1 else f"{base_name}_{sheet_name}"
+                dossier.add_table(name=full_key, df=df, description=f"Excel Source", extra=timing)
+        elif kind == "txt":
+            if err is not None:
+                print(f"  ⚠️ 文本读取失败 {filename}: {err}")
+                return
+            dossier.add_text(content=payload, source=filename, extra=timing)
+        else:
+            label = "Word" if kind == "docx" else "PDF"
+            if err is not None:
+                print(f"  ⚠️ {label}读取失败 {filename}: {err}")
+                return
+            if payload:
+                dossier.add_text(content=payload, source=filename, extra=timing)
+                print(f"  [Loader] 已提取 {label}: {filename}")
@@ -0,0 +1,309 @@
+"""
+【案卷快照】(Dossier Snapshot)
+
+把已加载的 Dossier 落成列式快照目录，下次启动直接读快照，跳过 CSV 解析 / 编码探测：
+
+    <snapshot_dir>/
+      CURRENT                  # 指针文件：当前版本子目录名
+      v-<时间戳>-<pid>/
+        manifest.json          # mission / meta / tables_meta / texts / texts_meta / aliases / sources 指纹
+        tables/0000.feather    # 表（Arrow IPC，列类型原样保留）；装不进 Arrow 的表退回 .pkl
+
+- sources 指纹：源目录内文件的 (文件名, 大小, mtime_ns) + 加载参数；指纹一致才复用
+- feather 依赖 pyarrow（可选依赖）；未安装时整份快照用 pickle
+- 每次写入一个新版本子目录，写完后 os.replace 原子替换 CURRENT：读方要么读到旧版本、要么读到新版本，不会读到半份
+- 旧版本不立即删除：保留最近 KEEP_VERSIONS 个，已按需（lazy）/ mmap 加载的案卷在快照被重写后仍能读到自己那一版的表文件
+- manifest 里的 meta 等字段按类型显式编码（时间 / numpy 标量 / tuple / set），读回原类型；无法编码的值直接报错，不静默转字符串
+- lazy=True 读取：只读 manifest，表登记为 LazyTable，首次取表时才读文件
+- mmap=True 读取：feather 表内存映射（不压缩 + 单 record batch），数值/时间列零拷贝转 pandas；
+  多进程共享同一份物理页（page cache），Dossier 序列化时只传快照路径（见 Dossier.__reduce_ex__）
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from .dossier import Dossier
+
+# --- 依赖库按需导入 (防止用户没装包报错) ---
+try:
+    import pyarrow
+    import pyarrow.feather
+except ImportError:
+    pyarrow = None
+
+# 快照格式版本：目录结构 / manifest 字段变化时 +1
+SNAPSHOT_FORMAT = 3
+MANIFEST_NAME = "manifest.json"
+POINTER_NAME = "CURRENT"
+# 保留的版本子目录数（含当前版本）
+KEEP_VERSIONS = 2
+# 非 JSON 原生类型的标记键：{"__snapshot_type__": 类型名, "value": ...}
+_TYPE_KEY = "__snapshot_type__"
+
+
+# ================= manifest 值编码 =================
+def _encode(obj: Any) -> Any:
+    """meta 等字段 -> JSON 可表示的结构；非原生类型带类型标记，不支持的类型抛 TypeError"""
+    if obj is None or isinstance(obj, (bool, str)):
+        return obj
+    if isinstance(obj, (int, float)) and not isinstance(obj, np.generic):
+        return obj
+    if isinstance(obj, np.generic):
+        return _encode(obj.item())
+    if isinstance(obj, pd.Timestamp):
+        return {_TYPE_KEY: "timestamp", "value": obj.isoformat()}
+    if isinstance(obj, _dt.datetime):
+        return {_TYPE_KEY: "datetime", "value": obj.isoformat()}
+    if isinstance(obj, _dt.date):
+        return {_TYPE_KEY: "date", "value": obj.isoformat()}
+    if isinstance(obj, tuple):
+        return {_TYPE_KEY: "tuple", "value": [_encode(v) for v in obj]}
+    if isinstance(obj, (set, frozenset)):
+        return {_TYPE_KEY: "set", "value": [_encode(v) for v in sorted(obj, key=repr)]}
+    if isinstance(obj, list):
+        return [_encode(v) for v in obj]
+    if isinstance(obj, dict):
+        if not all(isinstance(k, str) for k in obj):
+            raise TypeError(f"快照 manifest 只支持字符串键: {list(obj)[:5]}")
+        return {k: _encode(v) for k, v in obj.items()}
+    raise TypeError(f"快照 manifest 不支持的值类型: {type(obj).__name__}")
+
+
+def _decode(obj: Any) -> Any:
+    """_encode 的逆过程"""
+    if isinstance(obj, list):
+        return [_decode(v) for v in obj]
+    if not isinstance(obj, dict):
+        return obj
+    kind = obj.get(_TYPE_KEY)
+    if kind is None:
+        return {k: _decode(v) for k, v in obj.items()}
+    value = obj.get("value")
+    if kind == "timestamp":
+        return pd.Timestamp(value)
+    if kind == "datetime":
+        return _dt.datetime.fromisoformat(value)
+    if kind == "date":
+        return _dt.date.fromisoformat(value)
+    if kind == "tuple":
+        return tuple(_decode(v) for v in value)
+    if kind == "set":
+        return {_decode(v) for v in value}
+    raise ValueError(f"未知的快照值类型标记: {kind}")
+
+
+# ================= 源文件指纹 =================
+def source_fingerprint(folder_path: str, *, options: Optional[Dict[str, Any]] = None, extra_files: Optional[List[str]] = None) -> Dict[str, Any]:
+    """源目录指纹：非隐藏文件的 (文件名, 大小, mtime_ns) + 加载参数（file_map / 表名映射等）"""
+    files: List[List[Any]] = []
+    if os.path.isdir(folder_path):
+        for name in sorted(os.listdir(folder_path)):
+            if name.startswith("."):
+                continue
+            path = os.path.join(folder_path, name)
+            if os.path.isfile(path):
+                st = os.stat(path)
+                files.append([name, int(st.st_size), int(st.st_mtime_ns)])
+    for path in extra_files or []:
+        if path and os.path.isfile(path):
+            st = os.stat(path)
+            files.append([os.path.abspath(path), int(st.st_size), int(st.st_mtime_ns)])
+    return {
+        "folder": os.path.abspath(folder_path),
+        "files": files,
+        "options": json.loads(json.dumps(options or {}, sort_keys=True, default=str)),
+    }
+
+
+def default_snapshot_path(root: str, folder_path: str) -> str:
+    """每个源目录一个快照子目录：<root>/<目录名>_<路径哈希>"""
+    abspath = os.path.abspath(folder_path)
+    digest = hashlib.sha1(abspath.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(root, f"{os.path.basename(abspath.rstrip(os.sep)) or 'root'}_{digest}")
+
+
+def resolve_version_dir(path: str) -> Optional[str]:
+    """快照根目录 -> 当前版本子目录（按 CURRENT 指针）；传入的已是版本目录时原样返回"""
+    if os.path.isfile(os.path.join(path, MANIFEST_NAME)):
+        return os.path.abspath(path)
+    try:
+        with open(os.path.join(path, POINTER_NAME), "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return os.path.abspath(os.path.join(path, name)) if name else None
+
+
+def read_manifest(path: str) -> Optional[Dict[str, Any]]:
+    version_dir = resolve_version_dir(path)
+    return _read_manifest_at(version_dir) if version_dir else None
+
+
+def _read_manifest_at(version_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(version_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            obj = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(obj, dict) or obj.get("format") != SNAPSHOT_FORMAT:
+        return None
+    return obj
+
+
+def is_fresh(path: str, sources: Dict[str, Any]) -> bool:
+    """快照存在、格式匹配且源指纹一致"""
+    manifest = read_manifest(path)
+    return manifest is not None and manifest.get("sources") == sources
+
+
+# ================= 写快照 =================
+def _write_table(df: pd.DataFrame, base: str) -> str:
+    """优先 feather（需默认 RangeIndex + 字符串列名 + Arrow 可表示的列）；否则 pickle。返回文件名"""
+    if pyarrow is not None:
+        plain_index = isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1
+        if plain_index and all(isinstance(c, str) for c in df.columns) and df.columns.is_unique:
+            try:
+                # 不压缩 + 单 record batch：mmap 读取时每列一块连续内存，可零拷贝
+                df.to_feather(f"{base}.feather", compression="uncompressed", chunksize=max(1, len(df)))
+                return os.path.basename(base) + ".feather"
+            except Exception:
+                if os.path.exists(f"{base}.feather"):
+                    os.remove(f"{base}.feather")
+    df.to_pickle(f"{base}.pkl")
+    return os.path.basename(base) + ".pkl"
+
+
+def _prune_versions(path: str, current: str) -> None:
+    """删掉多余的旧版本子目录（保留最近 KEEP_VERSIONS 个）与旧格式的顶层文件；失败忽略"""
+    # 版本名以纳秒时间戳开头，按名字排序即按写入先后
+    versions = sorted(n for n in os.listdir(path) if n.startswith("v-") and os.path.isdir(os.path.join(path, n)))
+    stale = [n for n in versions if n != current][: max(0, len(versions) - KEEP_VERSIONS)]
+    for name in stale:
+        shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+    # 旧格式（manifest / tables 直接在根目录）
+    shutil.rmtree(os.path.join(path, "tables"), ignore_errors=True)
+    try:
+        os.remove(os.path.join(path, MANIFEST_NAME))
+    except OSError:
+        pass
+
+
+def save_snapshot(dossier: "Dossier", path: str, *, sources: Optional[Dict[str, Any]] = None) -> str:
+    """把 dossier 写成快照的一个新版本子目录，再原子切换 CURRENT 指针；返回快照根路径"""
+    t0 = time.time()
+    path = os.path.abspath(path)
+    created_root = not os.path.isdir(path)
+    os.makedirs(path, exist_ok=True)
+    version = f"v-{time.time_ns()}-{os.getpid()}"
+    tmp = os.path.join(path, f".tmp-{version}")
+    os.makedirs(os.path.join(tmp, "tables"))
+
+    try:
+        tables: List[Dict[str, Any]] = []
+        for i, (name, df) in enumerate(dossier.structured_data.items()):
+            fname = _write_table(df, os.path.join(tmp, "tables", f"{i:04d}"))
+            tables.append({"name": name, "file": fname})
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "mission": dossier.mission,
+            "meta": _encode(dossier.meta),
+            "tables": tables,
+            "tables_meta": _encode(dossier.tables_meta),
+            "table_aliases": _encode(dossier.table_aliases),
+            "texts": _encode(dossier.unstructured_text),
+            "texts_meta": _encode(dossier.texts_meta),
+            "sources": sources,
+        }
+        with open(os.path.join(tmp, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+        # 版本目录改名到位后再切指针；指针文件同样先写临时文件再 os.replace
+        os.replace(tmp, os.path.join(path, version))
+        pointer_tmp = os.path.join(path, f".{POINTER_NAME}.{version}")
+        with open(pointer_tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(pointer_tmp, os.path.join(path, POINTER_NAME))
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.rmtree(os.path.join(path, version), ignore_errors=True)
+        if created_root:
+            shutil.rmtree(path, ignore_errors=True)
+        raise
+
+    _prune_versions(path, version)
+
+    print(f"💾 [Snapshot] 已写入案卷快照: {path} ({len(tables)} tables, {time.time() - t0:.2f}s)")
+    return path
+
+
+# ================= 读快照 =================
+def _read_table(path: str, *, mmap: bool = False) -> pd.DataFrame:
+    if path.endswith(".feather"):
+        if pyarrow is None:
+            raise ImportError("读取 feather 快照需要 pyarrow")
+        if mmap:
+            # split_blocks：不合并同类型列，避免 consolidate 拷贝；含 null 的整数列等仍会拷贝
+            table = pyarrow.feather.read_table(path, memory_map=True)
+            return table.to_pandas(split_blocks=True, self_destruct=False)
+        return pd.read_feather(path)
+    return pd.read_pickle(path)
+
+
+def load_snapshot(path: str, *, mission: Optional[str] = None, mmap: bool = False, lazy: bool = False) -> "Dossier":
+    """读快照目录 -> Dossier；mission 缺省沿用快照里的；mmap=True 时表由内存映射文件支撑；lazy=True 时表按需读取"""
+    from .dossier import Dossier, LazyTable
+
+    # 只解析一次指针：之后的表路径都落在这一版目录里，快照被并发重写也不受影响
+    version_dir = resolve_version_dir(path)
+    manifest = _read_manifest_at(version_dir) if version_dir else None
+    if manifest is None:
+        raise FileNotFoundError(f"无效的案卷快照（缺少 manifest 或格式版本不符）: {path}")
+
+    dossier = Dossier.create_empty(mission=mission if mission is not None else str(manifest.get("mission", "")))
+    dossier.meta.update(_decode(manifest.get("meta") or {}))
+    dossier.register_table_aliases(_decode(manifest.get("table_aliases") or {}))
+
+    tables_meta = _decode(manifest.get("tables_meta") or {})
+    for t in manifest.get("tables") or []:
+        name = t["name"]
+        table_path = os.path.join(version_dir, "tables", t["file"])
+        if lazy:
+            dossier.structured_data[name] = LazyTable(path=table_path, reader=_read_table, kwargs={"mmap": mmap})
+        else:
+            dossier.structured_data[name] = _read_table(table_path, mmap=mmap)
+        dossier._bump_table_version(name)
+        dossier.tables_meta[name] = dict(tables_meta.get(name) or {})
+
+    dossier.unstructured_text.extend(_decode(manifest.get("texts") or []))
+    dossier.texts_meta.extend(_decode(manifest.get("texts_meta") or []))
+    if mmap:
+        # 记版本目录而非根目录：子进程映射与父进程同一份文件
+        dossier._mmap_snapshot = (version_dir, dossier.version)
+    return dossier
+
+
+def _restore_mmap_dossier(path: str, mission: str, meta: Dict[str, Any], extras: Optional[Dict[str, Any]] = None) -> "Dossier":
+    """Dossier.__reduce_ex__ 的反序列化入口：子进程按路径重新映射快照，再覆盖父进程加载后改过的文本 / 别名 / 表元信息"""
+    dossier = load_snapshot(path, mission=mission, mmap=True, lazy=True)
+    dossier.meta = meta
+    if extras:
+        dossier.unstructured_text[:] = extras.get("texts") or []
+        dossier.texts_meta[:] = extras.get("texts_meta") or []
+        dossier.register_table_aliases(extras.get("table_aliases") or {})
+        # tables_meta 是 TableStore 的 meta_sink，原地替换内容
+        dossier.tables_meta.clear()
+        dossier.tables_meta.update(extras.get("tables_meta") or {})
+    return dossier
@@ -1,40 +1,104 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+# 按表默认时间列 / 代码列（库里的原始列名）
+TABLE_DATE_MAP: Dict[str, str] = {
+    "etf_daily": "TradingDate",
+    # TODO: 可扩展
+}
+# 库里时间列名不固定的表：按候选名在库表 schema 里找（批量加载时用于共享的 ref_date / lookback 窗口）
+TABLE_DATE_CANDIDATES: Dict[str, List[str]] = {
+    "govcn": ["date", "pub_date", "time"],
+    "csrc": ["date", "pub_date", "time"],
+}
+TABLE_CODE_MAP: Dict[str, str] = {
+    "etf_daily": "code",
+    "etf_basic": "code",
+}
+
+# 技能实际会读到的列（候选名，按小写匹配库表 schema；同一语义的别名都列上，库里没有的自动跳过）
+TABLE_COLUMNS: Dict[str, List[str]] = {
+    # quantitative_sniper / market_sentry：代码、日期、收盘、成交额
+    "etf_daily": ["code", "date", "tradingdate", "data", "close", "amount"],
+    # theme_miner / forensic_detective：名称匹配 + 成立/上市日期 + 管理费
+    "etf_basic": [
+        "code", "symbol", "ts_code", "masterfundcode",
+        "cname", "csname", "name", "extname", "index_code", "index_name",
+        "setup_date", "list_date", "pub_date", "base_date", "mgt_fee",
+    ],
+    # 文本类：标题 / 正文 / 行业 + 日期
+    "govcn": ["title", "content", "context", "summary", "industry_name", "date", "pub_date", "time"],
+    "csrc": ["title", "content", "context", "summary", "date", "pub_date", "time"],
+}
+
+
+# 批量加载（DualModeLoader.load_tables_from_clickhouse）缺省读取的表
+DB_BATCH_TABLES: List[str] = ["etf_daily", "etf_basic", "govcn", "csrc"]
+
+
+def project_columns(table_name: str, available: Optional[Iterable[str]]) -> Optional[List[str]]:
+    """
+    按 TABLE_COLUMNS 从库表实际列里挑出要 SELECT 的列（保留库里的大小写与列顺序）
+    - 表未登记 / 不知道库表 schema / 一个都对不上：返回 None（调用方退回 SELECT *）
+    """
+    wanted = {c.lower() for c in TABLE_COLUMNS.get(table_name, [])}
+    if not wanted or available is None:
+        return None
+    picked = [str(c) for c in available if str(c).lower() in wanted]
+    return picked or None
+
+
+def _quote(val: Any) -> str:
+    if isinstance(val, (int, float)):
+        return str(val)
+    return "'" + str(val).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def _as_date(val: Any) -> date:
+    if isinstance(val, datetime):
+        return val.date()
+    if isinstance(val, date):
+        return val
+    return datetime.fromisoformat(str(val)).date()
 
 
 def get_universal_query(
     table_name: str,
     # 原有参数
     date_col: str | None = None,
-    limit: int | None = 10000,
+    limit: int | None = None,
     order: str = "DESC",
     filters: dict | None = None,
     columns: list[str] | None = None,
     # 调仓日 + 回溯天数
     ref_date: str | None = None,       
     lookback_days: int | None = None,  
+    # 显式日期区间 / 代码列表（分区 + 主键裁剪）
+    start_date: str | None = None,
+    end_date: str | None = None,
+    codes: list[str] | None = None,
+    code_col: str | None = None,
     **kwargs
 ) -> str:
     """
     [万能模版: universal_select]
     功能：
-    1) columns 为空 -> SELECT *
-    2) 支持简单等值 filters -> AND col = 'val'
-    3) ref_date + lookback_days 做时间窗口：
-       区间：[ref_date - lookback_days, ref_date) —— 严格小于 ref_date，防未来数据
-    4) 默认按时间倒序排序
-    5) limit=None 时不加 LIMIT
+    1) columns 为空 -> SELECT *（通过 loader 调用时会按 TABLE_COLUMNS 投影，不走 SELECT *）
+    2) filters：标量 -> AND col = 'val'；list/tuple/set -> AND col IN (...)
+    3) 时间窗口（两种写法，后者优先）：
+       - ref_date + lookback_days：[ref_date - lookback_days, ref_date) —— 严格小于 ref_date，防未来数据
+       - start_date / end_date：[start_date, end_date)，可只给一端
+       时间列直接和常量 toDate(...) 比较，分区键 / 主键按日期时可被裁剪
+    4) codes -> AND code IN (...)（代码列按 TABLE_CODE_MAP，可用 code_col 覆盖）
+    5) 默认按时间倒序排序
+    6) limit 默认不加（靠投影 + 时间窗口 + 代码列表控制数据量；需要兜底时显式传）
     """
-    TABLE_DATE_MAP: Dict[str, str] = {
-        "etf_daily": "TradingDate",
-        # TODO: 可扩展
-    }
-
     # 按表默认列名映射
     if (date_col is None or date_col == "date") and table_name in TABLE_DATE_MAP:
         date_col = TABLE_DATE_MAP[table_name]
+    code_col = code_col or TABLE_CODE_MAP.get(table_name, "code")
 
     # SELECT 部分
     if not columns or columns == ["*"]:
@@ -44,29 +108,45 @@ def get_universal_query(
 
     sql = f"SELECT {select_part} FROM {table_name} WHERE 1 = 1"
 
-    # filters（等值）
+    # filters（等值 / IN）
     if filters:
         for col, val in filters.items():
-            if isinstance(val, str):
-                sql += f" AND {col} = '{val}'"
+            if isinstance(val, (list, tuple, set)):
+                sql += f" AND {col} IN ({', '.join(_quote(v) for v in val)})" if val else " AND 0"
             else:
-                sql += f" AND {col} = {val}"
+                sql += f" AND {col} = {_quote(val)}"
 
     # 时间窗口
-    if date_col and ref_date and lookback_days is not None:
+    start_dt: Optional[date] = None
+    end_dt: Optional[date] = None
+    if ref_date and lookback_days is not None:
         try:
-            ref_dt = datetime.fromisoformat(ref_date).date()
-            start_dt = ref_dt - timedelta(days=int(lookback_days))
-            sql += f" AND {date_col} >= toDate('{start_dt.isoformat()}')"
-            sql += f" AND {date_col} < toDate('{ref_dt.isoformat()}')"
+            end_dt = _as_date(ref_date)
+            start_dt = end_dt - timedelta(days=int(lookback_days))
         except Exception:
-            pass
+            start_dt = end_dt = None
+    try:
+        if start_date:
+            start_dt = _as_date(start_date)
+        if end_date:
+            end_dt = _as_date(end_date)
+    except Exception:
+        pass
+    if date_col and start_dt is not None:
+        sql += f" AND {date_col} >= toDate('{start_dt.isoformat()}')"
+    if date_col and end_dt is not None:
+        sql += f" AND {date_col} < toDate('{end_dt.isoformat()}')"
+
+    # 代码列表
+    if codes is not None:
+        code_list = sorted({str(c) for c in codes})
+        sql += f" AND {code_col} IN ({', '.join(_quote(c) for c in code_list)})" if code_list else " AND 0"
 
     # 排序（如果有时间列，就按时间排序）
     if date_col:
         sql += f" ORDER BY {date_col} {order}"
 
-    # Limit（兜底防止查爆）
+    # Limit（需要兜底时显式传）
     if limit is not None:
         sql += f" LIMIT {limit}"
 
@@ -75,4 +155,4 @@ def get_universal_query(
 
 TEMPLATE_REGISTRY = {
     "universal": get_universal_query
-}
\ No newline at end of file
+}
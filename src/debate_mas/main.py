@@ -1,12 +1,17 @@
 from __future__ import annotations
 
 import os
+import json
 import argparse
 
 from dotenv import load_dotenv
 
-from .core.engine import run
+from .core.engine import load_dossier, run
+from .core.batch import run_batch
 from .core.config import CONFIG
+from .core.llm_backends import LLM_BACKENDS, cassette_from_transcript, configure_llm_backend
+from .core.llm_cache import LLM_CACHE_MODES, configure_llm_cache
+from .skills.result_cache import CACHE_MODES, configure_result_cache
 
 
 def _require_env() -> None:
@@ -21,7 +26,6 @@ def _require_env() -> None:
 def main() -> None:
     # 1) 固定从“项目根目录”加载 .env（不依赖当前工作目录 cwd）
     load_dotenv(dotenv_path=os.path.join(CONFIG.BASE_DIR, ".env"))
-    _require_env()
 
     # 2) 定义默认路径
     default_folder = os.path.join(CONFIG.BASE_DIR, "data_test")
@@ -36,24 +40,104 @@ def main() -> None:
     parser.add_argument("--folder", type=str, default=default_folder, help="本地案卷数据文件夹路径")
     parser.add_argument("--date", type=str, default=default_date, help="决策基准日期 (YYYY-MM-DD)")
     parser.add_argument("--output_dir", type=str, default=default_output, help="结果输出目录")
+    parser.add_argument("--skill_cache", type=str, choices=CACHE_MODES, default=CONFIG.SKILL_CACHE_MODE,
+                        help="技能结果磁盘缓存: off=关闭 / on=读写 / bypass=不读旧结果但刷新写入")
+    parser.add_argument("--skill_cache_dir", type=str, default=CONFIG.SKILL_CACHE_DIR, help="技能结果缓存目录")
+    parser.add_argument("--skill_cache_max_mb", type=float, default=CONFIG.SKILL_CACHE_MAX_MB, help="缓存容量上限 (MB)，超出按 LRU 淘汰")
+    parser.add_argument("--skill_cache_clear", action="store_true", help="运行前清空技能结果缓存")
+    parser.add_argument("--llm_backend", type=str, choices=LLM_BACKENDS, default=CONFIG.LLM_BACKEND,
+                        help="LLM 后端: live=真实调用 / record=调用并录制到 cassette / replay=离线回放 cassette")
+    parser.add_argument("--cassette", type=str, default=CONFIG.LLM_CASSETTE_PATH, help="录制/回放用的 cassette (JSONL)")
+    parser.add_argument("--cassette_strict", action="store_true", help="回放时只按 prompt 哈希命中，不按角色顺序兜底")
+    parser.add_argument("--cassette_from_transcript", type=str, nargs="+", default=None,
+                        help="先把 output_reports/*_transcript.json 追加写入 cassette（配合 --llm_backend replay）")
+    parser.add_argument("--llm_cache", type=str, choices=LLM_CACHE_MODES, default=CONFIG.LLM_CACHE_MODE,
+                        help="LLM 响应缓存 (SQLite): off=关闭 / on=读写 / bypass=不读旧响应但刷新写入；仅 live 后端生效")
+    parser.add_argument("--llm_cache_path", type=str, default=CONFIG.LLM_CACHE_PATH, help="LLM 响应缓存 SQLite 文件")
+    parser.add_argument("--llm_cache_ttl_hours", type=float, default=CONFIG.LLM_CACHE_TTL_HOURS, help="缓存条目有效期 (小时)")
+    parser.add_argument("--llm_cache_max_mb", type=float, default=CONFIG.LLM_CACHE_MAX_MB, help="缓存容量上限 (MB)，超出按最近访问淘汰")
+    parser.add_argument("--llm_cache_allow_sampled", action="store_true", default=CONFIG.LLM_CACHE_ALLOW_SAMPLED,
+                        help="temperature > 0 的角色也走缓存（默认绕过）")
+    parser.add_argument("--llm_cache_clear", action="store_true", help="运行前清空 LLM 响应缓存")
+    parser.add_argument("--batch", type=str, default=None,
+                        help="批量任务 JSONL（每行 {mission, ref_date, job_id}，缺省字段取 --mission/--date）；案卷只加载一次")
+    parser.add_argument("--workers", type=int, default=CONFIG.BATCH_MAX_WORKERS, help="批量模式并发任务数")
+    parser.add_argument("--dossier_snapshot", action="store_true", default=CONFIG.DOSSIER_SNAPSHOT,
+                        help="读写案卷快照：源文件未变时跳过 CSV 解析（写入 .dossier_snapshots/，Feather 需 pyarrow）")
 
     # 4) 解析参数
     args = parser.parse_args()
 
+    # replay 不连网，无需密钥
+    if args.llm_backend != "replay":
+        _require_env()
+    if args.cassette_from_transcript:
+        models = {"hunter": CONFIG.HUNTER_MODEL, "auditor": CONFIG.AUDITOR_MODEL, "pm": CONFIG.PM_MODEL}
+        for path in args.cassette_from_transcript:
+            n = cassette_from_transcript(path, args.cassette, allowlist_by_role=CONFIG.ROLE_TOOL_ALLOWLIST, model_by_role=models)
+            print(f"📼 Cassette: {path} -> {n} 条响应")
+    cassette = configure_llm_backend(args.llm_backend, args.cassette, strict=args.cassette_strict)
+
+    skill_cache = configure_result_cache(args.skill_cache, args.skill_cache_dir, args.skill_cache_max_mb)
+    if args.skill_cache_clear:
+        skill_cache.clear()
+    llm_cache = configure_llm_cache(
+        args.llm_cache,
+        args.llm_cache_path,
+        ttl_hours=args.llm_cache_ttl_hours,
+        max_mb=args.llm_cache_max_mb,
+        allow_sampled=args.llm_cache_allow_sampled,
+    )
+    if args.llm_cache_clear:
+        llm_cache.clear()
+
     print(f"🚀 Starting Debate MAS...")
     print(f"📂 Data Folder: {args.folder}")
     print(f"📅 Ref Date: {args.date}")
     print(f"🎯 Mission: {args.mission}")
+    if args.skill_cache != "off":
+        print(f"🗄️ Skill Cache: {args.skill_cache} ({args.skill_cache_dir})")
+    if cassette is not None:
+        print(f"📼 LLM Backend: {args.llm_backend} ({args.cassette}, {len(cassette)} entries)")
+    if args.llm_cache != "off":
+        print(f"💾 LLM Cache: {args.llm_cache} ({args.llm_cache_path}, allow_sampled={args.llm_cache_allow_sampled})")
 
-    # 5) 运行引擎
-    artifacts = run(
-        mission=args.mission,
-        ref_date=args.date,
-        folder_path=args.folder,
-        output_dir=args.output_dir,
-        seed_user_message="严格使用案卷证据与工具输出；输出遵守 system prompt 的格式要求。",
-    )
+    seed = "严格使用案卷证据与工具输出；输出遵守 system prompt 的格式要求。"
+
+    # 开启案卷快照时先在这里加载，再交给 run / run_batch 复用
+    dossier = None
+    if args.dossier_snapshot:
+        print(f"💾 Dossier Snapshot: on ({CONFIG.DOSSIER_SNAPSHOT_DIR})")
+        dossier = load_dossier("batch" if args.batch else args.mission, args.folder, snapshot=True)
+
+    # 5) 运行引擎（批量模式：案卷只加载一次，任务并发）
+    if args.batch:
+        with open(args.batch, "r", encoding="utf-8") as f:
+            jobs = [json.loads(line) for line in f if line.strip()]
+        for job in jobs:
+            job.setdefault("mission", args.mission)
+            job.setdefault("ref_date", args.date)
+            job.setdefault("seed_user_message", seed)
+        rows = run_batch(jobs, folder_path=args.folder, output_dir=args.output_dir, workers=args.workers, dossier=dossier)
+        print(f"✅ 批量完成：{sum(1 for r in rows if r['ok'])}/{len(rows)}，汇总见 {os.path.join(args.output_dir, 'batch_summary.csv')}")
+    else:
+        artifacts = run(
+            mission=args.mission,
+            ref_date=args.date,
+            folder_path=args.folder,
+            output_dir=args.output_dir,
+            seed_user_message=seed,
+            dossier=dossier,
+        )
+
+        print("✅ 产物已生成：")
+        for k, v in (artifacts or {}).items():
+            print(f"- {k}: {v}")
 
-    print("✅ 产物已生成：")
-    for k, v in (artifacts or {}).items():
-        print(f"- {k}: {v}")
+    if args.skill_cache != "off":
+        st = skill_cache.stats
+        print(f"🗄️ Skill Cache: hits={st['hits']} misses={st['misses']} writes={st['writes']} evictions={st['evictions']}")
+    if cassette is not None:
+        print(f"📼 LLM Backend: {args.llm_backend} stats={cassette.stats}")
+    if args.llm_cache != "off":
+        print(f"💾 LLM Cache: stats={llm_cache.stats}")
@@ -0,0 +1,113 @@
+# protocol/llm_view.py
+"""
+[通用协议] 工具输出的 LLM 视图（只给模型看；完整对象仍进 tool_cache 供 postprocess 使用）
+
+完整 SkillResult 里每个 item 都带一份 extra（composite 有十几个字段 + 重复的 strategy/window 等元信息），
+直接 json.dumps 给模型很浪费 token。LLM 视图按列式表格编码：
+- columns + rows：item 顶层字段与 extra 字段展平为列（与顶层重名的 extra 字段加 "extra." 前缀）
+- const：所有行取值相同的列提到表外只写一次；与 meta 重复或全为 null 的直接省略
+- 数值按有效数字取整（默认 4 位）；meta 中的 null 省略
+
+只处理 VIEW_TYPES 中的列表类型；失败结果 / 其它类型原样返回。
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional
+
+VIEW_TYPES = ("EtfCandidateList", "EtfRiskReportList", "EtfDecisionList")
+
+_MISSING = object()
+
+
+def round_sig(x: Any, digits: int = 4) -> Any:
+    """浮点数按有效数字取整；容器递归处理；其它类型原样返回"""
+    if isinstance(x, bool) or x is None:
+        return x
+    if isinstance(x, float):
+        if x != x or x in (float("inf"), float("-inf")):
+            return None
+        r = float(f"{x:.{digits}g}")
+        return int(r) if r.is_integer() and abs(r) < 1e15 else r
+    if isinstance(x, dict):
+        return {k: round_sig(v, digits) for k, v in x.items()}
+    if isinstance(x, (list, tuple)):
+        return [round_sig(v, digits) for v in x]
+    return x
+
+
+def _same(a: Any, b: Any) -> bool:
+    return json.dumps(a, sort_keys=True, default=str) == json.dumps(b, sort_keys=True, default=str)
+
+
+def _flatten_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    row = {k: v for k, v in item.items() if k != "extra"}
+    extra = item.get("extra")
+    if isinstance(extra, dict):
+        for k, v in extra.items():
+            row[f"extra.{k}" if k in row else k] = v
+    return row
+
+
+def table_view(items: List[Dict[str, Any]], *, meta: Optional[Dict[str, Any]] = None, digits: int = 4) -> Dict[str, Any]:
+    """items -> {"const": {...}, "columns": [...], "rows": [[...], ...]}"""
+    flat = [_flatten_item(x) for x in items if isinstance(x, dict)]
+    columns: List[str] = []
+    for row in flat:
+        for k in row:
+            if k not in columns:
+                columns.append(k)
+
+    const: Dict[str, Any] = {}
+    varying: List[str] = []
+    for col in columns:
+        values = [row.get(col, _MISSING) for row in flat]
+        first = values[0]
+        if col != "symbol" and len(flat) > 1 and all(v is not _MISSING and _same(v, first) for v in values):
+            if first is None or (isinstance(meta, dict) and col in meta and _same(meta[col], first)):
+                continue
+            const[col] = round_sig(first, digits)
+        elif any(v is not _MISSING and v is not None for v in values) or col == "symbol":
+            varying.append(col)
+
+    out: Dict[str, Any] = {}
+    if const:
+        out["const"] = const
+    out["columns"] = varying
+    out["rows"] = [[round_sig(row.get(c), digits) for c in varying] for row in flat]
+    return out
+
+
+def to_llm_view(payload: Dict[str, Any], *, digits: int = 4) -> Dict[str, Any]:
+    """SkillResult dict -> LLM 视图 dict；不支持的类型原样返回"""
+    data = payload.get("data") if isinstance(payload, dict) else None
+    if not isinstance(data, dict) or data.get("type") not in VIEW_TYPES or not isinstance(data.get("items"), list):
+        return payload
+    if not payload.get("success", True):
+        return payload
+
+    meta = data.get("meta") if isinstance(data.get("meta"), dict) else {}
+    view: Dict[str, Any] = {"success": True, "insight": payload.get("insight", ""), "type": data["type"]}
+    compact_meta = {k: round_sig(v, digits) for k, v in meta.items() if v is not None}
+    if compact_meta:
+        view["meta"] = compact_meta
+    for k, v in data.items():
+        if k not in ("type", "items", "meta") and v is not None:
+            view[k] = round_sig(v, digits)
+    if payload.get("visuals"):
+        view["visuals"] = payload["visuals"]
+    view.update(table_view(data["items"], meta=meta, digits=digits))
+    return view
+
+
+def dumps_llm_view(payload: Dict[str, Any], *, digits: int = 4) -> str:
+    return json.dumps(to_llm_view(payload, digits=digits), ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def view_rows(obj: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """LLM 视图 -> 行 dict 列表（const 合并回每行）；不是表格视图时返回 None"""
+    if not isinstance(obj, dict) or not isinstance(obj.get("columns"), list) or not isinstance(obj.get("rows"), list):
+        return None
+    const = obj.get("const") or {}
+    return [{**const, **dict(zip(obj["columns"], row))} for row in obj["rows"] if isinstance(row, list)]
@@ -7,20 +7,22 @@ Layer 3 - 技能基类定义 (The Skill Constitution)
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Optional, Any, Dict, List, get_type_hints
+from typing import Callable, Hashable, Optional, Any, Dict, List, get_type_hints
 
 import inspect
 import json
+import threading
 import traceback
 
 import pandas as pd
-from pandas.api.types import is_datetime64_any_dtype, is_object_dtype, is_string_dtype
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype, is_object_dtype, is_string_dtype
 
 from pydantic import BaseModel, Field, ConfigDict, create_model
 
 # 引入通用协议与案卷
 from ..protocol import SkillResult
-from ..loader.dossier import Dossier
+from ..loader.dossier import Dossier, TableAppend
+from .result_cache import get_result_cache
 
 # ==========================================
 # 1. 定义运行上下文 (The Runtime Context)
@@ -115,6 +117,77 @@ def _auto_args_schema_from_execute(execute_fn, *, model_name: str) -> type[BaseM
 
     return model
 
+# ==========================================================
+# 2.5) 共享日线预处理（etf_daily 标准化副本，按案卷缓存）
+# ==========================================================
+DAILY_TABLE = "etf_daily"
+
+
+def prepare_daily_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    日线表标准化（全量，与 ref_date 无关）：
+    - 列名小写去空格；data / tradingdate -> date
+    - code 转 str；date 解析为 datetime；close / amount 转数值（loader 按 schema 读入时已是目标类型，跳过）
+    - 丢弃 code/date 缺失行，并按 date 稳定排序（供 searchsorted 切片）
+    """
+    out = df.rename(columns=lambda x: str(x).strip().lower())
+    if "date" not in out.columns:
+        alt = next((c for c in ("data", "tradingdate") if c in out.columns), None)
+        if alt:
+            out = out.rename(columns={alt: "date"})
+
+    if "code" in out.columns and not isinstance(out["code"].dtype, pd.StringDtype):
+        out["code"] = out["code"].astype(str)
+    if "date" in out.columns and not is_datetime64_any_dtype(out["date"]):
+        out["date"] = pd.to_datetime(out["date"], errors="coerce")
+    for c in ("close", "amount"):
+        if c in out.columns and not is_numeric_dtype(out[c]):
+            out[c] = pd.to_numeric(out[c], errors="coerce")
+
+    keys = [c for c in ("code", "date") if c in out.columns]
+    if keys:
+        out = out.dropna(subset=keys)
+    if "date" in out.columns:
+        out = out.sort_values("date", kind="mergesort")
+    return out
+
+
+def append_prepared_daily(prev: pd.DataFrame, info: TableAppend) -> Optional[pd.DataFrame]:
+    """
+    append_rows 后的增量标准化日线（只标准化新增行）：
+    删掉被覆盖的旧行 -> 拼上 prepare_daily_frame(delta) -> 新日期早于原末尾时再稳定排序；
+    结果与对新表整体 prepare_daily_frame 一致（旧表为 RangeIndex 时行标签也一致）
+    """
+    if info.old_positions is None and len(info.removed):
+        return None
+    out = prev.copy(deep=False)
+    if len(info.removed):
+        pos = info.old_positions[out.index.to_numpy()]
+        out = out[pos >= 0].set_axis(pos[pos >= 0], axis=0)
+
+    add = prepare_daily_frame(info.delta)
+    if add.empty:
+        return out
+    if set(add.columns) != set(out.columns):
+        return None
+    add = add[list(out.columns)]
+    tail_ok = out.empty or "date" not in out.columns or add["date"].iloc[0] >= out["date"].iloc[-1]
+    out = pd.concat([out, add])
+    if not tail_ok:
+        out = out.sort_values("date", kind="mergesort")
+    return out
+
+
+def slice_daily_before(full: pd.DataFrame, ref_date: Optional[str]) -> pd.DataFrame:
+    """对已按 date 排序的标准化日线取 date < ref_date 的前缀（iloc 切片，不复制）"""
+    if full is None or not ref_date or "date" not in full.columns:
+        return full
+    target = pd.to_datetime(ref_date, errors="coerce")
+    if pd.isna(target):
+        return full
+    k = int(full["date"].searchsorted(target, side="left"))
+    return full.iloc[:k]
+
 # ==========================================
 # 3) 通用技能底座 (The Engine Chassis)
 # ==========================================
@@ -127,6 +200,12 @@ class BaseSkill(ABC):
     chinese_name: str = ""
     description: str = ""
     expert_mindset: str = "" # 从 SKILL.md 注入
+    # 依赖的案卷表（从 SKILL.md data_dependencies 注入，子类也可直接声明）
+    # None = 未声明（结果缓存按全部表哈希）；[] = 不读任何表
+    data_dependencies: Optional[List[str]] = None
+    # 技能实例是注册表单例，会被并发调用（同步 tool_calls / 批量任务）
+    # execute 中写实例属性的技能须置 False：同一实例的调用串行化
+    thread_safe: bool = True
 
     args_schema: Optional[type[BaseModel]] = None
     @abstractmethod
@@ -136,6 +215,27 @@ class BaseSkill(ABC):
 
     def safe_run(self, ctx: SkillContext, **kwargs) -> SkillResult:
         """ 系统调用的实际入口 (Template Method 模式)"""
+        # 跨运行结果缓存（可选，见 result_cache.py）
+        cache = get_result_cache()
+        key = cache.key_for(self, ctx, kwargs) if cache is not None else None
+        if key:
+            hit = cache.get(key)
+            if hit is not None:
+                try:
+                    return SkillResult.model_validate(hit)
+                except Exception:
+                    pass
+
+        if self.thread_safe:
+            result = self._run_execute(ctx, **kwargs)
+        else:
+            with self.__dict__.setdefault("_execute_lock", threading.Lock()):
+                result = self._run_execute(ctx, **kwargs)
+        if key and result.success:
+            cache.put(key, self._dump_result(result))
+        return result
+
+    def _run_execute(self, ctx: SkillContext, **kwargs) -> SkillResult:
         try:
             result = self.execute(ctx, **kwargs)
             if not isinstance(result, SkillResult):
@@ -207,24 +307,41 @@ class BaseSkill(ABC):
 class BaseFinanceSkill(BaseSkill):
     """
     【金融技能模板】
-    业务人员继承它即可，重点提供两类能力：
+    业务人员继承它即可，重点提供三类能力：
     1) 防未来：apply_date_filter
     2) 常用切片与截面排序：get_entity_data / rank_by_column
+    3) 共享的标准化日线：get_prepared_daily（按案卷 + ref_date 缓存，只读）
     """
     _DATE_COL_CANDIDATES = ("date", "data", "tradingdate", "pub_date", "time", "timestamp", "setup_date", "list_date")
     _ID_COL_CANDIDATES = ("symbol", "code", "id", "user_id", "fund_code", "ts_code", "masterfundcode")
 
     # --- 核心工具 1: 时间时光机 (防止未来函数) ---
-    def apply_date_filter(self, df: pd.DataFrame, ref_date: Optional[str]) -> pd.DataFrame:
+    def apply_date_filter(
+        self,
+        df: pd.DataFrame,
+        ref_date: Optional[str],
+        *,
+        dossier: Optional[Dossier] = None,
+        table_name: Optional[str] = None,
+    ) -> pd.DataFrame:
         """
         [时间切割] 根据 ref_date 切掉“未来数据”。
         逻辑：保留 date < ref_date 的数据 (假设 ref_date 是调仓执行日，只能看前一天收盘)
+        - 传入 dossier + table_name 且 df 即案卷原表时，走案卷日期索引（searchsorted 切片，免复制/免重解析）
+        - 结果 attrs["date_filter"]["fast_path"] 标记是否走了快路径；未切割时 "skipped" 记录原因（每个返回都带该标记）
         """
-        if df is None or df.empty or not ref_date:
+        if df is None:
             return df
-                
+        if df.empty or not ref_date:
+            return self._date_filter_skipped(df, None, "empty" if df.empty else "no_ref_date")
+
         date_col = next((c for c in df.columns if c.lower() in ["date", "tradingdate", "setup_date","time"]), None)
-        if not date_col: return df
+        if not date_col:
+            return self._date_filter_skipped(df, None, "no_date_col")
+
+        fast = self._date_filter_fast(df, ref_date, date_col, dossier, table_name)
+        if fast is not None:
+            return fast
 
         try:
             out = df.copy()
@@ -237,13 +354,42 @@ class BaseFinanceSkill(BaseSkill):
 
             target_dt = pd.to_datetime(ref_date, errors="coerce")
             if pd.isna(target_dt):
-                return df
+                return self._date_filter_skipped(df, date_col, "invalid_ref_date")
 
             out = out.dropna(subset=[date_col])
-            return out[out[date_col] < target_dt]
+            out = out[out[date_col] < target_dt]
+            out.attrs["date_filter"] = {"fast_path": False, "date_col": date_col, "rows": int(len(out))}
+            return out
         except Exception as e:
             print(f"⚠️ [DateFilter] 时间切割失败: col={date_col}, ref_date={ref_date}, err={e}")
-            return df
+            return self._date_filter_skipped(df, date_col, "error")
+
+    @staticmethod
+    def _date_filter_skipped(df: pd.DataFrame, date_col: Optional[str], reason: str) -> pd.DataFrame:
+        """未切割的返回：浅拷贝后打 attrs 标记（不改调用方 / 案卷里的原表）"""
+        out = df.copy(deep=False)
+        out.attrs["date_filter"] = {"fast_path": False, "date_col": date_col, "rows": int(len(out)), "skipped": reason}
+        return out
+
+    def _date_filter_fast(
+        self,
+        df: pd.DataFrame,
+        ref_date: str,
+        date_col: str,
+        dossier: Optional[Dossier],
+        table_name: Optional[str],
+    ) -> Optional[pd.DataFrame]:
+        """[快路径] 仅当 df 就是案卷中的原表时使用日期索引；否则返回 None 走常规路径"""
+        if dossier is None or not table_name:
+            return None
+        slicer = getattr(dossier, "slice_before", None)
+        if not callable(slicer) or dossier.get_table(table_name) is not df:
+            return None
+        try:
+            return slicer(table_name, ref_date, date_col=date_col)
+        except Exception as e:
+            print(f"⚠️ [DateFilter] 日期索引切片失败，回退常规路径: table={table_name}, err={e}")
+            return None
 
     # --- 核心工具 2: 数据切片 ---
     def get_entity_data(
@@ -258,23 +404,24 @@ class BaseFinanceSkill(BaseSkill):
         - 自动识别 ID 列（code/symbol/id...）
         - 自动按日期排序（如果存在日期列）
         - 自动防未来（按 ctx.ref_date 过滤）
+        - 返回原表的列名与取值（日线只借标准化副本定位行，不改列）
         """
+        candidates = tuple((id_col_names or list(self._ID_COL_CANDIDATES)))
         df = ctx.dossier.get_table(table_name)
         if df is None or df.empty:
             raise ValueError(f"案卷中找不到表格 '{table_name}' 或表为空")
 
-        df = self.apply_date_filter(df, ctx.ref_date)
-        if df.empty:
-            return df
-
-        candidates = tuple((id_col_names or list(self._ID_COL_CANDIDATES)))
-        target_col = next((col for col in df.columns if str(col).strip().lower() in candidates), None)
-        if not target_col:
-            raise ValueError(f"表格 '{table_name}' 中找不到 ID 列，无法切片")
-
-        df_sub = df[df[target_col].astype(str) == str(entity_id)].copy()
+        df_sub = self._daily_entity_rows(ctx, table_name, df, entity_id, candidates) if self._is_daily_table(ctx, table_name) else None
+        if df_sub is None:
+            df = self.apply_date_filter(df, ctx.ref_date, dossier=ctx.dossier, table_name=table_name)
+            if df.empty:
+                return df
+            target_col = next((col for col in df.columns if str(col).strip().lower() in candidates), None)
+            if not target_col:
+                raise ValueError(f"表格 '{table_name}' 中找不到 ID 列，无法切片")
+            df_sub = df[df[target_col].astype(str) == str(entity_id)].copy()
         if df_sub.empty:
-            return df_sub   
+            return df_sub
         
         # 按日期排序（如果存在日期列）
         date_col = next((c for c in df_sub.columns if str(c).strip().lower() in self._DATE_COL_CANDIDATES), None)
@@ -287,7 +434,32 @@ class BaseFinanceSkill(BaseSkill):
                 pass
 
         return df_sub
-            
+
+    def _daily_entity_rows(
+        self,
+        ctx: SkillContext,
+        table_name: str,
+        raw: pd.DataFrame,
+        entity_id: str,
+        candidates: tuple,
+    ) -> Optional[pd.DataFrame]:
+        """
+        [日线快路径] 在共享标准化副本（已防未来 + 已按日期排序）上定位实体行，再按行标签取回原表的行
+        - 标准化副本保留原表行标签；原表标签不唯一 / 对不上时返回 None，回退常规路径
+        """
+        if not raw.index.is_unique:
+            return None
+        prepared = self.get_prepared_daily(ctx, table_name)
+        if prepared is None:
+            return None
+        target_col = next((col for col in prepared.columns if str(col).strip().lower() in candidates), None)
+        if not target_col:
+            return None
+        hit = prepared.index[(prepared[target_col].astype(str) == str(entity_id)).to_numpy()]
+        pos = raw.index.get_indexer(hit)
+        if (pos < 0).any():
+            return None
+        return raw.iloc[pos].copy()
 
     # --- 核心工具 3: 截面排序 ---
     def rank_by_column(self, 
@@ -306,7 +478,7 @@ class BaseFinanceSkill(BaseSkill):
         if df is None or df.empty:
             return pd.DataFrame()
 
-        df = self.apply_date_filter(df, ctx.ref_date)
+        df = self.apply_date_filter(df, ctx.ref_date, dossier=ctx.dossier, table_name=table_name)
         if df is None or df.empty:
             return pd.DataFrame()
 
@@ -332,3 +504,47 @@ class BaseFinanceSkill(BaseSkill):
         # 3) 排序取 TopK
         df_sorted = df.sort_values(by=score_col, ascending=ascending)
         return df_sorted.head(int(top_k))
+
+    # --- 核心工具 4: 共享的标准化日线 ---
+    def cached_derived(
+        self,
+        ctx: SkillContext,
+        table_name: str,
+        key: Hashable,
+        builder: Callable[[pd.DataFrame], Any],
+        updater: Optional[Callable[[Any, TableAppend], Any]] = None,
+    ) -> Any:
+        """
+        [派生缓存] 走 Dossier.get_derived（按表版本自动失效；updater 用于 append_rows 后的增量更新）；
+        dossier 不支持缓存时直接现算（兼容测试替身）
+        """
+        getter = getattr(ctx.dossier, "get_derived", None)
+        if callable(getter):
+            return getter(table_name, key, builder, updater) if updater is not None else getter(table_name, key, builder)
+        df = ctx.dossier.get_table(table_name)
+        return None if df is None else builder(df)
+
+    def get_prepared_daily(
+        self,
+        ctx: SkillContext,
+        table_name: str = DAILY_TABLE,
+        *,
+        full: bool = False,
+    ) -> Optional[pd.DataFrame]:
+        """
+        [共享日线] 标准化 + 防未来后的日线表（见 prepare_daily_frame）
+        - 全量标准化只做一次；每个 ref_date 只是其上的 iloc 前缀切片
+        - full=True 返回未按 ref_date 切片的全量标准化表
+        - 返回值在技能间共享：只读，不得原地修改
+        """
+        prepared = self.cached_derived(ctx, table_name, ("prepared_daily", None), prepare_daily_frame, append_prepared_daily)
+        if prepared is None or full or not ctx.ref_date:
+            return prepared
+        return self.cached_derived(
+            ctx, table_name, ("prepared_daily", str(ctx.ref_date)), lambda _df: slice_daily_before(prepared, ctx.ref_date)
+        )
+
+    def _is_daily_table(self, ctx: SkillContext, table_name: str) -> bool:
+        resolve = getattr(ctx.dossier, "resolve_table_name", None)
+        canonical = resolve(table_name) if callable(resolve) else table_name
+        return canonical == DAILY_TABLE
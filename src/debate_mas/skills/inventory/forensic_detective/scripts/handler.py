@@ -1,12 +1,32 @@
 from __future__ import annotations
 
+import re
+from dataclasses import dataclass
 from datetime import timedelta
-from typing import List, Optional
+from typing import Dict, List, Optional
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
 
 from debate_mas.protocol import EtfRiskReport, SkillResult
 from debate_mas.skills.base import BaseFinanceSkill, SkillContext
+from debate_mas.skills.text_index import AhoCorasick
+
+
+@dataclass(frozen=True)
+class NewsIndex:
+    """
+    [舆情索引] csrc 全表预处理一次，按案卷缓存（行号 = 原表位置）
+    - news_dates: 舆情窗口口径的日期列 (date/time/pub_date)
+    - cut_dates: 防未来切割口径的日期列 (同 apply_date_filter)；None 表示不切
+    - texts / titles / negative: 拼接文本、标题、负面词命中
+    """
+    news_dates: np.ndarray
+    cut_dates: Optional[np.ndarray]
+    texts: np.ndarray
+    titles: Optional[np.ndarray]
+    negative: np.ndarray
 
 class SkillHandler(BaseFinanceSkill):
     """
@@ -51,10 +71,16 @@ class SkillHandler(BaseFinanceSkill):
 
         target_basic = df_basic[df_basic["code"].isin(str_symbols)].copy()
 
-        if df_news is not None and not df_news.empty:
-            df_news = self.apply_date_filter(df_news, ctx.ref_date)
-
         ref_date = pd.to_datetime(ctx.ref_date) if ctx.ref_date else pd.Timestamp.now()
+
+        # 舆情：全表索引只建一次，本次调用只算一个时间窗口掩码
+        news_index, news_hits, in_window = None, {}, None
+        if df_news is not None and not df_news.empty:
+            news_index = self._get_news_index(ctx)
+            if news_index is not None:
+                in_window = self._news_window(news_index, ctx.ref_date, ref_date, lookback)
+                if in_window.any():
+                    news_hits = self._get_news_hits(ctx)
         
         # --- 2. 逐个侦查 ---
         reports: List[EtfRiskReport] = []
@@ -76,8 +102,8 @@ class SkillHandler(BaseFinanceSkill):
             
             # === B. 舆情取证 (Audit News) ===
             news_score, news_msgs = 0, []
-            if df_news is not None and not df_news.empty:
-                news_score, news_msgs = self._audit_news(sym, row, df_news, ref_date, lookback)
+            if news_index is not None:
+                news_score, news_msgs = self._audit_news(sym, row, news_index, news_hits, in_window)
                 risk_score += news_score
                 risk_msgs.extend(news_msgs)
             
@@ -171,37 +197,16 @@ class SkillHandler(BaseFinanceSkill):
         self,
         sym: str,
         row: pd.Series,
-        df_news: pd.DataFrame,
-        ref_date: pd.Timestamp,
-        lookback: int,
+        index: NewsIndex,
+        hits: Dict[str, np.ndarray],
+        in_window: np.ndarray,
     ) -> tuple[int, List[str]]:
         """
         舆情取证：在监管数据中搜索 ETF 名称/代码，并命中负面词
+        - 倒排查找候选行，取时间窗口内（原表顺序）第一条
         Return: (score, msgs)
         """
-        score = 0
-        msgs = []
-        
-        # 1. 确定时间窗口
-        start_date = ref_date - timedelta(days=int(lookback))
-
-        date_col = next((c for c in df_news.columns if c.lower() in ["date", "time", "pub_date"]), None)
-        if not date_col:
-            return 0, []
-
-        try:
-            news_subset = df_news.copy()
-            news_subset[date_col] = pd.to_datetime(news_subset[date_col], errors="coerce")
-            news_subset = news_subset.dropna(subset=[date_col])
-            news_subset = news_subset[(news_subset[date_col] >= start_date) & (news_subset[date_col] <= ref_date)]
-        except Exception:
-            return 0, []
-            
-        if news_subset.empty: 
-            return 0, []
-        
-        # 2. 构造搜索关键词
-        # 搜索：ETF简称 (cname)
+        # 搜索：ETF代码 + ETF简称 (cname)
         # 进阶(TODO): 搜索基金公司 (management)、基金经理
         keywords: List[str] = []
         if sym:
@@ -214,27 +219,97 @@ class SkillHandler(BaseFinanceSkill):
         if not keywords:
             return 0, []
 
-        text_cols = [c for c in news_subset.columns if c.lower() in ["title", "content", "summary"]]
-        if not text_cols:
+        # hits 里只有负面行；多个关键词取并集后按行号找窗口内的第一条
+        cand = [hits[kw] for kw in keywords if kw in hits]
+        if not cand:
+            return 0, []
+        rows = cand[0] if len(cand) == 1 else np.union1d(cand[0], cand[1])
+        rows = rows[in_window[rows]]
+        if len(rows) == 0:
             return 0, []
-        
-        hit_record = ""
-        for _, news_row in news_subset.iterrows():
-            combined_text = " ".join([str(news_row.get(c, "")) for c in text_cols])
 
-            hit_kw = next((kw for kw in keywords if kw in combined_text), "")
-            if not hit_kw:
-                continue
+        first = int(rows[0])
+        hit_kw = next(kw for kw in keywords if kw in index.texts[first])
+        title = str(index.titles[first]) if index.titles is not None else "监管公告"
+        return 50, [f"监管舆情命中 ({hit_kw}涉及{title})"]
 
-            if any(neg in combined_text for neg in self.NEGATIVE_TERMS):
-                title = str(news_row.get("title", "监管公告"))
-                hit_record = f"{hit_kw}涉及{title}"
-                break
+    # =========================
+    # 舆情索引
+    # =========================
+    def _get_news_index(self, ctx: SkillContext) -> Optional[NewsIndex]:
+        return self.cached_derived(ctx, self.TABLE_NEWS, ("news_index", None), self._build_news_index)
 
-        if hit_record:
-            return 50, [f"监管舆情命中 ({hit_record})"]
+    def _get_news_hits(self, ctx: SkillContext) -> Dict[str, np.ndarray]:
+        """[倒排] ETF 代码/简称 -> 命中的负面新闻行号；随 etf_basic 版本失效"""
+        df_basic = ctx.dossier.get_table(self.TABLE_BASIC)
+        version = getattr(ctx.dossier, "table_version", None)
+        stamp = (id(df_basic), version(self.TABLE_BASIC) if callable(version) else 0)
 
-        return 0, []
+        def _build(_df: pd.DataFrame) -> Dict[str, np.ndarray]:
+            index = self._get_news_index(ctx)
+            if index is None or df_basic is None:
+                return {}
+            matcher = AhoCorasick(self._news_patterns(df_basic))
+            rows = np.flatnonzero(index.negative)
+            inverted = matcher.index_rows((index.texts[i] for i in rows), rows)
+            return {kw: np.asarray(ids, dtype=np.int64) for kw, ids in inverted.items()}
+
+        return self.cached_derived(ctx, self.TABLE_NEWS, ("news_hits", stamp), _build) or {}
+
+    def _news_patterns(self, df_basic: pd.DataFrame) -> List[str]:
+        """检索词全集：全部 ETF 代码 + 有效简称（与 _audit_news 的关键词口径一致）"""
+        patterns: List[str] = []
+        if "code" in df_basic.columns:
+            patterns.extend(df_basic["code"].astype(str).tolist())
+        if "cname" in df_basic.columns:
+            for v in df_basic["cname"].tolist():
+                cname = str(v or "")
+                if cname and cname not in ("nan", "None") and len(cname) > 2:
+                    patterns.append(cname)
+        return patterns
+
+    def _build_news_index(self, df: pd.DataFrame) -> Optional[NewsIndex]:
+        """全表一次：解析日期、拼接文本、负面词掩码；缺日期列/文本列时返回 None（不做舆情取证）"""
+        news_col = next((c for c in df.columns if c.lower() in ["date", "time", "pub_date"]), None)
+        cut_col = next((c for c in df.columns if c.lower() in ["date", "tradingdate", "setup_date", "time"]), None)
+        text_cols = [c for c in df.columns if c.lower() in ["title", "content", "summary"]]
+        if not news_col or not text_cols:
+            return None
+
+        news_dates = self._parse_news_dates(df[news_col])
+        if news_dates is None:
+            return None
+        cut_dates = news_dates if cut_col == news_col else (self._parse_news_dates(df[cut_col]) if cut_col else None)
+
+        columns = [[str(v) for v in df[c].tolist()] for c in text_cols]
+        texts = np.asarray([" ".join(parts) for parts in zip(*columns)], dtype=object)
+        neg_pattern = "|".join(re.escape(t) for t in self.NEGATIVE_TERMS)
+        negative = pd.Series(texts, dtype=object).str.contains(neg_pattern, regex=True).to_numpy(dtype=bool)
+        titles = np.asarray([str(v) for v in df["title"].tolist()], dtype=object) if "title" in df.columns else None
+
+        return NewsIndex(news_dates=news_dates, cut_dates=cut_dates, texts=texts, titles=titles, negative=negative)
+
+    def _parse_news_dates(self, col: pd.Series) -> Optional[np.ndarray]:
+        """-> datetime64[ns] 数组（NaT=无法解析）；带时区等无法与 ref_date 比较时返回 None"""
+        try:
+            parsed = col if is_datetime64_any_dtype(col) else pd.to_datetime(col, errors="coerce")
+            if getattr(parsed.dt, "tz", None) is not None:
+                return None
+            return parsed.to_numpy(dtype="datetime64[ns]")
+        except Exception as e:
+            print(f"⚠️ [Forensic] 舆情日期解析失败: col={col.name}, err={e}")
+            return None
+
+    def _news_window(self, index: NewsIndex, raw_ref: Optional[str], ref_date: pd.Timestamp, lookback: int) -> np.ndarray:
+        """本次调用的有效行：start <= 日期 <= ref_date，且通过防未来切割 (日期 < ref_date)"""
+        ref = np.datetime64(ref_date.to_datetime64(), "ns")
+        start = np.datetime64((ref_date - timedelta(days=int(lookback))).to_datetime64(), "ns")
+        mask = (index.news_dates >= start) & (index.news_dates <= ref)
+
+        cut_ref = pd.to_datetime(raw_ref, errors="coerce") if raw_ref else pd.NaT
+        if index.cut_dates is not None and not pd.isna(cut_ref):
+            mask &= index.cut_dates < np.datetime64(cut_ref.to_datetime64(), "ns")
+        return mask
 
     # =========================
     # 模板/扩展接口
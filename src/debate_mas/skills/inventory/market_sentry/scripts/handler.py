@@ -16,6 +16,8 @@ class SkillHandler(BaseFinanceSkill):
     # 常量集中
     SKILL_NAME = "market_sentry"  
     TABLE_DAILY = "etf_daily"
+    # 向量化审计：一次分组聚合算出全部标的指标；False 时回退逐只审计（口径一致）
+    VECTORIZED_AUDIT = True
 
     def execute(self, 
                 ctx: SkillContext, 
@@ -33,44 +35,34 @@ class SkillHandler(BaseFinanceSkill):
         if df is None or df.empty:
             return SkillResult.fail("案卷中缺失 'etf_daily' 行情表，无法审计。")
 
-        df = self.apply_date_filter(df, ctx.ref_date)
-        if df.empty:
+        # 共享的标准化副本（已防未来 / 列名小写 / 类型转换 / 按日期排序，只读）
+        df = self.get_prepared_daily(ctx, self.TABLE_DAILY)
+        if df is None or df.empty:
             return SkillResult.fail(f"截止 {ctx.ref_date} 无可用行情数据。")
 
-        df = df.copy()
-        if "code" in df.columns:
-            df["code"] = df["code"].astype(str)
-
-        if "amount" in df.columns:
-            df["amount"] = pd.to_numeric(df["amount"], errors="coerce")
-        if "close" in df.columns:
-            df["close"] = pd.to_numeric(df["close"], errors="coerce")
-
-        df_subset = df[df["code"].isin(str_symbols)].copy()
-
-        date_col = self._infer_date_col(df_subset)
+        date_col = self._infer_date_col(df)
         if not date_col:
             return SkillResult.fail("行情表缺失 date/data/tradingdate 列，无法进行时间序审计。")
 
-        df_subset[date_col] = pd.to_datetime(df_subset[date_col], errors="coerce")
-        df_subset = df_subset.dropna(subset=[date_col]).sort_values(date_col)
+        df_subset = df[df["code"].isin(str_symbols)]
 
-        # --- 2. 逐个审计 ---
+        # --- 2. 审计指标 ---
         reports: List[EtfRiskReport] = []
         window = int(window)
-        
-        for sym in str_symbols:
-            single_df = df_subset[df_subset['code'] == sym]
-            
+
+        if self.VECTORIZED_AUDIT and window > 0:
+            per_symbol = self._audit_vectorized(df_subset, str_symbols, window, min_amount, vol_threshold)
+        else:
+            per_symbol = self._audit_per_symbol(df_subset, str_symbols, window, min_amount, vol_threshold)
+
+        for sym, (n_rows, single_df, liq, vol) in zip(str_symbols, per_symbol):
             # 如果数据太少 
-            if len(single_df) < max(5, window // 2):
-                reports.append(self._create_report(sym, risk_score=100.0, reason=f"数据严重不足 (仅{len(single_df)}天)"))
+            if n_rows < max(5, window // 2):
+                reports.append(self._create_report(sym, risk_score=100.0, reason=f"数据严重不足 (仅{n_rows}天)"))
                 continue
-                
-            # A. 流动性检查
-            liq_pass, liq_val, liq_msg = self._check_liquidity(single_df, window, min_amount)
-            # B. 波动率检查
-            vol_pass, vol_val, vol_msg = self._check_volatility(single_df, window, vol_threshold)
+
+            liq_pass, liq_val, liq_msg = liq
+            vol_pass, vol_val, vol_msg = vol
             # C. 用户自定义检查 (扩展接口)
             custom_pass, custom_msg = self._user_defined_check(single_df)
             
@@ -116,6 +108,91 @@ class SkillHandler(BaseFinanceSkill):
         }
         return SkillResult.ok(data=data, insight=insight)
 
+    # =========================
+    # 审计路径
+    # =========================
+    def _audit_per_symbol(self, df_subset, symbols, window, min_amount, vol_threshold):
+        """[逐只] 每只标的单独切片后检查 -> [(行数, 单只切片, 流动性结果, 波动率结果)]"""
+        out = []
+        for sym in symbols:
+            single_df = df_subset[df_subset["code"] == sym]
+            if len(single_df) < max(5, window // 2):
+                out.append((len(single_df), single_df, None, None))
+                continue
+            out.append((
+                len(single_df),
+                single_df,
+                self._check_liquidity(single_df, window, min_amount),
+                self._check_volatility(single_df, window, vol_threshold),
+            ))
+        return out
+
+    def _audit_vectorized(self, df_subset, symbols, window, min_amount, vol_threshold):
+        """[向量化] 一次 groupby 算出全部标的的均额/波动/下跌日占比/下行波动/最大单日跌幅，结果与逐只路径一致"""
+        stats = self._audit_stats(df_subset, window)
+        positions = df_subset.groupby("code", sort=False).indices if not df_subset.empty else {}
+
+        out = []
+        for sym in symbols:
+            idx = positions.get(sym)
+            single_df = df_subset.iloc[idx] if idx is not None else df_subset.iloc[0:0]
+            n_rows = len(single_df)
+            if n_rows < max(5, window // 2):
+                out.append((n_rows, single_df, None, None))
+                continue
+
+            st = stats.loc[sym]
+            if "amount" not in df_subset.columns:
+                liq = (False, 0.0, "缺失 amount 列")
+            else:
+                liq = self._judge_liquidity(float(st["avg_amount"]), min_amount)
+
+            if "close" not in df_subset.columns:
+                vol = (False, float("nan"), "缺失 close 列")
+            else:
+                down_ratio = float(st["neg_n"]) / max(1, int(st["tail_n"]))
+                vol = self._judge_volatility(
+                    float(st["ret_std"]), down_ratio, float(st["downside_vol"]), float(st["max_drop"]), vol_threshold
+                )
+            out.append((n_rows, single_df, liq, vol))
+        return out
+
+    def _audit_stats(self, df_subset: pd.DataFrame, window: int) -> pd.DataFrame:
+        """
+        [分组聚合] 每只标的最近 window 行的审计指标（df_subset 已按日期排序）：
+        avg_amount / ret_std / tail_n / neg_n / downside_vol / max_drop
+        """
+        if df_subset.empty:
+            return pd.DataFrame(columns=["avg_amount", "ret_std", "tail_n", "neg_n", "downside_vol", "max_drop"])
+
+        codes = df_subset["code"]
+        in_tail = df_subset.groupby("code", sort=False).cumcount(ascending=False) < int(window)
+        tail_codes = codes[in_tail]
+
+        stats = pd.DataFrame(index=pd.Index(codes.unique(), name="code"))
+        stats["tail_n"] = in_tail.groupby(codes, sort=False).sum()
+
+        if "amount" in df_subset.columns:
+            stats["avg_amount"] = df_subset.loc[in_tail, "amount"].groupby(tail_codes, sort=False).mean()
+        else:
+            stats["avg_amount"] = np.nan
+
+        if "close" in df_subset.columns:
+            rets = df_subset["close"].groupby(codes, sort=False).pct_change()[in_tail]
+            neg = rets.where(rets < 0)
+            g_rets = rets.groupby(tail_codes, sort=False)
+            g_neg = neg.groupby(tail_codes, sort=False)
+            stats["ret_std"] = g_rets.std()
+            stats["neg_n"] = g_neg.count()
+            stats["downside_vol"] = g_neg.std()
+            stats["max_drop"] = g_neg.min().fillna(0.0)
+        else:
+            stats["ret_std"] = np.nan
+            stats["neg_n"] = 0
+            stats["downside_vol"] = np.nan
+            stats["max_drop"] = 0.0
+        return stats
+
     # =========================
     # 审计逻辑细节
     # =========================
@@ -125,8 +202,10 @@ class SkillHandler(BaseFinanceSkill):
             return False, 0.0, "缺失 amount 列"
 
         recent = df["amount"].tail(int(window))
-        avg_amount = float(recent.mean())
-            
+        return self._judge_liquidity(float(recent.mean()), threshold)
+
+    def _judge_liquidity(self, avg_amount, threshold):
+        """流动性判定规则（两条审计路径共用）"""
         if pd.isna(avg_amount):
             return False, 0.0, "流动性数据缺失 (NaN)"
         if avg_amount < float(threshold):
@@ -145,23 +224,28 @@ class SkillHandler(BaseFinanceSkill):
             return False, float("nan"), "缺失 close 列"
 
         pct_change = df["close"].pct_change().tail(int(window))
-        std_dev = float(pct_change.std())
+        negative_rets = pct_change[pct_change < 0]
+        return self._judge_volatility(
+            float(pct_change.std()),
+            len(negative_rets) / max(1, len(pct_change)),
+            float(negative_rets.std()),
+            float(negative_rets.min()) if not negative_rets.empty else 0.0,
+            threshold,
+        )
 
+    def _judge_volatility(self, std_dev, down_ratio, downside_vol, max_drop, threshold):
+        """波动率判定规则（两条审计路径共用）"""
         if pd.isna(std_dev):
             return False, float("nan"), "波动率无法计算 (数据不足)"
 
         if std_dev <= float(threshold):
             return True, std_dev, ""
 
-        negative_rets = pct_change[pct_change < 0]
-        down_ratio = len(negative_rets) / max(1, len(pct_change))
         if down_ratio < 0.15:
             return True, std_dev, f"波动虽高({std_dev:.1%})但下跌日少({down_ratio:.0%}<15%)"
 
-        downside_vol = float(negative_rets.std())
         if pd.isna(downside_vol) or downside_vol > float(threshold):
             if pd.isna(downside_vol):
-                max_drop = float(negative_rets.min()) if not negative_rets.empty else 0.0
                 if max_drop < -float(threshold) * 2:
                     return False, std_dev, f"单日暴跌 ({max_drop:.1%})"
                 return True, std_dev, "波动主要来自上涨"
@@ -7,6 +7,8 @@ from typing import Any, Dict, List, Literal, Optional
 import numpy as np
 import pandas as pd
 
+from .panel import build_price_panel, compute_panel_factors
+
 # =========================
 # 基础工具
 # =========================
@@ -178,6 +180,17 @@ def apply_threshold_psr(df_score: pd.DataFrame, *, top_k: int, psr_confidence: f
     }
     return filtered
 
+def panel_factors(df: pd.DataFrame, params: Dict[str, Any], valid_codes) -> pd.DataFrame:
+    """[Panel] 复用 params["panel"]（若有），按流动性过滤后的代码子集一次性算出原始因子"""
+    panel = params.get("panel")
+    if panel is None:
+        panel = build_price_panel(df)
+    return compute_panel_factors(
+        panel.select(valid_codes),
+        int(params["window"]),
+        float(params.get("psr_ref_sharpe", 0.0)),
+    )
+
 # =========================
 # 核心策略实现：返回 df_score
 # df_score 必须至少包含：symbol, score, reason, extra
@@ -194,26 +207,24 @@ def scan_momentum(df: pd.DataFrame, params: Dict[str, Any]) -> pd.DataFrame:
     quantile_q = params.get("quantile_q")
 
     # --- Phase 1: 流动性过滤 (Liquidity Filter) ---
-    valid_codes = filter_liquidity(df, min_amount, liquidity_filter, amount_scale, window, illiq_quantile)
-    target_df = df[df["code"].isin(valid_codes)].copy()
+    valid_codes = filter_liquidity(
+        df,
+        min_amount=min_amount,
+        liquidity_filter=liquidity_filter,
+        amount_scale=amount_scale,
+        window=window,
+        illiq_quantile=illiq_quantile,
+    )
 
     # --- Phase 2: 核心指标计算 (Core Calculation) ---
-    rows: List[Dict[str, Any]] = []
-    for code, g in target_df.sort_values("date").groupby("code"):
-        if len(g) < window + 1:
-            continue
-        curr = float(g.iloc[-1]["close"])
-        prev = float(g.iloc[-(window + 1)]["close"])
-        if prev <= 0:
-            continue
-        mom_raw = (curr - prev) / prev
-        rows.append({"symbol": str(code), "mom_raw": float(mom_raw)})
+    f = panel_factors(df, params, valid_codes)
+    rows = f.loc[np.isfinite(f["mom_raw"]), ["symbol", "mom_raw"]]
 
     # --- Phase 3: 结果处理 (Result Processing) ---
-    if not rows:
+    if rows.empty:
         return pd.DataFrame()
 
-    df_score = pd.DataFrame(rows)
+    df_score = rows.reset_index(drop=True)
     df_score["mom_pct"] = pct_rank_0_100(df_score["mom_raw"], neutral=50.0)
     df_score["score"] = df_score["mom_pct"]
     df_score["reason"] = df_score.apply(
@@ -225,7 +236,7 @@ def scan_momentum(df: pd.DataFrame, params: Dict[str, Any]) -> pd.DataFrame:
         axis=1,
     )
 
-    df_score = apply_threshold_quantile(df_score, top_k, quantile_q, enabled=(threshold_mode == "quantile"))
+    df_score = apply_threshold_quantile(df_score, top_k=top_k, quantile_q=quantile_q, enabled=(threshold_mode == "quantile"))
     return df_score
 
 def select_by_sharpe(df: pd.DataFrame, params: Dict[str, Any]) -> pd.DataFrame:
@@ -241,56 +252,30 @@ def select_by_sharpe(df: pd.DataFrame, params: Dict[str, Any]) -> pd.DataFrame:
     psr_ref_sharpe = float(params["psr_ref_sharpe"])
 
     # --- Phase 1: 流动性过滤 ---
-    valid_codes = filter_liquidity(df, min_amount, liquidity_filter, amount_scale, window, illiq_quantile)
-    target_df = df[df["code"].isin(valid_codes)].copy()
+    valid_codes = filter_liquidity(
+        df,
+        min_amount=min_amount,
+        liquidity_filter=liquidity_filter,
+        amount_scale=amount_scale,
+        window=window,
+        illiq_quantile=illiq_quantile,
+    )
 
     # --- Phase 2: 核心指标计算 ---
-    rows: List[Dict[str, Any]] = []
-    for code, g in target_df.sort_values("date").groupby("code"):
-        if len(g) < window + 1:
-            continue
-
-        recent_data = g.iloc[-(window + 1) :].copy()
-        recent_data["ret"] = recent_data["close"].pct_change()
-        rets = recent_data["ret"].dropna()
-
-        if len(rets) < max(5, window // 3):
-            continue
-
-        mu = float(rets.mean())
-        sig = float(rets.std())
-        if sig <= 1e-6 or np.isnan(sig):
-            continue
-
-        sharpe = (mu / sig) * np.sqrt(252)
-
-        skew = float(rets.skew()) if len(rets) > 2 else 0.0
-        ex_kurt = float(rets.kurt()) if len(rets) > 2 else 0.0
-        n = int(len(rets))
-
-        psr = probabilistic_sharpe_ratio(sharpe, float(psr_ref_sharpe), n, skew, ex_kurt)
-        sharpe_adj = float(sharpe) * float(psr)
-
-        rows.append(
-            {
-                "symbol": str(code),
-                "sharpe": float(sharpe),
-                "psr": float(psr),
-                "n": n,
-                "sharpe_adj": float(sharpe_adj),
-            }
-        )
+    f = panel_factors(df, params, valid_codes)
+    rows = f.loc[np.isfinite(f["sharpe_raw"]), ["symbol", "sharpe_raw", "psr", "n_rets", "sharpe_adj"]]
+    rows = rows.rename(columns={"sharpe_raw": "sharpe", "n_rets": "n"})
 
     # --- Phase 3: 结果处理 (包含 PSR 专用逻辑) ---
-    if not rows:
+    if rows.empty:
         return pd.DataFrame()
 
-    df_score = pd.DataFrame(rows)
+    df_score = rows.reset_index(drop=True)
     df_score["sharpe_pct"] = pct_rank_0_100(df_score["sharpe_adj"], neutral=50.0)
     df_score["score"] = df_score["sharpe_pct"]
 
     if threshold_mode == "psr":
-        df_score = apply_threshold_psr(df_score, top_k, psr_confidence)
+        df_score = apply_threshold_psr(df_score, top_k=top_k, psr_confidence=psr_confidence)
 
     df_score["reason"] = df_score.apply(
         lambda r: f"夏普 {r['sharpe']:.2f} | PSR {r['psr']:.2f} | pct {r['sharpe_pct']:.1f} | win={window}",
@@ -322,27 +307,24 @@ def scan_reversal(df: pd.DataFrame, params: Dict[str, Any]) -> pd.DataFrame:
     adj_min_amount = (min_amount / 2.0) if liquidity_filter == "amount_latest" else min_amount
     
     # --- Phase 1: 流动性过滤 ---
-    valid_codes = filter_liquidity(df, adj_min_amount, liquidity_filter, amount_scale, window, illiq_quantile)
-    target_df = df[df["code"].isin(valid_codes)].copy()
+    valid_codes = filter_liquidity(
+        df,
+        min_amount=adj_min_amount,
+        liquidity_filter=liquidity_filter,
+        amount_scale=amount_scale,
+        window=window,
+        illiq_quantile=illiq_quantile,
+    )
 
     # --- Phase 2: 核心指标计算 ---
-    rows: List[Dict[str, Any]] = []
-    for code, g in target_df.sort_values("date").groupby("code"):
-        if len(g) < window:
-            continue
-        curr = float(g.iloc[-1]["close"])
-        ma = float(g["close"].tail(window).mean())
-        if not np.isfinite(ma) or ma == 0:
-            continue
-        bias = (curr - ma) / ma
-        rev_raw = -bias
-        rows.append({"symbol": str(code), "bias": float(bias), "rev_raw": float(rev_raw)})
+    f = panel_factors(df, params, valid_codes)
+    rows = f.loc[np.isfinite(f["rev_raw"]), ["symbol", "bias", "rev_raw"]]
 
     # --- Phase 3: 结果处理 ---    
-    if not rows:
+    if rows.empty:
         return pd.DataFrame()
 
-    df_all = pd.DataFrame(rows)
+    df_all = rows.reset_index(drop=True)
     df_all["rev_pct"] = pct_rank_0_100(df_all["rev_raw"], neutral=50.0)
 
     df_score = df_all[df_all["rev_raw"] > 0].copy()
@@ -359,7 +341,7 @@ def scan_reversal(df: pd.DataFrame, params: Dict[str, Any]) -> pd.DataFrame:
         axis=1,
     )
 
-    df_score = apply_threshold_quantile(df_score, top_k, quantile_q, enabled=(threshold_mode == "quantile"))
+    df_score = apply_threshold_quantile(df_score, top_k=top_k, quantile_q=quantile_q, enabled=(threshold_mode == "quantile"))
     return df_score
 
 def scan_composite(df: pd.DataFrame, params: Dict[str, Any]) -> pd.DataFrame:
@@ -383,63 +365,22 @@ def scan_composite(df: pd.DataFrame, params: Dict[str, Any]) -> pd.DataFrame:
     if composite_weights is not None and not isinstance(composite_weights, dict):
         composite_weights = None
 
-    valid_codes = filter_liquidity(df, min_amount, liquidity_filter, amount_scale, window, illiq_quantile)
-    target_df = df[df["code"].isin(valid_codes)].copy()
+    valid_codes = filter_liquidity(
+        df,
+        min_amount=min_amount,
+        liquidity_filter=liquidity_filter,
+        amount_scale=amount_scale,
+        window=window,
+        illiq_quantile=illiq_quantile,
+    )
 
     w = normalize_weights(composite_weights)
 
-    rows: List[Dict[str, Any]] = []
-    for code, g in target_df.sort_values("date").groupby("code"):
-        mom_raw = np.nan
-        if len(g) >= window + 1:
-            curr = float(g.iloc[-1]["close"])
-            prev = float(g.iloc[-(window + 1)]["close"])
-            if prev > 0:
-                mom_raw = (curr - prev) / prev
-
-        rev_raw = np.nan
-        bias = np.nan
-        if len(g) >= window:
-            curr = float(g.iloc[-1]["close"])
-            ma = float(g["close"].tail(window).mean())
-            if np.isfinite(ma) and ma != 0:
-                bias = (curr - ma) / ma
-                rev_raw = -bias
-
-        sharpe = np.nan
-        psr = np.nan
-        sharpe_adj = np.nan
-        if len(g) >= window + 1:
-            recent = g.iloc[-(window + 1) :].copy()
-            recent["ret"] = recent["close"].pct_change()
-            rets = recent["ret"].dropna()
-            if len(rets) >= max(5, window // 3):
-                mu = float(rets.mean())
-                sig = float(rets.std())
-                if sig > 1e-6 and not np.isnan(sig):
-                    sharpe = (mu / sig) * np.sqrt(252)
-                    skew = float(rets.skew()) if len(rets) > 2 else 0.0
-                    ex_kurt = float(rets.kurt()) if len(rets) > 2 else 0.0
-                    n = int(len(rets))
-                    psr = probabilistic_sharpe_ratio(sharpe, float(psr_ref_sharpe), n, skew, ex_kurt)
-                    sharpe_adj = float(sharpe) * float(psr)
-
-        rows.append(
-            {
-                "symbol": str(code),
-                "mom_raw": mom_raw,
-                "rev_raw": rev_raw,
-                "bias": bias,
-                "sharpe_raw": sharpe,
-                "psr": psr,
-                "sharpe_adj": sharpe_adj,
-            }
-        )
-
-    if not rows:
+    f = panel_factors(df, params, valid_codes)
+    if f.empty:
         return pd.DataFrame()
 
-    d = pd.DataFrame(rows)
+    d = f[["symbol", "mom_raw", "rev_raw", "bias", "sharpe_raw", "psr", "sharpe_adj"]].reset_index(drop=True)
 
     d["mom_pct"] = pct_rank_0_100(d["mom_raw"], neutral=50.0)
     d["rev_pct"] = pct_rank_0_100(d["rev_raw"], neutral=50.0)
@@ -476,7 +417,7 @@ def scan_composite(df: pd.DataFrame, params: Dict[str, Any]) -> pd.DataFrame:
     )
 
     if threshold_mode == "quantile":
-        d = apply_threshold_quantile(d, top_k, quantile_q, enabled=True)
+        d = apply_threshold_quantile(d, top_k=top_k, quantile_q=quantile_q, enabled=True)
 
     return d
 
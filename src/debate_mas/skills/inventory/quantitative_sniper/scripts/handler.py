@@ -9,14 +9,18 @@ import numpy as np
 import pandas as pd
 
 from debate_mas.protocol import EtfCandidate, SkillResult
-from debate_mas.skills.base import BaseFinanceSkill, SkillContext
+from debate_mas.skills.base import BaseFinanceSkill, SkillContext, prepare_daily_frame
 
-from .dataloader import load_etf_daily
-from .algo import run_strategy
+from .panel import PricePanel, append_price_panel, build_price_panel, compute_panel_factors
 
 Strategy = Literal["momentum", "sharpe", "reversal", "composite", "user_defined"]
 
 
+def _update_price_panel(prev: PricePanel, info: Any) -> Optional[PricePanel]:
+    """价格面板的 updater（模块级，可 pickle）：append_rows 之后只把新增 / 被覆盖的行并入面板，不重新透视全量历史"""
+    return append_price_panel(prev, prepare_daily_frame(info.delta), prepare_daily_frame(info.removed))
+
+
 class SkillHandler(BaseFinanceSkill):
     """[Hunter] 量化狙击手：取数/路由/包装"""
 
@@ -141,33 +145,21 @@ class SkillHandler(BaseFinanceSkill):
     ) -> SkillResult:
         
         # 1. 数据准备 (Data Preparation)
-        df = ctx.dossier.get_table("etf_daily")
-        if df is None or df.empty:
+        raw = ctx.dossier.get_table("etf_daily")
+        if raw is None or raw.empty:
             return SkillResult.fail("案卷中找不到 'etf_daily' 数据。")
 
-        # 时间切片（防未来函数）
-        df = self.apply_date_filter(df, ctx.ref_date)
+        # 共享的标准化副本（已防未来 / 列名小写 / 类型转换，按案卷 + ref_date 缓存，只读）
+        df = self.get_prepared_daily(ctx)
         if df is None or df.empty:
             return SkillResult.fail(f"截止 {ctx.ref_date} 无可用行情数据。")
 
-        # 字段标准化
-        df = df.rename(columns=lambda x: str(x).strip().lower())
-        if "data" in df.columns and "date" not in df.columns:
-            df = df.rename(columns={"data": "date"})
-        
-        # 强制类型转换 (Robustness)
-        try:
-            if "code" in df.columns:
-                df["code"] = df["code"].astype(str)
-            if "date" in df.columns:
-                df["date"] = pd.to_datetime(df["date"], errors="coerce")
-            df["close"] = pd.to_numeric(df["close"], errors="coerce")
-            if "amount" in df.columns:
-                df["amount"] = pd.to_numeric(df["amount"], errors="coerce")
-        except Exception as e:
-            return SkillResult.fail(f"数据清洗失败: {e}")
-
-        df = df.dropna(subset=["code", "date", "close"])
+        missing = [c for c in ("code", "date", "close") if c not in df.columns]
+        if missing:
+            return SkillResult.fail(f"数据清洗失败: 行情表缺失必需字段 {missing}")
+
+        if df["close"].isna().any():
+            df = df[df["close"].notna()]
         if df.empty:
             return SkillResult.fail("清洗后数据为空（code/date/close缺失）。")
         
@@ -175,7 +167,7 @@ class SkillHandler(BaseFinanceSkill):
         universe_list = self._normalize_universe(universe)
         universe_set = set(universe_list) if universe_list else None
         if universe_set:
-            df = df[df["code"].isin(universe_set)].copy()
+            df = df[df["code"].isin(universe_set)]
             if df.empty:
                 return SkillResult.fail(
                     f"universe 过滤后为空：传入 {len(universe_set)} 个代码，但行情表无匹配。"
@@ -204,6 +196,7 @@ class SkillHandler(BaseFinanceSkill):
             "ref_date": ctx.ref_date,
             "agent_role": ctx.agent_role,
             "composite_weights": composite_weights,
+            "panel": self._get_price_panel(ctx),
         }
 
         if strategy == "momentum":
@@ -240,25 +233,16 @@ class SkillHandler(BaseFinanceSkill):
         """[策略] 动量：计算近 N 日涨幅"""
         # --- Phase 1: 流动性过滤 (Liquidity Filter) ---
         valid_codes = self._filter_liquidity(df, min_amount, liquidity_filter, amount_scale, window, illiq_quantile)
-        target_df = df[df["code"].isin(valid_codes)].copy()
 
         # --- Phase 2: 核心指标计算 (Core Calculation) --- 
-        rows: List[Dict[str, Any]] = []
-        for code, g in target_df.sort_values("date").groupby("code"):
-            if len(g) < window + 1:
-                continue
-            curr = float(g.iloc[-1]["close"])
-            prev = float(g.iloc[-(window + 1)]["close"])
-            if prev <= 0:
-                continue
-            mom_raw = (curr - prev) / prev  
-            rows.append({"symbol": code, "mom_raw": mom_raw})
+        f = self._panel_factors(df, kwargs.get("panel"), valid_codes, window)
+        rows = f.loc[np.isfinite(f["mom_raw"]), ["symbol", "mom_raw"]]
 
         # --- Phase 3: 结果处理 (Result Processing) ---
-        if not rows:
+        if rows.empty:
             return self._wrap_empty_result("momentum", window, universe_size, liquidity_filter, threshold_mode, meta=meta)
 
-        df_score = pd.DataFrame(rows)
+        df_score = rows.reset_index(drop=True)
         df_score["mom_pct"] = self._pct_rank_0_100(df_score["mom_raw"], neutral=50.0)
         df_score["score"] = df_score["mom_pct"]
 
@@ -293,38 +277,17 @@ class SkillHandler(BaseFinanceSkill):
         """[策略] 夏普比率：稳健优选 (支持 PSR 概率调整)"""
         # --- Phase 1: 流动性过滤 ---
         valid_codes = self._filter_liquidity(df, min_amount, liquidity_filter, amount_scale, window, illiq_quantile)
-        target_df = df[df["code"].isin(valid_codes)].copy()
 
         # --- Phase 2: 核心指标计算 ---
-        rows: List[Dict[str, Any]] = []
-        for code, g in target_df.sort_values("date").groupby("code"):
-            if len(g) < window + 1:
-                continue
-
-            recent_data = g.iloc[-(window + 1):].copy()
-            recent_data["ret"] = recent_data["close"].pct_change()
-            rets = recent_data["ret"].dropna()
-            
-            if len(rets) < max(5, window // 3): continue
-
-            mu = float(rets.mean())
-            sig = float(rets.std())
-            if sig <= 1e-6 or np.isnan(sig): continue # 防除零
-
-            sharpe = (mu / sig) * np.sqrt(252)
-
-            skew = float(rets.skew()) if len(rets) > 2 else 0.0
-            ex_kurt = float(rets.kurt()) if len(rets) > 2 else 0.0
-            n = int(len(rets))
-            psr = self._probabilistic_sharpe_ratio(sharpe, float(psr_ref_sharpe), n, skew, ex_kurt)
-            sharpe_adj = float(sharpe) * float(psr) 
-            rows.append({"symbol": code, "sharpe": float(sharpe), "psr": float(psr), "n": n, "sharpe_adj": float(sharpe_adj)})
+        f = self._panel_factors(df, kwargs.get("panel"), valid_codes, window, psr_ref_sharpe)
+        rows = f.loc[np.isfinite(f["sharpe_raw"]), ["symbol", "sharpe_raw", "psr", "n_rets", "sharpe_adj"]]
+        rows = rows.rename(columns={"sharpe_raw": "sharpe", "n_rets": "n"})
 
         # --- Phase 3: 结果处理 (包含 PSR 专用逻辑) ---
-        if not rows:
+        if rows.empty:
             return self._wrap_empty_result("sharpe", window, universe_size, liquidity_filter, threshold_mode, meta=meta)
 
-        df_score = pd.DataFrame(rows)
+        df_score = rows.reset_index(drop=True)
         df_score["sharpe_pct"] = self._pct_rank_0_100(df_score["sharpe_adj"], neutral=50.0)
         df_score["score"] = df_score["sharpe_pct"]
 
@@ -366,26 +329,16 @@ class SkillHandler(BaseFinanceSkill):
         
         # --- Phase 1: 流动性过滤 ---
         valid_codes = self._filter_liquidity(df, adj_min_amount, liquidity_filter, amount_scale, window, illiq_quantile)
-        target_df = df[df["code"].isin(valid_codes)].copy()
 
         # --- Phase 2: 核心指标计算 ---
-        rows: List[Dict[str, Any]] = []
-        for code, g in target_df.sort_values("date").groupby("code"):
-            if len(g) < window:
-                continue
-            curr = float(g.iloc[-1]["close"])
-            ma = float(g["close"].tail(window).mean())
-            if not np.isfinite(ma) or ma == 0:
-                continue
-            bias = (curr - ma) / ma
-            rev_raw = -bias 
-            rows.append({"symbol": code, "bias": float(bias), "rev_raw": float(rev_raw)})
+        f = self._panel_factors(df, kwargs.get("panel"), valid_codes, window)
+        rows = f.loc[np.isfinite(f["rev_raw"]), ["symbol", "bias", "rev_raw"]]
 
         # --- Phase 3: 结果处理 ---
-        if not rows:
+        if rows.empty:
             return self._wrap_empty_result("reversal", window, universe_size, liquidity_filter, threshold_mode, meta=meta)
 
-        df_all = pd.DataFrame(rows)
+        df_all = rows.reset_index(drop=True)
         df_all["rev_pct"] = self._pct_rank_0_100(df_all["rev_raw"], neutral=50.0)
 
         df_score = df_all[df_all["rev_raw"] > 0].copy()
@@ -430,62 +383,14 @@ class SkillHandler(BaseFinanceSkill):
                 composite_weights = None
 
         valid_codes = self._filter_liquidity(df, min_amount, liquidity_filter, amount_scale, window, illiq_quantile)
-        target_df = df[df["code"].isin(valid_codes)].copy()
 
         w = self._normalize_weights(composite_weights)
 
-        rows: List[Dict[str, Any]] = []
-        for code, g in target_df.sort_values("date").groupby("code"):
-            mom_raw = np.nan
-            if len(g) >= window + 1:
-                curr = float(g.iloc[-1]["close"])
-                prev = float(g.iloc[-(window + 1)]["close"])
-                if prev > 0:
-                    mom_raw = (curr - prev) / prev
-
-            rev_raw = np.nan
-            bias = np.nan
-            if len(g) >= window:
-                curr = float(g.iloc[-1]["close"])
-                ma = float(g["close"].tail(window).mean())
-                if np.isfinite(ma) and ma != 0:
-                    bias = (curr - ma) / ma
-                    rev_raw = -bias
-
-            sharpe = np.nan
-            psr = np.nan
-            sharpe_adj = np.nan
-            if len(g) >= window + 1:
-                recent = g.iloc[-(window + 1):].copy()
-                recent["ret"] = recent["close"].pct_change()
-                rets = recent["ret"].dropna()
-                if len(rets) >= max(5, window // 3):
-                    mu = float(rets.mean())
-                    sig = float(rets.std())
-                    if sig > 1e-6 and not np.isnan(sig):
-                        sharpe = (mu / sig) * np.sqrt(252)
-                        skew = float(rets.skew()) if len(rets) > 2 else 0.0
-                        ex_kurt = float(rets.kurt()) if len(rets) > 2 else 0.0
-                        n = int(len(rets))
-                        psr = self._probabilistic_sharpe_ratio(sharpe, float(psr_ref_sharpe), n, skew, ex_kurt)
-                        sharpe_adj = float(sharpe) * float(psr)
-
-            rows.append(
-                {
-                    "symbol": str(code),
-                    "mom_raw": mom_raw,
-                    "rev_raw": rev_raw,
-                    "bias": bias,
-                    "sharpe_raw": sharpe,
-                    "psr": psr,
-                    "sharpe_adj": sharpe_adj,
-                }
-            )
-
-        if not rows:
+        f = self._panel_factors(df, kwargs.get("panel"), valid_codes, window, psr_ref_sharpe)
+        if f.empty:
             return self._wrap_empty_result("composite", window, universe_size, liquidity_filter, threshold_mode, meta=meta)
 
-        d = pd.DataFrame(rows)
+        d = f[["symbol", "mom_raw", "rev_raw", "bias", "sharpe_raw", "psr", "sharpe_adj"]].reset_index(drop=True)
 
         d["mom_pct"] = self._pct_rank_0_100(d["mom_raw"], neutral=50.0)
         d["rev_pct"] = self._pct_rank_0_100(d["rev_raw"], neutral=50.0)
@@ -625,6 +530,30 @@ class SkillHandler(BaseFinanceSkill):
         return filtered
 
     # ================= 基础工具 (Infrastructure) =================
+    def _get_price_panel(self, ctx: SkillContext) -> PricePanel:
+        """[Panel] 全量面板按案卷只透视一次；各 ref_date 取其日期前缀（行切片，不复制）"""
+        def _build(_raw: pd.DataFrame) -> PricePanel:
+            full = self.get_prepared_daily(ctx, full=True)
+            return build_price_panel(full[full["close"].notna()])
+
+        panel = self.cached_derived(ctx, "etf_daily", ("price_panel", None), _build, _update_price_panel)
+        target = pd.to_datetime(ctx.ref_date, errors="coerce") if ctx.ref_date else pd.NaT
+        if pd.isna(target):
+            return panel
+        return panel.head(int(np.searchsorted(panel.dates, np.datetime64(target, "ns"), side="left")))
+
+    def _panel_factors(
+        self,
+        df: pd.DataFrame,
+        panel: Optional[PricePanel],
+        valid_codes,
+        window: int,
+        psr_ref_sharpe: float = 0.0,
+    ) -> pd.DataFrame:
+        """[Panel] 流动性过滤后的代码子集 -> 一次性算出全部原始因子（无面板时按 df 现建）"""
+        base = panel if panel is not None else build_price_panel(df)
+        return compute_panel_factors(base.select(valid_codes), window, float(psr_ref_sharpe))
+
     def _norm_cdf(self, x: float) -> float:
         return 0.5 * (1.0 + erf(x / sqrt(2.0)))
 
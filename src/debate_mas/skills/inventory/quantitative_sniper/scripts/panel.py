@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from math import erf, sqrt
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+# =========================
+# 面板因子引擎 (Panel Engine)
+# - etf_daily 一次性透视为 dates × codes 的 close/amount 矩阵
+# - 一次 NumPy 计算得到全部代码的 mom / bias / sharpe / skew / kurt / PSR
+# - 口径与逐组循环 (groupby("code") + iloc) 一致：
+#   1) 按“每只代码自己的第 k 条记录”取数（尾部对齐），而不是按日历对齐
+#   2) skew / kurt 走 pandas 的无偏修正公式
+# =========================
+
+# 逐元素 erf（N 只代码量级，成本可忽略；与 math.erf 逐位一致）
+_erf_vec = np.frompyfunc(erf, 1, 1)
+
+FACTOR_COLUMNS = ("symbol", "n_obs", "mom_raw", "bias", "rev_raw", "sharpe_raw", "psr", "sharpe_adj", "n_rets")
+
+
+@dataclass(frozen=True)
+class PricePanel:
+    """dates × codes 价格面板（缺失为 NaN；dates 升序，codes 字典序）"""
+
+    dates: np.ndarray
+    codes: np.ndarray
+    close: np.ndarray
+    amount: Optional[np.ndarray] = None
+
+    @property
+    def n_obs(self) -> np.ndarray:
+        return (~np.isnan(self.close)).sum(axis=0)
+
+    def select(self, codes: Iterable[str]) -> "PricePanel":
+        """按代码子集取列（保持面板原有列序），不存在的代码忽略"""
+        wanted = set(str(c) for c in codes)
+        mask = np.fromiter((c in wanted for c in self.codes), dtype=bool, count=len(self.codes))
+        return PricePanel(
+            dates=self.dates,
+            codes=self.codes[mask],
+            close=self.close[:, mask],
+            amount=None if self.amount is None else self.amount[:, mask],
+        )
+
+    def head(self, n_dates: int) -> "PricePanel":
+        """取前 n_dates 个交易日（行切片，零拷贝）"""
+        k = int(max(0, n_dates))
+        return PricePanel(
+            dates=self.dates[:k],
+            codes=self.codes,
+            close=self.close[:k],
+            amount=None if self.amount is None else self.amount[:k],
+        )
+
+
+def build_price_panel(df: pd.DataFrame) -> PricePanel:
+    """
+    输入: 已标准化的 etf_daily（code:str / date:datetime / close:float，amount 可选）
+    输出: PricePanel；同一 (code, date) 重复行保留最后一条
+    """
+    if df is None or df.empty:
+        empty = np.empty((0, 0), dtype=np.float64)
+        return PricePanel(dates=np.array([], dtype="datetime64[ns]"), codes=np.array([], dtype=object), close=empty)
+
+    # factorize(sort=True) 比 np.unique(object) 快一个量级；重复 (code, date) 由“后写覆盖”保留最后一条
+    code_idx, codes = pd.factorize(df["code"].astype(str), sort=True)
+    date_idx, dates = pd.factorize(df["date"], sort=True)
+    dates = np.asarray(dates, dtype="datetime64[ns]")
+    codes = np.asarray(codes, dtype=object)
+
+    close = np.full((len(dates), len(codes)), np.nan, dtype=np.float64)
+    close[date_idx, code_idx] = df["close"].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    amount = None
+    if "amount" in df.columns:
+        amount = np.full((len(dates), len(codes)), np.nan, dtype=np.float64)
+        amount[date_idx, code_idx] = pd.to_numeric(df["amount"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+    return PricePanel(dates=dates, codes=codes, close=close, amount=amount)
+
+
+def append_price_panel(panel: PricePanel, delta: pd.DataFrame, removed: Optional[pd.DataFrame] = None) -> Optional[PricePanel]:
+    """
+    增量面板（append_rows 之后）：输入为已标准化的新增行 delta 与被覆盖的旧行 removed。
+    - 被覆盖的 (code, date) 先清空，再写入 delta 中 close 非空的行（后写覆盖，与 build_price_panel 一致）
+    - 新代码 / 新日期并入后保持字典序 / 升序；清空后整行 / 整列无值的日期 / 代码剔除
+    结果与对新表整体 build_price_panel 一致；amount 有无与 delta 不一致时返回 None（交给调用方重建）
+    """
+    add = delta[delta["close"].notna()] if delta is not None and not delta.empty else delta
+    if (panel.amount is not None) != ("amount" in getattr(delta, "columns", [])):
+        return None
+
+    new_codes = np.asarray(add["code"].astype(str).unique(), dtype=object) if add is not None and len(add) else np.array([], dtype=object)
+    new_dates = np.asarray(add["date"].unique(), dtype="datetime64[ns]") if add is not None and len(add) else np.array([], dtype="datetime64[ns]")
+    codes = np.asarray(np.union1d(panel.codes.astype(str), new_codes.astype(str)), dtype=object)
+    dates = np.union1d(panel.dates, new_dates).astype("datetime64[ns]")
+
+    ci = np.searchsorted(codes.astype(str), panel.codes.astype(str))
+    di = np.searchsorted(dates, panel.dates)
+
+    def _grow(mat: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if mat is None:
+            return None
+        out = np.full((len(dates), len(codes)), np.nan, dtype=np.float64)
+        out[np.ix_(di, ci)] = mat
+        return out
+
+    close, amount = _grow(panel.close), _grow(panel.amount)
+
+    def _cells(df: pd.DataFrame):
+        c = np.searchsorted(codes.astype(str), df["code"].astype(str).to_numpy())
+        d = np.searchsorted(dates, df["date"].to_numpy(dtype="datetime64[ns]"))
+        ok = (c < len(codes)) & (d < len(dates))
+        ok[ok] &= (codes[c[ok]].astype(str) == df["code"].astype(str).to_numpy()[ok]) & (dates[d[ok]] == df["date"].to_numpy(dtype="datetime64[ns]")[ok])
+        return d[ok], c[ok], ok
+
+    if removed is not None and len(removed):
+        d, c, _ = _cells(removed)
+        close[d, c] = np.nan
+        if amount is not None:
+            amount[d, c] = np.nan
+    if add is not None and len(add):
+        d, c, ok = _cells(add)
+        close[d, c] = add["close"].to_numpy(dtype=np.float64, na_value=np.nan)[ok]
+        if amount is not None:
+            amount[d, c] = pd.to_numeric(add["amount"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)[ok]
+
+    valid = ~np.isnan(close)
+    rows, cols = valid.any(axis=1), valid.any(axis=0)
+    if not rows.all() or not cols.all():
+        close = close[rows][:, cols]
+        amount = None if amount is None else amount[rows][:, cols]
+        dates, codes = dates[rows], codes[cols]
+    return PricePanel(dates=dates, codes=codes, close=close, amount=amount)
+
+
+def _tail_align(mat: np.ndarray, min_rows: int) -> np.ndarray:
+    """把每列的有效值下沉到底部（保持时间顺序），使第 -k 行即“该代码倒数第 k 条记录”"""
+    valid = ~np.isnan(mat)
+    order = np.argsort(valid, axis=0, kind="stable")
+    aligned = np.take_along_axis(mat, order, axis=0)
+    if aligned.shape[0] < min_rows:
+        pad = np.full((min_rows - aligned.shape[0], aligned.shape[1]), np.nan)
+        aligned = np.vstack([pad, aligned])
+    return aligned
+
+
+def compute_panel_factors(panel: PricePanel, window: int, psr_ref_sharpe: float = 0.0) -> pd.DataFrame:
+    """
+    一次性计算全部代码的原始因子，不满足条件的位置为 NaN：
+    - mom_raw: 需 n_obs >= window+1 且 prev > 0
+    - bias / rev_raw: 需 n_obs >= window，均值有限且非 0
+    - sharpe_raw / psr / sharpe_adj: 取最后 window+1 个收盘价的收益，
+      需有效收益数 >= max(5, window//3) 且 std > 1e-6
+    仅返回至少有 1 条记录的代码，列序见 FACTOR_COLUMNS。
+    """
+    w = int(window)
+    n_obs = panel.n_obs
+    keep = n_obs > 0
+    codes = panel.codes[keep]
+    n_obs = n_obs[keep]
+    if len(codes) == 0:
+        empty = {c: pd.Series(dtype=np.float64) for c in FACTOR_COLUMNS}
+        empty["symbol"] = pd.Series(dtype=object)
+        return pd.DataFrame(empty)
+
+    a = _tail_align(panel.close[:, keep], min_rows=w + 1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        curr = a[-1]
+        prev = a[-(w + 1)]
+        mom_raw = np.where((n_obs >= w + 1) & (prev > 0), (curr - prev) / prev, np.nan)
+
+        ma = pd.DataFrame(a[-w:]).mean(axis=0).to_numpy() if w > 0 else np.full(len(codes), np.nan)
+        ok_ma = (n_obs >= w) & np.isfinite(ma) & (ma != 0)
+        bias = np.where(ok_ma, (curr - ma) / ma, np.nan)
+        rev_raw = -bias
+
+        # 收益矩阵：最后 window+1 个收盘价 -> window 个收益（NaN 视为缺失，与 dropna 一致）
+        rets = pd.DataFrame(a[-w:] / a[-(w + 1):-1] - 1.0) if w > 0 else pd.DataFrame(np.empty((0, len(codes))))
+        n_rets = rets.count(axis=0).to_numpy()
+        mu = rets.mean(axis=0).to_numpy()
+        sig = rets.std(axis=0).to_numpy()
+        skew = rets.skew(axis=0).to_numpy()
+        ex_kurt = rets.kurt(axis=0).to_numpy()
+
+        ok_sr = (n_obs >= w + 1) & (n_rets >= max(5, w // 3)) & (sig > 1e-6) & ~np.isnan(sig)
+        sharpe = np.where(ok_sr, (mu / sig) * np.sqrt(252), np.nan)
+
+        skew = np.where(n_rets > 2, skew, 0.0)
+        ex_kurt = np.where(n_rets > 2, ex_kurt, 0.0)
+        psr = probabilistic_sharpe_ratio_vec(sharpe, float(psr_ref_sharpe), n_rets, skew, ex_kurt)
+        psr = np.where(ok_sr, psr, np.nan)
+        sharpe_adj = sharpe * psr
+
+    return pd.DataFrame(
+        {
+            "symbol": codes.astype(str),
+            "n_obs": n_obs.astype(int),
+            "mom_raw": mom_raw,
+            "bias": bias,
+            "rev_raw": rev_raw,
+            "sharpe_raw": sharpe,
+            "psr": psr,
+            "sharpe_adj": sharpe_adj,
+            "n_rets": n_rets.astype(int),
+        }
+    )
+
+
+def probabilistic_sharpe_ratio_vec(
+    sr_hat: np.ndarray, sr_ref: float, n: np.ndarray, skew: np.ndarray, ex_kurt: np.ndarray
+) -> np.ndarray:
+    """PSR 向量化版本（与逐只计算的 _probabilistic_sharpe_ratio 同口径）"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        denom = 1.0 - (skew * sr_hat) + ((ex_kurt + 1.0) / 4.0) * (sr_hat**2)
+        denom = np.where(np.isnan(denom) | (denom <= 0), 1e-12, denom)
+        z = (sr_hat - sr_ref) * np.sqrt(np.maximum(n - 1, 1)) / np.sqrt(denom)
+        cdf = 0.5 * (1.0 + _erf_vec(z / sqrt(2.0)).astype(np.float64))
+        out = np.clip(cdf, 0.0, 1.0)
+    return np.where(n <= 2, 0.0, out)
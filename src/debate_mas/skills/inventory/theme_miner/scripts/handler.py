@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 import math
-from typing import Any, Dict, List, Literal, Optional, Tuple
+import re
+from typing import Any, Dict, Iterable, List, Literal, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 from debate_mas.protocol import EtfCandidate, SkillResult
 from debate_mas.skills.base import BaseFinanceSkill, SkillContext
+from debate_mas.skills.text_index import SubstringIndex
 
 from .mapping import (
     GUARDRAIL_BUCKETS,
@@ -18,6 +21,9 @@ from .ontology import get_concept_meta
 
 Mode = Literal["ontology_mapping", "industry_frequency", "guardrail_pool", "user_custom"]
 
+# str.contains 默认按正则匹配；含这些元字符的词不走子串索引，回退原逻辑保证口径一致
+_REGEX_META = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
 class SkillHandler(BaseFinanceSkill):
     """
     [Hunter] 主题挖掘机 - Recall 模块 (The Theme Miner)
@@ -31,6 +37,11 @@ class SkillHandler(BaseFinanceSkill):
     TABLE_ETF = "etf_basic"
     TABLE_GOV = "govcn"
     OUTPUT_TYPE = "EtfCandidateList"
+    # execute 期间把列名/名称索引绑在实例上 -> 同一实例的并发调用需串行
+    thread_safe = False
+    _name_view: Optional[pd.DataFrame] = None
+    _name_index: Optional[SubstringIndex] = None
+    _name_pos: Optional[np.ndarray] = None
 
     def execute(self, 
                 ctx: SkillContext, 
@@ -58,6 +69,9 @@ class SkillHandler(BaseFinanceSkill):
         if not self._code_col or not self._name_col:
             return SkillResult.fail(f"etf_basic 表缺少必要的 code 或 name 列。现有: {list(df_etf.columns)}")
 
+        # 名称子串索引（按案卷缓存）绑定到本次的 df_etf 视图
+        self._bind_name_index(ctx, df_etf)
+
         # ==========================================================
         # 2. 模式路由 (Mode Dispatch)
         # ==========================================================
@@ -76,7 +90,7 @@ class SkillHandler(BaseFinanceSkill):
         if df_gov is None:
             return SkillResult.fail("案卷中缺失 'govcn' 政策表。")
 
-        df_gov = self.apply_date_filter(df_gov, ctx.ref_date)
+        df_gov = self.apply_date_filter(df_gov, ctx.ref_date, dossier=ctx.dossier, table_name=self.TABLE_GOV)
         if df_gov.empty:
             return SkillResult.fail(f"截止 {ctx.ref_date} 无可用政策数据。")
         df_gov = self._norm_cols(df_gov)
@@ -143,11 +157,11 @@ class SkillHandler(BaseFinanceSkill):
         # --- Step 3: ETF Recall ---
         terms = self._uniq_keep([keyword, std_theme] + expansions)
 
+        matched = self._match_etfs_many(df_etf, terms)
         hits = []
         for t in terms:
-            h = self._match_etfs(df_etf, t)
+            h = matched[t]
             if not h.empty:
-                h = h.copy()
                 h["_match_term"] = t 
                 hits.append(h)
 
@@ -221,16 +235,21 @@ class SkillHandler(BaseFinanceSkill):
         per_bucket_k = int(max(1, per_bucket_k))
 
         rows: List[Dict[str, Any]] = []
+        bucket_terms = {
+            str(b).strip(): [str(x).strip() for x in (THEME_KEYWORDS_MAP.get(str(b).strip(), []) or []) if str(x).strip()]
+            for b in buckets
+        }
+        matched = self._match_etfs_many(df_etf, [t for ts in bucket_terms.values() for t in ts])
 
         for b in buckets:
             b = str(b).strip()
-            terms = [str(x).strip() for x in (THEME_KEYWORDS_MAP.get(b, []) or []) if str(x).strip()]
+            terms = bucket_terms[b]
             
             cnt = 0
             seen = set()
 
             for t in terms:
-                h = self._match_etfs(df_etf, t)
+                h = matched[t]
                 if h.empty: 
                     continue
                 
@@ -318,11 +337,14 @@ class SkillHandler(BaseFinanceSkill):
 
         # 3. 映射 ETF
 
+        ind_terms = {ind: self._industry_terms(ind) for ind in top_inds.index}
+        matched = self._match_etfs_many(df_etf, [t for ts in ind_terms.values() for t in ts])
+
         hits: List[pd.DataFrame] = []
         for ind, freq in top_inds.items():
-            terms = self._industry_terms(ind)
+            terms = ind_terms[ind]
             for t in terms:
-                h = self._match_etfs(df_etf, t)
+                h = matched[t]
                 if h.empty:
                     continue
                 h = h.copy()
@@ -520,5 +542,57 @@ class SkillHandler(BaseFinanceSkill):
         """[工具] 简单的模糊匹配 (Contains)"""
         kw = str(keyword).strip()
         if not self._name_col or not kw: return pd.DataFrame()
+        pos = self._lookup_name_index(df, kw)
+        if pos is not None:
+            return df.iloc[pos].copy()
         mask = df[self._name_col].astype(str).str.contains(kw, na=False)
-        return df[mask].copy()
\ No newline at end of file
+        return df[mask].copy()
+
+    def _match_etfs_many(self, df: pd.DataFrame, terms: Iterable[str]) -> Dict[str, pd.DataFrame]:
+        """[工具] 批量模糊匹配：term -> 命中的 ETF 子表（重复 term 只查一次；可走索引的词一次性 lookup_many）"""
+        terms = list(dict.fromkeys(terms))
+        kws = {t: str(t).strip() for t in terms}
+        hits: Dict[str, np.ndarray] = {}
+        if self._name_col and self._name_index is not None and df is self._name_view:
+            indexable = [kw for kw in kws.values() if kw and not _REGEX_META.search(kw)]
+            hits = {kw: self._index_rows(ids) for kw, ids in self._name_index.lookup_many(indexable).items()}
+        return {t: df.iloc[hits[kws[t]]].copy() if kws[t] in hits else self._match_etfs(df, t) for t in terms}
+
+    # ================= 名称子串索引 (Name Index) =================
+    def _get_name_index(self, ctx: SkillContext) -> Optional[Tuple[str, pd.Index, SubstringIndex]]:
+        """[缓存] etf_basic 名称列的 n-gram 索引：(名称列, 原表行标签, 索引)；随表版本失效"""
+        def _build(raw: pd.DataFrame) -> Optional[Tuple[str, pd.Index, SubstringIndex]]:
+            d = self._norm_cols(raw)
+            _, name_col = self._infer_etf_cols(d)
+            if not name_col or not d.index.is_unique:
+                return None
+            return name_col, d.index, SubstringIndex(d[name_col].astype(str).tolist())
+
+        return self.cached_derived(ctx, self.TABLE_ETF, ("name_index", None), _build)
+
+    def _bind_name_index(self, ctx: SkillContext, df_etf: pd.DataFrame) -> None:
+        """把案卷级索引映射到本次 df_etf（防未来过滤后的子集）：原表行号 -> df_etf 行号"""
+        self._name_view, self._name_index, self._name_pos = None, None, None
+        built = self._get_name_index(ctx)
+        if built is None:
+            return
+        name_col, labels, index = built
+        if name_col != self._name_col:
+            return
+        loc = labels.get_indexer(df_etf.index)
+        if (loc < 0).any():
+            return
+        pos = np.full(len(labels), -1, dtype=np.int64)
+        pos[loc] = np.arange(len(df_etf), dtype=np.int64)
+        self._name_view, self._name_index, self._name_pos = df_etf, index, pos
+
+    def _lookup_name_index(self, df: pd.DataFrame, kw: str) -> Optional[np.ndarray]:
+        """命中 df 的行号（升序）；索引不可用或词含正则元字符时返回 None（回退 str.contains）"""
+        if self._name_index is None or df is not self._name_view or _REGEX_META.search(kw):
+            return None
+        return self._index_rows(self._name_index.lookup(kw))
+
+    def _index_rows(self, ids: np.ndarray) -> np.ndarray:
+        """索引文档号 -> df 行号（升序，去掉不在当前视图里的）"""
+        pos = self._name_pos[ids]
+        return np.sort(pos[pos >= 0])
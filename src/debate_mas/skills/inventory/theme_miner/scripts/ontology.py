@@ -3,21 +3,41 @@ Ontology Inference Engine (本地知识推理引擎)
 
 - 负责加载 references/ontology.yaml
 - 提供关键词扩展（aliases / expands_to / weight）
+- 编译索引：精确 key / 别名 / 双向子串包含，查询与概念数量无关
+  编译结果以 JSON 缓存到用户缓存目录（$XDG_CACHE_HOME 或 ~/.cache 下的 debate_mas/），
+  进程内缓存与磁盘缓存都按 YAML 的 mtime + size 校验，写失败静默跳过
 """
 from __future__ import annotations
 
+import hashlib
+import json
+import os
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import yaml
 
+from debate_mas.skills.text_index import AhoCorasick, SubstringIndex
+
 # 全局缓存，避免每次调用都读 IO
 _CONCEPTS_CACHE: Optional[Dict[str, Any]] = None
+_INDEX_CACHE: Optional[Dict[str, Any]] = None
+
+_INDEX_STAMP: Optional[tuple] = None
+
+# 编译缓存格式版本：索引结构变化时 +1，旧缓存自动失效
+_INDEX_FORMAT = 2
 
 def _ontology_yaml_path() -> Path:
     # YAML 文件：skills/inventory/theme_miner/references/ontology.yaml
     return Path(__file__).resolve().parent.parent / "references" / "ontology.yaml"
 
+def _ontology_cache_path() -> Path:
+    # 编译缓存：用户缓存目录，按 YAML 绝对路径区分（不写进包目录）
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    digest = hashlib.sha1(str(_ontology_yaml_path()).encode("utf-8")).hexdigest()[:12]
+    return Path(root) / "debate_mas" / f"ontology_index_{digest}.json"
+
 def _load_ontology() -> Dict:
     """加载并解析 yaml 文件 (Lazy Loading)"""
     global _CONCEPTS_CACHE
@@ -41,6 +61,157 @@ def _load_ontology() -> Dict:
         _CONCEPTS_CACHE = {}
         return _CONCEPTS_CACHE
 
+# =========================
+# 编译索引 (Compiled Index)
+# =========================
+def _compile_index(concepts: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    concepts -> 索引（基础容器 + text_index 对象；落盘见 _index_to_json）
+    - exact: 原始 key -> 概念序号
+    - terms/owners: 全部 key + aliases（去空白），及其所属概念序号
+    - contained: AC 自动机，答“哪些 term 出现在 query 中”
+    - containing: n-gram 索引，答“哪些 term 包含 query”
+    """
+    entries: List[Dict[str, Any]] = []
+    exact: Dict[str, int] = {}
+    terms: List[str] = []
+    owners: List[int] = []
+
+    for order, (key, info) in enumerate((concepts or {}).items()):
+        info = info or {}
+        key_s = str(key).strip()
+        entries.append({
+            "name": key_s,
+            "expansions": info.get("expands_to", []) or [],
+            "weight": info.get("weight", 1.0),
+        })
+        if isinstance(key, str):
+            exact.setdefault(key, order)
+        if not key_s:
+            continue
+        for t in [key_s] + [str(a).strip() for a in (info.get("aliases", []) or [])]:
+            if t:
+                terms.append(t)
+                owners.append(order)
+
+    term_owners: Dict[str, List[int]] = {}
+    for t, o in zip(terms, owners):
+        term_owners.setdefault(t, []).append(o)
+
+    return {
+        "format": _INDEX_FORMAT,
+        "entries": entries,
+        "exact": exact,
+        "terms": terms,
+        "owners": owners,
+        "term_owners": term_owners,
+        "contained": AhoCorasick(terms),
+        "containing": SubstringIndex(terms),
+    }
+
+def _index_to_json(index: Dict[str, Any]) -> Dict[str, Any]:
+    """索引 -> JSON 可表示的结构（自动机导出为状态表；term_owners 由 terms/owners 重建）"""
+    return {
+        "format": index["format"],
+        "entries": index["entries"],
+        "exact": index["exact"],
+        "terms": index["terms"],
+        "owners": index["owners"],
+        "contained": index["contained"].to_state(),
+        "containing": index["containing"].to_state(),
+    }
+
+def _index_from_json(obj: Dict[str, Any]) -> Dict[str, Any]:
+    term_owners: Dict[str, List[int]] = {}
+    for t, o in zip(obj["terms"], obj["owners"]):
+        term_owners.setdefault(t, []).append(o)
+    return {
+        "format": obj["format"],
+        "entries": obj["entries"],
+        "exact": obj["exact"],
+        "terms": obj["terms"],
+        "owners": obj["owners"],
+        "term_owners": term_owners,
+        "contained": AhoCorasick.from_state(obj["contained"]),
+        "containing": SubstringIndex.from_state(obj["containing"]),
+    }
+
+def _yaml_stamp() -> Optional[tuple]:
+    try:
+        st = _ontology_yaml_path().stat()
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def _read_index_cache(stamp: tuple) -> Optional[Dict[str, Any]]:
+    """磁盘缓存命中条件：格式版本 + YAML mtime/size 一致"""
+    path = _ontology_cache_path()
+    if not path.exists():
+        return None
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("stamp") != list(stamp) or payload["index"].get("format") != _INDEX_FORMAT:
+            return None
+        return _index_from_json(payload["index"])
+    except Exception:
+        return None
+
+def _write_index_cache(stamp: tuple, index: Dict[str, Any]) -> None:
+    """原子写入（先写临时文件再替换）；只读目录等失败直接忽略"""
+    path = _ontology_cache_path()
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"stamp": list(stamp), "index": _index_to_json(index)}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+def _load_index() -> Dict[str, Any]:
+    """取编译索引：进程内缓存 -> 磁盘缓存 -> 现编译（三者都按 YAML mtime/size 校验）"""
+    global _INDEX_CACHE, _INDEX_STAMP, _CONCEPTS_CACHE
+    stamp = _yaml_stamp()
+    if _INDEX_CACHE is not None and _INDEX_STAMP == stamp:
+        return _INDEX_CACHE
+
+    index = _read_index_cache(stamp) if stamp else None
+    if index is None:
+        # 需要重新编译时 YAML 可能已变：概念缓存一并作废，重新解析
+        _CONCEPTS_CACHE = None
+        index = _compile_index(_load_ontology())
+        if stamp:
+            _write_index_cache(stamp, index)
+
+    _INDEX_CACHE, _INDEX_STAMP = index, stamp
+    return _INDEX_CACHE
+
+def _resolve_order(query_norm: str) -> Optional[int]:
+    """
+    精确 key 优先；否则取“key/别名与 query 互相包含”的概念中 YAML 顺序最靠前的一个
+    （与逐个扫描的首个命中一致）
+    """
+    index = _load_index()
+    hit = index["exact"].get(query_norm)
+    if hit is not None:
+        return hit
+
+    best: Optional[int] = None
+    # term 出现在 query 中
+    for t in index["contained"].find_all(query_norm):
+        o = min(index["term_owners"][t])
+        best = o if best is None else min(best, o)
+    # term 包含 query
+    rows = index["containing"].lookup(query_norm)
+    if len(rows):
+        o = min(index["owners"][int(i)] for i in rows)
+        best = o if best is None else min(best, o)
+    return best
+
 def get_concept_meta(query: str) -> Dict[str, Any]:
     """
     [推理核心接口]
@@ -51,8 +222,6 @@ def get_concept_meta(query: str) -> Dict[str, Any]:
           - weight: 静态权重
           - found: 是否命中
     """
-    concepts = _load_ontology()
-
     result = {
         "name": query,
         "expansions": [],
@@ -60,49 +229,23 @@ def get_concept_meta(query: str) -> Dict[str, Any]:
         "found": False
     }
 
-    if not concepts:
-        return result
-
     query_norm = str(query).strip()
     if not query_norm:
         return result
-    
-    # 1. 精确匹配 Key
-    if query_norm in concepts:
-        info = concepts[query_norm]
-        result.update({
-            "name": query_norm,
-            "expansions": info.get("expands_to", []) or [],
-            "weight": info.get("weight", 1.0),
-            "found": True
-        })
+
+    index = _load_index()
+    if not index["entries"]:
         return result
 
-    # 2. 模糊/别名匹配
-    for key, info in (concepts or {}).items():
-        key_s = str(key).strip()
-        if not key_s:
-            continue
-        info = info or {}
+    order = _resolve_order(query_norm)
+    if order is None:
+        return result
 
-        match_key = (query_norm in key_s) or (key_s in query_norm)
-
-        match_alias = False
-        for alias in (info.get("aliases", []) or []):
-            alias_s = str(alias).strip()
-            if not alias_s:
-                continue
-            if (query_norm in alias_s) or (alias_s in query_norm):
-                match_alias = True
-                break
-        
-        if match_key or match_alias:
-            result.update({
-                "name": key_s, 
-                "expansions": info.get("expands_to", []) or [],
-                "weight": info.get("weight", 1.0),
-                "found": True
-            })
-            return result
-
-    return result
\ No newline at end of file
+    entry = index["entries"][order]
+    result.update({
+        "name": entry["name"],
+        "expansions": entry["expansions"],
+        "weight": entry["weight"],
+        "found": True
+    })
+    return result
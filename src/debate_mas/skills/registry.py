@@ -6,13 +6,13 @@ Layer 3 - 技能注册中心 (The Skill Store)
 - 扫描 skills/inventory/*
 - 解析 SKILL.md（YAML frontmatter + prompt）
 - 动态加载 scripts/handler.py，实例化 SkillHandler
-- 将元信息注入 instance（name/chinese_name/description/expert_mindset）
+- 将元信息注入 instance（name/chinese_name/description/expert_mindset/data_dependencies）
 """
 
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, Tuple, Any, Optional
+from typing import Dict, List, Tuple, Any, Optional
 
 import importlib.util
 import re
@@ -75,6 +75,14 @@ class SkillRegistry:
 
         return meta, prompt_text
 
+    @staticmethod
+    def _table_dependencies(meta: Dict[str, Any]) -> Optional[List[str]]:
+        """SKILL.md data_dependencies -> 依赖表名列表（未声明该字段返回 None）"""
+        deps = meta.get("data_dependencies")
+        if not isinstance(deps, list):
+            return None
+        return [str(d["table"]) for d in deps if isinstance(d, dict) and d.get("table")]
+
     @staticmethod
     def _load_package(skill_dir: Path):
         """加载单个 skill 文件夹"""
@@ -127,6 +135,9 @@ class SkillRegistry:
             instance.chinese_name = str(meta.get("chinese_name", skill_name))
             instance.description = str(meta.get("description", "") or "")
             instance.expert_mindset = prompt_text
+            deps = SkillRegistry._table_dependencies(meta)
+            if deps is not None and getattr(handler_cls, "data_dependencies", None) is None:
+                instance.data_dependencies = deps
 
             _SKILL_CACHE[str(skill_name)] = instance
 
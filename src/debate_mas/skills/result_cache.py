@@ -0,0 +1,264 @@
+# skills/result_cache.py
+"""
+Layer 3 - 技能结果磁盘缓存 (Skill Result Cache)
+
+跨运行复用技能输出（同 mission/ref_date 反复调 prompt 时，技能结果完全相同）：
+- key = 技能名 + 代码指纹 + 归一化参数 + role + ref_date + 依赖表内容哈希
+- 代码指纹：技能 scripts/*.py + 技能包的 SKILL.md / references/*（ontology.yaml 等）+ 共享模块（base.py / text_index.py）
+- 依赖表：技能声明的 data_dependencies（SKILL.md 注入或类属性）；未声明则哈希全部表
+- 值：SkillResult 的 JSON（只缓存成功结果）
+- 容量：按总字节数上限做 LRU 淘汰（命中时刷新 mtime）；总字节数首次写入时扫描一次、之后在内存里累加，超限才遍历目录
+
+模式：
+- off: 不读不写
+- on: 命中直接返回；未命中执行后写入
+- bypass: 不读，执行后覆盖写入（强制刷新）
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+CACHE_MODES = ("off", "on", "bypass")
+
+# 缓存格式版本：key/value 结构变化时 +1
+_FORMAT = 1
+
+# 所有技能共用、改动会影响结果的模块（与本文件同目录）
+_SHARED_CODE = ("base.py", "text_index.py")
+
+
+def _stable_json(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def table_content_hash(df: pd.DataFrame) -> Optional[str]:
+    """表内容哈希（列名 + dtype + 逐行哈希）；无法哈希时返回 None（该次调用不缓存）"""
+    try:
+        h = hashlib.sha1()
+        h.update(_stable_json([[str(c), str(t)] for c, t in df.dtypes.items()]).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+        return h.hexdigest()
+    except Exception as e:
+        print(f"⚠️ [SkillCache] 表内容哈希失败，跳过缓存: {e}")
+        return None
+
+
+def _code_files(cls: type) -> List[Path]:
+    """参与代码指纹的文件（见 SkillResultCache._code_stamp）"""
+    folder = Path(inspect.getsourcefile(cls) or "").resolve().parent
+    package = folder.parent if folder.name == "scripts" else folder
+    files = list(folder.glob("*.py"))
+    if package != folder:
+        files += [package / "SKILL.md"] + sorted((package / "references").rglob("*"))
+    shared = Path(__file__).resolve().parent
+    files += [shared / name for name in _SHARED_CODE]
+    return [p for p in files if p.is_file() and not p.name.startswith(".")]
+
+
+class SkillResultCache:
+    """内容寻址的技能结果缓存（目录下 <key[:2]>/<key>.json）"""
+
+    def __init__(self, cache_dir: str, *, mode: str = "on", max_bytes: int = 512 * 1024 * 1024):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"未知缓存模式 '{mode}'，可选: {CACHE_MODES}")
+        self.cache_dir = Path(cache_dir)
+        self.mode = mode
+        self.max_bytes = int(max_bytes)
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._code_stamps: Dict[type, str] = {}
+        self._total_bytes: Optional[int] = None  # 缓存目录总字节数；None = 尚未扫描
+
+    # ---------------- 开关 ----------------
+    @property
+    def readable(self) -> bool:
+        return self.mode == "on"
+
+    @property
+    def writable(self) -> bool:
+        return self.mode in ("on", "bypass")
+
+    # ---------------- key ----------------
+    def key_for(self, skill: Any, ctx: Any, args: Dict[str, Any]) -> Optional[str]:
+        """组装缓存 key；依赖表无法哈希时返回 None"""
+        tables = self._table_hashes(getattr(ctx, "dossier", None), getattr(skill, "data_dependencies", None))
+        if tables is None:
+            return None
+        raw = _stable_json({
+            "format": _FORMAT,
+            "skill": getattr(skill, "name", "") or type(skill).__name__,
+            "code": self._code_stamp(skill),
+            "args": args or {},
+            "role": getattr(ctx, "agent_role", None),
+            "ref_date": getattr(ctx, "ref_date", None),
+            "tables": tables,
+        })
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _table_hashes(self, dossier: Any, deps: Optional[List[str]]) -> Optional[Dict[str, Optional[str]]]:
+        if dossier is None:
+            return {}
+        names = list(deps) if deps is not None else sorted(getattr(dossier, "structured_data", {}) or {})
+
+        out: Dict[str, Optional[str]] = {}
+        getter = getattr(dossier, "get_derived", None)
+        for name in names:
+            df = dossier.get_table(name) if hasattr(dossier, "get_table") else None
+            if df is None:
+                out[str(name)] = None  # 缺表也是输入的一部分
+                continue
+            digest = getter(name, ("content_hash", None), table_content_hash) if callable(getter) else table_content_hash(df)
+            if digest is None:
+                return None
+            out[str(name)] = digest
+        return out
+
+    def _code_stamp(self, skill: Any) -> str:
+        """
+        技能代码指纹：(相对路径, mtime, size) 列表的哈希；改代码 / 改参考数据即失效
+        - handler 所在目录下 *.py
+        - 技能包（scripts/ 的上一级）的 SKILL.md 与 references/ 下全部文件（如 theme_miner 的 ontology.yaml / mapping.yaml）
+        - 共享模块 _SHARED_CODE（apply_date_filter / prepare_daily_frame 等在 base.py）
+        """
+        cls = type(skill)
+        stamp = self._code_stamps.get(cls)
+        if stamp is not None:
+            return stamp
+        try:
+            root = Path(__file__).resolve().parent
+            parts = []
+            for p in _code_files(cls):
+                st = p.stat()
+                parts.append((os.path.relpath(p, root), st.st_mtime_ns, st.st_size))
+            parts.sort()
+            stamp = hashlib.sha1(_stable_json(parts).encode("utf-8")).hexdigest()
+        except Exception:
+            stamp = cls.__qualname__
+        self._code_stamps[cls] = stamp
+        return stamp
+
+    # ---------------- 读写 ----------------
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.readable:
+            return None
+        path = self._path(key)
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                payload = json.load(f)
+            os.utime(path)  # LRU：命中刷新 mtime
+        except (OSError, ValueError):
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        with self._lock:
+            self.stats["hits"] += 1
+        return payload
+
+    def put(self, key: str, payload: Dict[str, Any]) -> None:
+        """原子写入；序列化/写盘失败静默跳过（缓存不影响主流程）"""
+        if not self.writable:
+            return
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._disk_usage()
+        try:
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                old_size = path.stat().st_size
+            except OSError:
+                old_size = 0
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"⚠️ [SkillCache] 写入失败: {e}")
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self.stats["writes"] += 1
+            self._total_bytes = (self._total_bytes or 0) + len(data) - old_size
+            over = self._total_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def _disk_usage(self) -> int:
+        total = 0
+        for p in self.cache_dir.glob("*/*.json"):
+            try:
+                total += p.stat().st_size
+            except OSError:
+                continue
+        return total
+
+    def evict(self) -> int:
+        """遍历目录：总大小超过 max_bytes 时按 mtime 从旧到新删除，并校正内存里的总字节数；返回删除个数"""
+        with self._lock:
+            entries = []
+            total = 0
+            for p in self.cache_dir.glob("*/*.json"):
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, p))
+                total += st.st_size
+            self._total_bytes = total
+            if total <= self.max_bytes:
+                return 0
+
+            removed = 0
+            for _, size, p in sorted(entries, key=lambda x: x[0]):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    p.unlink()
+                    total -= size
+                    removed += 1
+                except OSError:
+                    continue
+            self._total_bytes = total
+            self.stats["evictions"] += removed
+            return removed
+
+    def clear(self) -> None:
+        if self.cache_dir.exists():
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+        with self._lock:
+            self._total_bytes = 0
+        print(f"🧹 [SkillCache] 已清空: {self.cache_dir}")
+
+
+# ============================================================
+# 进程级单例（默认关闭；由 main 按 CONFIG + CLI 配置）
+# ============================================================
+_RESULT_CACHE: Optional[SkillResultCache] = None
+
+
+def configure_result_cache(mode: str, cache_dir: str, max_mb: float = 512) -> SkillResultCache:
+    global _RESULT_CACHE
+    _RESULT_CACHE = SkillResultCache(cache_dir, mode=mode, max_bytes=int(float(max_mb) * 1024 * 1024))
+    return _RESULT_CACHE
+
+
+def get_result_cache() -> Optional[SkillResultCache]:
+    """未配置或 mode=off 时返回 None"""
+    cache = _RESULT_CACHE
+    return cache if cache is not None and cache.mode != "off" else None
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from collections import deque
+from itertools import count
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+# =========================
+# 文本索引工具 (技能间共享)
+# - AhoCorasick: 多模式串一次扫描（代码/简称 -> 命中行号）
+# - SubstringIndex: n-gram 子串索引（名称 -> 包含某词的行号）
+# 纯 Python/NumPy 实现，无额外依赖；构建后只读，可在技能/线程间共享
+# to_state / from_state：导出为 JSON 可表示的结构，供磁盘缓存跳过重建
+# =========================
+
+
+class AhoCorasick:
+    """
+    多模式子串匹配自动机
+    - patterns 去重后按输入顺序编号；空串忽略
+    - find_all(text) 返回 text 中出现过的模式集合（子串语义，与 `p in text` 一致）
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        seen: Set[str] = set()
+        for p in patterns:
+            p = str(p)
+            if p and p not in seen:
+                seen.add(p)
+                self.patterns.append(p)
+
+        # 状态 0 为根；goto[s]: 字符 -> 状态
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for pid, p in enumerate(self.patterns):
+            s = 0
+            for ch in p:
+                nxt = self._goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[s][ch] = nxt
+                s = nxt
+            self._out[s].append(pid)
+        self._build_fail()
+
+    def _build_fail(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            s = queue.popleft()
+            for ch, t in self._goto[s].items():
+                queue.append(t)
+                f = self._fail[s]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[t] = cand if cand != t else 0
+                self._out[t] = self._out[t] + self._out[self._fail[t]]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"patterns": self.patterns, "goto": self._goto, "fail": self._fail, "out": self._out}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "AhoCorasick":
+        obj = cls.__new__(cls)
+        obj.patterns = list(state["patterns"])
+        obj._goto = [dict(g) for g in state["goto"]]
+        obj._fail = list(state["fail"])
+        obj._out = [list(o) for o in state["out"]]
+        return obj
+
+    def find_all(self, text: str) -> Set[str]:
+        """text 中出现的全部模式（去重）"""
+        hits: Set[int] = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        s = 0
+        for ch in text:
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            if out[s]:
+                hits.update(out[s])
+        return {self.patterns[i] for i in hits}
+
+    def index_rows(self, texts: Iterable[str], row_ids: Optional[Iterable[int]] = None) -> Dict[str, List[int]]:
+        """[倒排] 模式 -> 命中的行号列表（按输入顺序）；row_ids 缺省为 0..n-1"""
+        inverted: Dict[str, List[int]] = {}
+        ids = row_ids if row_ids is not None else count()
+        for row_id, text in zip(ids, texts):
+            if not text:
+                continue
+            for p in self.find_all(text):
+                inverted.setdefault(p, []).append(row_id)
+        return inverted
+
+
+class SubstringIndex:
+    """
+    n-gram 子串索引：回答“哪些行的文本包含 term”（子串语义，与 `term in text` 一致）
+    - 单字直接查字表；多字取全部 n-gram 的行集合求交，再逐行校验
+    - 查询结果按 term 记忆（索引只读，可在技能/线程间共享）
+    """
+
+    def __init__(self, texts: Iterable[Optional[str]], n: int = 2):
+        self.n = max(1, int(n))
+        self.texts: List[Optional[str]] = [t if isinstance(t, str) else None for t in texts]
+        self._grams: Dict[str, Set[int]] = {}
+        for row_id, text in enumerate(self.texts):
+            if not text:
+                continue
+            for k in range(1, self.n + 1):
+                for i in range(len(text) - k + 1):
+                    self._grams.setdefault(text[i:i + k], set()).add(row_id)
+        self._memo: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"n": self.n, "texts": self.texts, "grams": {g: sorted(rows) for g, rows in self._grams.items()}}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "SubstringIndex":
+        obj = cls.__new__(cls)
+        obj.n = int(state["n"])
+        obj.texts = list(state["texts"])
+        obj._grams = {g: set(rows) for g, rows in state["grams"].items()}
+        obj._memo = {}
+        return obj
+
+    def lookup(self, term: str) -> np.ndarray:
+        """包含 term 的行号（升序 int64 数组）"""
+        hit = self._memo.get(term)
+        if hit is not None:
+            return hit
+
+        if not term:
+            rows = [i for i, t in enumerate(self.texts) if t is not None]
+        elif len(term) <= self.n:
+            rows = sorted(self._grams.get(term, ()))
+        else:
+            grams = {term[i:i + self.n] for i in range(len(term) - self.n + 1)}
+            sets = sorted((self._grams.get(g, set()) for g in grams), key=len)
+            cand = set(sets[0]).intersection(*sets[1:]) if sets[0] else set()
+            rows = sorted(i for i in cand if term in self.texts[i])
+
+        out = np.asarray(rows, dtype=np.int64)
+        self._memo[term] = out
+        return out
+
+    def lookup_many(self, terms: Iterable[str]) -> Dict[str, np.ndarray]:
+        """批量查询：term -> 行号数组（重复 term 只查一次）"""
+        return {t: self.lookup(t) for t in dict.fromkeys(terms)}
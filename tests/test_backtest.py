@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from debate_mas.core import backtest as bt
+from debate_mas.loader.dossier import Dossier
+
+
+def _make_dossier(seed: int = 1, n_codes: int = 24, days: int = 140) -> Dossier:
+    rng = np.random.default_rng(seed)
+    codes = [f"{510000 + i:06d}" for i in range(n_codes)]
+    rows = []
+    for i, code in enumerate(codes):
+        px = 1.0 + rng.random()
+        for d in pd.bdate_range("2024-01-01", periods=days):
+            px *= float(np.exp(rng.normal(0.0005 * (i % 5 - 2), 0.01 + 0.01 * (i % 3))))
+            rows.append({"code": code, "date": d, "close": px, "amount": float(rng.uniform(1e6, 1e8))})
+    d = Dossier.create_empty(mission="bt")
+    d.add_table(name="etf_daily", df=pd.DataFrame(rows))
+    d.add_table(
+        name="etf_basic",
+        df=pd.DataFrame({"code": codes, "cname": [f"主题{i}ETF" for i in range(n_codes)], "mgt_fee": 0.15, "list_date": "2020-01-01"}),
+    )
+    d.add_table(name="csrc", df=pd.DataFrame({"title": ["公告"], "date": ["2024-03-01"], "content": [f"{codes[3]} 被立案调查"]}))
+    return d
+
+
+def test_compute_turnover_half_abs_change_from_cash() -> None:
+    w = pd.DataFrame({"a": [0.5, 0.5, 0.0], "b": [0.5, 0.2, 0.0]}, index=["d1", "d2", "d3"])
+    assert bt.compute_turnover(w).tolist() == pytest.approx([0.5, 0.15, 0.35])
+    assert bt.compute_turnover(pd.DataFrame(index=["d1"])).tolist() == [0.0]
+
+
+def test_backtest_weights_turnover_and_parallel_parity(tmp_path) -> None:
+    d = _make_dossier()
+    dates = ["2023-12-29"] + [str(x.date()) for x in pd.date_range("2024-04-05", "2024-06-28", freq="W-FRI")]
+
+    serial = bt.run_backtest(dates, dossier=d, workers=1, output_dir=str(tmp_path))
+    parallel = bt.run_backtest(list(reversed(dates)), dossier=d, workers=4)
+
+    w = serial.weights
+    assert list(w.index) == sorted(dates)
+    pd.testing.assert_frame_equal(w, parallel.weights)
+
+    # 首期无历史数据 -> 失败并保持空仓；之后满仓到 target_exposure
+    assert serial.log[0]["ok"] is False and serial.log[0]["held_previous"] is True
+    assert w.iloc[0].sum() == 0.0
+    assert w.iloc[1:].sum(axis=1).round(4).eq(0.95).all()
+    assert (w.le(0.4 + 1e-9)).all().all()
+
+    expected = 0.5 * (w - w.shift(1).fillna(0.0)).abs().sum(axis=1)
+    assert serial.turnover.tolist() == pytest.approx(expected.tolist())
+    assert (tmp_path / "backtest_weights.csv").exists() and (tmp_path / "backtest_log.jsonl").exists()
@@ -0,0 +1,90 @@
+import csv
+import json
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from debate_mas.core import batch as b
+from debate_mas.core import engine as e
+
+
+def _patch_engine(monkeypatch: pytest.MonkeyPatch, calls: dict) -> None:
+    """只替换 LLM/图相关环节；batch 的装配/并发/汇总逻辑真实运行"""
+    monkeypatch.setattr(b, "CONFIG", SimpleNamespace(DATA_DIR="__DATA__", BATCH_MAX_WORKERS=4), raising=True)
+    monkeypatch.setattr(b.SkillRegistry, "load_all_skills", lambda force_reload=False: calls["skills"].append(1), raising=True)
+
+    def fake_load_dossier(mission: str, folder_path: str):
+        calls["load"].append(folder_path)
+        return {"dossier": True}
+
+    monkeypatch.setattr(e, "load_dossier", fake_load_dossier, raising=True)
+
+    def fake_setup_state(*, mission, ref_date, folder_path, seed_user_message, dossier=None):
+        calls["dossiers"].append(id(dossier))
+        return dossier, {"mission": mission, "ref_date": ref_date}
+
+    def fake_setup_llms(*, mission, dossier, ref_date, st):
+        return {}, None, None, None
+
+    def fake_run_graph(*, st, hunter_block, auditor_block, pm_block, verbose_summary):
+        calls["threads"].add(threading.get_ident())
+        time.sleep(0.2)
+        if st["ref_date"] == "bad":
+            raise RuntimeError("llm down")
+        return {
+            "round_idx": 1,
+            "stop_reason": "CONSENSUS_STOP",
+            "decisions": [
+                {"symbol": "510300", "action": "BUY", "weight": 0.6},
+                {"symbol": "159915", "action": "WATCH", "weight": 0.0},
+            ],
+        }
+
+    def fake_finalize(*, mission, ref_date, output_dir, final_state, verbose_summary):
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        memo = Path(output_dir) / "memo.md"
+        memo.write_text(mission, encoding="utf-8")
+        return {"memo": str(memo)}
+
+    monkeypatch.setattr(e, "_setup_dossier_and_state", fake_setup_state, raising=True)
+    monkeypatch.setattr(e, "_setup_prompts_tools_llms", fake_setup_llms, raising=True)
+    monkeypatch.setattr(e, "_run_graph", fake_run_graph, raising=True)
+    monkeypatch.setattr(e, "_finalize_and_render", fake_finalize, raising=True)
+
+
+def test_run_batch_shares_dossier_runs_concurrently_and_writes_summary(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    calls = {"skills": [], "load": [], "dossiers": [], "threads": set()}
+    _patch_engine(monkeypatch, calls)
+
+    jobs = [{"mission": f"组合{i}", "ref_date": f"2025-0{i + 1}-28"} for i in range(4)]
+    jobs.append(b.BatchJob(mission="坏任务", ref_date="bad", job_id="broken"))
+
+    t0 = time.time()
+    rows = b.run_batch(jobs, folder_path="/data", output_dir=str(tmp_path), workers=5)
+    elapsed = time.time() - t0
+
+    assert len(calls["skills"]) == 1 and calls["load"] == ["/data"]
+    assert len(set(calls["dossiers"])) == 1
+    assert elapsed < 0.6 and len(calls["threads"]) > 1
+
+    assert [r["job_id"] for r in rows] == ["job_000", "job_001", "job_002", "job_003", "broken"]
+    assert all(r["ok"] for r in rows[:4])
+    assert rows[0]["rounds"] == 2 and rows[0]["n_buy"] == 1
+    assert rows[0]["decisions"] == "510300:BUY:0.6000;159915:WATCH:0.0000"
+    assert rows[4]["ok"] is False and "llm down" in rows[4]["error"]
+    assert (tmp_path / "job_002" / "memo.md").read_text(encoding="utf-8") == "组合2"
+
+    lines = (tmp_path / "batch_summary.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(x)["job_id"] for x in lines] == [r["job_id"] for r in rows]
+    with (tmp_path / "batch_summary.csv").open(encoding="utf-8-sig") as f:
+        table = list(csv.DictReader(f))
+    assert list(table[0]) == b.SUMMARY_FIELDS
+    assert table[4]["ok"] == "False" and table[1]["stop_reason"] == "CONSENSUS_STOP"
+
+
+def test_run_batch_rejects_duplicate_job_ids():
+    with pytest.raises(ValueError):
+        b.run_batch([b.BatchJob("a", job_id="x"), b.BatchJob("b", job_id="x")], dossier=object())
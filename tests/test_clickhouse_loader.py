@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Dict, List
+
+import pandas as pd
+import pytest
+
+from debate_mas.loader import dual_mode_loader
+from debate_mas.loader.dual_mode_loader import DualModeLoader
+from debate_mas.loader.sql_templates import get_universal_query
+
+
+class _FakeClient:
+    """模拟 clickhouse_driver.Client.execute_iter：首元素是列类型，按 chunk_size 分块；不解析 WHERE"""
+
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def __init__(self, tables: Dict[str, pd.DataFrame], queries: List[str]):
+        self.tables = tables
+        self.queries = queries
+
+    def execute_iter(self, sql, with_column_types=False, settings=None, chunk_size=1):
+        self.queries.append(sql)
+        m = re.match(r"DESCRIBE TABLE (\w+)", sql)
+        if m:
+            header = [("name", "String"), ("type", "String")]
+            rows = [(c, "String") for c in self.tables[m.group(1)].columns]
+        else:
+            m = re.match(r"SELECT (.+?) FROM (\w+)", sql)
+            df = self.tables[m.group(2)]
+            cols = list(df.columns) if m.group(1) == "*" else [c.strip() for c in m.group(1).split(",")]
+            header = [(c, "String") for c in cols]
+            rows = list(df[cols].itertuples(index=False, name=None))
+            with _FakeClient.lock:
+                _FakeClient.active += 1
+                _FakeClient.max_active = max(_FakeClient.max_active, _FakeClient.active)
+            time.sleep(0.05)
+            with _FakeClient.lock:
+                _FakeClient.active -= 1
+        it = iter([header] + rows)
+        if chunk_size <= 1:  # 与 clickhouse_driver 一致：chunk_size=1 时不分块，直接产出裸行
+            yield from it
+            return
+        while True:
+            chunk = list(islice(it, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+
+class _FakeDatabase:
+    instances: List["_FakeDatabase"] = []
+    queries: List[str] = []
+
+    def __init__(self, config: Dict[str, Any], **kwargs: Any):
+        self.config = config
+        self.closed = False
+        _FakeDatabase.instances.append(self)
+
+    @contextmanager
+    def cursor(self):
+        yield _FakeClient(_FAKE_TABLES, _FakeDatabase.queries)
+
+    def fetch(self, sql: str):
+        raise AssertionError("不应再走整表 fetch")
+
+    def close(self) -> None:
+        self.closed = True
+
+
+_FAKE_TABLES = {
+    "etf_daily": pd.DataFrame(
+        {
+            "code": ["510300", "510500", "510300", "510500", "159915"],
+            "TradingDate": ["2024-01-02", "2024-01-02", "2024-01-03", "2024-01-03", "2024-01-03"],
+            "open": [3.1, 5.1, 3.2, 5.2, 2.1],
+            "close": [3.15, 5.15, 3.25, 5.25, 2.15],
+            "amount": [1e8, 2e8, 1.1e8, 2.1e8, 3e7],
+            "turnover": [0.1, 0.2, 0.3, 0.4, 0.5],
+        }
+    ),
+    "etf_basic": pd.DataFrame({"code": ["510300"], "cname": ["沪深300ETF"], "list_date": ["2012-05-28"], "pub_date": ["20050408"], "bp": [1000.0]}),
+    "govcn": pd.DataFrame({"title": ["政策"], "content": ["新能源"], "pub_date": ["2024-01-02"], "url": ["http://x"]}),
+    "csrc": pd.DataFrame({"title": ["公告"], "content": ["处罚"], "date": ["2024-01-02"], "from": ["csrc"]}),
+}
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    _FakeDatabase.instances.clear()
+    _FakeDatabase.queries.clear()
+    _FakeClient.max_active = 0
+    monkeypatch.setattr(dual_mode_loader, "ClickHouseDatabase", _FakeDatabase)
+    return _FakeDatabase
+
+
+def test_universal_query_emits_pruning_predicates() -> None:
+    sql = get_universal_query(
+        "etf_daily",
+        columns=["code", "TradingDate", "close"],
+        ref_date="2024-06-30",
+        lookback_days=30,
+        codes=["510500", "510300", "510300"],
+    )
+    assert sql.startswith("SELECT code, TradingDate, close FROM etf_daily WHERE 1 = 1")
+    assert "TradingDate >= toDate('2024-05-31') AND TradingDate < toDate('2024-06-30')" in sql
+    assert "code IN ('510300', '510500')" in sql
+    assert "LIMIT" not in sql
+
+    sql2 = get_universal_query("csrc", date_col="date", start_date="2024-01-01", filters={"src": ["a", "b'c"], "n": 1})
+    assert "src IN ('a', 'b\\'c')" in sql2 and "n = 1" in sql2
+    assert "date >= toDate('2024-01-01')" in sql2 and "date <" not in sql2
+    assert "code IN" not in get_universal_query("etf_daily") and "AND 0" in get_universal_query("etf_daily", codes=[])
+
+
+def test_load_from_clickhouse_streams_projected_blocks(fake_db) -> None:
+    loader = DualModeLoader()
+    d = loader.load_from_clickhouse(
+        mission="m",
+        table_name="etf_daily",
+        ref_date="2024-01-04",
+        lookback_days=10,
+        codes=["510300", "510500"],
+        block_rows=2,
+    )
+
+    # 一次性调用：本次临时建立的连接用完即关
+    assert _FakeDatabase.instances and all(db.closed for db in _FakeDatabase.instances)
+    assert not loader._sessions
+
+    queries = _FakeDatabase.queries
+    assert queries[0] == "DESCRIBE TABLE etf_daily"
+    sql = d.meta["sql"]
+    assert sql == queries[1]
+    # 只投影技能用到的列（open / turnover 不取），并带时间窗口 + 代码列表
+    assert sql.startswith("SELECT code, TradingDate, close, amount FROM etf_daily")
+    assert "code IN ('510300', '510500')" in sql and "LIMIT" not in sql
+
+    df = d.get_table("etf_daily")
+    assert list(df.columns) == ["code", "TradingDate", "close", "amount"]
+    assert len(df) == 5
+    # 分块读入后按 etf_daily schema 转类型
+    assert isinstance(df["code"].dtype, pd.StringDtype)
+    assert pd.api.types.is_datetime64_any_dtype(df["TradingDate"])
+    assert df["close"].dtype == "float64"
+    meta = d.tables_meta["etf_daily"]
+    assert meta["blocks"] == 3 and meta["load_ms"] >= 0
+
+
+def test_batch_load_shares_pool_window_and_schema_cache(fake_db) -> None:
+    with DualModeLoader() as loader:
+        _check_batch_load(loader)
+    # 退出 with 块时连接池关闭
+    assert all(db.closed for db in _FakeDatabase.instances)
+
+
+def _check_batch_load(loader: DualModeLoader) -> None:
+    d = loader.load_tables_from_clickhouse(mission="m", ref_date="2024-01-04", lookback_days=30)
+
+    # 一个案卷装下四张表，顺序与 DB_BATCH_TABLES 一致；并发查询、连接不超过池上限
+    assert d.list_tables() == ["etf_daily", "etf_basic", "govcn", "csrc"]
+    assert 1 < len(_FakeDatabase.instances) <= dual_mode_loader.DB_POOL_SIZE
+    assert _FakeClient.max_active > 1
+
+    sqls = {name: d.tables_meta[name]["sql"] for name in d.list_tables()}
+    # 共享时间窗口：按各表自己的时间列；etf_basic 是静态表，不加窗口（其 pub_date 是指数发布日）
+    assert "TradingDate >= toDate('2023-12-05')" in sqls["etf_daily"]
+    assert "pub_date >= toDate('2023-12-05') AND pub_date < toDate('2024-01-04')" in sqls["govcn"]
+    assert "date < toDate('2024-01-04')" in sqls["csrc"]
+    assert "toDate" not in sqls["etf_basic"]
+    # 投影：库里多出来的列不取
+    assert sqls["govcn"].startswith("SELECT title, content, pub_date FROM govcn")
+    assert "bp" not in sqls["etf_basic"] and "from" not in sqls["csrc"].split("FROM")[0]
+
+    # 表结构按会话缓存：再批量读一次 / inspect_table 都不再 DESCRIBE，也不建案卷
+    n_describe = sum(q.startswith("DESCRIBE") for q in _FakeDatabase.queries)
+    assert n_describe == 4
+    loader.load_tables_from_clickhouse(mission="m2", tables={"daily": {"table_name": "etf_daily", "codes": ["510300"]}})
+    assert loader.inspect_table("govcn") == ["title", "content", "pub_date", "url"]
+    assert sum(q.startswith("DESCRIBE") for q in _FakeDatabase.queries) == n_describe
+    assert loader.inspect_table("govcn", refresh=True) == ["title", "content", "pub_date", "url"]
+    assert sum(q.startswith("DESCRIBE") for q in _FakeDatabase.queries) == n_describe + 1
+    assert not any(db.closed for db in _FakeDatabase.instances)
+
+
+def test_session_pool_blocks_until_a_connection_is_returned() -> None:
+    from debate_mas.loader.clickhouse_reader import ClickHouseSession
+
+    session = ClickHouseSession(lambda: _FakeDatabase(config={}), pool_size=1)
+    got: List[float] = []
+
+    def _borrow() -> None:
+        with session.client():
+            got.append(time.perf_counter())
+
+    with session.client():
+        t = threading.Thread(target=_borrow)
+        t.start()
+        time.sleep(0.1)
+        assert not got  # 池满：等待中
+        released = time.perf_counter()
+    t.join(timeout=2)
+    assert got and got[0] >= released and session.connections == 1
+
+    session.close()
+    with pytest.raises(RuntimeError):
+        with session.client():
+            pass
+
+
+def test_read_query_typed_handles_single_row_blocks() -> None:
+    from debate_mas.loader.clickhouse_reader import read_query_typed
+
+    client = _FakeClient(_FAKE_TABLES, [])
+    sql = "SELECT code, TradingDate, close FROM etf_daily"
+    df1, n1 = read_query_typed(client, sql, table_name="etf_daily", block_rows=1)
+    df2, _ = read_query_typed(client, sql, table_name="etf_daily", block_rows=1000)
+    pd.testing.assert_frame_equal(df1, df2)
+    assert len(df1) == 5 and n1 == 6  # 表头块 + 每行一块
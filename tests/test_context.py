@@ -0,0 +1,52 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from debate_mas.core import context as cx
+from debate_mas.core import graph as g
+
+
+def _sniper_result(n: int) -> str:
+    items = [{"symbol": f"51{i:04d}", "score": i / n, "extra": {"note": "x" * 80}} for i in range(n)]
+    return json.dumps({"success": True, "data": {"items": items}, "insight": "召回完成", "visuals": []}, ensure_ascii=False)
+
+
+def _round(i: int, n_items: int):
+    call = AIMessage(content="", tool_calls=[{"name": "quantitative_sniper", "args": {"round": i}, "id": f"c{i}"}])
+    return [call, ToolMessage(content=_sniper_result(n_items), tool_call_id=f"c{i}"), AIMessage(content=f"round {i} done")]
+
+
+def test_prune_digests_old_tool_messages_and_keeps_current_round():
+    msgs = [HumanMessage(content="go")] + _round(0, 200) + _round(1, 200)
+    keep_from = 4  # round 1 起原样保留
+    before = cx.count_tokens(msgs)
+
+    out, stats = cx.prune_messages(msgs, keep_from=keep_from, budget_tokens=before * 2 // 3, top_n=3)
+    assert stats["pruned_n"] == 1 and stats["tokens_before"] == before
+    assert stats["tokens_after"] == cx.count_tokens(out) < before * 2 // 3
+    digest = json.loads(out[2].content)
+    assert digest == {"pruned": True, "success": True, "insight": "召回完成", "n_items": 200, "top_symbols": ["510000", "510001", "510002"]}
+    assert out[2].tool_call_id == "c0"
+    assert out[keep_from:] == msgs[keep_from:]
+    assert msgs[2].content == _sniper_result(200)  # 入参不变
+
+    # 预算内不裁剪
+    same, stats2 = cx.prune_messages(msgs, keep_from=keep_from, budget_tokens=before + 1)
+    assert same == msgs and stats2["pruned_n"] == 0
+
+
+def test_agent_prompt_records_prune_trace(monkeypatch: pytest.MonkeyPatch):
+    cfg = SimpleNamespace(CONTEXT_PRUNE=True, ROLE_CONTEXT_TOKEN_BUDGET={"auditor": 500}, CONTEXT_PRUNE_TOP_N=5)
+    monkeypatch.setattr(cx, "CONFIG", cfg, raising=True)
+    state = {"messages": [HumanMessage(content="go")] + _round(0, 100) + _round(1, 5), "_round_msg_start": 4, "round_idx": 1, "tool_trace": []}
+    rb = g.RoleBlock(role="auditor", system_prompt="SYS", llm_invoke=lambda ms: AIMessage(content=""), tool_node=None, postprocess=lambda s: None)
+
+    prompt = g._build_agent_prompt(rb, state)
+    assert json.loads(prompt[2 + 2].content)["pruned"] is True
+    assert len(state["messages"][2].content) > 1000  # state 本身不改
+
+    trace = [t for t in state["tool_trace"] if t["tool"] == "__context_prune__"]
+    assert len(trace) == 1 and trace[0]["role"] == "auditor"
+    assert trace[0]["args"]["tokens_before"] > trace[0]["args"]["tokens_after"]
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import codecs
+from pathlib import Path
+
+import pandas as pd
+
+from debate_mas.loader.csv_reader import read_csv_typed, sniff_encoding
+from debate_mas.loader.dual_mode_loader import DualModeLoader
+
+
+def test_sniff_encoding_from_leading_bytes(tmp_path: Path) -> None:
+    p = tmp_path / "a.csv"
+    p.write_bytes(codecs.BOM_UTF8 + "code\n510300\n".encode("utf-8"))
+    assert sniff_encoding(str(p)) == "utf-8-sig"
+
+    p.write_bytes("code,name\n510300,沪深300\n".encode("utf-8"))
+    assert sniff_encoding(str(p)) == "utf-8"
+
+    # 表头纯 ASCII，靠数据行判定
+    p.write_bytes("code,name\n510300,沪深300\n".encode("gb18030"))
+    assert sniff_encoding(str(p)) == "gb18030"
+
+    # 样本内是 ASCII、后文才出现 gb18030：读取时按编码列表重试
+    p.write_bytes(("code,name\n" + "000001,a\n" * 50 + "510300,沪深300\n").encode("gb18030"))
+    assert sniff_encoding(str(p), sample_bytes=64) == "utf-8"
+    df, enc = read_csv_typed(str(p), table_name="etf_basic", encoding="utf-8")
+    assert enc == "gb18030" and df["name"].iloc[-1] == "沪深300"
+
+
+def test_etf_daily_schema_and_chunked_read(tmp_path: Path) -> None:
+    p = tmp_path / "etf_2025_data.csv"
+    pd.DataFrame({
+        "code": ["000001", "159915", "000001", "159915", "510300"],
+        "date": ["2025-01-02", "2025-01-02", "2025-01-03", "bad", "2025-01-03"],
+        "open": [1.0, 2.0, 1.1, 2.1, 3.0],
+        "close": [1.05, 2.05, 1.15, 2.15, 3.05],
+        "amount": [1e6, 2e6, 1.1e6, 2.1e6, 3e6],
+    }).to_csv(p, index=False)
+
+    df, _ = read_csv_typed(str(p), table_name="etf_daily")
+    assert df["code"].tolist()[:2] == ["000001", "159915"]  # 保留前导 0
+    assert df["code"].dtype == "string"  # 显式 "string"：pandas 2.x 下同样不是 object
+    assert pd.api.types.is_datetime64_any_dtype(df["date"]) and df["date"].isna().sum() == 1
+    assert df["open"].dtype == "float32"
+    assert df["close"].dtype == "float64" and df["amount"].dtype == "float64"
+
+    chunked, _ = read_csv_typed(str(p), table_name="etf_daily", chunk_rows=2)
+    pd.testing.assert_frame_equal(chunked, df)
+
+    # 未登记 schema 的表只保护 code 列
+    other, _ = read_csv_typed(str(p), table_name="misc")
+    assert other["code"].iloc[0] == "000001" and other["open"].dtype == "float64"
+
+    # loader（含惰性表）走同一 schema
+    for lazy in (False, True):
+        d = DualModeLoader().load_from_folder(mission="m", folder_path=str(tmp_path), lazy=lazy)
+        pd.testing.assert_frame_equal(d.get_table("etf_daily"), df)
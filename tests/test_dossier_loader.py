@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import os
+import pickle
 from pathlib import Path
 from typing import Any, Dict
 
+import numpy as np
 import pandas as pd
+import pytest
 
 from debate_mas.loader.dossier import Dossier
 from debate_mas.loader.dual_mode_loader import DualModeLoader
@@ -115,6 +119,95 @@ def test_loader_loads_minimal_supported_files(tmp_path: Path) -> None:
     assert len(dossier.texts_meta) >= 2
 
 
+def test_parallel_load_matches_serial_order_and_records_timings(tmp_path: Path) -> None:
+    docx = pytest.importorskip("docx")
+    for name in ["c_tbl", "a_tbl", "b_tbl"]:
+        pd.DataFrame({"code": ["510300", "159915"], "v": [1.0, 2.0]}).to_csv(tmp_path / f"{name}.csv", index=False)
+    (tmp_path / "z_note.md").write_text("# z", encoding="utf-8")
+    for name in ["y_doc", "x_doc"]:
+        doc = docx.Document()
+        doc.add_paragraph(f"para of {name}")
+        doc.save(str(tmp_path / f"{name}.docx"))
+    (tmp_path / "broken.csv").write_bytes(b"")  # 读取失败不影响其它文件
+
+    loader = DualModeLoader()
+    serial = loader.load_from_folder(mission="m", folder_path=str(tmp_path))
+    fast = loader.load_from_folder(mission="m", folder_path=str(tmp_path), parallel=True, max_workers=2)
+
+    # 按文件名顺序合并，与串行一致
+    assert fast.list_tables() == serial.list_tables() == ["a_tbl", "b_tbl", "c_tbl"]
+    assert fast.unstructured_text == serial.unstructured_text
+    assert [m["source"] for m in fast.texts_meta] == ["x_doc.docx", "y_doc.docx", "z_note.md"]
+    for name in fast.list_tables():
+        pd.testing.assert_frame_equal(fast.get_table(name), serial.get_table(name))
+
+    # 每个文件的读取耗时留痕（不进 frozen_view）
+    assert all(m["load_ms"] >= 0 for m in fast.tables_meta.values())
+    assert all(m["load_ms"] >= 0 for m in fast.texts_meta)
+    assert "load_ms" not in fast.frozen_view()["tables"][0]
+
+
+def test_lazy_load_probes_headers_and_parses_on_first_get_table(tmp_path: Path) -> None:
+    pd.DataFrame({"code": ["510300", "159915", "512880"], "close": [1.5, 2.25, 0.9]}).to_csv(tmp_path / "etf_2025_data.csv", index=False)
+    pd.DataFrame({"code": ["510300"], "name": ["沪深300ETF"]}).to_csv(tmp_path / "sampled_etf_basic.csv", index=False, encoding="gb18030")
+
+    d = DualModeLoader().load_from_folder(mission="m", folder_path=str(tmp_path), lazy=True)
+
+    # 只探测：frozen_view 已有表头 / 行数，但没有解析任何表
+    assert not d.is_table_loaded("etf_daily") and not d.is_table_loaded("etf_basic")
+    assert d.tables_meta["etf_basic"]["description"] == "CSV Source (encoding=gb18030)"
+    view = {t["name"]: t for t in d.frozen_view()["tables"]}
+    assert view["etf_daily"]["columns"] == ["code", "close"] and view["etf_daily"]["rows"] == 3
+    assert d.tables_meta["etf_daily"]["rows_estimated"] is True
+
+    # 序列化不触发读取
+    clone = pickle.loads(pickle.dumps(d))
+    assert not clone.is_table_loaded("etf_daily") and not d.is_table_loaded("etf_daily")
+
+    basic = d.get_table("etf_basic")
+    assert basic["name"].tolist() == ["沪深300ETF"]
+    assert d.is_table_loaded("etf_basic") and not d.is_table_loaded("etf_daily")
+    assert d.get_table("etf_basic") is basic  # 只读一次
+    assert "rows_estimated" not in d.tables_meta["etf_basic"] and d.tables_meta["etf_basic"]["load_ms"] >= 0
+
+    eager = DualModeLoader().load_from_folder(mission="m", folder_path=str(tmp_path))
+    pd.testing.assert_frame_equal(clone.get_table("etf_2025_data"), eager.get_table("etf_daily"))
+
+
+def test_append_rows_dedups_and_extends_date_index(tmp_path: Path) -> None:
+    pd.DataFrame({
+        "code": ["000001", "159915", "000001", "159915"],
+        "date": ["2025-01-02", "2025-01-02", "2025-01-03", "2025-01-03"],
+        "close": [1.0, 2.0, 1.1, 2.1],
+    }).to_csv(tmp_path / "etf_2025_data.csv", index=False)
+    loader = DualModeLoader()
+    d = loader.load_from_folder(mission="m", folder_path=str(tmp_path))
+    idx = d.date_index("etf_daily", "date")
+    assert idx is not None and idx.order == "asc"
+
+    delta = tmp_path / "delta.csv"
+    pd.DataFrame({"code": ["000001", "159915", "000001"], "date": ["2025-01-06", "2025-01-06", "2025-01-06"], "close": [1.2, 2.2, 1.25]}).to_csv(delta, index=False)
+    v = d.version
+    stats = loader.append_from_csv(d, "etf_2025_data", str(delta))
+    assert stats == {"appended": 2, "replaced": 0, "rows": 6} and d.version == v + 1
+    t = d.get_table("etf_daily")
+    assert t["code"].tolist()[-2:] == ["159915", "000001"] and t["close"].tolist()[-1] == 1.25
+    assert d.tables_meta["etf_daily"]["rows"] == 6
+
+    # 日期索引增量延伸（不重建），切片与整体重建一致
+    assert ("etf_daily", ("date_index", "date")) in d._derived
+    fresh = Dossier.create_empty(mission="m")
+    fresh.add_table("etf_daily", t.copy())
+    for ref in ("2025-01-03", "2025-01-06", "2025-01-07"):
+        pd.testing.assert_frame_equal(d.slice_before("etf_daily", ref, "date"), fresh.slice_before("etf_daily", ref, "date"))
+
+    # 覆盖旧行（修正数据）：旧行删除，索引按需重建
+    stats = d.append_rows("etf_daily", pd.DataFrame({"code": ["159915"], "date": ["2025-01-02"], "close": [9.0]}))
+    assert stats == {"appended": 1, "replaced": 1, "rows": 6}
+    out = d.slice_before("etf_daily", "2025-01-03", "date")
+    assert sorted(out["close"].tolist()) == [1.0, 9.0]
+
+
 def test_get_table_and_list_tables_are_available(tmp_path: Path) -> None:
     csv_path = tmp_path / "demo.csv"
     pd.DataFrame([{"x": 1}]).to_csv(csv_path, index=False, encoding="utf-8-sig")
@@ -129,4 +222,265 @@ def test_get_table_and_list_tables_are_available(tmp_path: Path) -> None:
     # 不强绑具体表名，只验证 get_table 能取到某张表
     t0 = names[0]
     df0 = dossier.get_table(t0)
-    assert df0 is None or isinstance(df0, pd.DataFrame)
\ No newline at end of file
+    assert df0 is None or isinstance(df0, pd.DataFrame)
+
+def test_get_derived_cached_until_table_replaced() -> None:
+    d = Dossier.create_empty(mission="x")
+    d.add_table(name="etf_daily", df=pd.DataFrame({"code": ["A"], "close": [1.0]}), aliases=["daily"])
+    calls = []
+
+    def _build(df: pd.DataFrame) -> int:
+        calls.append(1)
+        return len(df)
+
+    v0 = d.version
+    assert d.get_derived("daily", "n", _build) == 1
+    assert d.get_derived("etf_daily", "n", _build) == 1
+    assert len(calls) == 1  # 别名与正名共享同一份缓存
+
+    d.add_table(name="etf_daily", df=pd.DataFrame({"code": ["A", "B"], "close": [1.0, 2.0]}))
+    assert d.version == v0 + 1
+    assert d.get_derived("etf_daily", "n", _build) == 2
+    assert len(calls) == 2
+    assert d.get_derived("missing", "n", _build) is None
+
+
+def test_derived_cache_is_lru_bounded(monkeypatch) -> None:
+    from debate_mas.loader import dossier as dossier_mod
+
+    monkeypatch.setattr(dossier_mod, "DERIVED_CACHE_MAX_ENTRIES", 3)
+    d = Dossier.create_empty(mission="x")
+    d.add_table(name="etf_daily", df=pd.DataFrame({"code": ["A"], "close": [1.0]}))
+    calls = []
+
+    def _build(df: pd.DataFrame) -> int:
+        calls.append(1)
+        return len(df)
+
+    d.get_derived("etf_daily", ("prepared_daily", None), _build)
+    for ref in ("2025-01-02", "2025-01-03", "2025-01-06"):
+        d.get_derived("etf_daily", ("prepared_daily", None), _build)  # 常用的基表条目保持最近使用
+        d.get_derived("etf_daily", ("prepared_daily", ref), _build)
+    assert len(d._derived) == 3
+    assert ("etf_daily", ("prepared_daily", None)) in d._derived
+    assert ("etf_daily", ("prepared_daily", "2025-01-02")) not in d._derived  # 最久未用的 ref_date 被淘汰
+    assert len(calls) == 4
+
+
+def test_get_derived_and_version_bumps_are_thread_safe() -> None:
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    d = Dossier.create_empty(mission="x")
+    d.add_table(name="etf_daily", df=pd.DataFrame({"code": ["A"], "close": [1.0]}))
+    calls = []
+
+    def _build(df: pd.DataFrame) -> int:
+        calls.append(threading.get_ident())
+        time.sleep(0.02)
+        return len(df)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(lambda _: d.get_derived("etf_daily", "n", _build), range(16))) == [1] * 16
+    assert len(calls) == 1  # 并发未命中只构建一次
+
+    v0 = d.version
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: d.add_table(name=f"t{i % 4}", df=pd.DataFrame({"a": [i]})), range(200)))
+    assert d.version == v0 + 200
+    assert sum(d.table_version(f"t{i}") for i in range(4)) == 200
+
+
+def test_prepared_daily_shared_across_skills() -> None:
+    from debate_mas.skills.base import SkillContext
+    from debate_mas.skills.inventory.market_sentry.scripts.handler import SkillHandler as Sentry
+    from debate_mas.skills.inventory.quantitative_sniper.scripts.handler import SkillHandler as Sniper
+
+    dates = pd.date_range("2025-01-01", periods=40, freq="D")
+    raw = pd.DataFrame(
+        [{"Code": c, "TradingDate": str(t.date()), "Close": 100 + i, "Amount": 1e9} for c in ("A", "B") for i, t in enumerate(dates)]
+    )
+    d = Dossier.create_empty(mission="x")
+    d.add_table(name="etf_daily", df=raw)
+    ctx = SkillContext(dossier=d, agent_role="hunter", ref_date="2025-02-01")
+
+    sniper, sentry = Sniper(), Sentry()
+    p1 = sniper.get_prepared_daily(ctx)
+    assert list(p1.columns) == ["code", "date", "close", "amount"]
+    assert p1["date"].max() < pd.Timestamp("2025-02-01")
+
+    assert sniper.execute(ctx, strategy="momentum", window=10).success
+    assert sentry.execute(ctx, symbols=["A", "B"]).success
+    assert sentry.get_prepared_daily(ctx) is p1
+    sub = sniper.get_entity_data(ctx, "etf_daily", "A")
+    assert len(sub) == len(p1[p1["code"] == "A"])
+    assert list(sub.columns) == list(raw.columns)  # 保持原表列名，不暴露标准化副本
+    assert sub["TradingDate"].is_monotonic_increasing and (sub["Code"] == "A").all()
+
+    # 替换原表后缓存失效
+    d.add_table(name="etf_daily", df=raw.head(10))
+    assert len(sniper.get_prepared_daily(ctx)) == 10
+
+
+def test_apply_date_filter_fast_path_matches_slow_path() -> None:
+    from debate_mas.skills.base import BaseFinanceSkill
+
+    class _Skill(BaseFinanceSkill):
+        def execute(self, ctx, **kwargs):  # pragma: no cover
+            raise NotImplementedError
+
+    dates = ["2025-01-03", "2025-01-01", "bad", "2025-01-05", "2025-01-02", "2025-01-04"]
+    tables = {
+        "unsorted": pd.DataFrame({"date": dates, "v": range(6)}),
+        "desc": pd.DataFrame({"date": sorted([x for x in dates if x != "bad"], reverse=True), "v": range(5)}),
+        "asc_dt": pd.DataFrame({"TradingDate": pd.to_datetime(sorted(x for x in dates if x != "bad")), "v": range(5)}),
+    }
+    d = Dossier.create_empty(mission="x")
+    for k, v in tables.items():
+        d.add_table(name=k, df=v)
+
+    skill = _Skill()
+    for name, df in tables.items():
+        slow = skill.apply_date_filter(df, "2025-01-04")
+        fast = skill.apply_date_filter(df, "2025-01-04", dossier=d, table_name=name)
+        assert fast.attrs["date_filter"]["fast_path"] is True
+        assert slow.attrs["date_filter"]["fast_path"] is False
+        pd.testing.assert_frame_equal(fast, slow)
+
+    # 传入的不是案卷原表时不走快路径
+    other = tables["desc"].copy()
+    out = skill.apply_date_filter(other, "2025-01-04", dossier=d, table_name="desc")
+    assert out.attrs["date_filter"]["fast_path"] is False
+
+    # 未切割的提前返回同样带标记，且不改原表的 attrs
+    cases = [
+        (tables["desc"], None, "no_ref_date"),
+        (tables["desc"], "not-a-date", "invalid_ref_date"),
+        (pd.DataFrame({"v": [1, 2]}), "2025-01-04", "no_date_col"),
+        (tables["desc"].head(0), "2025-01-04", "empty"),
+    ]
+    for df, ref, reason in cases:
+        out = skill.apply_date_filter(df, ref)
+        assert out.attrs["date_filter"]["skipped"] == reason and out.attrs["date_filter"]["fast_path"] is False
+        assert len(out) == len(df) and "date_filter" not in df.attrs
+
+
+def test_snapshot_roundtrip_and_reuse_until_source_changes(tmp_path: Path, monkeypatch) -> None:
+    src = tmp_path / "data"
+    src.mkdir()
+    pd.DataFrame({"code": ["510300", "159915"], "close": [1.5, 2.25]}).to_csv(src / "etf_2025_data.csv", index=False)
+    (src / "note.md").write_text("# hello", encoding="utf-8")
+    snap = tmp_path / "snap"
+
+    loader = DualModeLoader()
+    first = loader.load_from_folder(mission="m1", folder_path=str(src), snapshot_dir=str(snap))
+    assert (snap / "CURRENT").exists() and (snap / (snap / "CURRENT").read_text() / "manifest.json").exists()
+
+    # 源未变：直接读快照，不再解析 CSV
+    def _no_csv(*args, **kwargs):
+        raise AssertionError("应命中快照")
+
+    monkeypatch.setattr(DualModeLoader, "_read_files", _no_csv)
+    again = loader.load_from_folder(mission="m2", folder_path=str(src), snapshot_dir=str(snap))
+    assert again.mission == "m2"
+    pd.testing.assert_frame_equal(again.get_table("etf_daily"), first.get_table("etf_daily"))
+    assert again.get_table("etf_2025_data") is not None  # 别名随快照恢复
+    assert again.unstructured_text == first.unstructured_text
+    assert again.tables_meta == first.tables_meta and again.texts_meta == first.texts_meta
+    monkeypatch.undo()
+
+    # 源文件变化（大小/mtime）-> 重新加载并刷新快照
+    pd.DataFrame({"code": ["510300"], "close": [9.0]}).to_csv(src / "etf_2025_data.csv", index=False)
+    fresh = loader.load_from_folder(mission="m3", folder_path=str(src), snapshot_dir=str(snap))
+    assert fresh.get_table("etf_daily")["close"].tolist() == [9.0]
+    assert DualModeLoader().load_snapshot(str(snap)).get_table("etf_daily")["close"].tolist() == [9.0]
+
+    # lazy：只读 manifest，表按需读取
+    lazy = DualModeLoader().load_snapshot(str(snap), lazy=True)
+    assert lazy.tables_meta == fresh.tables_meta and not lazy.is_table_loaded("etf_daily")
+    assert lazy.get_table("etf_daily")["close"].tolist() == [9.0]
+
+
+def test_snapshot_keeps_dtypes_and_falls_back_for_unusual_frames(tmp_path: Path) -> None:
+    d = Dossier.create_empty(mission="x")
+    d.meta.update({"k": "v", "ts": pd.Timestamp("2025-01-02"), "n": np.int64(3), "pair": ("a", 1), "tags": {"x"}})
+    d.add_table("typed", pd.DataFrame({
+        "date": pd.to_datetime(["2025-01-02", "2025-01-03"]),
+        "code": pd.Series(["000001", "000002"], dtype="category"),
+        "v": pd.Series([1.5, 2.5], dtype="float32"),
+    }))
+    d.add_table("indexed", pd.DataFrame({"x": [1, 2]}, index=["a", "b"]))
+    d.add_text("body", source="s.txt")
+    d.save_snapshot(str(tmp_path / "snap"))
+
+    back = DualModeLoader().load_snapshot(str(tmp_path / "snap"))
+    assert back.mission == "x" and back.meta == d.meta and back.version == 2
+    assert isinstance(back.meta["ts"], pd.Timestamp) and type(back.meta["n"]) is int
+    pd.testing.assert_frame_equal(back.get_table("typed"), d.get_table("typed"))
+    pd.testing.assert_frame_equal(back.get_table("indexed"), d.get_table("indexed"))
+    assert back.unstructured_text == d.unstructured_text
+
+    # 编码不了的 meta 值直接报错，不静默转字符串
+    d.meta["obj"] = object()
+    with pytest.raises(TypeError):
+        d.save_snapshot(str(tmp_path / "snap2"))
+    assert not (tmp_path / "snap2").exists()
+
+
+def test_snapshot_rewrite_keeps_lazy_tables_of_earlier_loads(tmp_path: Path) -> None:
+    from debate_mas.loader import snapshot
+
+    snap = str(tmp_path / "snap")
+    d = Dossier.create_empty(mission="x")
+    d.add_table("a", pd.DataFrame({"v": [1, 2]}))
+    d.save_snapshot(snap)
+    lazy = DualModeLoader().load_snapshot(snap, lazy=True)
+
+    # 重写快照（表顺序也变了）：已按需加载的案卷仍读自己那一版，新读者读到新版
+    d2 = Dossier.create_empty(mission="y")
+    d2.add_table("b", pd.DataFrame({"w": [9]}))
+    d2.add_table("a", pd.DataFrame({"v": [7]}))
+    d2.save_snapshot(snap)
+    assert lazy.get_table("a")["v"].tolist() == [1, 2]
+    assert DualModeLoader().load_snapshot(snap).get_table("a")["v"].tolist() == [7]
+
+    # 旧版本只保留 KEEP_VERSIONS 个
+    for _ in range(3):
+        d2.save_snapshot(snap)
+    versions = [p for p in os.listdir(snap) if p.startswith("v-")]
+    assert len(versions) == snapshot.KEEP_VERSIONS and not any(p.startswith(".") for p in os.listdir(snap))
+
+
+def test_mmap_snapshot_pickles_as_path_until_tables_change(tmp_path: Path) -> None:
+    pytest.importorskip("pyarrow")
+    d = Dossier.create_empty(mission="x")
+    d.add_table("etf_daily", pd.DataFrame({"code": ["510300"] * 1000, "close": range(1000)}), aliases=["daily"])
+    d.save_snapshot(str(tmp_path / "snap"))
+
+    mapped = DualModeLoader().load_snapshot(str(tmp_path / "snap"), mission="m", mmap=True)
+    assert mapped.is_mmap_backed
+    pd.testing.assert_frame_equal(mapped.get_table("daily"), d.get_table("etf_daily"))
+
+    blob = pickle.dumps(mapped)
+    assert len(blob) < 1000  # 只含快照路径 + mission/meta
+    clone = pickle.loads(blob)
+    assert clone.is_mmap_backed and clone.mission == "m"
+    pd.testing.assert_frame_equal(clone.get_table("etf_daily"), d.get_table("etf_daily"))
+
+    # 文本 / 别名 / 表元信息不改版本号：仍按路径序列化，但这些改动要带到子进程
+    mapped.add_text("新闻正文", source="news.txt")
+    mapped.register_table_aliases({"px": "etf_daily"})
+    mapped.tables_meta["etf_daily"]["description"] = "日线"
+    assert mapped.is_mmap_backed
+    clone = pickle.loads(pickle.dumps(mapped))
+    assert clone.is_mmap_backed
+    assert clone.unstructured_text == mapped.unstructured_text and clone.texts_meta == mapped.texts_meta
+    assert clone.resolve_table_name("px") == "etf_daily" and clone.resolve_table_name("daily") == "etf_daily"
+    assert clone.tables_meta["etf_daily"]["description"] == "日线"
+    assert clone.structured_data.meta_sink is clone.tables_meta
+
+    # 加载后改动过表：退回常规序列化
+    mapped.add_table("extra", pd.DataFrame({"a": [1]}))
+    assert not mapped.is_mmap_backed
+    assert pickle.loads(pickle.dumps(mapped)).list_tables() == ["etf_daily", "extra"]
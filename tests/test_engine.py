@@ -141,7 +141,10 @@ def _patch_graph_and_renderer(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
         def stream(self, _st, stream_mode="values"):
             yield self._final_state
 
-    def fake_build_graph(*, hunter, auditor, pm):
+        async def ainvoke(self, _st):
+            return self._final_state
+
+    def fake_build_graph(*, hunter, auditor, pm, use_async=False):
         final_state = {
             "round_idx": 0,
             "stable_rounds": 0,
@@ -336,4 +339,45 @@ def test_run_entrypoint_smoke(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
     )
 
     assert isinstance(artifacts, dict)
-    assert "memo" in artifacts
\ No newline at end of file
+    assert "memo" in artifacts
+
+def test_arun_end_to_end_with_async_graph(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    import asyncio
+
+    _patch_config(monkeypatch, VERBOSE=False)
+    _patch_llm(monkeypatch)
+    _patch_loader_and_state(monkeypatch)
+    _patch_prompts_tools(monkeypatch)
+    _patch_graph_and_renderer(monkeypatch, tmp_path)
+    _patch_skill_registry(monkeypatch)
+
+    artifacts = asyncio.run(e.arun("m", ref_date="2025-10-26", output_dir=str(tmp_path)))
+    assert "memo" in artifacts
+    assert Path(artifacts["transcript"]).exists()
+
+
+def test_arun_many_respects_concurrency_limit_and_order(monkeypatch: pytest.MonkeyPatch):
+    import asyncio
+
+    _patch_config(monkeypatch, ASYNC_MAX_CONCURRENCY=3)
+    _patch_skill_registry(monkeypatch)
+    active = {"now": 0, "peak": 0}
+
+    async def fake_arun(mission: str, **kwargs):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.02)
+        active["now"] -= 1
+        if mission == "bad":
+            raise RuntimeError("boom")
+        return {"mission": mission, "output_dir": kwargs["output_dir"], "load_skills": kwargs["load_skills"]}
+
+    monkeypatch.setattr(e, "arun", fake_arun, raising=True)
+
+    jobs = [{"mission": f"m{i}"} for i in range(8)] + [{"mission": "bad", "output_dir": "x"}]
+    outs = asyncio.run(e.arun_many(jobs))
+
+    assert active["peak"] == 3
+    assert [o["mission"] for o in outs[:8]] == [f"m{i}" for i in range(8)]
+    assert outs[0]["output_dir"].endswith("job_000") and outs[0]["load_skills"] is False
+    assert isinstance(outs[8], RuntimeError)
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from debate_mas.loader.dossier import Dossier
+from debate_mas.skills.base import SkillContext
+from debate_mas.skills.inventory.forensic_detective.scripts.handler import SkillHandler
+from debate_mas.skills.text_index import AhoCorasick
+
+
+def test_aho_corasick_matches_substring_semantics() -> None:
+    patterns = ["he", "she", "his", "hers", "510300", "沪深300ETF", "300"]
+    ac = AhoCorasick(patterns + ["", "he"])
+    assert len(ac) == len(patterns)
+
+    for text in ["ushers", "this", "买入沪深300ETF(510300)", "", "h"]:
+        assert ac.find_all(text) == {p for p in patterns if p in text}
+
+    assert ac.index_rows(["she", "x", "hers"], row_ids=[4, 7, 9]) == {"she": [4], "he": [4, 9], "hers": [9]}
+
+
+def _loop_audit_news(sym: str, cname: str, df_news: pd.DataFrame, ref_date: pd.Timestamp, lookback: int) -> Optional[str]:
+    """逐行 iterrows 参考实现（即倒排索引替换前的口径），返回命中描述"""
+    news = df_news.copy()
+    news["date"] = pd.to_datetime(news["date"], errors="coerce")
+    news = news.dropna(subset=["date"])
+    news = news[(news["date"] >= ref_date - timedelta(days=lookback)) & (news["date"] <= ref_date)]
+    keywords = [sym] + ([cname] if len(cname) > 2 else [])
+    for _, r in news.iterrows():
+        text = " ".join(str(r.get(c, "")) for c in ("title", "content"))
+        kw = next((k for k in keywords if k in text), "")
+        if kw and any(neg in text for neg in SkillHandler.NEGATIVE_TERMS):
+            return f"{kw}涉及{r['title']}"
+    return None
+
+
+def _make_tables(seed: int = 5):
+    rng = np.random.default_rng(seed)
+    basic = pd.DataFrame(
+        {
+            "code": [f"{510000 + i}" for i in range(20)],
+            "cname": [f"测试主题{i}ETF" for i in range(20)],
+            "mgt_fee": 0.15,
+            "list_date": "2020-01-01",
+        }
+    )
+    rows = []
+    for i, d in enumerate(pd.date_range("2025-01-01", periods=200, freq="D")):
+        j = int(rng.integers(0, 20))
+        mention = basic.loc[j, "code"] if rng.random() < 0.5 else basic.loc[j, "cname"]
+        neg = "被立案调查" if rng.random() < 0.5 else "发布公告"
+        date = "bad-date" if i % 37 == 0 else str(d.date())
+        rows.append({"title": f"公告{i}", "date": date, "content": f"{mention} {neg}"})
+    news = pd.DataFrame(rows).sample(frac=1.0, random_state=seed).reset_index(drop=True)
+    return basic, news
+
+
+@pytest.mark.parametrize("ref_date,lookback", [("2025-04-01", 30), ("2025-07-20", 90), ("2025-12-31", 365)])
+def test_news_index_matches_iterrows_loop(ref_date: str, lookback: int) -> None:
+    basic, news = _make_tables()
+    d = Dossier.create_empty(mission="x")
+    d.add_table(name="etf_basic", df=basic)
+    d.add_table(name="csrc", df=news)
+    ctx = SkillContext(dossier=d, agent_role="auditor", ref_date=ref_date)
+
+    res = SkillHandler().execute(ctx, symbols=basic["code"].tolist(), lookback=lookback)
+    assert res.success
+
+    ref = pd.Timestamp(ref_date)
+    visible = news[pd.to_datetime(news["date"], errors="coerce") < ref]
+    hits = 0
+    for item, (_, row) in zip(res.data["items"], basic.iterrows()):
+        expected = _loop_audit_news(row["code"], row["cname"], visible, ref, lookback)
+        news_notes: List[str] = [n for n in item["notes"] if n.startswith("监管舆情命中")]
+        assert news_notes == ([f"监管舆情命中 ({expected})"] if expected else [])
+        hits += bool(expected)
+    assert hits > 0
+
+
+def test_news_index_built_once_per_table_version() -> None:
+    basic, news = _make_tables()
+    d = Dossier.create_empty(mission="x")
+    d.add_table(name="etf_basic", df=basic)
+    d.add_table(name="csrc", df=news)
+    ctx = SkillContext(dossier=d, agent_role="auditor", ref_date="2025-12-31")
+    h = SkillHandler()
+
+    idx = h._get_news_index(ctx)
+    hits = h._get_news_hits(ctx)
+    h.execute(ctx, symbols=["510001"])
+    assert h._get_news_index(ctx) is idx
+    assert h._get_news_hits(ctx) is hits
+
+    d.add_table(name="etf_basic", df=basic.head(3))
+    assert h._get_news_hits(ctx) is not hits
+    assert h._get_news_index(ctx) is idx
@@ -264,4 +264,51 @@ def test_graph_compiles_and_runs_one_cycle(monkeypatch: pytest.MonkeyPatch):
     ai_n = len([m for m in (out.get("messages") or []) if isinstance(m, AIMessage)])
     assert ai_n >= 3
 
-    assert out.get("stop_reason") in (None, "MAX_ROUNDS_DEBATE")
\ No newline at end of file
+    assert out.get("stop_reason") in (None, "MAX_ROUNDS_DEBATE")
+
+def test_async_graph_drives_many_debates_in_one_loop(monkeypatch: pytest.MonkeyPatch):
+    import asyncio
+    import time
+
+    _patch_protocol(monkeypatch)
+    _patch_config(monkeypatch, MAX_ROUNDS=1, ENFORCE_MIN_CANDIDATES=False)
+
+    def _arole(role: str, payload: dict, postprocess):
+        async def _allm(_msgs):
+            await asyncio.sleep(0.1)
+            return _mk_ai(payload)
+
+        return g.RoleBlock(
+            role=role,
+            system_prompt=f"{role}_SYS",
+            llm_invoke=lambda _msgs: (_ for _ in ()).throw(AssertionError("sync llm called")),
+            tool_node=None,
+            postprocess=postprocess,
+            allm_invoke=_allm,
+        )
+
+    graph = g.build_etf_attack_patch_graph(
+        hunter=_arole(
+            "hunter",
+            {"type": "CANDIDATES", "stop_suggest": "STOP", "items": [{"symbol": "510300", "score": 80.0, "reason": "x", "source_skill": "demo", "extra": {}}]},
+            g.postprocess_hunter,
+        ),
+        auditor=_arole("auditor", {"type": "OBJECTIONS", "stop_suggest": "STOP", "items": []}, g.postprocess_auditor),
+        pm=_arole("pm", {"type": "DECISIONS", "stop_suggest": "STOP", "items": []}, g.postprocess_pm),
+        use_async=True,
+    )
+
+    def _init():
+        return {"messages": [], "round_idx": 0, "stable_rounds": 0, "tool_trace": [], "tool_cache": {}, "candidates_cur": []}
+
+    async def _main():
+        return await asyncio.gather(*(graph.ainvoke(_init()) for _ in range(10)))
+
+    t0 = time.time()
+    outs = asyncio.run(_main())
+    elapsed = time.time() - t0
+
+    assert len(outs) == 10
+    assert all(o.get("_last_speaker_role") == "pm" for o in outs)
+    assert all(any(it.get("symbol") == "510300" for it in o.get("candidates_cur") or []) for o in outs)
+    assert elapsed < 1.5  # 10 场 x 3 次 0.1s 串行需 3s；事件循环内重叠执行
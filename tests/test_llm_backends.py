@@ -0,0 +1,118 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from debate_mas.core import llm_backends as lb
+
+
+class _ScriptedLLM:
+    """按调用顺序返回预设响应；记录收到的 prompt"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.prompts = []
+        self.bound = None
+
+    def bind_tools(self, tools, **kwargs):
+        self.bound = tools
+        return self
+
+    def invoke(self, messages, *args, **kwargs):
+        self.prompts.append(messages)
+        return self.responses[len(self.prompts) - 1]
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        return self.invoke(messages)
+
+
+class _Tool:
+    def __init__(self, name):
+        self.name = name
+
+
+def _conversation():
+    first = [SystemMessage(content="SYS"), HumanMessage(content="go")]
+    call = AIMessage(content="", tool_calls=[{"name": "quantitative_sniper", "args": {"strategy": "momentum"}, "id": "c1"}], id="run-1")
+    second = first + [call, ToolMessage(content='{"success": true}', tool_call_id="c1")]
+    final = AIMessage(content='{"type":"CANDIDATES","items":[]}', response_metadata={"token_usage": {"total_tokens": 9}})
+    return first, call, second, final
+
+
+def test_record_then_replay_by_prompt_hash(tmp_path: Path):
+    path = tmp_path / "c.jsonl"
+    first, call, second, final = _conversation()
+
+    rec = lb.RecordingLLM(_ScriptedLLM([call, final]), lb.Cassette(str(path)), role="hunter", model="m").bind_tools([_Tool("quantitative_sniper")])
+    assert rec.invoke(first) is call
+    assert asyncio.run(rec.ainvoke(second)) is final
+    lines = [json.loads(x) for x in path.read_text(encoding="utf-8").splitlines()]
+    assert [x["tools"] for x in lines] == [["quantitative_sniper"], ["quantitative_sniper"]]
+    assert lines[0]["response"]["data"]["tool_calls"][0]["name"] == "quantitative_sniper"
+
+    # 回放：顺序打乱也按哈希命中；消息 id / metadata 不影响 key
+    replay = lb.ReplayLLM(lb.Cassette(str(path)), role="hunter", model="m", strict=True).bind_tools([_Tool("quantitative_sniper")])
+    second_new_ids = first + [AIMessage(content="", tool_calls=call.tool_calls, id="run-other"), second[-1]]
+    out2 = replay.invoke(second_new_ids)
+    out1 = replay.invoke(first)
+    assert out2.content == final.content
+    assert out1.tool_calls[0]["args"] == {"strategy": "momentum"} and out1.tool_calls[0]["id"] == "c1"
+
+    # strict：不同 model / 工具集合 / prompt 即未命中
+    with pytest.raises(LookupError):
+        replay.invoke([HumanMessage(content="other")])
+    unbound = lb.ReplayLLM(lb.Cassette(str(path)), role="hunter", model="m", strict=True)
+    with pytest.raises(LookupError):
+        unbound.invoke(first)
+
+
+def test_replay_falls_back_to_role_sequence_and_transcript_seed(tmp_path: Path):
+    transcript = {
+        "transcript": [
+            {"role": "user", "content": "seed"},
+            {"role": "assistant", "content": "", "tool_calls": [{"name": "quantitative_sniper", "args": {"top_k": 3}, "id": "t1"}]},
+            {"role": "tool", "content": "{}", "tool_call_id": "t1"},
+            {"role": "assistant", "content": "召回完成 {\"type\":\"CANDIDATES\",\"items\":[]}"},
+            {"role": "assistant", "content": "{\"type\":\"OBJECTIONS\",\"items\":[]}"},
+            {"role": "assistant", "content": "", "tool_calls": [{"id": "t2", "type": "function", "function": {"name": "portfolio_allocator", "arguments": "{}"}}]},
+            {"role": "tool", "content": "{}", "tool_call_id": "t2"},
+            {"role": "assistant", "content": "{\"type\":\"DECISIONS\",\"items\":[]}"},
+        ]
+    }
+    tpath = tmp_path / "x_transcript.json"
+    tpath.write_text(json.dumps(transcript, ensure_ascii=False), encoding="utf-8")
+    cpath = tmp_path / "seed.jsonl"
+
+    allow = {"hunter": ["quantitative_sniper"], "auditor": ["market_sentry"], "pm": ["portfolio_allocator"]}
+    assert lb.cassette_from_transcript(str(tpath), str(cpath), allowlist_by_role=allow) == 5
+
+    cassette = lb.Cassette(str(cpath))
+    hunter = lb.ReplayLLM(cassette, role="hunter", model="m")
+    pm = lb.ReplayLLM(cassette, role="pm", model="m")
+    assert hunter.invoke([HumanMessage(content="anything")]).tool_calls[0]["id"] == "t1"
+    assert pm.invoke([]).tool_calls[0]["name"] == "portfolio_allocator"
+    assert "CANDIDATES" in hunter.invoke([]).content
+    assert "DECISIONS" in pm.invoke([]).content
+    with pytest.raises(LookupError):
+        hunter.invoke([])
+    assert cassette.stats == {"recorded": 0, "hits": 0, "sequential": 4, "misses": 1}
+
+
+def test_wrap_llm_respects_backend(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(lb, "_BACKEND", {"mode": "live", "cassette": None, "strict": False})
+    built = []
+    llm = lb.wrap_llm(lambda: built.append(1) or "LIVE", role="pm", model="m")
+    assert llm == "LIVE" and built == [1]
+
+    path = tmp_path / "c.jsonl"
+    lb.configure_llm_backend("record", str(path))
+    assert isinstance(lb.wrap_llm(lambda: _ScriptedLLM([]), role="pm", model="m"), lb.RecordingLLM)
+
+    with pytest.raises(FileNotFoundError):
+        lb.configure_llm_backend("replay", str(tmp_path / "missing.jsonl"))
+    path.write_text("", encoding="utf-8")
+    lb.configure_llm_backend("replay", str(path))
+    replay = lb.wrap_llm(lambda: pytest.fail("replay must not build a live LLM"), role="pm", model="m")
+    assert isinstance(replay, lb.ReplayLLM)
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from pathlib import Path
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.tools import StructuredTool
+
+from debate_mas.core import llm_cache as lc
+
+
+class _CountingLLM:
+    def __init__(self):
+        self.calls = 0
+        self.bound = None
+
+    def bind_tools(self, tools, **kwargs):
+        self.bound = tools
+        return self
+
+    def invoke(self, messages, *args, **kwargs):
+        self.calls += 1
+        return AIMessage(content=f"answer-{self.calls}", tool_calls=[{"name": "t", "args": {"k": 1}, "id": "c1"}])
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        return self.invoke(messages)
+
+
+def _tool(desc="d"):
+    def t(k: int) -> str:
+        return str(k)
+    return StructuredTool.from_function(t, name="t", description=desc)
+
+
+def _msgs(text="go"):
+    return [SystemMessage(content="SYS"), HumanMessage(content=text, id="volatile")]
+
+
+def test_cache_hit_keyed_on_prompt_and_tool_schema(tmp_path: Path):
+    cache = lc.LLMResponseCache(str(tmp_path / "c.sqlite"))
+    inner = _CountingLLM()
+    llm = lc.CachedLLM(inner, cache, model="m", temperature=0.0).bind_tools([_tool()])
+
+    first = llm.invoke(_msgs())
+    again = asyncio.run(llm.ainvoke([SystemMessage(content="SYS"), HumanMessage(content="go", id="other")]))
+    assert inner.calls == 1
+    assert again.content == first.content and again.tool_calls[0]["args"] == {"k": 1}
+
+    # 工具 schema / 消息 / 温度变化 -> 不同 key
+    lc.CachedLLM(inner, cache, model="m", temperature=0.0).bind_tools([_tool("changed")]).invoke(_msgs())
+    llm.invoke(_msgs("different"))
+    assert inner.calls == 3
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 3 and cache.stats["writes"] == 3
+
+    # 跨实例持久化
+    reopened = lc.LLMResponseCache(str(tmp_path / "c.sqlite"))
+    assert lc.CachedLLM(_CountingLLM(), reopened, model="m", temperature=0.0).bind_tools([_tool()]).invoke(_msgs()).content == "answer-1"
+
+
+def test_sampled_temperature_bypasses_unless_allowed(tmp_path: Path):
+    cache = lc.LLMResponseCache(str(tmp_path / "c.sqlite"))
+    inner = _CountingLLM()
+    llm = lc.CachedLLM(inner, cache, model="m", temperature=0.7)
+    llm.invoke(_msgs())
+    llm.invoke(_msgs())
+    assert inner.calls == 2 and cache.stats["bypassed"] == 2 and len(cache) == 0
+
+    cache.allow_sampled = True
+    llm.invoke(_msgs())
+    llm.invoke(_msgs())
+    assert inner.calls == 3 and cache.stats["hits"] == 1
+
+
+def test_ttl_and_size_bound(tmp_path: Path):
+    cache = lc.LLMResponseCache(str(tmp_path / "c.sqlite"), ttl_s=60)
+    cache.put("a", AIMessage(content="x"))
+    assert cache.get("a").content == "x"
+    cache._db().execute("UPDATE responses SET created_at = ?", (time.time() - 120,))
+    assert cache.get("a") is None and cache.stats["expired"] == 1 and len(cache) == 0
+
+    small = lc.LLMResponseCache(str(tmp_path / "s.sqlite"), max_bytes=600)
+    for i in range(5):
+        small.put(f"k{i}", AIMessage(content="y" * 200))
+    assert small.stats["evictions"] > 0
+    assert small.get("k4") is not None and small.get("k0") is None
+
+
+def test_stats_are_counted_per_run_scope(tmp_path: Path):
+    import threading
+    from contextvars import copy_context
+
+    from debate_mas.core.llm_backends import run_stats, run_stats_scope
+
+    cache = lc.LLMResponseCache(str(tmp_path / "c.sqlite"))
+    llm = lc.CachedLLM(_CountingLLM(), cache, model="m", temperature=0.0)
+    llm.invoke(_msgs("warm"))
+    barrier = threading.Barrier(2)
+    seen = {}
+
+    def job(name: str, n_hits: int) -> None:
+        with run_stats_scope():
+            barrier.wait()
+            for _ in range(n_hits):
+                llm.invoke(_msgs("warm"))
+            # 子线程继承 context：同一次运行内的线程池调用也计入
+            t = threading.Thread(target=copy_context().run, args=(llm.invoke, _msgs(f"new-{name}")))
+            t.start()
+            t.join()
+            barrier.wait()
+            seen[name] = run_stats("llm_cache", cache.stats)
+
+    threads = [threading.Thread(target=job, args=("a", 1)), threading.Thread(target=job, args=("b", 3))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert seen["a"]["hits"] == 1 and seen["a"]["misses"] == 1 and seen["a"]["writes"] == 1
+    assert seen["b"]["hits"] == 3 and seen["b"]["misses"] == 1
+    # 作用域外退回进程级累计
+    assert run_stats("llm_cache", cache.stats) == cache.stats and cache.stats["hits"] == 4
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from debate_mas.loader.dossier import Dossier
+from debate_mas.skills.base import SkillContext
+from debate_mas.skills.inventory.market_sentry.scripts.handler import SkillHandler
+
+
+def _make_daily(seed: int = 3, n_codes: int = 30, days: int = 80) -> pd.DataFrame:
+    """波动/流动性分化 + 随机停牌 + 零星 NaN + 一只短历史，用于覆盖各判定分支"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2025-01-01", periods=days)
+    rows = []
+    for i in range(n_codes):
+        code = f"{159000 + i:06d}"
+        vol = [0.005, 0.02, 0.06][i % 3]
+        drift = -0.01 if i % 5 == 0 else 0.002
+        start = days - 4 if i == n_codes - 1 else 0
+        px = 1.0 + rng.random()
+        for d in dates[start:]:
+            px *= float(np.exp(rng.normal(drift, vol)))
+            if rng.random() < 0.05:
+                continue
+            close = np.nan if rng.random() < 0.02 else px
+            amount = np.nan if rng.random() < 0.02 else float(rng.uniform(1e6, 1e8) if i % 4 else rng.uniform(1e4, 1e6))
+            rows.append({"code": code, "date": d, "close": close, "amount": amount})
+    return pd.DataFrame(rows).sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("window", [5, 20, 60])
+def test_vectorized_audit_matches_per_symbol_loop(window: int) -> None:
+    raw = _make_daily()
+    d = Dossier.create_empty(mission="x")
+    d.add_table(name="etf_daily", df=raw)
+    ctx = SkillContext(dossier=d, agent_role="auditor", ref_date="2026-01-01")
+
+    symbols = sorted(raw["code"].unique())[:25] + ["NOT_EXIST", sorted(raw["code"].unique())[0]]
+    kwargs = dict(symbols=symbols, window=window, min_amount=5e6, vol_threshold=0.03)
+
+    loop = SkillHandler()
+    loop.VECTORIZED_AUDIT = False
+    ref = loop.execute(ctx, **kwargs)
+    got = SkillHandler().execute(ctx, **kwargs)
+
+    assert ref.success and got.success
+    assert got.data == ref.data
+    assert got.insight == ref.insight
@@ -129,3 +129,37 @@ def test_renderer_generates_three_artifacts(tmp_path: Path) -> None:
     #     assert c in df.columns, f"csv missing column: {c}"
     #
     # 建议：Checkpoint 测试默认保持“宽松”，把严格契约留给你们自己的业务测试。
+
+
+def test_llm_view_is_column_oriented_and_lossless_for_cited_fields() -> None:
+    from debate_mas.protocol.llm_view import dumps_llm_view, view_rows
+
+    items = [
+        {
+            "symbol": f"5100{i}",
+            "score": 100.0 - i * 3.3333333,
+            "reason": f"Comp {100 - i}",
+            "source_skill": "quantitative_sniper",
+            "extra": {"strategy": "composite", "window": 20, "threshold_meta": None, "mom_raw": 0.20084751725342784 / (i + 1), "score": 1.0},
+        }
+        for i in range(3)
+    ]
+    payload = SkillResult.ok(
+        data={"type": "EtfCandidateList", "items": items, "meta": {"strategy": "composite", "window": 20, "universe_size": None}},
+        insight="done",
+    ).model_dump()
+
+    text = dumps_llm_view(payload)
+    view = json.loads(text)
+    assert len(text) < len(json.dumps(payload, ensure_ascii=False)) / 2
+    assert view["meta"] == {"strategy": "composite", "window": 20}
+    assert view["const"] == {"source_skill": "quantitative_sniper", "extra.score": 1}  # 与 meta 重复 / 全 null 的省略
+    assert view["columns"] == ["symbol", "score", "reason", "mom_raw"]
+
+    rows = view_rows(view)
+    assert [r["symbol"] for r in rows] == ["51000", "51001", "51002"]
+    assert rows[1]["score"] == 96.67 and rows[0]["mom_raw"] == 0.2008 and rows[2]["source_skill"] == "quantitative_sniper"
+
+    # 失败结果 / 非列表类型原样返回
+    fail = SkillResult.fail("boom").model_dump()
+    assert json.loads(dumps_llm_view(fail)) == fail
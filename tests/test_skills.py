@@ -52,6 +52,31 @@ def test_safe_run_converges_errors_to_skillresult_fail():
     assert "boom" in (out2.error_msg or "")
 
 
+def test_non_thread_safe_skill_serializes_concurrent_calls():
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    class StatefulSkill(BaseSkill):
+        name = "stateful"
+        thread_safe = False
+        active = 0
+        peak = 0
+
+        def execute(self, ctx: SkillContext, x: int = 1) -> SkillResult:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            time.sleep(0.01)
+            self.active -= 1
+            return SkillResult.ok(data={"x": x})
+
+    sk = StatefulSkill()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        outs = list(pool.map(lambda i: sk.safe_run(_ctx_stub(), x=i), range(8)))
+    assert [o.data["x"] for o in outs] == list(range(8))
+    assert sk.peak == 1
+
+
 def test_to_langchain_tool_returns_json_string():
     ctx = _ctx_stub()
     tool = OkSkill().to_langchain_tool(ctx)
@@ -154,4 +179,107 @@ def test_get_skill_autoloads_when_empty(monkeypatch: pytest.MonkeyPatch):
 
     s = reg.SkillRegistry.get_skill("x")
     assert called["n"] == 1
-    assert s.name == "x"
\ No newline at end of file
+    assert s.name == "x"
+
+def test_result_cache_keyed_by_declared_tables(tmp_path, monkeypatch):
+    import pandas as pd
+    from debate_mas.loader.dossier import Dossier
+    from debate_mas.skills import result_cache as rc
+
+    class CountingSkill(BaseSkill):
+        name = "counting"
+        data_dependencies = ["t1"]
+        calls = 0
+
+        def execute(self, ctx: SkillContext, x: int = 1) -> SkillResult:
+            type(self).calls += 1
+            if x < 0:
+                return SkillResult.fail("neg")
+            return SkillResult.ok(data={"x": x, "n": len(ctx.dossier.get_table("t1"))}, insight="ok")
+
+    monkeypatch.setattr(rc, "_RESULT_CACHE", None)
+    cache = rc.configure_result_cache("on", str(tmp_path / "cache"), max_mb=1)
+
+    d = Dossier.create_empty(mission="m")
+    d.add_table(name="t1", df=pd.DataFrame({"a": [1, 2]}))
+    d.add_table(name="t2", df=pd.DataFrame({"b": [1]}))
+    ctx = SkillContext(dossier=d, agent_role="hunter", ref_date="2025-01-01")
+    skill = CountingSkill()
+
+    first = skill.safe_run(ctx, x=3)
+    assert skill.safe_run(ctx, x=3).model_dump() == first.model_dump()
+    assert CountingSkill.calls == 1 and cache.stats["hits"] == 1
+
+    # 未声明依赖的表变化不影响；依赖表内容变化 -> 重算
+    d.add_table(name="t2", df=pd.DataFrame({"b": [9, 9]}))
+    skill.safe_run(ctx, x=3)
+    assert CountingSkill.calls == 1
+    d.add_table(name="t1", df=pd.DataFrame({"a": [1, 2, 3]}))
+    assert skill.safe_run(ctx, x=3).data["n"] == 3
+    assert CountingSkill.calls == 2
+
+    # 失败结果不缓存
+    skill.safe_run(ctx, x=-1)
+    skill.safe_run(ctx, x=-1)
+    assert CountingSkill.calls == 4
+
+    # bypass：不读，只刷新写入
+    cache.mode = "bypass"
+    skill.safe_run(ctx, x=3)
+    assert CountingSkill.calls == 5
+
+    # LRU：超出容量时删除最旧条目
+    cache.mode = "on"
+    cache.max_bytes = 1
+    skill.safe_run(ctx, x=4)
+    assert cache.stats["evictions"] >= 1
+    assert len(list((tmp_path / "cache").glob("*/*.json"))) <= 1
+
+    cache.clear()
+    assert not (tmp_path / "cache").exists()
+
+
+def test_result_cache_code_stamp_covers_references_and_shared_modules(tmp_path):
+    import os
+
+    from debate_mas.skills import result_cache as rc
+    from debate_mas.skills.registry import SkillRegistry
+
+    SkillRegistry.load_all_skills()
+    skill = SkillRegistry.get_skill("theme_miner")
+    root = rc.Path(rc.__file__).resolve().parent
+    names = {p.relative_to(root).as_posix() for p in rc._code_files(type(skill))}
+    assert {"base.py", "text_index.py", "inventory/theme_miner/SKILL.md", "inventory/theme_miner/scripts/handler.py"} <= names
+    assert {"inventory/theme_miner/references/ontology.yaml", "inventory/theme_miner/references/mapping.yaml"} <= names
+
+    # 参考数据变动（mtime）-> 指纹变化
+    stamp = rc.SkillResultCache(str(tmp_path / "cache"))._code_stamp(skill)
+    ref = root / "inventory" / "theme_miner" / "references" / "ontology.yaml"
+    st = ref.stat()
+    try:
+        os.utime(ref, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        assert rc.SkillResultCache(str(tmp_path / "cache"))._code_stamp(skill) != stamp
+    finally:
+        os.utime(ref, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+def test_result_cache_tracks_size_without_rescanning(tmp_path, monkeypatch):
+    from debate_mas.skills import result_cache as rc
+
+    cache = rc.SkillResultCache(str(tmp_path / "cache"), max_bytes=10_000)
+    scans = {"n": 0}
+    real = rc.Path.glob
+
+    def counting_glob(self, pattern):
+        scans["n"] += 1
+        return real(self, pattern)
+
+    monkeypatch.setattr(rc.Path, "glob", counting_glob)
+    for i in range(20):
+        cache.put(f"{i:064x}", {"i": i})
+    assert scans["n"] == 1  # 只在首次写入时扫描
+    assert cache._total_bytes == sum(p.stat().st_size for p in real(tmp_path / "cache", "*/*.json"))
+
+    cache.put("f" * 64, {"blob": "x" * 20_000})  # 超限才遍历目录淘汰
+    assert scans["n"] == 2 and cache.stats["evictions"] >= 1
+    assert cache._total_bytes <= cache.max_bytes
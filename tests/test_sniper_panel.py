@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import pickle
+from dataclasses import dataclass
+from math import erf, sqrt
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from debate_mas.loader.dossier import Dossier
+from debate_mas.skills.inventory.quantitative_sniper.scripts import algo
+from debate_mas.skills.inventory.quantitative_sniper.scripts.handler import SkillHandler
+from debate_mas.skills.inventory.quantitative_sniper.scripts.panel import build_price_panel, compute_panel_factors
+
+
+def make_ragged_daily(seed: int = 7, n_codes: int = 12, days: int = 90) -> pd.DataFrame:
+    """不同代码的交易日历不同（随机停牌/晚上市），用于校验“尾部对齐”口径"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2025-01-01", periods=days)
+    rows = []
+    for i in range(n_codes):
+        code = f"{510000 + i:06d}"
+        start = int(rng.integers(0, days - 10)) if i % 4 == 0 else 0
+        px = 1.0 + rng.random()
+        for d in dates[start:]:
+            px *= float(np.exp(rng.normal(0.0005, 0.02)))
+            if rng.random() < 0.08:
+                continue  # 停牌
+            rows.append({"code": code, "date": d, "close": px, "amount": float(rng.uniform(1e3, 1e6))})
+    df = pd.DataFrame(rows)
+    return df.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+
+def _norm_cdf(x: float) -> float:
+    return 0.5 * (1.0 + erf(x / sqrt(2.0)))
+
+
+def _loop_factors(df: pd.DataFrame, window: int, psr_ref: float = 0.0) -> pd.DataFrame:
+    """逐组循环参考实现（即面板引擎替换前的 Phase 2 口径）"""
+    rows: List[Dict[str, Any]] = []
+    for code, g in df.sort_values("date").groupby("code"):
+        r: Dict[str, Any] = {"symbol": str(code), "mom_raw": np.nan, "bias": np.nan, "sharpe_raw": np.nan, "psr": np.nan}
+        if len(g) >= window + 1:
+            curr, prev = float(g.iloc[-1]["close"]), float(g.iloc[-(window + 1)]["close"])
+            if prev > 0:
+                r["mom_raw"] = (curr - prev) / prev
+        if len(g) >= window:
+            ma = float(g["close"].tail(window).mean())
+            if np.isfinite(ma) and ma != 0:
+                r["bias"] = (float(g.iloc[-1]["close"]) - ma) / ma
+        if len(g) >= window + 1:
+            rets = g.iloc[-(window + 1):]["close"].pct_change().dropna()
+            if len(rets) >= max(5, window // 3):
+                mu, sig = float(rets.mean()), float(rets.std())
+                if sig > 1e-6 and not np.isnan(sig):
+                    sr = (mu / sig) * np.sqrt(252)
+                    skew, kurt, n = float(rets.skew()), float(rets.kurt()), len(rets)
+                    denom = 1.0 - skew * sr + ((kurt + 1.0) / 4.0) * sr**2
+                    denom = 1e-12 if (np.isnan(denom) or denom <= 0) else denom
+                    z = (sr - psr_ref) * sqrt(max(n - 1, 1)) / sqrt(denom)
+                    r["sharpe_raw"], r["psr"] = sr, min(max(_norm_cdf(z), 0.0), 1.0)
+        rows.append(r)
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize("window", [5, 20, 60])
+def test_panel_factors_match_per_group_loop(window: int) -> None:
+    df = make_ragged_daily()
+    ref = _loop_factors(df, window, psr_ref=0.1)
+    got = compute_panel_factors(build_price_panel(df), window, psr_ref_sharpe=0.1)
+
+    assert got["symbol"].tolist() == ref["symbol"].tolist()
+    for col in ("mom_raw", "bias", "sharpe_raw", "psr"):
+        np.testing.assert_allclose(got[col].to_numpy(), ref[col].to_numpy(dtype=float), rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+@dataclass
+class _Ctx:
+    dossier: Any
+    ref_date: str = "2025-12-31"
+    agent_role: str = "hunter"
+
+
+class _Dossier:
+    def __init__(self, df: pd.DataFrame):
+        self._df = df
+
+    def get_table(self, name: str):
+        return self._df if name == "etf_daily" else None
+
+
+@pytest.mark.parametrize("strategy", ["momentum", "sharpe", "reversal", "composite"])
+def test_handler_and_algo_share_panel_results(strategy: str) -> None:
+    df = make_ragged_daily(seed=11)
+    res = SkillHandler().execute(_Ctx(dossier=_Dossier(df)), strategy=strategy, window=20, top_k=50, min_amount=0)
+    assert res.success
+    items = res.data["items"]
+
+    params = {
+        "strategy": strategy, "window": 20, "top_k": 50, "min_amount": 0.0, "liquidity_filter": "amount_latest",
+        "amount_scale": 1000.0, "illiq_quantile": 0.8, "threshold_mode": "none", "quantile_q": None,
+        "psr_confidence": 0.95, "psr_ref_sharpe": 0.0,
+    }
+    d = df.copy()
+    d["code"] = d["code"].astype(str)
+    df_score = algo.run_strategy(d, params).sort_values("score", ascending=False)
+
+    assert [it["symbol"] for it in items] == df_score["symbol"].head(50).tolist()
+    assert [round(it["score"], 9) for it in items] == [round(float(s), 9) for s in df_score["score"].head(50)]
+
+
+def test_append_rows_updates_prepared_daily_and_panel_incrementally() -> None:
+    df = make_ragged_daily(seed=3)
+    d = Dossier.create_empty(mission="x")
+    d.add_table("etf_daily", df)
+    sk = SkillHandler()
+    ctx = _Ctx(dossier=d, ref_date="2026-12-31")
+    before = sk.execute(ctx, strategy="momentum", window=20, top_k=50, min_amount=0)
+    assert before.success
+    version = d.version
+
+    last = df["date"].max()
+    nxt = last + pd.offsets.BDay(1)
+    delta = pd.DataFrame([
+        {"code": "510001", "date": nxt, "close": 2.0, "amount": 1e5},
+        {"code": "510002", "date": nxt, "close": 1.5, "amount": 2e5},
+        {"code": "510002", "date": nxt, "close": 1.6, "amount": 2e5},   # delta 内重复：保留最后一条
+        {"code": "599999", "date": nxt, "close": 3.0, "amount": 3e5},   # 新代码
+        {"code": "510003", "date": df.loc[df["code"] == "510003", "date"].max(), "close": 9.9, "amount": 1.0},  # 修正旧行
+    ])
+    stats = d.append_rows("etf_daily", delta)
+    assert stats == {"appended": 4, "replaced": 1, "rows": len(df) + 3}
+    assert d.version > version
+    # 面板 / 标准化日线走了增量更新（未被清掉）
+    assert ("etf_daily", ("price_panel", None)) in d._derived
+    assert ("etf_daily", ("prepared_daily", None)) in d._derived
+
+    fresh = Dossier.create_empty(mission="x")
+    fresh.add_table("etf_daily", d.get_table("etf_daily").copy())
+    fctx = _Ctx(dossier=fresh, ref_date="2026-12-31")
+
+    pd.testing.assert_frame_equal(sk.get_prepared_daily(ctx, full=True), sk.get_prepared_daily(fctx, full=True))
+    got, ref = sk._get_price_panel(ctx), sk._get_price_panel(fctx)
+    assert got.codes.tolist() == ref.codes.tolist() and np.array_equal(got.dates, ref.dates)
+    np.testing.assert_array_equal(got.close, ref.close)
+    np.testing.assert_array_equal(got.amount, ref.amount)
+
+    after = sk.execute(ctx, strategy="momentum", window=20, top_k=50, min_amount=0)
+    assert after.data["items"] == sk.execute(fctx, strategy="momentum", window=20, top_k=50, min_amount=0).data["items"]
+
+    # 派生缓存（含 updater）不随案卷序列化：pickle 可用，反序列化后缓存为空、表与版本保留
+    restored = pickle.loads(pickle.dumps(d))
+    assert not restored._derived and restored.version == d.version
+    pd.testing.assert_frame_equal(restored.get_table("etf_daily"), d.get_table("etf_daily"))
+    assert sk.execute(_Ctx(dossier=restored, ref_date="2026-12-31"), strategy="momentum", window=20, top_k=50, min_amount=0).data["items"] == after.data["items"]
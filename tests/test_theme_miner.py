@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from debate_mas.loader.dossier import Dossier
+from debate_mas.skills.base import SkillContext
+from debate_mas.skills.inventory.theme_miner.scripts.handler import SkillHandler
+from debate_mas.skills.text_index import SubstringIndex
+
+
+def test_substring_index_matches_contains() -> None:
+    texts = ["华夏中证新能源汽车ETF", "半导体芯片ETF", None, "", "新能源ETF联接A", "中证500ETF"]
+    idx = SubstringIndex(texts)
+    for term in ["新能源", "ETF", "芯", "中证500", "不存在", "A", "新能源汽车ETF"]:
+        expected = [i for i, t in enumerate(texts) if isinstance(t, str) and term in t]
+        assert idx.lookup(term).tolist() == expected
+
+    many = idx.lookup_many(["ETF", "芯", "ETF"])
+    assert list(many) == ["ETF", "芯"]
+    assert many["ETF"] is idx.lookup("ETF")
+
+
+def _make_basic() -> pd.DataFrame:
+    names = ["新能源", "半导体", "黄金", "红利低波", "医药", "国债", "人工智能", "银行"]
+    rows = []
+    for i in range(60):
+        rows.append(
+            {
+                "Code": f"{159000 + i}",
+                "CName": f"{names[i % len(names)]}{'主题' if i % 3 else ''}ETF" if i % 11 else None,
+                "setup_date": f"20{15 + i % 12}-01-01",
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def test_name_index_matches_str_contains_on_filtered_view() -> None:
+    d = Dossier.create_empty(mission="x")
+    d.add_table(name="etf_basic", df=_make_basic())
+    ctx = SkillContext(dossier=d, agent_role="hunter", ref_date="2022-06-30")
+    h = SkillHandler()
+
+    res = h.execute(ctx, mode="guardrail_pool")
+    assert res.success or res.error_msg
+    view = h._name_view
+    assert view is not None and 0 < len(view) < 60
+
+    terms = ["新能源", "ETF", "主题ETF", "黄", "None", "nan", "不存在", "红利|黄金"]
+    calls = []
+    index = h._name_index
+    orig = index.lookup_many
+    index.lookup_many = lambda ts: calls.append(list(ts)) or orig(ts)
+    got = h._match_etfs_many(view, terms + ["ETF"])
+    # 可走索引的词一次批量查询；含正则元字符的回退 str.contains
+    assert calls == [[t for t in terms if t != "红利|黄金"]]
+    for t in terms:
+        expected = view[view[h._name_col].astype(str).str.contains(t, na=False)]
+        pd.testing.assert_frame_equal(got[t], expected)
+
+    # 索引按案卷缓存；替换 etf_basic 后重建
+    built = h._get_name_index(ctx)
+    h.execute(ctx, mode="guardrail_pool")
+    assert h._get_name_index(ctx) is built
+    d.add_table(name="etf_basic", df=_make_basic().head(5))
+    assert h._get_name_index(ctx) is not built
+    assert isinstance(h._name_pos, np.ndarray)
+
+
+def _reset_ontology(monkeypatch, yaml_path) -> None:
+    from debate_mas.skills.inventory.theme_miner.scripts import ontology
+
+    monkeypatch.setattr(ontology, "_ontology_yaml_path", lambda: yaml_path)
+    monkeypatch.setattr(ontology, "_CONCEPTS_CACHE", None)
+    monkeypatch.setattr(ontology, "_INDEX_CACHE", None)
+
+
+def test_ontology_index_resolution_and_disk_cache(tmp_path, monkeypatch) -> None:
+    from debate_mas.skills.inventory.theme_miner.scripts import ontology
+
+    yaml_path = tmp_path / "ontology.yaml"
+    yaml_path.write_text(
+        "concepts:\n"
+        "  新质生产力:\n    aliases: [科技创新, 科创]\n    expands_to: [芯片]\n    weight: 1.3\n"
+        "  人工智能:\n    aliases: [AI, 大模型]\n    expands_to: [通信]\n"
+        "  科创:\n    expands_to: [科创50]\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    _reset_ontology(monkeypatch, yaml_path)
+
+    assert ontology.get_concept_meta("科创")["name"] == "科创"  # 精确 key 优先于别名
+    assert ontology.get_concept_meta("AI应用")["name"] == "人工智能"  # 别名被 query 包含
+    assert ontology.get_concept_meta("大模")["name"] == "人工智能"  # query 被别名包含
+    assert ontology.get_concept_meta("科技创新与AI")["name"] == "新质生产力"  # 多个命中取 YAML 靠前者
+    assert ontology.get_concept_meta("不存在")["found"] is False
+
+    # JSON 缓存写在用户缓存目录，不写进 YAML 所在目录
+    cache = ontology._ontology_cache_path()
+    assert cache.parent == tmp_path / "cache" / "debate_mas" and cache.suffix == ".json" and cache.exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["cache", "ontology.yaml"]
+
+    # 新进程：直接读磁盘缓存，不再解析 YAML
+    compile_index = ontology._compile_index
+    _reset_ontology(monkeypatch, yaml_path)
+    monkeypatch.setattr(ontology, "_compile_index", lambda concepts: (_ for _ in ()).throw(AssertionError("recompiled")))
+    assert ontology.get_concept_meta("AI")["expansions"] == ["通信"]
+    monkeypatch.setattr(ontology, "_compile_index", compile_index)
+
+    # YAML 变更（size/mtime）后进程内缓存与磁盘缓存都失效
+    yaml_path.write_text("concepts:\n  黄金:\n    aliases: [贵金属]\n", encoding="utf-8")
+    assert ontology.get_concept_meta("AI")["found"] is False
+    assert ontology.get_concept_meta("贵金属")["name"] == "黄金"
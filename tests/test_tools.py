@@ -185,6 +185,24 @@ def test_wrap_tool_with_guard_ok_returns_json_and_trace(monkeypatch: pytest.Monk
     assert int(obj["data"]["seen_top_k"]) <= 4
 
 
+def test_tool_message_uses_llm_view_but_cache_keeps_full_object(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(t, "CONFIG", _FakeConfig, raising=True)
+    items = [{"symbol": f"51030{i}", "score": 90.123456 - i, "reason": "r", "source_skill": "quantitative_sniper", "extra": {"strategy": "momentum", "mom_raw": 0.1234567}} for i in range(3)]
+
+    def handler(args: Dict[str, Any]) -> str:
+        return json.dumps(SkillResult.ok(data={"type": "EtfCandidateList", "items": items, "meta": {}}, insight="ok").model_dump(), ensure_ascii=False)
+
+    base_tool = _FakeStructuredTool(name="quantitative_sniper", args_schema=_SniperArgs, handler=handler)
+    st = {"round_idx": 0, "_round_tool_calls": {"hunter": 0}, "_round_fingerprints": set()}
+    wrapped = t._wrap_tool_with_guard(role="hunter", tool_name="quantitative_sniper", base_tool=base_tool, state=st)
+
+    view = json.loads(wrapped.invoke({}))
+    assert view["columns"] == ["symbol", "score"] and view["rows"][0] == ["510300", 90.12]
+    assert view["const"] == {"reason": "r", "source_skill": "quantitative_sniper", "strategy": "momentum", "mom_raw": 0.1235}
+    assert st["tool_cache"]["quantitative_sniper"]["data"]["items"] == items
+    assert st["tool_trace"][-1]["produced_n"] == 3
+
+
 def test_portfolio_allocator_injects_state_fields_when_schema_supports(monkeypatch: pytest.MonkeyPatch):
     monkeypatch.setattr(t, "CONFIG", _FakeConfig, raising=True)
 
@@ -247,3 +265,162 @@ def test_runtime_state_contextvar_affects_wrapper_trace(monkeypatch: pytest.Monk
     assert state_in.get("tool_trace")
     assert state_in["tool_trace"][-1]["round_idx"] == 7
 
+
+
+class _VersionedDossier:
+    def __init__(self) -> None:
+        self.version = 1
+
+
+def test_cross_round_memo_serves_cached_result_and_counts_call(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(t, "CONFIG", _FakeConfig, raising=True)
+    calls: List[Dict[str, Any]] = []
+
+    def handler(args: Dict[str, Any]) -> str:
+        calls.append(args)
+        return json.dumps(SkillResult.ok(data={"items": [1, 2, 3]}, insight="ok").model_dump(), ensure_ascii=False)
+
+    base_tool = _FakeStructuredTool(name="quantitative_sniper", args_schema=_SniperArgs, handler=handler)
+    dossier = _VersionedDossier()
+    ctx = SkillContext.model_construct(dossier=dossier, agent_role="hunter", ref_date="2025-01-01")
+    st = {"round_idx": 0, "_round_tool_calls": {"hunter": 0}, "_round_fingerprints": set()}
+    wrapped = t._wrap_tool_with_guard(role="hunter", tool_name="quantitative_sniper", base_tool=base_tool, state=st, ctx=ctx)
+
+    first = wrapped.invoke({"strategy": "momentum"})
+    assert len(calls) == 1 and st["tool_trace"][-1]["cache_hit"] is False
+
+    # 下一轮：同参直接命中，不再执行；仍计入调用次数
+    st.update(round_idx=1, _round_tool_calls={"hunter": 0}, _round_fingerprints=set())
+    second = wrapped.invoke({"strategy": "momentum"})
+    assert second == first and len(calls) == 1
+    assert st["tool_trace"][-1]["cache_hit"] is True
+    assert st["tool_trace"][-1]["produced_n"] == 3
+    assert st["_round_tool_calls"]["hunter"] == 1
+    assert st["tool_cache"]["quantitative_sniper"]["success"] is True
+
+    # 上限已到：命中缓存也要被 guard 拒绝
+    denied = json.loads(wrapped.invoke({"strategy": "reversal"}))
+    assert denied["success"] is False and st["tool_trace"][-1]["denied"] is True
+
+    # dossier 版本变化 -> 失效重算
+    dossier.version = 2
+    st.update(round_idx=2, _round_tool_calls={"hunter": 0}, _round_fingerprints=set())
+    wrapped.invoke({"strategy": "momentum"})
+    assert len(calls) == 2 and st["tool_trace"][-1]["cache_hit"] is False
+
+
+class _ParallelConfig(_FakeConfig):
+    ROLE_TOOL_ALLOWLIST = {"hunter": ["quantitative_sniper", "market_sentry"], "pm": [], "auditor": []}
+    ROLE_TOOL_MAX_CALLS = {"hunter": 2, "pm": 0, "auditor": 0}
+    SNIPER_LIMITS = {}
+    TOOL_PARALLEL_MODE = "thread"
+    TOOL_PARALLEL_MAX_WORKERS = 4
+
+
+def test_tool_node_runs_calls_concurrently_in_order(monkeypatch: pytest.MonkeyPatch):
+    import time
+
+    from langchain_core.messages import AIMessage
+
+    monkeypatch.setattr(t, "CONFIG", _ParallelConfig, raising=True)
+
+    def slow(tag: str):
+        def handler(args: Dict[str, Any]) -> str:
+            time.sleep(0.3)
+            return json.dumps(SkillResult.ok(data={"items": [tag]}, insight=tag).model_dump(), ensure_ascii=False)
+        return handler
+
+    st = {"round_idx": 0, "_round_tool_calls": {"hunter": 0}, "_round_fingerprints": set(), "messages": []}
+    tools = [
+        t._wrap_tool_with_guard(
+            role="hunter",
+            tool_name=name,
+            base_tool=_FakeStructuredTool(name=name, args_schema=_SniperArgs, handler=slow(name)),
+            state=st,
+        )
+        for name in ["quantitative_sniper", "market_sentry"]
+    ]
+    node = t.build_tool_node_for_role("hunter", tools, st)
+
+    calls = [
+        {"name": "quantitative_sniper", "args": {"strategy": "momentum"}, "id": "c1"},
+        {"name": "market_sentry", "args": {}, "id": "c2"},
+        {"name": "quantitative_sniper", "args": {"strategy": "reversal"}, "id": "c3"},  # 超上限 -> 拒绝
+    ]
+    st["messages"] = [AIMessage(content="", tool_calls=calls)]
+
+    t0 = time.time()
+    out = node(st)
+    elapsed = time.time() - t0
+    assert elapsed < 0.55  # 两个 0.3s 调用并发
+
+    tool_msgs = out["messages"][1:]
+    assert [m.tool_call_id for m in tool_msgs] == ["c1", "c2", "c3"]
+    payloads = [json.loads(m.content) for m in tool_msgs]
+    assert [p["success"] for p in payloads] == [True, True, False]
+    assert payloads[0]["insight"] == "quantitative_sniper"
+
+    assert st["_round_tool_calls"]["hunter"] == 2
+    assert st["_round_tool_calls_ok"]["hunter"] == 2
+    assert len(st["_round_fingerprints"]) == 2
+    assert sorted(x["denied"] for x in st["tool_trace"]) == [False, False, True]
+    assert set(st["tool_cache"]) == {"quantitative_sniper", "market_sentry"}
+
+
+def test_guard_lock_is_per_tool_node(monkeypatch: pytest.MonkeyPatch):
+    import threading
+
+    from langchain_core.messages import AIMessage
+
+    monkeypatch.setattr(t, "CONFIG", _ParallelConfig, raising=True)
+    ok = json.dumps(SkillResult.ok(data={}, insight="ok").model_dump(), ensure_ascii=False)
+
+    # 辩论 A 的 guard 检查卡住（持有 A 的 node 锁）时，辩论 B 的 node 照常执行
+    entered, release = threading.Event(), threading.Event()
+    real_guard = t.tool_guard_check
+
+    def guard(role, tool_name, tool_args, st):
+        if st.get("debate") == "a":
+            entered.set()
+            release.wait(timeout=5)
+        return real_guard(role, tool_name, tool_args, st)
+
+    monkeypatch.setattr(t, "tool_guard_check", guard, raising=True)
+
+    def node_for(tag: str):
+        st = {"debate": tag, "round_idx": 0, "_round_tool_calls": {"hunter": 0}, "_round_fingerprints": set(), "messages": []}
+        names = ["quantitative_sniper", "market_sentry"]
+        tools = [
+            t._wrap_tool_with_guard(
+                role="hunter",
+                tool_name=name,
+                base_tool=_FakeStructuredTool(name=name, args_schema=_SniperArgs, handler=lambda args: ok),
+                state=st,
+            )
+            for name in names
+        ]
+        st["messages"] = [AIMessage(content="", tool_calls=[{"name": n, "args": {}, "id": f"{tag}{i}"} for i, n in enumerate(names)])]
+        return t.build_tool_node_for_role("hunter", tools, st), st
+
+    node_a, st_a = node_for("a")
+    node_b, st_b = node_for("b")
+    th = threading.Thread(target=node_a, args=(st_a,))
+    th.start()
+    try:
+        assert entered.wait(timeout=5)
+        th_b = threading.Thread(target=node_b, args=(st_b,))
+        th_b.start()
+        th_b.join(timeout=2)
+        assert not th_b.is_alive()  # 全局锁时 B 会一直等到 A 放行
+        assert [json.loads(m.content)["success"] for m in st_b["messages"][1:]] == [True, True]
+    finally:
+        release.set()
+        th.join(timeout=5)
+    assert [json.loads(m.content)["success"] for m in st_a["messages"][1:]] == [True, True]
+
+
+def test_validate_tool_args_uses_args_schema():
+    assert t._validate_tool_args(_FakeStructuredTool(name="x", args_schema=_SniperArgs, handler=None), {"top_k": "3"}) == {"top_k": 3}
+    with pytest.raises(Exception):
+        t._validate_tool_args(_FakeStructuredTool(name="x", args_schema=_SniperArgs, handler=None), {"top_k": "many"})
+    assert t._validate_tool_args(_FakeStructuredTool(name="x", args_schema=None, handler=None), {"a": 1}) == {"a": 1}